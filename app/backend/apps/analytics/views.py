@@ -13,7 +13,7 @@ import json
 
 from apps.courses.models import Course, Enrollment
 from apps.classrooms.models import Classroom, Building
-from apps.schedules.models import Schedule, TimeSlot
+from apps.schedules.models import Schedule, TimeSlot, week_range_cache_stats
 from .serializers import (
     DashboardStatsSerializer, CourseAnalyticsSerializer, UserAnalyticsSerializer,
     ClassroomAnalyticsSerializer, EnrollmentTrendSerializer, DepartmentStatsSerializer,
@@ -573,6 +573,7 @@ class RealtimeStatsView(APIView):
                 'database': db_status,
                 'api': api_status,
                 'cache': cache_status,
+                'week_range_cache': week_range_cache_stats(),
                 'last_updated': now.isoformat(),
                 'uptime': '99.9%',  # 模拟数据
                 'response_time': '120ms'  # 模拟数据
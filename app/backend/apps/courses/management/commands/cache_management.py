@@ -7,6 +7,7 @@ from django.core.cache import cache, caches
 from django.db.models import Count, Avg
 from apps.courses.models import Course, Enrollment, Grade
 from apps.courses.cache_service import course_cache, grade_cache, schedule_cache
+from apps.schedules.models import week_range_cache_stats
 from apps.users.models import User
 import logging
 
@@ -179,6 +180,9 @@ class Command(BaseCommand):
                 self._show_cache_alias_stats('default', '默认缓存')
                 self._show_cache_alias_stats('sessions', '会话缓存')
 
+            if cache_type in ['all', 'schedule']:
+                self._show_week_range_cache_stats()
+
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"获取缓存统计失败: {e}"))
 
@@ -210,6 +214,15 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(f"\n{name} ({alias}): 获取统计失败 - {e}")
 
+    def _show_week_range_cache_stats(self):
+        """显示周次解析的进程内缓存统计"""
+        self.stdout.write("\n周次解析缓存 (进程内):")
+        for name, stats in week_range_cache_stats().items():
+            self.stdout.write(
+                f"  {name}: 命中 {stats['hits']} / 未命中 {stats['misses']}, "
+                f"命中率 {stats['hit_rate'] * 100:.2f}%, 容量 {stats['size']}/{stats['max_size']}"
+            )
+
     def clear_expired_cache(self, cache_type: str):
         """清理过期缓存"""
         self.stdout.write("清理过期缓存...")
@@ -5,8 +5,9 @@
 
 import random
 import time
-from typing import List, Dict, Tuple, Optional, Set
-from dataclasses import dataclass
+import numpy as np
+from typing import Callable, List, Dict, Tuple, Optional, Set
+from dataclasses import dataclass, fields
 from collections import defaultdict
 from django.db import models
 from django.db.models import Q
@@ -14,6 +15,13 @@ from math import ceil
 from django.conf import settings
 
 from .models import Schedule, TimeSlot
+from .availability import SlotAvailabilityIndex, occupy_existing
+from .solver_model import SolverModel, is_noon_time
+from .domains import ConstraintDomains
+from .greedy_core import GreedySolverCore, load_score_weights
+from .local_search import LocalSearchEngine
+from .snapshot import SnapshotConstraint, SolverSnapshot
+from .time_budget import TimeBudget
 from apps.courses.models import Course
 from apps.classrooms.models import Classroom
 from apps.users.models import User
@@ -37,40 +45,48 @@ class ScheduleConstraint:
     def __post_init__(self):
         if self.fixed_time_slots is None:
             self.fixed_time_slots = []
+        # 缓存整数键，哈希和比较时不再访问模型属性
+        self._key = (self.course.id, self.teacher.id, self.sessions_per_week)
 
     def __hash__(self):
-        return hash((self.course.id, self.teacher.id, self.sessions_per_week))
+        return hash(self._key)
 
     def __eq__(self, other):
-        return (self.course.id == other.course.id and
-                self.teacher.id == other.teacher.id and
-                self.sessions_per_week == other.sessions_per_week)
+        return isinstance(other, ScheduleConstraint) and self._key == other._key
 
 
-@dataclass
+@dataclass(eq=False)
 class ScheduleSlot:
     """排课时间槽"""
+    __slots__ = ('day_of_week', 'time_slot', 'classroom', '_key', '_hash')
+
     day_of_week: int
     time_slot: TimeSlot
     classroom: Classroom
-    
+
+    def __post_init__(self):
+        # 缓存整数键与哈希值
+        self._key = (self.day_of_week, self.time_slot.id, self.classroom.id)
+        self._hash = hash(self._key)
+
     def __hash__(self):
-        return hash((self.day_of_week, self.time_slot.id, self.classroom.id))
-    
+        return self._hash
+
     def __eq__(self, other):
-        return (self.day_of_week == other.day_of_week and 
-                self.time_slot.id == other.time_slot.id and 
-                self.classroom.id == other.classroom.id)
+        return isinstance(other, ScheduleSlot) and self._key == other._key
 
 
 class SchedulingAlgorithm:
-    """智能排课算法"""
+    """智能排课算法
+
+    求解过程在 SolverModel 的整数下标（教室下标、单元格）上进行，
+    只有写入 assigned_slots 时才构造 ScheduleSlot 并映射回模型对象。
+    """
     
     def __init__(self, semester: str, academic_year: str):
         self.semester = semester
         self.academic_year = academic_year
         self.constraints: List[ScheduleConstraint] = []
-        self.available_slots: Set[ScheduleSlot] = set()
         self.assigned_slots: Dict[ScheduleConstraint, List[ScheduleSlot]] = {}
         self.conflicts: List[Dict] = []
 
@@ -78,69 +94,259 @@ class SchedulingAlgorithm:
         self.teacher_schedule: Dict[int, Dict[tuple, ScheduleConstraint]] = {}
         self.classroom_schedule: Dict[int, Dict[tuple, ScheduleConstraint]] = {}
         self.time_slot_usage: Dict[int, int] = defaultdict(int)
+        # 求解模型（整数下标结构数组）与可用性索引（占用位掩码 + 教室×单元格 空闲矩阵）
+        self.model: Optional[SolverModel] = None
+        self.slot_index: Optional[SlotAvailabilityIndex] = None
+        self.core: Optional[GreedySolverCore] = None
+        # 增量模式：沿用仍然有效的已有排课，只重新求解变化、新增或失败的约束
+        self.incremental = False
+        self.changed_constraints: Set[ScheduleConstraint] = set()
+        self.stale_schedule_ids: List[int] = []
+        self._adopted_schedule_ids: Dict[ScheduleConstraint, List[int]] = {}
+        # 替换模式（强制重新排课）：范围内的已有排课不作为占用，记入 stale_schedule_ids，
+        # 保存新结果时在同一事务中删除；replace_course_ids 为 None 表示替换整个学期
+        self.replace_existing = False
+        self.replace_course_ids: Optional[Set[int]] = None
+        # 进度回调，接收 {'stage': ..., ...} 形式的字典（异步排课任务用它推送进度）
+        self.progress_callback: Optional[Callable[[Dict], None]] = None
+        # 求解快照：给定时从快照读取时间段、教室与已有排课，不查询数据库
+        self.snapshot: Optional[SolverSnapshot] = None
         # 配置
         self.cfg = getattr(settings, 'SCHEDULE_CONFIG', {})
+        # 本次排课的周次范围：只有周次与之重叠的已有排课才占用时间槽
+        self.week_range = f"1-{self.cfg.get('TERM_WEEKS', 18)}"
+        self._existing_week_masks: Dict[int, int] = {}
+        self.score_weights = self._load_score_weights()
+        # 批量打分用的预计算数组（在 initialize_available_slots 中填充）
+        self._time_slot_order_bonus = np.zeros(0)
+        self._time_slot_usage_counts = np.zeros(0)
+
+    def _load_score_weights(self) -> Dict[str, float]:
+        """读取一次打分权重，避免在打分循环中反复查询配置"""
+        return load_score_weights(self.cfg)
         
     def add_constraint(self, constraint: ScheduleConstraint):
         """添加排课约束"""
         self.constraints.append(constraint)
+
+    def _report_progress(self, **progress):
+        """向进度回调报告当前进度"""
+        if self.progress_callback is not None:
+            self.progress_callback(progress)
         
     def initialize_available_slots(self):
-        """初始化可用时间槽"""
-        time_slots = TimeSlot.objects.filter(is_active=True).order_by('order')
-        classrooms = Classroom.objects.filter(is_active=True)
-        
+        """初始化可用时间槽
+
+        一次性加载教室与时间段并编译求解模型（仅周一到周五），
+        再将已有排课的教室与教师占用写入可用性索引。
+        增量模式下本次约束所属课程的已有排课会被尝试沿用为该约束的分配。
+        """
+        time_slots, classrooms, existing_schedules = self._load_resources()
+        self.model = SolverModel(self.constraints, time_slots, classrooms, days=range(1, 6))
+        self._build_slot_index()
+
+        if self.incremental:
+            self._adopt_existing_schedules(existing_schedules)
+        else:
+            if self.replace_existing:
+                existing_schedules = self._release_replaced_schedules(existing_schedules)
+            self._occupy_existing(row[2:] for row in existing_schedules if self._overlaps_weeks(row))
+
+    def _overlaps_weeks(self, row) -> bool:
+        """已有排课的周次是否与本次排课的周次重叠（快照中的排课没有周次信息，视为重叠）"""
+        week_mask = self._existing_week_masks.get(row[0])
+        return week_mask is None or bool(week_mask & Schedule.week_range_mask(self.week_range))
+
+    def _same_weeks(self, row) -> bool:
+        """已有排课的周次是否与本次排课的周次完全一致"""
+        week_mask = self._existing_week_masks.get(row[0])
+        return week_mask is None or week_mask == Schedule.week_range_mask(self.week_range)
+
+    def _release_replaced_schedules(self, rows) -> List[Tuple]:
+        """替换模式：把范围内的已有排课记入 stale_schedule_ids，返回仍作为占用的其余排课"""
+        kept = []
+        self.stale_schedule_ids = []
+        for row in rows:
+            if self.replace_course_ids is None or row[1] in self.replace_course_ids:
+                self.stale_schedule_ids.append(row[0])
+            else:
+                kept.append(row)
+        return kept
+
+    def _load_resources(self) -> Tuple[List, List, List[Tuple]]:
+        """读取可用时间段、教室及已有排课 (ID, 课程ID, 星期, 时间段ID, 教室ID, 教师ID)
+
+        已有排课的周次位掩码记入 _existing_week_masks。设置了快照时直接使用快照中的数据。
+        """
+        if self.snapshot is not None:
+            return self.snapshot.time_slots, self.snapshot.classrooms, self.snapshot.existing_rows
+        time_slots = list(TimeSlot.objects.filter(is_active=True).order_by('order'))
+        classrooms = list(Classroom.objects.filter(is_active=True))
         # 获取已有的排课，避免冲突
-        existing_schedules = Schedule.objects.filter(
+        existing_schedules = []
+        self._existing_week_masks = {}
+        for *row, week_mask in Schedule.objects.filter(
             semester=self.semester,
             academic_year=self.academic_year,
             status='active'
-        ).select_related('time_slot', 'classroom')
-        
-        occupied_slots = set()
-        for schedule in existing_schedules:
-            slot = ScheduleSlot(
-                day_of_week=schedule.day_of_week,
-                time_slot=schedule.time_slot,
-                classroom=schedule.classroom
-            )
-            occupied_slots.add(slot)
-        
-        # 生成所有可能的时间槽（仅周一到周五）
-        for day in range(1, 6):  # 1-5: 周一到周五
-            for time_slot in time_slots:
-                for classroom in classrooms:
-                    slot = ScheduleSlot(
-                        day_of_week=day,
-                        time_slot=time_slot,
-                        classroom=classroom
-                    )
-                    if slot not in occupied_slots:
-                        self.available_slots.add(slot)
-    
-    def check_teacher_conflict(self, teacher: User, slot: ScheduleSlot) -> bool:
-        """检查教师时间冲突（优化版）"""
-        teacher_id = teacher.id
-        time_key = (slot.day_of_week, slot.time_slot.id)
+        ).values_list('id', 'course_id', 'day_of_week', 'time_slot_id', 'classroom_id', 'teacher_id', 'week_mask'):
+            existing_schedules.append(tuple(row))
+            self._existing_week_masks[row[0]] = week_mask
+        return time_slots, classrooms, existing_schedules
 
-        # 使用字典快速查找，O(1)时间复杂度
-        if teacher_id in self.teacher_schedule:
-            return time_key in self.teacher_schedule[teacher_id]
-        return False
+    def export_snapshot(self, path: Optional[str] = None) -> SolverSnapshot:
+        """导出当前约束与资源的求解快照，给定 path 时同时写入文件（见 SolverSnapshot.save）"""
+        time_slots, classrooms, existing_schedules = self._load_resources()
+        # 快照不保存周次，只保留与本次排课周次重叠的占用
+        existing_schedules = [row for row in existing_schedules if self._overlaps_weeks(row)]
+        snapshot = SolverSnapshot(time_slots, classrooms, self.constraints, existing_schedules,
+                                  semester=self.semester, academic_year=self.academic_year, config=self.cfg)
+        if path is not None:
+            snapshot.save(path)
+        return snapshot
 
-    def check_classroom_conflict(self, classroom: Classroom, slot: ScheduleSlot) -> bool:
-        """检查教室冲突（优化版）"""
-        classroom_id = classroom.id
-        time_key = (slot.day_of_week, slot.time_slot.id)
+    @classmethod
+    def from_snapshot(cls, snapshot: SolverSnapshot, **kwargs) -> 'SchedulingAlgorithm':
+        """由快照创建排课算法，求解过程不访问数据库
 
-        # 使用字典快速查找，O(1)时间复杂度
-        if classroom_id in self.classroom_schedule:
-            return time_key in self.classroom_schedule[classroom_id]
-        return False
+        快照中的排课配置覆盖当前配置；结果中的课程、教师、教室与时间段为快照记录，
+        只用于离线分析与重放，不能直接写入数据库。
+        """
+        algorithm = cls(snapshot.semester, snapshot.academic_year, **kwargs)
+        algorithm.snapshot = snapshot
+        algorithm.cfg = {**algorithm.cfg, **snapshot.config}
+        algorithm.score_weights = algorithm._load_score_weights()
+        for constraint in snapshot.constraints:
+            if isinstance(constraint, SnapshotConstraint):
+                constraint = ScheduleConstraint(**{f.name: getattr(constraint, f.name)
+                                                   for f in fields(SnapshotConstraint)})
+            algorithm.add_constraint(constraint)
+        return algorithm
+
+    def _share_context(self, other: 'SchedulingAlgorithm'):
+        """把约束、进度回调、替换范围、周次、快照与配置传给作为子阶段运行的算法实例"""
+        for constraint in self.constraints:
+            other.add_constraint(constraint)
+        other.progress_callback = self.progress_callback
+        other.replace_existing = self.replace_existing
+        other.replace_course_ids = self.replace_course_ids
+        other.week_range = self.week_range
+        other.snapshot = self.snapshot
+        other.cfg = self.cfg
+        other.score_weights = self.score_weights
+
+    def _build_slot_index(self):
+        """根据求解模型创建空的可用性索引及求解内核"""
+        model = self.model
+        self.slot_index = SlotAvailabilityIndex.for_model(model)
+        usage_counts = np.array(
+            [self.time_slot_usage.get(int(ts_id), 0) for ts_id in model.time_slot_ids], dtype=float
+        )
+        self.core = GreedySolverCore(model, self.slot_index, self.score_weights, usage_counts)
+        # 与求解内核共享的打分数组
+        self._time_slot_order_bonus = self.core.time_slot_order_bonus
+        self._time_slot_usage_counts = self.core.time_slot_usage_counts
+
+    def _occupy_existing(self, rows):
+        """将 (星期, 时间段ID, 教室ID, 教师ID) 形式的已有占用写入索引"""
+        occupy_existing(self.model, self.slot_index, rows)
+
+    def _adopt_existing_schedules(self, rows):
+        """增量模式：把已有排课划分为外部占用、沿用的分配和过期记录
+
+        不属于本次约束课程、且周次与本次排课重叠的排课作为固定占用；某约束的已有排课如果教师与周次一致、
+        节数等于每周课时数且不与其他占用冲突，则直接沿用为该约束的分配，
+        否则该约束标记为需要重新求解，其已有排课记入 stale_schedule_ids。
+        """
+        constraint_by_course = {}
+        for constraint in self.constraints:
+            constraint_by_course.setdefault(constraint.course.id, constraint)
+
+        rows_by_constraint = defaultdict(list)
+        external_rows = []
+        for row in rows:
+            constraint = constraint_by_course.get(row[1])
+            if constraint is None:
+                if self._overlaps_weeks(row):
+                    external_rows.append(row[2:])
+            else:
+                rows_by_constraint[constraint].append(row)
+
+        # 先写入外部占用，沿用的分配需要与之不冲突
+        self._occupy_existing(external_rows)
+
+        for constraint, constraint_rows in rows_by_constraint.items():
+            slots = None
+            if all(self._same_weeks(row) for row in constraint_rows):
+                slots = self._existing_rows_to_slots(constraint, constraint_rows)
+            if slots is None:
+                self.stale_schedule_ids.extend(row[0] for row in constraint_rows)
+                continue
+            self.assigned_slots[constraint] = slots
+            self._adopted_schedule_ids[constraint] = [row[0] for row in constraint_rows]
+            self._update_conflict_tracking(constraint, slots)
+
+    def _existing_rows_to_slots(self, constraint: ScheduleConstraint, rows) -> Optional[List[ScheduleSlot]]:
+        """将约束的已有排课转换为时间槽，不能原样沿用时返回 None"""
+        model, index = self.model, self.slot_index
+        if len(rows) != constraint.sessions_per_week:
+            return None
+        teacher_index = model.teacher_pos[constraint.teacher.id]
+
+        pairs = []
+        for _id, _course_id, day_of_week, time_slot_id, classroom_id, teacher_id in rows:
+            day_index = model.day_pos.get(day_of_week)
+            time_index = model.time_slot_pos.get(time_slot_id)
+            room = model.classroom_pos.get(classroom_id)
+            # 换了教师，或时间段/教室已不在可用资源中
+            if teacher_id != constraint.teacher.id or None in (day_index, time_index, room):
+                return None
+            cell = index.cell(day_index, time_index)
+            if index.is_teacher_busy(teacher_index, cell) or index.is_classroom_busy(room, cell):
+                return None
+            if any(cell == other for _room, other in pairs):
+                return None
+            pairs.append((room, cell))
+        return [self._make_slot(room, cell) for room, cell in pairs]
+
+    @property
+    def available_slots(self) -> Set[ScheduleSlot]:
+        """当前仍可用的时间槽集合（由可用性索引按需生成）"""
+        if self.slot_index is None:
+            return set()
+        rooms, cells = self.slot_index.free_pairs()
+        return {self._make_slot(int(room), int(cell)) for room, cell in zip(rooms, cells)}
+
+    def _make_slot(self, room: int, cell: int) -> ScheduleSlot:
+        """根据 (教室下标, 单元格) 构造时间槽"""
+        model = self.model
+        return ScheduleSlot(
+            day_of_week=model.cell_day(cell),
+            time_slot=model.time_slots[cell % model.num_time_slots],
+            classroom=model.classrooms[room]
+        )
+
+    def check_teacher_conflict(self, teacher: User, slot: ScheduleSlot) -> bool:
+        """检查教师时间冲突（位掩码查询）"""
+        if self.slot_index is None:
+            return False
+        teacher_index = self.model.teacher_pos.get(teacher.id)
+        _room, cell = self.model.slot_position(slot)
+        return (teacher_index is not None and cell is not None and
+                self.slot_index.is_teacher_busy(teacher_index, cell))
+
+    def check_classroom_conflict(self, classroom: Classroom, slot: ScheduleSlot) -> bool:
+        """检查教室冲突（位掩码查询）"""
+        if self.slot_index is None:
+            return False
+        room = self.model.classroom_pos.get(classroom.id)
+        _room, cell = self.model.slot_position(slot)
+        return room is not None and cell is not None and self.slot_index.is_classroom_busy(room, cell)
 
     def _update_conflict_tracking(self, constraint: ScheduleConstraint, slots: List[ScheduleSlot]):
-        """更新冲突跟踪字典"""
+        """更新冲突跟踪（可用性索引及占用明细）"""
         teacher_id = constraint.teacher.id
+        teacher_index = self.model.teacher_pos.get(teacher_id) if self.model is not None else None
 
         # 初始化教师时间表
         if teacher_id not in self.teacher_schedule:
@@ -149,35 +355,76 @@ class SchedulingAlgorithm:
         for slot in slots:
             time_key = (slot.day_of_week, slot.time_slot.id)
 
-            # 更新教师时间表
-            self.teacher_schedule[teacher_id][time_key] = constraint
+            # 更新位掩码索引
+            if self.slot_index is not None:
+                room, cell = self.model.slot_position(slot)
+                if cell is not None:
+                    if teacher_index is not None:
+                        self.slot_index.occupy_teacher(teacher_index, cell)
+                    if room is not None:
+                        self.slot_index.occupy_classroom(room, cell)
+                    self._time_slot_usage_counts[cell % self.model.num_time_slots] += 1
 
-            # 更新教室时间表
+            # 记录占用该时间的约束
+            self.teacher_schedule[teacher_id][time_key] = constraint
             classroom_id = slot.classroom.id
             if classroom_id not in self.classroom_schedule:
                 self.classroom_schedule[classroom_id] = {}
             self.classroom_schedule[classroom_id][time_key] = constraint
             # 更新全局时间段使用计数（用于均衡打分）
             self.time_slot_usage[slot.time_slot.id] += 1
+
+    def _release_conflict_tracking(self, constraint: ScheduleConstraint, slots: List[ScheduleSlot]):
+        """撤销 _update_conflict_tracking 记录的占用"""
+        teacher_id = constraint.teacher.id
+        teacher_index = self.model.teacher_pos.get(teacher_id) if self.model is not None else None
+
+        for slot in slots:
+            time_key = (slot.day_of_week, slot.time_slot.id)
+
+            if self.slot_index is not None:
+                room, cell = self.model.slot_position(slot)
+                if cell is not None:
+                    if teacher_index is not None:
+                        self.slot_index.release_teacher(teacher_index, cell)
+                    if room is not None:
+                        self.slot_index.release_classroom(room, cell)
+                    self._time_slot_usage_counts[cell % self.model.num_time_slots] -= 1
+
+            self.teacher_schedule.get(teacher_id, {}).pop(time_key, None)
+            self.classroom_schedule.get(slot.classroom.id, {}).pop(time_key, None)
+            self.time_slot_usage[slot.time_slot.id] -= 1
+
+    def _teacher_day_load(self, teacher_id: int, day_of_week: int) -> int:
+        """教师某天已排的课时数"""
+        if self.slot_index is not None:
+            teacher_index = self.model.teacher_pos.get(teacher_id)
+            day_index = self.model.day_pos.get(day_of_week)
+            if teacher_index is not None and day_index is not None:
+                return self.slot_index.teacher_day_load(teacher_index, day_index)
+        return sum(1 for (d, _ts) in self.teacher_schedule.get(teacher_id, {}) if d == day_of_week)
     
     def calculate_slot_score(self, constraint: ScheduleConstraint, slot: ScheduleSlot) -> float:
-        """计算时间槽的适合度分数"""
+        """计算时间槽的适合度分数（逐个计算的参考实现，求解时使用 score_candidates）"""
         score = 0.0
+        weights = self.score_weights
         
         # 优先级权重
-        score += constraint.priority * self.cfg.get('priority_weight', 10)
+        score += constraint.priority * weights['priority_weight']
         
         # 偏好教室权重
-        if slot.classroom in constraint.preferred_classrooms:
-            score += self.cfg.get('preferred_classroom_bonus', 20)
+        preferred_classroom_ids = {c.id for c in constraint.preferred_classrooms}
+        if slot.classroom.id in preferred_classroom_ids:
+            score += weights['preferred_classroom_bonus']
         
         # 偏好时间段权重
-        if slot.time_slot in constraint.preferred_time_slots:
-            score += self.cfg.get('preferred_time_slot_bonus', 15)
+        preferred_time_slot_ids = {ts.id for ts in constraint.preferred_time_slots}
+        if slot.time_slot.id in preferred_time_slot_ids:
+            score += weights['preferred_time_slot_bonus']
         
         # 偏好星期权重
         if slot.day_of_week in constraint.preferred_days:
-            score += self.cfg.get('preferred_day_bonus', 10)
+            score += weights['preferred_day_bonus']
         
         # 教室容量适合度
         if hasattr(constraint.course, 'max_students') and constraint.course.max_students:
@@ -190,138 +437,109 @@ class SchedulingAlgorithm:
                 score -= 20  # 容量不足，大幅减分
         
         # 避免过早或过晚的时间
-        if self.cfg.get('good_time_slot_order_min', 2) <= slot.time_slot.order <= self.cfg.get('good_time_slot_order_max', 6):
-            score += self.cfg.get('good_time_slot_bonus', 5)
+        if weights['good_time_slot_order_min'] <= slot.time_slot.order <= weights['good_time_slot_order_max']:
+            score += weights['good_time_slot_bonus']
         
         # 避免中午时间
         if constraint.avoid_noon and self._is_noon_time(slot.time_slot):
-            score -= self.cfg.get('noon_penalty', 30)
+            score -= weights['noon_penalty']
         
         # 同一教师同一天已有课则降权，鼓励分散到不同天
-        teacher_id = constraint.teacher.id
-        same_day_count = 0
-        if teacher_id in self.teacher_schedule:
-            for (d, _ts_id) in self.teacher_schedule[teacher_id].keys():
-                if d == slot.day_of_week:
-                    same_day_count += 1
+        same_day_count = self._teacher_day_load(constraint.teacher.id, slot.day_of_week)
         if same_day_count > 0:
-            score -= self.cfg.get('teacher_same_day_penalty', 8) * same_day_count
+            score -= weights['teacher_same_day_penalty'] * same_day_count
 
         # 时间段均衡：已使用越多的 time_slot 降权，促进稀疏分布
         slot_used = self.time_slot_usage.get(slot.time_slot.id, 0)
         if slot_used > 0:
-            score -= self.cfg.get('time_slot_usage_penalty', 2.0) * slot_used
+            score -= weights['time_slot_usage_penalty'] * slot_used
 
         return score
+
+    def score_candidates(self, constraint: ScheduleConstraint, rooms: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """批量计算候选时间槽的适合度分数
+
+        与 calculate_slot_score 逐项等价，但对一个约束的全部候选
+        (教室下标, 单元格) 一次性以 NumPy 向量运算完成。
+        """
+        return self._score_candidates(self.model.index_of(constraint), rooms, cells)
+
+    def _score_candidates(self, ci: int, rooms: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """按约束下标批量打分"""
+        return self.core.score(ci, rooms, cells)
     
     def find_best_slots(self, constraint: ScheduleConstraint) -> List[ScheduleSlot]:
         """为约束找到最佳时间槽"""
-        candidate_slots = []
-        
-        # 处理固定时间槽
-        if constraint.fixed_time_slots:
-            fixed_slots = []
-            for day_of_week, time_slot in constraint.fixed_time_slots:
-                # 查找匹配的教室
-                for classroom in constraint.preferred_classrooms or self._get_all_classrooms():
-                    slot = ScheduleSlot(day_of_week=day_of_week, time_slot=time_slot, classroom=classroom)
-                    if slot in self.available_slots:
-                        # 检查冲突
-                        if (not self.check_teacher_conflict(constraint.teacher, slot) and
-                            not self.check_classroom_conflict(slot.classroom, slot)):
-                            fixed_slots.append(slot)
-            
-            # 如果固定时间槽数量满足要求
-            if len(fixed_slots) >= constraint.sessions_per_week:
-                # 从可用槽中移除
-                for slot in fixed_slots[:constraint.sessions_per_week]:
-                    self.available_slots.discard(slot)
-                return fixed_slots[:constraint.sessions_per_week]
-        
-        # 筛选可用的时间槽
-        for slot in self.available_slots:
-            # 检查基本约束
-            if (slot.classroom in constraint.preferred_classrooms or 
-                not constraint.preferred_classrooms):
-                if (slot.time_slot in constraint.preferred_time_slots or 
-                    not constraint.preferred_time_slots):
-                    if (slot.day_of_week in constraint.preferred_days or 
-                        not constraint.preferred_days):
-                        # 检查中午时间约束
-                        if constraint.avoid_noon and self._is_noon_time(slot.time_slot):
-                            continue
-                        
-                        # 检查冲突
-                        if (not self.check_teacher_conflict(constraint.teacher, slot) and
-                            not self.check_classroom_conflict(slot.classroom, slot)):
-                            score = self.calculate_slot_score(constraint, slot)
-                            candidate_slots.append((slot, score))
-        
-        # 按分数排序
-        candidate_slots.sort(key=lambda x: x[1], reverse=True)
-        
-        # 选择最佳的时间槽
-        selected_slots = []
-        daily_sessions = defaultdict(int)  # 每天课时计数
-        
-        for slot, score in candidate_slots:
-            if len(selected_slots) >= constraint.sessions_per_week:
-                break
-                
-            # 检查每天最大课时数限制
-            if (constraint.max_daily_sessions > 0 and 
-                daily_sessions[slot.day_of_week] >= constraint.max_daily_sessions):
-                continue
+        if self.slot_index is None:
+            return []
+        ci = self.model.index_of(constraint)
+        if ci is None:
+            return []
+        return [self._make_slot(room, cell) for room, cell in self._select_slots(ci)]
 
-            # 限制教师在同一天的总授课数（跨课程），缓解某天过满
-            teacher_day_load = 0
-            if constraint.teacher.id in self.teacher_schedule:
-                teacher_day_load = sum(1 for (d, _ts) in self.teacher_schedule[constraint.teacher.id].keys() if d == slot.day_of_week)
-            if teacher_day_load >= self.cfg.get('teacher_day_load_limit', 3):
-                continue
-                
-            # 如果避免连续排课，检查是否在同一天（如果已经排了一天的课）
-            if constraint.avoid_consecutive and daily_sessions[slot.day_of_week] > 0:
-                # 检查是否与已选的同一日课程连续
-                if self._would_be_consecutive(slot, selected_slots):
-                    continue
-                
-            selected_slots.append(slot)
-            daily_sessions[slot.day_of_week] += 1
-            
-            # 从可用槽中移除
-            self.available_slots.discard(slot)
-        
-        return selected_slots
+    def _select_slots(self, ci: int, relax_rooms: bool = False, relax_times: bool = False,
+                      sessions: Optional[int] = None,
+                      taken_cells: Tuple[int, ...] = ()) -> List[Tuple[int, int]]:
+        """为约束选择 (教室下标, 单元格)，参见 GreedySolverCore.select"""
+        return self.core.select(ci, relax_rooms, relax_times, sessions, taken_cells)
     
-    def solve(self, timeout_seconds: int = 300) -> Dict:
+    def solve(self, timeout_seconds: int = 300, budget: Optional[TimeBudget] = None) -> Dict:
         """执行排课算法
         
         Args:
             timeout_seconds: 算法执行超时时间（秒）
+            budget: 与其他求解阶段共享的时间预算，给定时忽略 timeout_seconds
         """
         start_time = time.time()
+        budget = TimeBudget.of(timeout_seconds, budget)
         self.initialize_available_slots()
+
+        # 增量模式下沿用的已有分配不再参与求解
+        pending_constraints = self.constraints
+        kept_assignments = 0
+        if self.incremental:
+            pending_constraints = [c for c in self.constraints if c not in self.assigned_slots]
+            kept_assignments = len(self.constraints) - len(pending_constraints)
+            self.changed_constraints.update(pending_constraints)
         
-        # 按优先级排序约束
-        sorted_constraints = sorted(self.constraints, key=lambda x: x.priority, reverse=True)
+        # 按优先级排序约束；最受约束优先时优先级只决定可行域相同约束的先后
+        sorted_constraints = sorted(pending_constraints, key=lambda x: x.priority, reverse=True)
+        domains = None
+        if self.cfg.get('greedy_ordering', 'most_constrained') == 'most_constrained':
+            domains = ConstraintDomains(self.model, self.slot_index,
+                                        [self.model.index_of(c) for c in sorted_constraints],
+                                        self.score_weights['teacher_day_load_limit'], self.core.candidates)
         
-        successful_assignments = 0
+        successful_assignments = kept_assignments
         failed_assignments = []
         
-        for i, constraint in enumerate(sorted_constraints):
+        for i in range(len(sorted_constraints)):
             # 检查超时
-            if time.time() - start_time > timeout_seconds:
+            if budget.expired():
+                remaining = (sorted_constraints[i:] if domains is None
+                             else [self.model.constraints[ci] for ci in domains.pending_order()])
                 failed_assignments.extend([{
                     'constraint': c,
                     'assigned_slots': 0,
                     'required_slots': c.sessions_per_week,
                     'reason': '算法执行超时'
-                } for c in sorted_constraints[i:]])
+                } for c in remaining])
                 break
+            
+            if domains is None:
+                constraint = sorted_constraints[i]
+            else:
+                ci = domains.pop()
+                constraint = self.model.constraints[ci]
                 
             try:
-                best_slots = self.find_best_slots(constraint)
+                if domains is None:
+                    best_slots = self.find_best_slots(constraint)
+                else:
+                    # 前向检查，并增量更新其余约束的可行域
+                    pairs = self.core.select_forward_checked(ci, domains)
+                    domains.consume(ci, pairs)
+                    best_slots = [self._make_slot(room, cell) for room, cell in pairs]
                 
                 if len(best_slots) >= constraint.sessions_per_week:
                     self.assigned_slots[constraint] = best_slots
@@ -348,23 +566,81 @@ class SchedulingAlgorithm:
                     'required_slots': constraint.sessions_per_week,
                     'reason': f'排课失败: {str(e)}'
                 })
+
+            self._report_progress(stage='greedy', processed=i + 1, total=len(sorted_constraints),
+                                  assigned=successful_assignments)
         
         # 尝试解决失败的分配
-        if failed_assignments and time.time() - start_time <= timeout_seconds:
-            resolved_assignments = self._attempt_conflict_resolution(failed_assignments, 
-                                                                    timeout_seconds - (time.time() - start_time))
+        if failed_assignments and not budget.expired():
+            resolved_assignments = self._attempt_conflict_resolution(failed_assignments, budget.remaining())
             successful_assignments += resolved_assignments
 
+        # 增量模式：对仍失败的约束尝试有限次数的局部调整
+        unresolved = [fa for fa in failed_assignments if fa.get('resolved', False) != True]
+        if self.incremental and unresolved and not budget.expired():
+            successful_assignments += self._repair_failed_assignments(unresolved, budget.remaining())
+
         execution_time = time.time() - start_time
-        return {
+        total_constraints = len(self.constraints)
+        result = {
             'successful_assignments': successful_assignments,
             'failed_assignments': [fa for fa in failed_assignments if fa.get('resolved', False) != True],
-            'total_constraints': len(sorted_constraints),
-            'success_rate': successful_assignments / len(sorted_constraints) * 100 if sorted_constraints else 0,
+            'total_constraints': total_constraints,
+            'success_rate': successful_assignments / total_constraints * 100 if total_constraints else 0,
             'assigned_slots': self.assigned_slots,
             'optimization_suggestions': self.get_optimization_suggestions(),
             'execution_time': execution_time
         }
+        if self.incremental:
+            result.update({
+                'kept_assignments': kept_assignments,
+                'changed_constraints': len(self.changed_constraints),
+                'stale_schedule_ids': list(self.stale_schedule_ids)
+            })
+        return result
+
+    def run_local_search(self, budget: Optional[TimeBudget] = None, **options) -> Dict:
+        """在当前分配上执行局部搜索（模拟退火或禁忌搜索），改进后的分配写回 assigned_slots
+
+        带固定时间槽的约束保持不动。未显式传入的参数取自 SCHEDULE_CONFIG。
+
+        Returns:
+            局部搜索统计，参见 LocalSearchEngine.run
+        """
+        model = self.model
+        assignments = {}
+        for constraint, slots in self.assigned_slots.items():
+            ci = model.index_of(constraint)
+            if ci is not None:
+                assignments[ci] = [model.slot_position(slot) for slot in slots]
+
+        # 释放当前分配的占用，由局部搜索引擎在索引中重新登记并维护
+        for constraint, slots in self.assigned_slots.items():
+            self._release_conflict_tracking(constraint, slots)
+
+        settings_options = {
+            'acceptance': self.cfg.get('local_search_acceptance', 'annealing'),
+            'max_iterations': self.cfg.get('local_search_iterations', 20000),
+            'tabu_tenure': self.cfg.get('local_search_tabu_tenure', 10),
+            'initial_temperature': self.cfg.get('local_search_temperature', 50.0),
+            'cooling_rate': self.cfg.get('local_search_cooling_rate', 0.9995),
+        }
+        settings_options.update({key: value for key, value in options.items() if value is not None})
+        locked = [ci for ci in range(len(model.constraints))
+                  if model.fixed_offsets[ci + 1] > model.fixed_offsets[ci]]
+        engine = LocalSearchEngine(model, self.slot_index, self.score_weights, assignments,
+                                   locked=locked, **settings_options)
+        stats = engine.run(budget)
+
+        self.assigned_slots = {}
+        for ci, pairs in engine.assignments().items():
+            constraint = model.constraints[ci]
+            slots = [self._make_slot(room, cell) for room, cell in pairs]
+            self.assigned_slots[constraint] = slots
+            self._update_conflict_tracking(constraint, slots)
+        self._report_progress(stage='local_search', iterations=stats['iterations'],
+                              cost=stats['cost'], unassigned_sessions=stats['unassigned_sessions'])
+        return stats
 
     def _attempt_conflict_resolution(self, failed_assignments: List[Dict], timeout_seconds: float = 60) -> int:
         """尝试解决冲突的分配
@@ -389,53 +665,161 @@ class SchedulingAlgorithm:
                 resolved_count += 1
 
         return resolved_count
-
     def _try_relaxed_constraints(self, constraint: ScheduleConstraint) -> bool:
-        """尝试放宽约束条件重新分配"""
-        # 备份原始偏好
-        original_classrooms = constraint.preferred_classrooms.copy()
-        original_time_slots = constraint.preferred_time_slots.copy()
-        original_days = constraint.preferred_days.copy()
+        """尝试放宽约束条件重新分配
 
-        try:
-            # 放宽教室限制
-            if constraint.preferred_classrooms:
-                constraint.preferred_classrooms = []
-                best_slots = self.find_best_slots(constraint)
-                if len(best_slots) >= constraint.sessions_per_week:
-                    self.assigned_slots[constraint] = best_slots
-                    self._update_conflict_tracking(constraint, best_slots)
-                    return True
+        放宽通过求解模型上的开关完成，不修改约束对象本身；
+        不放宽日期限制，严格限定周一到周五。
+        """
+        if self.slot_index is None:
+            return False
+        model = self.model
+        ci = model.index_of(constraint)
+        if ci is None:
+            return False
 
-            # 放宽时间段限制
-            if constraint.preferred_time_slots:
-                constraint.preferred_time_slots = []
-                best_slots = self.find_best_slots(constraint)
-                if len(best_slots) >= constraint.sessions_per_week:
-                    self.assigned_slots[constraint] = best_slots
-                    self._update_conflict_tracking(constraint, best_slots)
-                    return True
+        if not (model.has_room_pref[ci] or model.has_time_pref[ci]):
+            return False
 
-            # 不放宽日期限制，严格限定周一到周五
-            # 保持 constraint.preferred_days 不变
+        # 先撤销部分分配，放宽后的搜索可以重新使用这些时间槽
+        previous_slots = self.assigned_slots.pop(constraint, [])
+        self._release_conflict_tracking(constraint, previous_slots)
 
-        except Exception:
-            pass
-        finally:
-            # 恢复原始偏好
-            constraint.preferred_classrooms = original_classrooms
-            constraint.preferred_time_slots = original_time_slots
-            constraint.preferred_days = original_days
+        pairs = self.core.select_relaxed(ci)
+        if pairs is not None:
+            best_slots = [self._make_slot(room, cell) for room, cell in pairs]
+            self.assigned_slots[constraint] = best_slots
+            self._update_conflict_tracking(constraint, best_slots)
+            return True
 
+        # 恢复原有的部分分配
+        if previous_slots:
+            self.assigned_slots[constraint] = previous_slots
+            self._update_conflict_tracking(constraint, previous_slots)
         return False
 
+    def _repair_failed_assignments(self, failed_assignments: List[Dict], timeout_seconds: float = 60) -> int:
+        """增量模式：通过挪动其他课程的单节课为失败约束腾出教室
+
+        Args:
+            failed_assignments: 仍未解决的失败分配列表
+            timeout_seconds: 局部调整的超时时间（秒）
+        """
+        start_time = time.time()
+        moves_left = self.cfg.get('incremental_repair_moves', 50)
+        resolved_count = 0
+
+        for failure in failed_assignments:
+            if moves_left <= 0 or time.time() - start_time > timeout_seconds:
+                break
+            constraint = failure['constraint']
+            moves_left -= self._repair_constraint(constraint, moves_left)
+            assigned = len(self.assigned_slots.get(constraint, []))
+            failure['assigned_slots'] = assigned
+            if assigned >= constraint.sessions_per_week:
+                failure['resolved'] = True
+                resolved_count += 1
+
+        return resolved_count
+
+    def _repair_constraint(self, constraint: ScheduleConstraint, max_moves: int) -> int:
+        """为约束补齐缺少的节次，返回使用的调整次数
+
+        只考虑教师空闲但教室被本次求解的其他约束占用的单元格：
+        把占用者的这一节挪到别处，再把腾出的教室分配给当前约束。
+        已有排课中的外部占用和带固定时间槽的约束不会被挪动。
+        """
+        model, index = self.model, self.slot_index
+        ci = model.index_of(constraint)
+        if ci is None:
+            return 0
+        teacher = int(model.constraint_teacher[ci])
+        num_time_slots = model.num_time_slots
+        max_daily = int(model.max_daily[ci])
+        day_load_limit = self.score_weights['teacher_day_load_limit']
+        rooms = self.core.candidates.allowed_rooms(ci)
+        room_order = list(rooms) if rooms is not None else list(range(model.num_classrooms))
+
+        slots = self.assigned_slots.setdefault(constraint, [])
+        own_cells = set(model.slot_position(slot)[1] for slot in slots)
+        cell_mask = self.core.candidates.cell_mask(ci, relax_times=True)
+        moves = 0
+
+        for cell in index.mask_to_cells(cell_mask & ~index.teacher_mask(teacher)):
+            if len(slots) >= model.sessions[ci] or moves >= max_moves:
+                break
+            cell = int(cell)
+            day_index = cell // num_time_slots
+            same_day = sum(1 for other in own_cells if other // num_time_slots == day_index)
+            if max_daily > 0 and same_day >= max_daily:
+                continue
+            if index.teacher_day_load(teacher, day_index) >= day_load_limit:
+                continue
+            if model.avoid_consecutive[ci] and same_day and self._would_be_consecutive(cell, own_cells):
+                continue
+
+            for room in room_order:
+                room = int(room)
+                if not index.free[room, cell]:
+                    if not self._relocate_session(room, cell):
+                        continue
+                    moves += 1
+                new_slot = self._make_slot(room, cell)
+                slots.append(new_slot)
+                own_cells.add(cell)
+                self._update_conflict_tracking(constraint, [new_slot])
+                break
+
+        if not slots:
+            self.assigned_slots.pop(constraint, None)
+        return moves
+
+    def _relocate_session(self, room: int, cell: int) -> bool:
+        """把占用 (教室, 单元格) 的那一节课挪到其他可用位置"""
+        model, index = self.model, self.slot_index
+        classroom = model.classrooms[room]
+        time_key = (model.cell_day(cell), int(model.time_slot_ids[cell % model.num_time_slots]))
+        holder = self.classroom_schedule.get(classroom.id, {}).get(time_key)
+        if holder is None:
+            return False
+        hj = model.index_of(holder)
+        if hj is None or model.fixed_offsets[hj + 1] > model.fixed_offsets[hj]:
+            return False
+
+        holder_slots = self.assigned_slots[holder]
+        old_slot = next(s for s in holder_slots if model.slot_position(s) == (room, cell))
+        remaining = [s for s in holder_slots if s is not old_slot]
+        self._release_conflict_tracking(holder, [old_slot])
+        # 暂时占住原位置，避免被挪回同一处
+        index.occupy_classroom(room, cell)
+        pairs = self._select_slots(hj, relax_rooms=True, relax_times=True, sessions=1,
+                                   taken_cells=tuple(model.slot_position(s)[1] for s in remaining))
+        index.release_classroom(room, cell)
+
+        if not pairs:
+            self._update_conflict_tracking(holder, [old_slot])
+            return False
+
+        new_slot = self._make_slot(*pairs[0])
+        self.assigned_slots[holder] = remaining + [new_slot]
+        self._update_conflict_tracking(holder, [new_slot])
+        # 被挪动的约束整体重写，原有记录作废
+        self.changed_constraints.add(holder)
+        self.stale_schedule_ids.extend(self._adopted_schedule_ids.pop(holder, []))
+        return True
+
     def create_schedules(self) -> List[Schedule]:
-        """根据分配结果创建Schedule对象"""
+        """根据分配结果创建Schedule对象
+
+        增量模式下只为发生变化的约束创建记录，沿用的已有排课保持不变。
+        """
         schedules = []
         used_teacher_keys = set()
         used_classroom_keys = set()
         
         for constraint, slots in self.assigned_slots.items():
+            if self.incremental and constraint not in self.changed_constraints:
+                continue
             for slot in slots:
                 teacher_key = (constraint.teacher.id, slot.day_of_week, slot.time_slot.id)
                 classroom_key = (slot.classroom.id, slot.day_of_week, slot.time_slot.id)
@@ -451,7 +835,7 @@ class SchedulingAlgorithm:
                     day_of_week=slot.day_of_week,
                     semester=self.semester,
                     academic_year=self.academic_year,
-                    week_range="1-18",
+                    week_range=self.week_range,
                     status='active'
                 )
                 schedules.append(schedule)
@@ -503,24 +887,16 @@ class SchedulingAlgorithm:
 
     def _is_noon_time(self, time_slot: TimeSlot) -> bool:
         """判断是否为中午时间（12:00-13:00）"""
-        # 检查时间段是否在中午12点到1点之间
-        if (time_slot.start_time.hour == 12 or 
-            (time_slot.start_time.hour == 11 and time_slot.end_time.hour >= 12) or
-            (time_slot.start_time.hour < 12 and time_slot.end_time.hour > 12)):
-            return True
-        return False
+        return is_noon_time(time_slot)
     
-    def _would_be_consecutive(self, new_slot: ScheduleSlot, selected_slots: List[ScheduleSlot]) -> bool:
-        """检查新时间槽是否与已选时间槽连续"""
-        for slot in selected_slots:
-            if slot.day_of_week == new_slot.day_of_week:
-                # 检查时间是否连续
-                if abs(slot.time_slot.order - new_slot.time_slot.order) == 1:
-                    return True
-        return False
+    def _would_be_consecutive(self, cell: int, selected_cells: Set[int]) -> bool:
+        """检查新单元格是否与已选单元格在同一天且时间段连续"""
+        return self.core.would_be_consecutive(cell, selected_cells)
     
     def _get_all_classrooms(self) -> List[Classroom]:
         """获取所有可用教室"""
+        if self.model is not None:
+            return list(self.model.classrooms)
         return list(Classroom.objects.filter(is_active=True))
     
     def get_constraint_stats(self) -> Dict:
@@ -572,8 +948,64 @@ class SchedulingAlgorithm:
         }
 
 
+def default_preferred_time_slots(time_slots: List, cfg: Dict) -> List:
+    """默认偏好时间段：约2小时的时间段（容忍小幅偏差），没有时使用全部时间段"""
+    two_hour_slots = [
+        ts for ts in time_slots
+        if getattr(ts, 'duration_minutes', 0) and cfg.get('two_hour_minutes_min', 115) <= ts.duration_minutes <= cfg.get('two_hour_minutes_max', 125)
+    ]
+    return two_hour_slots if two_hour_slots else list(time_slots)
+
+
+def build_course_constraint(course, teacher, classrooms: List, preferred_time_slots: List,
+                            hours: int, cfg: Dict) -> ScheduleConstraint:
+    """按课程类型与学时生成默认的排课约束
+
+    Args:
+        course / teacher: 课程与主讲教师（模型对象或快照记录）
+        classrooms: 可用教室
+        preferred_time_slots: 偏好时间段（见 default_preferred_time_slots）
+        hours: 课程总学时
+        cfg: 排课配置
+    """
+    # 根据课程类型调整偏好
+    preferred_classrooms = classrooms
+    if course.course_type == 'lab':
+        # 实验课偏好实验室
+        preferred_classrooms = [c for c in classrooms if c.room_type == 'lab']
+    elif course.course_type == 'lecture':
+        # 理论课偏好大教室
+        preferred_classrooms = [c for c in classrooms if c.capacity >= 50]
+    
+    # 计算每周节次数（以配置的节时长与学期周数为准）
+    term_weeks = cfg.get('TERM_WEEKS', 18)
+    session_duration_hours = cfg.get('SESSION_DURATION_HOURS', 2)
+    weekly_hours = hours / term_weeks
+    sessions_raw = ceil(weekly_hours / session_duration_hours) if session_duration_hours > 0 else 1
+    sessions_cap = cfg.get('sessions_per_week_cap', 2)
+    sessions_per_week = max(1, min(sessions_raw, sessions_cap))
+    
+    return ScheduleConstraint(
+        course=course,
+        teacher=teacher,
+        preferred_classrooms=preferred_classrooms,
+        preferred_time_slots=preferred_time_slots,
+        preferred_days=list(range(1, 6)),  # 周一到周五
+        sessions_per_week=sessions_per_week,
+        avoid_consecutive=True,  # 所有课程避免同日连续
+        avoid_noon=cfg.get('avoid_noon_default', False),        # 默认中午时间惩罚
+        max_daily_sessions=cfg.get('max_daily_sessions_per_course', 1),    # 每门课每天最多1节
+        priority=3 if course.course_type == 'required' else 2  # 必修课优先级高
+    )
+
+
 def create_auto_schedule(semester: str, academic_year: str, course_ids: List[int] = None, 
-                        algorithm_type: str = 'greedy', timeout_seconds: int = 300) -> Dict:
+                        algorithm_type: str = 'greedy', timeout_seconds: int = 300,
+                        incremental: bool = False,
+                        replace_existing: bool = False,
+                        week_range: Optional[str] = None,
+                        progress_callback: Optional[Callable[[Dict], None]] = None,
+                        algorithm_options: Optional[Dict] = None) -> Dict:
     """
     自动排课主函数
     
@@ -581,30 +1013,55 @@ def create_auto_schedule(semester: str, academic_year: str, course_ids: List[int
         semester: 学期
         academic_year: 学年
         course_ids: 要排课的课程ID列表，如果为None则排所有课程
-        algorithm_type: 算法类型 ('greedy', 'genetic', 'hybrid')
+        algorithm_type: 算法类型 ('greedy', 'genetic', 'hybrid', 'multi_start', 'local_search')
         timeout_seconds: 算法执行超时时间（秒）
+        incremental: 增量排课，沿用仍然有效的已有排课，只重新求解变化、新增或失败的课程
+        replace_existing: 替换已有排课（强制重新排课），范围与 AutoScheduleService.remove_existing_schedules
+            一致；求解时忽略这些排课，其ID通过 stale_schedule_ids 返回，由保存结果时统一删除
+        week_range: 新排课的周次范围，默认为整个学期（1-TERM_WEEKS），周次不重叠的已有排课不占用时间槽
+        progress_callback: 进度回调，算法执行过程中以字典形式报告进度
+        algorithm_options: 传给算法构造函数的额外参数，如多起点算法的 num_starts、max_workers
     
     Returns:
         排课结果字典
     """
     # 根据算法类型选择算法实现
-    if algorithm_type == 'genetic':
+    algorithm_options = algorithm_options or {}
+    if incremental:
+        # 增量模式基于贪心算法的可用性索引实现
+        algorithm_type = 'greedy'
+        algorithm = SchedulingAlgorithm(semester, academic_year)
+        algorithm.incremental = True
+    elif algorithm_type == 'genetic':
         try:
             from .genetic_algorithm import GeneticSchedulingAlgorithm
-            algorithm = GeneticSchedulingAlgorithm(semester, academic_year)
+            algorithm = GeneticSchedulingAlgorithm(semester, academic_year, **algorithm_options)
         except ImportError:
             # 如果遗传算法不可用，回退到贪心算法
             algorithm = SchedulingAlgorithm(semester, academic_year)
     elif algorithm_type == 'hybrid':
         try:
             from .hybrid_algorithm import HybridSchedulingAlgorithm
-            algorithm = HybridSchedulingAlgorithm(semester, academic_year)
+            algorithm = HybridSchedulingAlgorithm(semester, academic_year, **algorithm_options)
         except ImportError:
             # 如果混合算法不可用，回退到贪心算法
             algorithm = SchedulingAlgorithm(semester, academic_year)
+    elif algorithm_type == 'multi_start':
+        from .multi_start_algorithm import MultiStartSchedulingAlgorithm
+        algorithm = MultiStartSchedulingAlgorithm(semester, academic_year, **algorithm_options)
+    elif algorithm_type == 'local_search':
+        from .local_search_algorithm import LocalSearchSchedulingAlgorithm
+        algorithm = LocalSearchSchedulingAlgorithm(semester, academic_year, **algorithm_options)
     else:
         algorithm = SchedulingAlgorithm(semester, academic_year)
     
+    algorithm.progress_callback = progress_callback
+    if week_range:
+        algorithm.week_range = week_range
+    if replace_existing and not incremental:
+        algorithm.replace_existing = True
+        algorithm.replace_course_ids = set(course_ids) if course_ids else None
+    
     # 获取需要排课的课程
     courses_query = Course.objects.filter(
         semester=semester,
@@ -620,11 +1077,7 @@ def create_auto_schedule(semester: str, academic_year: str, course_ids: List[int
     cfg = getattr(settings, 'SCHEDULE_CONFIG', {})
     available_classrooms = list(Classroom.objects.filter(is_active=True))
     available_time_slots = list(TimeSlot.objects.filter(is_active=True))
-    # 以约2小时为标准的时间段集合（容忍小幅偏差）
-    two_hour_slots = [
-        ts for ts in available_time_slots
-        if getattr(ts, 'duration_minutes', 0) and cfg.get('two_hour_minutes_min', 115) <= ts.duration_minutes <= cfg.get('two_hour_minutes_max', 125)
-    ]
+    preferred_time_slots = default_preferred_time_slots(available_time_slots, cfg)
     
     # 为每个课程创建约束
     for course in courses_query:
@@ -632,45 +1085,21 @@ def create_auto_schedule(semester: str, academic_year: str, course_ids: List[int
         main_teacher = course.teachers.first()
         if not main_teacher:
             continue
-            
-        # 根据课程类型设置偏好
-        preferred_classrooms = available_classrooms
-        preferred_time_slots = two_hour_slots if two_hour_slots else available_time_slots
-        preferred_days = list(range(1, 6))  # 周一到周五
-        
-        # 根据课程类型调整偏好
-        if course.course_type == 'lab':
-            # 实验课偏好实验室
-            preferred_classrooms = [c for c in available_classrooms if c.room_type == 'lab']
-        elif course.course_type == 'lecture':
-            # 理论课偏好大教室
-            preferred_classrooms = [c for c in available_classrooms if c.capacity >= 50]
-        
-        # 计算每周节次数（以配置的节时长与学期周数为准）
-        term_weeks = cfg.get('TERM_WEEKS', 18)
-        session_duration_hours = cfg.get('SESSION_DURATION_HOURS', 2)
-        weekly_hours = (getattr(course, 'hours', 2) or 2) / term_weeks
-        sessions_raw = ceil(weekly_hours / session_duration_hours) if session_duration_hours > 0 else 1
-        sessions_cap = cfg.get('sessions_per_week_cap', 2)
-        sessions_per_week = max(1, min(sessions_raw, sessions_cap))
         
-        constraint = ScheduleConstraint(
-            course=course,
-            teacher=main_teacher,
-            preferred_classrooms=preferred_classrooms,
-            preferred_time_slots=preferred_time_slots,
-            preferred_days=preferred_days,
-            sessions_per_week=sessions_per_week,
-            avoid_consecutive=True,  # 所有课程避免同日连续
-            avoid_noon=cfg.get('avoid_noon_default', False),        # 默认中午时间惩罚
-            max_daily_sessions=cfg.get('max_daily_sessions_per_course', 1),    # 每门课每天最多1节
-            priority=3 if course.course_type == 'required' else 2  # 必修课优先级高
+        constraint = build_course_constraint(
+            course, main_teacher, available_classrooms, preferred_time_slots,
+            getattr(course, 'hours', 2) or 2, cfg
         )
         
         algorithm.add_constraint(constraint)
     
     # 执行排课算法
     result = algorithm.solve(timeout_seconds)
+    if algorithm.replace_existing:
+        if algorithm.model is None:
+            # 个别算法提前返回子阶段结果，没有加载已有排课
+            algorithm.initialize_available_slots()
+        result['stale_schedule_ids'] = list(algorithm.stale_schedule_ids)
     
     # 生成优化建议
     suggestions = algorithm.get_optimization_suggestions()
@@ -688,6 +1117,7 @@ def create_auto_schedule(semester: str, academic_year: str, course_ids: List[int
         'suggestions': suggestions,
         'algorithm_instance': algorithm,  # 用于后续创建Schedule对象
         'algorithm_type': algorithm_type,
+        'incremental': incremental,
         'constraint_stats': constraint_stats,
         'resource_utilization': resource_utilization
     })
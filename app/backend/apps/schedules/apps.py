@@ -5,3 +5,7 @@ class SchedulesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.schedules'
     verbose_name = '排课管理'
+
+    def ready(self):
+        # 导入信号处理器（课程表缓存失效）
+        import apps.schedules.signals  # noqa: F401
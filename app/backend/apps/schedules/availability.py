@@ -0,0 +1,248 @@
+"""
+排课可用性索引模块
+使用位掩码和占用矩阵快速判断教师、教室在 (星期, 时间段) 上的占用情况
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SlotAvailabilityIndex:
+    """时间槽可用性索引
+
+    (星期, 时间段) 被编码为单元格下标 ``cell = day_index * T + time_index``。
+    教师与教室的占用情况各自保存为整数位掩码（第 cell 位为 1 表示已占用），
+    同时维护一个 教室 × 单元格 的空闲矩阵 ``free``，
+    候选时间槽的生成因此变为掩码求交，而不需要遍历全部时间槽。
+
+    索引只使用整数下标（教室下标、教师下标、单元格），与 SolverModel 的编码一致。
+
+    时间段互相重叠时（``time_overlaps`` 给出每个时间段下标重叠的时间段下标），
+    占用一个单元格会同时挡住同一天所有重叠的单元格（该单元格的"覆盖范围"）。
+    掩码与 ``free`` 表示被挡住的单元格，另以引用计数记录每个单元格被几处占用挡住，
+    释放时只有计数归零才恢复空闲；占用与释放仍按单元格幂等，与不重叠时的语义一致。
+    教师单日授课数按实际占用的单元格统计，不计被挡住的单元格。
+    """
+
+    def __init__(self, num_days: int, num_time_slots: int, num_classrooms: int,
+                 time_overlaps: Optional[Sequence[Sequence[int]]] = None):
+        self.num_days = num_days
+        self.num_time_slots = num_time_slots
+        self.num_classrooms = num_classrooms
+        self.num_cells = num_days * num_time_slots
+        self.full_mask = (1 << self.num_cells) - 1
+
+        # 每天对应的单元格掩码，用于统计某天的占用数
+        day_width_mask = (1 << num_time_slots) - 1
+        self.day_masks: List[int] = [
+            day_width_mask << (i * num_time_slots) for i in range(num_days)
+        ]
+
+        # 教室 × 单元格 空闲矩阵
+        self.free = np.ones((num_classrooms, self.num_cells), dtype=bool)
+        # 占用位掩码
+        self.teacher_masks: Dict[int, int] = {}
+        self.classroom_masks: List[int] = [0] * num_classrooms
+
+        # 时间段重叠时每个单元格的覆盖范围与引用计数；不重叠时为 None，走原有的快速路径
+        self.footprints: Optional[List[Tuple[int, ...]]] = None
+        if time_overlaps is not None and any(len(overlaps) > 1 for overlaps in time_overlaps):
+            self.footprints = [
+                tuple(day_index * num_time_slots + other for other in time_overlaps[time_index])
+                for day_index in range(num_days) for time_index in range(num_time_slots)
+            ]
+            self.classroom_own = np.zeros((num_classrooms, self.num_cells), dtype=bool)
+            self.classroom_refs = np.zeros((num_classrooms, self.num_cells), dtype=np.int32)
+            self.teacher_own: Dict[int, int] = {}
+            self.teacher_refs: Dict[int, np.ndarray] = {}
+
+    @classmethod
+    def for_model(cls, model) -> 'SlotAvailabilityIndex':
+        """按 SolverModel 的网格（含时间段重叠关系）创建空索引"""
+        return cls(model.num_days, model.num_time_slots, model.num_classrooms,
+                   getattr(model, 'time_slot_overlaps', None))
+
+    @property
+    def has_overlaps(self) -> bool:
+        return self.footprints is not None
+
+    def footprint(self, cell: int) -> Tuple[int, ...]:
+        """占用单元格时一并挡住的单元格（含自身）"""
+        if self.footprints is None:
+            return (cell,)
+        return self.footprints[cell]
+
+    def state(self) -> Dict:
+        """可跨进程传递的占用状态，用 load_state 还原到同一网格的索引"""
+        state = {
+            'free': self.free,
+            'classroom_masks': self.classroom_masks,
+            'teacher_masks': self.teacher_masks,
+        }
+        if self.footprints is not None:
+            state.update(classroom_own=self.classroom_own, classroom_refs=self.classroom_refs,
+                         teacher_own=self.teacher_own, teacher_refs=self.teacher_refs)
+        return state
+
+    def load_state(self, state: Dict):
+        """复制 state() 导出的占用状态"""
+        self.free[:] = state['free']
+        self.classroom_masks = list(state['classroom_masks'])
+        self.teacher_masks = dict(state['teacher_masks'])
+        if self.footprints is not None:
+            self.classroom_own[:] = state['classroom_own']
+            self.classroom_refs[:] = state['classroom_refs']
+            self.teacher_own = dict(state['teacher_own'])
+            self.teacher_refs = {teacher: refs.copy() for teacher, refs in state['teacher_refs'].items()}
+
+    # ---- 编码 ----
+
+    def cell(self, day_index: int, time_index: int) -> int:
+        """将 (星期下标, 时间段下标) 编码为单元格下标"""
+        return day_index * self.num_time_slots + time_index
+
+    def mask_to_cells(self, mask: int) -> np.ndarray:
+        """将单元格掩码展开为下标数组（升序）"""
+        data = (mask & self.full_mask).to_bytes((self.num_cells + 7) // 8, 'little')
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder='little')[:self.num_cells]
+        return np.flatnonzero(bits).astype(np.int64)
+
+    @staticmethod
+    def mask_from_cells(allowed: np.ndarray) -> int:
+        """将长度为 num_cells 的布尔数组压缩为单元格掩码"""
+        bits = np.packbits(np.asarray(allowed, dtype=bool), bitorder='little')
+        return int.from_bytes(bits.tobytes(), 'little')
+
+    # ---- 占用维护 ----
+
+    def occupy_classroom(self, room: int, cell: int):
+        """标记教室在单元格上被占用"""
+        if self.footprints is None:
+            self.free[room, cell] = False
+            self.classroom_masks[room] |= 1 << cell
+            return
+        if self.classroom_own[room, cell]:
+            return
+        self.classroom_own[room, cell] = True
+        for blocked in self.footprints[cell]:
+            self.classroom_refs[room, blocked] += 1
+            self.free[room, blocked] = False
+            self.classroom_masks[room] |= 1 << blocked
+
+    def release_classroom(self, room: int, cell: int):
+        """释放教室在单元格上的占用"""
+        if self.footprints is None:
+            self.free[room, cell] = True
+            self.classroom_masks[room] &= ~(1 << cell)
+            return
+        if not self.classroom_own[room, cell]:
+            return
+        self.classroom_own[room, cell] = False
+        for blocked in self.footprints[cell]:
+            self.classroom_refs[room, blocked] -= 1
+            if self.classroom_refs[room, blocked] == 0:
+                self.free[room, blocked] = True
+                self.classroom_masks[room] &= ~(1 << blocked)
+
+    def occupy_teacher(self, teacher: int, cell: int):
+        """标记教师在单元格上被占用"""
+        if self.footprints is None:
+            self.teacher_masks[teacher] = self.teacher_masks.get(teacher, 0) | (1 << cell)
+            return
+        own = self.teacher_own.get(teacher, 0)
+        if (own >> cell) & 1:
+            return
+        self.teacher_own[teacher] = own | (1 << cell)
+        refs = self.teacher_refs.get(teacher)
+        if refs is None:
+            refs = self.teacher_refs[teacher] = np.zeros(self.num_cells, dtype=np.int32)
+        mask = self.teacher_masks.get(teacher, 0)
+        for blocked in self.footprints[cell]:
+            refs[blocked] += 1
+            mask |= 1 << blocked
+        self.teacher_masks[teacher] = mask
+
+    def release_teacher(self, teacher: int, cell: int):
+        """释放教师在单元格上的占用"""
+        if self.footprints is None:
+            self.teacher_masks[teacher] = self.teacher_masks.get(teacher, 0) & ~(1 << cell)
+            return
+        own = self.teacher_own.get(teacher, 0)
+        if not (own >> cell) & 1:
+            return
+        self.teacher_own[teacher] = own & ~(1 << cell)
+        refs = self.teacher_refs[teacher]
+        mask = self.teacher_masks.get(teacher, 0)
+        for blocked in self.footprints[cell]:
+            refs[blocked] -= 1
+            if refs[blocked] == 0:
+                mask &= ~(1 << blocked)
+        self.teacher_masks[teacher] = mask
+
+    # ---- 查询 ----
+
+    def teacher_mask(self, teacher: int) -> int:
+        return self.teacher_masks.get(teacher, 0)
+
+    def is_teacher_busy(self, teacher: int, cell: int) -> bool:
+        return bool((self.teacher_masks.get(teacher, 0) >> cell) & 1)
+
+    def is_classroom_busy(self, room: int, cell: int) -> bool:
+        return bool((self.classroom_masks[room] >> cell) & 1)
+
+    def _teacher_load_mask(self, teacher: int) -> int:
+        """教师实际占用的单元格掩码（不含因时间段重叠被挡住的单元格）"""
+        if self.footprints is None:
+            return self.teacher_masks.get(teacher, 0)
+        return self.teacher_own.get(teacher, 0)
+
+    def teacher_day_load(self, teacher: int, day_index: int) -> int:
+        """教师某天已占用的时间段数量"""
+        return bin(self._teacher_load_mask(teacher) & self.day_masks[day_index]).count('1')
+
+    def teacher_day_loads(self, teacher: int) -> np.ndarray:
+        """教师每天已占用的时间段数量"""
+        mask = self._teacher_load_mask(teacher)
+        return np.array([bin(mask & day_mask).count('1') for day_mask in self.day_masks], dtype=float)
+
+    def candidates(self, rooms: Optional[np.ndarray], cell_mask: int) -> Tuple[np.ndarray, np.ndarray]:
+        """返回在给定教室集合与单元格掩码内所有空闲的 (教室下标, 单元格) 对
+
+        结果按单元格优先、教室次之的顺序排列。``rooms`` 为 None 表示全部教室。
+        """
+        cells = self.mask_to_cells(cell_mask & self.full_mask)
+        if rooms is None:
+            rooms = np.arange(self.num_classrooms, dtype=np.int64)
+        if cells.size == 0 or rooms.size == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        sub = self.free[np.ix_(rooms, cells)]
+        cell_idx, room_idx = np.nonzero(sub.T)
+        return rooms[room_idx], cells[cell_idx]
+
+    def free_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """返回全部空闲的 (教室下标, 单元格) 对"""
+        cell_idx, room_idx = np.nonzero(self.free.T)
+        return room_idx, cell_idx
+
+
+def occupy_existing(model, index: SlotAvailabilityIndex, rows):
+    """将 (星期, 时间段ID, 教室ID, 教师ID) 形式的已有占用写入索引
+
+    ``model`` 提供资源ID到下标的映射（SolverModel），不在模型中的星期、时间段被忽略，
+    教师只跟踪本次约束涉及的教师。
+    """
+    for day_of_week, time_slot_id, classroom_id, teacher_id in rows:
+        day_index = model.day_pos.get(day_of_week)
+        time_index = model.time_slot_pos.get(time_slot_id)
+        if day_index is None or time_index is None:
+            continue
+        cell = index.cell(day_index, time_index)
+        room = model.classroom_pos.get(classroom_id)
+        if room is not None:
+            index.occupy_classroom(room, cell)
+        teacher = model.teacher_pos.get(teacher_id)
+        if teacher is not None:
+            index.occupy_teacher(teacher, cell)
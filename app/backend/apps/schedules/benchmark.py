@@ -0,0 +1,245 @@
+"""
+排课算法基准测试模块
+使用 data_generation.DataGenerator 按固定随机种子生成不同规模的排课问题，
+以快照方式（不访问数据库）运行各排课算法，记录耗时、峰值内存、成功率与软约束得分，
+并可与保存的基线结果比较以发现性能回退
+"""
+
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime, time as dtime
+from math import ceil
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+
+from data_generation.generator import DataGenerator
+from data_generation.params import GenerationParams
+
+from .algorithms import SchedulingAlgorithm, build_course_constraint, default_preferred_time_slots
+from .availability import SlotAvailabilityIndex
+from .genetic_algorithm import GeneticSchedulingAlgorithm
+from .greedy_core import GreedySolverCore, load_score_weights
+from .hybrid_algorithm import HybridSchedulingAlgorithm
+from .snapshot import SnapshotClassroom, SnapshotCourse, SnapshotTeacher, SnapshotTimeSlot, SolverSnapshot
+
+BENCHMARK_ALGORITHMS = {
+    'greedy': SchedulingAlgorithm,
+    'genetic': GeneticSchedulingAlgorithm,
+    'hybrid': HybridSchedulingAlgorithm,
+}
+DEFAULT_SIZES = (100, 1000, 10000)
+
+# 回归判定的默认容差
+DEFAULT_TOLERANCES = {
+    'max_slowdown': 0.25,          # 耗时最多增加 25%
+    'min_time_seconds': 0.5,       # 基线耗时低于该值时不判定耗时回退（计时噪声）
+    'max_memory_growth': 0.25,     # 峰值内存最多增加 25%
+    'max_success_drop': 1.0,       # 成功率最多下降 1 个百分点
+    'max_soft_score_drop': 0.05,   # 软约束得分最多下降 5%
+}
+
+
+def scaled_params(num_courses: int, seed: int = 42) -> GenerationParams:
+    """按课程数等比例放大教室、教师与教学楼数量，使问题规模变化时负载水平大致不变"""
+    num_classrooms = max(10, num_courses // 12)
+    return GenerationParams(
+        seed=seed,
+        num_buildings=max(1, ceil(num_classrooms / 150)),  # 每栋楼最多 180 个房间号
+        num_classrooms=num_classrooms,
+        num_teachers=max(10, num_courses // 3),
+        num_courses=num_courses,
+    )
+
+
+def build_problem(params: GenerationParams, cfg: Optional[Dict] = None) -> SolverSnapshot:
+    """由生成的数据集构建排课问题快照
+
+    约束与 create_auto_schedule 的默认约束一致（见 build_course_constraint）；
+    数据集中的排课记录是生成器给出的参考解，不作为已有占用。
+    cfg 未给定时使用当前的 SCHEDULE_CONFIG。
+    """
+    if cfg is None:
+        cfg = getattr(settings, 'SCHEDULE_CONFIG', {})
+    dataset = DataGenerator(params).generate()
+
+    time_slots = []
+    for position, ts in enumerate(dataset['time_slots'], start=1):
+        start_hour, start_minute = map(int, ts['start_time'].split(':'))
+        end_hour, end_minute = map(int, ts['end_time'].split(':'))
+        time_slots.append(SnapshotTimeSlot(id=position, order=ts['order'], start_time=dtime(start_hour, start_minute),
+                                           end_time=dtime(end_hour, end_minute)))
+    classrooms = [
+        SnapshotClassroom(id=position, capacity=room['capacity'], room_type=room['room_type'])
+        for position, room in enumerate(dataset['classrooms'], start=1)
+    ]
+    teachers = {teacher['username']: SnapshotTeacher(id=position)
+                for position, teacher in enumerate(dataset['users']['teachers'], start=1)}
+
+    preferred_time_slots = default_preferred_time_slots(time_slots, cfg)
+    constraints = []
+    for position, course in enumerate(dataset['courses'], start=1):
+        if not course['teacher_usernames']:
+            continue
+        record = SnapshotCourse(id=position, max_students=course['max_students'], course_type=course['course_type'])
+        constraints.append(build_course_constraint(
+            record, teachers[course['teacher_usernames'][0]], classrooms, preferred_time_slots,
+            course['hours'], cfg
+        ))
+
+    return SolverSnapshot(time_slots, classrooms, constraints, semester=params.semester,
+                          academic_year=params.academic_year, config=cfg)
+
+
+def solution_quality(snapshot: SolverSnapshot, assigned_slots: Dict) -> Dict:
+    """独立计算分配结果的软约束得分与硬冲突数"""
+    model = snapshot.build_model()
+    index = SlotAvailabilityIndex.for_model(model)
+    core = GreedySolverCore(model, index, load_score_weights(snapshot.config))
+
+    assignments = {}
+    teacher_keys, classroom_keys = set(), set()
+    conflicts = 0
+    for constraint, slots in assigned_slots.items():
+        ci = model.index_of(constraint)
+        if ci is None:
+            continue
+        pairs = [model.slot_position(slot) for slot in slots]
+        assignments[ci] = [(room, cell) for room, cell in pairs if room is not None and cell is not None]
+        teacher = int(model.constraint_teacher[ci])
+        for room, cell in assignments[ci]:
+            conflicts += (teacher, cell) in teacher_keys or (room, cell) in classroom_keys
+            # 时间段重叠时，占用会挡住同一天所有重叠的单元格
+            for blocked in index.footprint(cell):
+                teacher_keys.add((teacher, blocked))
+                classroom_keys.add((room, blocked))
+    return {'soft_score': core.assignment_score(assignments), 'hard_conflicts': conflicts}
+
+
+def run_algorithm(snapshot: SolverSnapshot, algorithm_type: str, timeout_seconds: float,
+                  algorithm_options: Optional[Dict] = None) -> Dict:
+    """在快照上运行一个算法并记录指标"""
+    algorithm = BENCHMARK_ALGORITHMS[algorithm_type].from_snapshot(snapshot, **(algorithm_options or {}))
+
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    try:
+        result = algorithm.solve(timeout_seconds)
+        wall_time = time.perf_counter() - start_time
+        _current, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    quality = solution_quality(snapshot, result.get('assigned_slots', {}))
+    return {
+        'algorithm': algorithm_type,
+        'wall_time': wall_time,
+        'peak_memory_mb': peak_memory / (1024 * 1024),
+        'success_rate': result.get('success_rate', 0),
+        'successful_assignments': result.get('successful_assignments', 0),
+        'total_constraints': result.get('total_constraints', len(snapshot.constraints)),
+        'soft_score': quality['soft_score'],
+        'hard_conflicts': quality['hard_conflicts'],
+    }
+
+
+def run_benchmark(sizes: Sequence[int] = DEFAULT_SIZES, algorithms: Sequence[str] = tuple(BENCHMARK_ALGORITHMS),
+                  timeout_seconds: float = 60, seed: int = 42, cfg: Optional[Dict] = None,
+                  algorithm_options: Optional[Dict[str, Dict]] = None, log=print) -> Dict:
+    """运行基准测试
+
+    Args:
+        sizes: 课程数列表
+        algorithms: 算法类型列表（greedy / genetic / hybrid）
+        timeout_seconds: 每次求解的超时时间
+        seed: 数据生成的随机种子
+        cfg: 排课配置，随快照传给算法，默认使用当前的 SCHEDULE_CONFIG
+        algorithm_options: 各算法构造函数的额外参数 {算法类型: {...}}
+        log: 进度输出函数
+
+    Returns:
+        可直接写为 JSON 的结果字典
+    """
+    algorithm_options = algorithm_options or {}
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'seed': seed,
+        'timeout_seconds': timeout_seconds,
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': [],
+    }
+    for size in sizes:
+        snapshot = build_problem(scaled_params(size, seed), cfg)
+        for algorithm_type in algorithms:
+            log(f"🔄 {size} 门课程: 运行 {algorithm_type} ...")
+            record = run_algorithm(snapshot, algorithm_type, timeout_seconds, algorithm_options.get(algorithm_type))
+            record.update({
+                'num_courses': size,
+                'num_constraints': len(snapshot.constraints),
+                'num_classrooms': len(snapshot.classrooms),
+            })
+            report['results'].append(record)
+            log(f"  ✅ 成功率 {record['success_rate']:.1f}%, 耗时 {record['wall_time']:.2f}秒, "
+                f"峰值内存 {record['peak_memory_mb']:.1f}MB, 软约束得分 {record['soft_score']:.0f}")
+    return report
+
+
+def compare_with_baseline(report: Dict, baseline: Dict, tolerances: Optional[Dict] = None) -> List[Dict]:
+    """将结果与基线比较，返回超出容差的回退项
+
+    只比较两边都存在的 (课程数, 算法) 组合。
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    baseline_results = {(r['num_courses'], r['algorithm']): r for r in baseline.get('results', [])}
+    regressions = []
+
+    def regressed(record, metric, old, new, limit):
+        regressions.append({
+            'num_courses': record['num_courses'],
+            'algorithm': record['algorithm'],
+            'metric': metric,
+            'baseline': old,
+            'current': new,
+            'limit': limit,
+        })
+
+    for record in report.get('results', []):
+        old = baseline_results.get((record['num_courses'], record['algorithm']))
+        if old is None:
+            continue
+        if old['wall_time'] >= tolerances['min_time_seconds']:
+            limit = old['wall_time'] * (1 + tolerances['max_slowdown'])
+            if record['wall_time'] > limit:
+                regressed(record, 'wall_time', old['wall_time'], record['wall_time'], limit)
+        limit = old['peak_memory_mb'] * (1 + tolerances['max_memory_growth'])
+        if record['peak_memory_mb'] > limit:
+            regressed(record, 'peak_memory_mb', old['peak_memory_mb'], record['peak_memory_mb'], limit)
+        limit = old['success_rate'] - tolerances['max_success_drop']
+        if record['success_rate'] < limit:
+            regressed(record, 'success_rate', old['success_rate'], record['success_rate'], limit)
+        limit = old['soft_score'] - abs(old['soft_score']) * tolerances['max_soft_score_drop']
+        if record['soft_score'] < limit:
+            regressed(record, 'soft_score', old['soft_score'], record['soft_score'], limit)
+        if record['hard_conflicts'] > old['hard_conflicts']:
+            regressed(record, 'hard_conflicts', old['hard_conflicts'], record['hard_conflicts'],
+                      old['hard_conflicts'])
+    return regressions
+
+
+def save_report(report: Dict, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def load_report(path: str) -> Dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,81 @@
+"""
+排课WebSocket消费者
+"""
+
+import json
+import logging
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from .models import SchedulingJob
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulingJobConsumer(AsyncWebsocketConsumer):
+    """排课任务进度消费者"""
+
+    # 与 CanManageSchedules 相同的角色
+    MANAGER_USER_TYPES = ['admin', 'academic_admin']
+
+    async def connect(self):
+        """连接到指定排课任务的进度频道"""
+        self.user = self.scope["user"]
+
+        if isinstance(self.user, AnonymousUser):
+            await self.close()
+            return
+
+        self.job_id = int(self.scope['url_route']['kwargs']['job_id'])
+        job_data = await self.get_job_data()
+        if job_data is None:
+            # 任务不存在或无权查看
+            await self.close()
+            return
+
+        self.job_group_name = f"scheduling_job_{self.job_id}"
+        await self.channel_layer.group_add(
+            self.job_group_name,
+            self.channel_name
+        )
+
+        await self.accept()
+
+        # 连接后立即发送任务当前状态
+        await self.send(text_data=json.dumps({
+            'type': 'job_update',
+            'job': job_data
+        }))
+
+    async def disconnect(self, close_code):
+        """断开连接"""
+        if hasattr(self, 'job_group_name'):
+            await self.channel_layer.group_discard(
+                self.job_group_name,
+                self.channel_name
+            )
+
+    # 组消息处理器
+    async def job_update(self, event):
+        """处理任务状态与进度更新"""
+        await self.send(text_data=json.dumps({
+            'type': 'job_update',
+            'job': event['job']
+        }))
+
+    @database_sync_to_async
+    def get_job_data(self):
+        """获取任务当前状态；任务不存在或当前用户无权查看时返回 None"""
+        try:
+            job = SchedulingJob.objects.get(pk=self.job_id)
+        except SchedulingJob.DoesNotExist:
+            return None
+        if not self.can_view_job(job):
+            return None
+        return job.to_dict()
+
+    def can_view_job(self, job):
+        """与排课管理接口一致只允许管理员角色，且只能查看自己创建的任务（系统管理员不限）"""
+        if self.user.user_type not in self.MANAGER_USER_TYPES:
+            return False
+        return job.is_visible_to(self.user)
@@ -0,0 +1,240 @@
+"""
+约束可行域模块
+CandidateDomains 预先计算每个约束在严格、放宽教室、放宽时间段三个级别下的静态候选域；
+ConstraintDomains 统计每个约束在当前占用下仍可使用的单元格数量（可行域大小），
+支持按"最受约束优先"的顺序选取约束，并在分配后增量更新其余约束的可行域（前向检查）
+"""
+
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .availability import SlotAvailabilityIndex
+from .solver_model import SolverModel
+
+Pair = Tuple[int, int]  # (教室下标, 单元格)
+
+
+class CandidateDomains:
+    """各约束的静态候选域
+
+    候选域只取决于约束的偏好，与占用无关，因此在求解开始时一次性计算：
+      - 教室：严格级别为偏好教室下标（无偏好时为 None，表示全部教室），放宽教室后为 None
+      - 单元格：偏好星期 × 偏好时间段（去掉需要回避的中午），放宽时间段后只保留星期限制
+    求解时的候选 (教室, 单元格) 由候选域与可用性索引中的空闲占用求交得到，
+    因此放宽约束只是换一个候选域，不需要重新扫描时间槽或查询数据库。
+    """
+
+    def __init__(self, model: SolverModel):
+        num_constraints = len(model.sessions)
+        noon = model.time_slot_noon
+        day_ok = np.where(model.has_day_pref[:, None], model.day_pref, True)
+        time_strict = np.where(model.has_time_pref[:, None], model.time_pref, True)
+        time_relaxed = np.ones((num_constraints, model.num_time_slots), dtype=bool)
+        avoid_noon = model.avoid_noon[:, None] & noon[None, :]
+        self.cells = {
+            False: (day_ok[:, :, None] & (time_strict & ~avoid_noon)[:, None, :]).reshape(num_constraints, -1),
+            True: (day_ok[:, :, None] & (time_relaxed & ~avoid_noon)[:, None, :]).reshape(num_constraints, -1),
+        }
+        self.cell_masks = {
+            relax_times: [SlotAvailabilityIndex.mask_from_cells(row) for row in cells]
+            for relax_times, cells in self.cells.items()
+        }
+        self.rooms: List[Optional[np.ndarray]] = [
+            np.flatnonzero(model.room_pref[ci]) if model.has_room_pref[ci] else None
+            for ci in range(num_constraints)
+        ]
+
+    def allowed_rooms(self, ci: int, relax_rooms: bool = False) -> Optional[np.ndarray]:
+        """允许的教室下标，None 表示不限制"""
+        return None if relax_rooms else self.rooms[ci]
+
+    def allowed_cells(self, ci: int, relax_times: bool = False) -> np.ndarray:
+        """允许的单元格布尔数组，与 SolverModel.allowed_cells 一致"""
+        return self.cells[relax_times][ci]
+
+    def cell_mask(self, ci: int, relax_times: bool = False) -> int:
+        """允许的单元格掩码"""
+        return self.cell_masks[relax_times][ci]
+
+
+class ConstraintDomains:
+    """约束可行域统计
+
+    约束 c 在单元格 x 上可用，当且仅当 x 是允许的单元格（偏好星期 × 偏好时间段，
+    带固定时间槽的约束只允许固定单元格）、教师在 x 空闲且当天授课数未达上限、
+    且至少有一间允许的教室在 x 空闲。
+    ``room_count[c, x]`` 保存允许且空闲的教室数，``day_domain[c, d]`` 为第 d 天的可用单元格数，
+    ``pair_domain[c]`` 为可用的 (教室, 单元格) 对数（可行域大小）；
+    约束的容量为各天可用单元格数（不超过每日最大课时数）之和，用于前向检查。
+    占用一个 (教室, 单元格) 时只更新使用该教室或该教师的约束。
+
+    选取顺序按每节课平均的可行域大小升序，实验室、大教室等稀缺资源的课程因此优先。
+
+    Args:
+        model: 求解模型
+        index: 可用性索引（构造时读取其中已有的占用）
+        order: 待排约束下标，可行域相同时按此顺序选取
+        day_load_limit: 教师单日授课数上限（与 GreedySolverCore 的 teacher_day_load_limit 一致）
+        candidates: 预先计算的静态候选域，未给定时新建
+    """
+
+    def __init__(self, model: SolverModel, index: SlotAvailabilityIndex, order: Sequence[int],
+                 day_load_limit: int, candidates: Optional[CandidateDomains] = None):
+        self.model = model
+        self.day_load_limit = day_load_limit
+        num_constraints = len(model.sessions)
+        num_teachers = len(model.teacher_ids)
+        num_days, num_time_slots = model.num_days, model.num_time_slots
+        num_cells = model.num_cells
+
+        # 允许的教室与单元格
+        if candidates is None:
+            candidates = CandidateDomains(model)
+        self.room_ok = np.where(model.has_room_pref[:, None], model.room_pref, True)
+        self.cell_ok = candidates.cells[False].copy()
+        for ci in np.flatnonzero(model.fixed_offsets[1:] > model.fixed_offsets[:-1]):
+            self.cell_ok[ci] = False
+            self.cell_ok[ci, model.fixed_cells(int(ci))] = True
+
+        # 允许且空闲的教室数；教师占用的单元格与每天的授课数，达到上限的那天整天不可用
+        self.room_count = self.room_ok.astype(np.int64) @ index.free.astype(np.int64)
+        teacher_busy = np.array(
+            [[(index.teacher_mask(teacher) >> cell) & 1 for cell in range(num_cells)]
+             for teacher in range(num_teachers)],
+            dtype=bool
+        ).reshape(num_teachers, num_cells)
+        # 单日授课数按实际占用统计（时间段重叠时被挡住的单元格不计）
+        self.teacher_day_load = np.array(
+            [index.teacher_day_loads(teacher) for teacher in range(num_teachers)], dtype=np.int64
+        ).reshape(num_teachers, num_days)
+        teacher_blocked = teacher_busy | np.repeat(self.teacher_day_load >= day_load_limit, num_time_slots, axis=1)
+        self.teacher_free = ~teacher_blocked[model.constraint_teacher]
+        available = self.cell_ok & self.teacher_free & (self.room_count > 0)
+        self.day_domain = available.reshape(num_constraints, num_days, num_time_slots).sum(axis=2)
+        self.pair_domain = (available * self.room_count).sum(axis=1)
+        # 每天最多可用的节数
+        self.day_cap = np.where(model.max_daily > 0, model.max_daily, num_time_slots)
+
+        # 使用某教室 / 某教师的约束
+        self.room_users: List[np.ndarray] = [np.flatnonzero(self.room_ok[:, room])
+                                             for room in range(model.num_classrooms)]
+        self.teacher_users: Dict[int, np.ndarray] = {
+            int(teacher): np.flatnonzero(model.constraint_teacher == teacher)
+            for teacher in np.unique(model.constraint_teacher)
+        }
+
+        # 待排约束及同等可行域下的先后次序
+        self.pending = np.zeros(num_constraints, dtype=bool)
+        self.rank = np.full(num_constraints, len(order), dtype=np.int64)
+        for position, ci in enumerate(order):
+            self.pending[ci] = True
+            self.rank[ci] = position
+
+    # ---- 查询 ----
+
+    def capacity(self, day_domain: np.ndarray = None) -> np.ndarray:
+        """各约束最多还能安排的节数"""
+        if day_domain is None:
+            day_domain = self.day_domain
+        return np.minimum(day_domain, self.day_cap[:, None]).sum(axis=1)
+
+    def slack(self) -> np.ndarray:
+        """容量减去所需节数，越小越受约束"""
+        return self.capacity() - self.model.sessions
+
+    def has_pending(self) -> bool:
+        return bool(self.pending.any())
+
+    def _order_keys(self, candidates: np.ndarray) -> np.ndarray:
+        """每节课平均的可行域大小"""
+        return self.pair_domain[candidates] / np.maximum(self.model.sessions[candidates], 1)
+
+    def pending_order(self) -> List[int]:
+        """按当前选取顺序排列的待排约束"""
+        candidates = np.flatnonzero(self.pending)
+        keys = np.lexsort((self.rank[candidates], self._order_keys(candidates)))
+        return candidates[keys].tolist()
+
+    def pop(self) -> int:
+        """取出最受约束的待排约束（每节课平均可行域最小，同等时按给定顺序）"""
+        candidates = np.flatnonzero(self.pending)
+        keys = self._order_keys(candidates)
+        tied = candidates[keys == keys.min()]
+        ci = int(tied[np.argmin(self.rank[tied])])
+        self.pending[ci] = False
+        return ci
+
+    def _teacher_lost_cells(self, teacher: int, cells: Sequence[int]) -> List[int]:
+        """教师占用 cells 后变为不可用的单元格（含达到单日上限的整天）"""
+        num_time_slots = self.model.num_time_slots
+        lost = set(cells)
+        added: Dict[int, int] = {}
+        for cell in cells:
+            day_index = cell // num_time_slots
+            added[day_index] = added.get(day_index, 0) + 1
+        for day_index, count in added.items():
+            if self.teacher_day_load[teacher, day_index] + count >= self.day_load_limit:
+                lost.update(range(day_index * num_time_slots, (day_index + 1) * num_time_slots))
+        return sorted(lost)
+
+    def losses(self, ci: int, pairs: Sequence[Pair]) -> Dict[int, Set[int]]:
+        """假设约束 ci 占用 pairs，返回各待排约束将失去的单元格（不修改统计）"""
+        teacher = int(self.model.constraint_teacher[ci])
+        teacher_users = self.teacher_users.get(teacher, np.empty(0, dtype=np.int64))
+        teacher_users = teacher_users[self.pending[teacher_users]]
+        lost: Dict[int, Set[int]] = {}
+        # 同一约束的各节位于不同单元格，每个单元格只占用一间教室
+        for room, cell in pairs:
+            users = self.room_users[room]
+            available = self.pending[users] & self.cell_ok[users, cell] & self.teacher_free[users, cell]
+            for cj in users[available & (self.room_count[users, cell] <= 1)]:
+                lost.setdefault(int(cj), set()).add(cell)
+        for cell in self._teacher_lost_cells(teacher, [cell for _room, cell in pairs]):
+            available = (self.cell_ok[teacher_users, cell] & self.teacher_free[teacher_users, cell] &
+                         (self.room_count[teacher_users, cell] > 0))
+            for cj in teacher_users[available]:
+                lost.setdefault(int(cj), set()).add(cell)
+        return lost
+
+    def wipeouts(self, ci: int, pairs: Sequence[Pair]) -> Dict[int, Set[int]]:
+        """占用 pairs 后容量将小于所需节数的待排约束（原本可满足的），及其失去的单元格"""
+        sessions = self.model.sessions
+        num_time_slots = self.model.num_time_slots
+        wiped = {}
+        for cj, cells in self.losses(ci, pairs).items():
+            day_domain = self.day_domain[cj].copy()
+            for cell in cells:
+                day_domain[cell // num_time_slots] -= 1
+            before = int(np.minimum(self.day_domain[cj], self.day_cap[cj]).sum())
+            after = int(np.minimum(day_domain, self.day_cap[cj]).sum())
+            if before >= sessions[cj] > after:
+                wiped[cj] = cells
+        return wiped
+
+    # ---- 更新 ----
+
+    def consume(self, ci: int, pairs: Sequence[Pair]):
+        """约束 ci 占用 pairs 后增量更新受影响约束的可行域"""
+        num_time_slots = self.model.num_time_slots
+        teacher = int(self.model.constraint_teacher[ci])
+        teacher_users = self.teacher_users.get(teacher, np.empty(0, dtype=np.int64))
+        for room, cell in pairs:
+            day_index = cell // num_time_slots
+            users = self.room_users[room]
+            available = users[self.cell_ok[users, cell] & self.teacher_free[users, cell] &
+                              (self.room_count[users, cell] > 0)]
+            self.room_count[users, cell] -= 1
+            self.pair_domain[available] -= 1
+            emptied = available[self.room_count[available, cell] == 0]
+            self.day_domain[emptied, day_index] -= 1
+
+        teacher_lost = self._teacher_lost_cells(teacher, [cell for _room, cell in pairs])
+        for _room, cell in pairs:
+            self.teacher_day_load[teacher, cell // num_time_slots] += 1
+        for cell in teacher_lost:
+            busy = teacher_users[self.teacher_free[teacher_users, cell]]
+            self.teacher_free[busy, cell] = False
+            lost = busy[self.cell_ok[busy, cell] & (self.room_count[busy, cell] > 0)]
+            self.day_domain[lost, cell // num_time_slots] -= 1
+            self.pair_domain[lost] -= self.room_count[lost, cell]
@@ -3,27 +3,37 @@
 实现基于遗传算法的智能排课算法
 """
 
+import os
 import random
-import copy
+import time
 import numpy as np
-from typing import List, Dict, Set, Tuple
-from dataclasses import dataclass
-from collections import defaultdict
+from typing import List, Dict, Optional, Set, Tuple
+from dataclasses import dataclass, field
 
 from .algorithms import SchedulingAlgorithm, ScheduleConstraint, ScheduleSlot
+from .genetic_fitness import FitnessEvaluator, FitnessState
+from .time_budget import TimeBudget
 from .models import Schedule, TimeSlot
 from apps.courses.models import Course
 from apps.classrooms.models import Classroom
 from apps.users.models import User
 
 
-@dataclass
+@dataclass(eq=False)
 class Individual:
-    """个体类 - 代表一个完整的排课方案"""
-    chromosome: Dict[ScheduleConstraint, List[ScheduleSlot]]  # 染色体：约束到时间槽的映射
+    """个体类 - 代表一个完整的排课方案
+
+    遗传操作在紧凑基因数组 genome 上进行，state 为其适应度统计（见 genetic_fitness）；
+    chromosome 是映射回模型对象的视图，只在输入和输出结果时使用。
+    """
+    chromosome: Dict[ScheduleConstraint, List[ScheduleSlot]] = field(default_factory=dict)  # 染色体：约束到时间槽的映射
     fitness: float = 0.0  # 适应度
+    genome: Optional[np.ndarray] = None  # 基因数组
+    state: Optional[FitnessState] = None  # 适应度统计，随基因增量更新
     
     def __hash__(self):
+        if self.genome is not None:
+            return hash(self.genome.tobytes())
         # 基于染色体内容计算哈希值
         hash_value = 0
         for constraint, slots in self.chromosome.items():
@@ -39,232 +49,163 @@ class GeneticSchedulingAlgorithm(SchedulingAlgorithm):
                  max_generations: int = 1000,
                  crossover_rate: float = 0.8,
                  mutation_rate: float = 0.1,
-                 elite_size: int = 5):
+                 elite_size: int = 5,
+                 seed: Optional[int] = None,
+                 fitness_workers: Optional[int] = None):
         super().__init__(semester, academic_year)
         self.population_size = population_size
         self.max_generations = max_generations
         self.crossover_rate = crossover_rate
         self.mutation_rate = mutation_rate
         self.elite_size = elite_size
+        # 随机数发生器，固定种子时结果可复现（与适应度评估是否并行无关）
+        self.rng = random.Random(seed)
+        # 适应度评估进程数，1 为串行，0 为全部 CPU 核心
+        if fitness_workers is None:
+            fitness_workers = self.cfg.get('genetic_fitness_workers', 1)
+        self.fitness_workers = fitness_workers or os.cpu_count() or 1
         
         # 遗传算法特有的属性
         self.population: List[Individual] = []
         self.best_individual: Individual = None
         self.fitness_history: List[float] = []
-        
+        self.fitness_evaluator: Optional[FitnessEvaluator] = None
+        # 种群基因矩阵，每行对应 population 中的一个个体
+        self.genomes: Optional[np.ndarray] = None
+        # 作为精英个体的初始解（如混合算法的贪心结果），为 None 时由贪心算法生成
+        self.initial_assignments: Optional[Dict[ScheduleConstraint, List[ScheduleSlot]]] = None
+        # 时间预算，由 solve() 设置；默认不限时
+        self.budget = TimeBudget()
+        self.termination_reason = ''
+        # 随机个体可选用的基因（空闲的 教室下标 * 单元格数 + 单元格）
+        self._gene_pool: List[int] = []
+        # 交换的约束数超过该值时，交叉直接重新计算子代的适应度统计
+        self.delta_crossover_limit = 64
+        self._constraint_index: Dict[ScheduleConstraint, int] = {}
+        
+    def _prepare_model(self):
+        """编译求解模型并创建适应度评估器（只执行一次）"""
+        if self.model is None:
+            self.initialize_available_slots()
+        if self.fitness_evaluator is None:
+            self.fitness_evaluator = FitnessEvaluator(self.model, max_workers=self.fitness_workers)
+            rooms, cells = self.slot_index.free_pairs()
+            self._gene_pool = (rooms * self.model.num_cells + cells).tolist()
+            # 染色体中的约束可能是深拷贝，按约束键（而非对象身份）定位
+            self._constraint_index = {c: i for i, c in enumerate(self.model.constraints)}
+
     def initialize_population(self):
         """初始化种群"""
         print(f"🧬 初始化种群，大小: {self.population_size}")
-        self.population = []
-        
-        # 使用贪心算法生成初始个体
-        greedy_algorithm = SchedulingAlgorithm(self.semester, self.academic_year)
-        
-        # 复制约束
-        for constraint in self.constraints:
-            greedy_algorithm.add_constraint(constraint)
-        
-        # 生成精英个体（使用贪心算法）
-        for i in range(min(self.elite_size, self.population_size)):
-            print(f"  生成精英个体 {i+1}/{self.elite_size}")
-            # 运行贪心算法
-            greedy_result = greedy_algorithm.solve()
-            
-            # 创建个体
-            chromosome = {}
-            if 'assigned_slots' in greedy_result:
-                chromosome = copy.deepcopy(greedy_result['assigned_slots'])
-            
-            individual = Individual(chromosome=chromosome)
-            self.calculate_fitness(individual)
-            self.population.append(individual)
-            
-            # 重置贪心算法的状态
-            greedy_algorithm.assigned_slots.clear()
-            greedy_algorithm.teacher_schedule.clear()
-            greedy_algorithm.classroom_schedule.clear()
-            greedy_algorithm.available_slots.clear()
+        self._prepare_model()
+        self.genomes = np.full((self.population_size, self.fitness_evaluator.offsets[-1]), -1, dtype=np.int64)
+        
+        # 生成精英个体（使用贪心算法）；贪心算法是确定性的，只需运行一次
+        elite_count = min(self.elite_size, self.population_size)
+        if elite_count:
+            assignments = self.initial_assignments
+            if assignments is None:
+                print(f"  生成精英个体 {elite_count} 个")
+                greedy_algorithm = SchedulingAlgorithm(self.semester, self.academic_year)
+                self._share_context(greedy_algorithm)
+                assignments = greedy_algorithm.solve(budget=self.budget).get('assigned_slots', {})
+            self.genomes[:elite_count] = self.encode_assignments(assignments)
         
         # 生成随机个体填充剩余位置
-        for i in range(len(self.population), self.population_size):
-            print(f"  生成随机个体 {i+1}/{self.population_size}")
-            chromosome = self._generate_random_chromosome()
-            individual = Individual(chromosome=chromosome)
-            self.calculate_fitness(individual)
-            self.population.append(individual)
+        for row in range(elite_count, self.population_size):
+            self._random_genome(self.genomes[row])
         
+        self.population = [Individual(genome=self.genomes[row]) for row in range(self.population_size)]
+        self.evaluate_population(self.population)
         print(f"✅ 种群初始化完成，共 {len(self.population)} 个个体")
     
-    def _generate_random_chromosome(self) -> Dict[ScheduleConstraint, List[ScheduleSlot]]:
-        """生成随机染色体"""
-        chromosome = {}
-        
-        # 为每个约束随机分配时间槽
-        for constraint in self.constraints:
-            # 随机选择时间槽
-            slots = []
-            for _ in range(constraint.sessions_per_week):
-                if self.available_slots:
-                    slot = random.choice(list(self.available_slots))
-                    slots.append(slot)
-            
-            chromosome[constraint] = slots
-        
-        return chromosome
+    def _random_genome(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """生成随机基因数组：每节课从空闲的 (教室, 单元格) 中随机选取"""
+        if out is None:
+            out = np.full(self.fitness_evaluator.offsets[-1], -1, dtype=np.int64)
+        if self._gene_pool:
+            for k in range(out.size):
+                out[k] = self.rng.choice(self._gene_pool)
+        return out
+    
+    def _random_genes(self, ci: int) -> np.ndarray:
+        """为约束 ci 生成随机基因"""
+        offsets = self.fitness_evaluator.offsets
+        genes = np.full(offsets[ci + 1] - offsets[ci], -1, dtype=np.int64)
+        if self._gene_pool:
+            for k in range(genes.size):
+                genes[k] = self.rng.choice(self._gene_pool)
+        return genes
+    
+    def encode(self, individual: Individual) -> np.ndarray:
+        """将个体编码为紧凑的整数基因数组（不含模型对象，序列化开销小）"""
+        if individual.genome is not None:
+            return individual.genome
+        return self.encode_assignments(individual.chromosome)
+    
+    def encode_assignments(self, assignments: Dict[ScheduleConstraint, List[ScheduleSlot]]) -> np.ndarray:
+        """将 约束 -> 时间槽列表 编码为基因数组"""
+        model = self.model
+        offsets = self.fitness_evaluator.offsets
+        genome = np.full(offsets[-1], -1, dtype=np.int64)
+        for constraint, slots in assignments.items():
+            ci = self._constraint_index.get(constraint)
+            if ci is None:
+                continue
+            start = offsets[ci]
+            for k, slot in enumerate(slots[:offsets[ci + 1] - start]):
+                room, cell = model.slot_position(slot)
+                if room is not None and cell is not None:
+                    genome[start + k] = room * model.num_cells + cell
+        return genome
+    
+    def decode(self, genome: np.ndarray) -> Dict[ScheduleConstraint, List[ScheduleSlot]]:
+        """将基因数组映射回 约束 -> 时间槽列表"""
+        model = self.model
+        offsets = self.fitness_evaluator.offsets
+        num_cells = model.num_cells
+        return {
+            constraint: [
+                self._make_slot(int(gene) // num_cells, int(gene) % num_cells)
+                for gene in genome[offsets[ci]:offsets[ci + 1]] if gene >= 0
+            ]
+            for ci, constraint in enumerate(model.constraints)
+        }
     
     def calculate_fitness(self, individual: Individual):
         """计算个体适应度"""
-        # 适应度由多个因素组成：
+        # 适应度由多个因素组成（见 genetic_fitness.FitnessState.fitness）：
         # 1. 硬约束满足程度（必须完全满足）
         # 2. 软约束满足程度（偏好、平衡等）
         # 3. 优化目标（教室利用率、时间分布等）
-        
-        hard_constraint_score = self._calculate_hard_constraint_score(individual)
-        soft_constraint_score = self._calculate_soft_constraint_score(individual)
-        optimization_score = self._calculate_optimization_score(individual)
-        
-        # 如果硬约束不满足，适应度为负值
-        if hard_constraint_score < 1.0:
-            individual.fitness = -1000 * (1.0 - hard_constraint_score)
-        else:
-            # 综合评分
-            individual.fitness = (
-                hard_constraint_score * 1000 +
-                soft_constraint_score * 100 +
-                optimization_score * 50
-            )
-    
-    def _calculate_hard_constraint_score(self, individual: Individual) -> float:
-        """计算硬约束满足分数"""
-        conflicts = 0
-        total_assignments = 0
-        
-        # 检查每个约束的分配
-        for constraint, slots in individual.chromosome.items():
-            total_assignments += len(slots)
-            
-            # 检查教师时间冲突
-            teacher_slots = defaultdict(int)
-            for slot in slots:
-                time_key = (slot.day_of_week, slot.time_slot.id)
-                teacher_slots[time_key] += 1
-                # 检查教室时间冲突
-                classroom_time_key = (slot.classroom.id, slot.day_of_week, slot.time_slot.id)
-            
-            # 检查教师是否在同时间有多个课程
-            for count in teacher_slots.values():
-                if count > 1:
-                    conflicts += count - 1
-            
-            # 检查教室是否在同时间有多个课程
-            classroom_slots = defaultdict(int)
-            for slot in slots:
-                classroom_time_key = (slot.classroom.id, slot.day_of_week, slot.time_slot.id)
-                classroom_slots[classroom_time_key] += 1
-            
-            for count in classroom_slots.values():
-                if count > 1:
-                    conflicts += count - 1
-        
-        # 计算满足度
-        if total_assignments == 0:
-            return 0.0
-        
-        return max(0.0, 1.0 - (conflicts / total_assignments))
-    
-    def _calculate_soft_constraint_score(self, individual: Individual) -> float:
-        """计算软约束满足分数"""
-        total_score = 0.0
-        total_constraints = len(individual.chromosome)
-        
-        if total_constraints == 0:
-            return 0.0
-        
-        for constraint, slots in individual.chromosome.items():
-            constraint_score = 0.0
-            
-            # 偏好教室满足度
-            preferred_classroom_count = sum(
-                1 for slot in slots if slot.classroom in constraint.preferred_classrooms
-            )
-            if constraint.preferred_classrooms:
-                constraint_score += (preferred_classroom_count / len(slots)) * 0.3
-            
-            # 偏好时间段满足度
-            preferred_time_count = sum(
-                1 for slot in slots if slot.time_slot in constraint.preferred_time_slots
-            )
-            if constraint.preferred_time_slots:
-                constraint_score += (preferred_time_count / len(slots)) * 0.3
-            
-            # 偏好星期满足度
-            preferred_day_count = sum(
-                1 for slot in slots if slot.day_of_week in constraint.preferred_days
-            )
-            if constraint.preferred_days:
-                constraint_score += (preferred_day_count / len(slots)) * 0.2
-            
-            # 避免连续排课
-            if constraint.avoid_consecutive:
-                consecutive_count = self._count_consecutive_classes(slots)
-                constraint_score += ((len(slots) - consecutive_count) / len(slots)) * 0.2
-            else:
-                constraint_score += 0.2  # 如果不需要避免连续，则满分
-            
-            total_score += constraint_score
-        
-        return total_score / total_constraints
-    
-    def _count_consecutive_classes(self, slots: List[ScheduleSlot]) -> int:
-        """计算连续排课数量"""
-        consecutive_count = 0
-        sorted_slots = sorted(slots, key=lambda s: (s.day_of_week, s.time_slot.order))
-        
-        for i in range(len(sorted_slots) - 1):
-            current = sorted_slots[i]
-            next_slot = sorted_slots[i + 1]
-            
-            # 如果在同一天且时间连续
-            if (current.day_of_week == next_slot.day_of_week and
-                next_slot.time_slot.order == current.time_slot.order + 1):
-                consecutive_count += 1
-        
-        return consecutive_count
+        self._prepare_model()
+        individual.genome = self.encode(individual)
+        individual.chromosome = {}
+        individual.state = self.fitness_evaluator.build_state(individual.genome)
+        individual.fitness = individual.state.fitness()
     
-    def _calculate_optimization_score(self, individual: Individual) -> float:
-        """计算优化目标分数"""
-        # 分析教室利用率和时间分布
-        classroom_usage = defaultdict(int)
-        time_distribution = defaultdict(int)
-        
-        for slots in individual.chromosome.values():
-            for slot in slots:
-                classroom_usage[slot.classroom.id] += 1
-                time_key = (slot.day_of_week, slot.time_slot.id)
-                time_distribution[time_key] += 1
-        
-        # 教室利用率平衡度
-        if classroom_usage:
-            usage_values = list(classroom_usage.values())
-            avg_usage = sum(usage_values) / len(usage_values)
-            usage_variance = np.var(usage_values) if len(usage_values) > 1 else 0
-            classroom_balance_score = max(0.0, 1.0 - (usage_variance / (avg_usage + 1)))
-        else:
-            classroom_balance_score = 0.0
-        
-        # 时间分布平衡度
-        if time_distribution:
-            distribution_values = list(time_distribution.values())
-            avg_distribution = sum(distribution_values) / len(distribution_values)
-            distribution_variance = np.var(distribution_values) if len(distribution_values) > 1 else 0
-            time_balance_score = max(0.0, 1.0 - (distribution_variance / (avg_distribution + 1)))
-        else:
-            time_balance_score = 0.0
-        
-        return (classroom_balance_score + time_balance_score) / 2
+    def evaluate_population(self, individuals: List[Individual]):
+        """批量计算适应度
+
+        已有适应度统计的个体（由交叉、变异增量维护）直接读取结果，
+        其余个体按 fitness_workers 串行或并行完整计算。
+        """
+        self._prepare_model()
+        pending = [individual for individual in individuals if individual.state is None]
+        genomes = [self.encode(individual) for individual in pending]
+        for individual, genome, state in zip(pending, genomes, self.fitness_evaluator.build_states(genomes)):
+            # 编码后以基因数组为准，染色体视图在输出结果时重新生成
+            individual.chromosome = {}
+            individual.genome = genome
+            individual.state = state
+        for individual in individuals:
+            individual.fitness = individual.state.fitness()
     
     def selection(self) -> List[Individual]:
-        """选择操作 - 锦标赛选择"""
+        """选择操作 - 锦标赛选择
+
+        返回的是对当前种群个体的引用；遗传操作只写入新一代的基因矩阵，不会修改父代。
+        """
         selected = []
         tournament_size = 3
         
@@ -275,83 +216,102 @@ class GeneticSchedulingAlgorithm(SchedulingAlgorithm):
         # 锦标赛选择其余个体
         for _ in range(self.population_size - self.elite_size):
             # 随机选择锦标赛参与者
-            tournament = random.sample(self.population, min(tournament_size, len(self.population)))
+            tournament = self.rng.sample(self.population, min(tournament_size, len(self.population)))
             # 选择适应度最高的个体
             winner = max(tournament, key=lambda x: x.fitness)
-            selected.append(copy.deepcopy(winner))
+            selected.append(winner)
         
         # 将精英个体加入选择结果
-        selected.extend(copy.deepcopy(elite_individuals))
+        selected.extend(elite_individuals)
         
         return selected
     
-    def crossover(self, parent1: Individual, parent2: Individual) -> Tuple[Individual, Individual]:
-        """交叉操作 - 均匀交叉"""
-        if random.random() > self.crossover_rate:
-            return copy.deepcopy(parent1), copy.deepcopy(parent2)
-        
-        # 创建子代染色体
-        child1_chromosome = {}
-        child2_chromosome = {}
-        
-        # 对每个约束进行交叉
-        all_constraints = set(parent1.chromosome.keys()) | set(parent2.chromosome.keys())
-        
-        for constraint in all_constraints:
-            if constraint in parent1.chromosome and constraint in parent2.chromosome:
-                # 均匀交叉：随机选择来自哪个父代
-                if random.random() < 0.5:
-                    child1_chromosome[constraint] = copy.deepcopy(parent1.chromosome[constraint])
-                    child2_chromosome[constraint] = copy.deepcopy(parent2.chromosome[constraint])
-                else:
-                    child1_chromosome[constraint] = copy.deepcopy(parent2.chromosome[constraint])
-                    child2_chromosome[constraint] = copy.deepcopy(parent1.chromosome[constraint])
-            elif constraint in parent1.chromosome:
-                # 只在父代1中存在
-                child1_chromosome[constraint] = copy.deepcopy(parent1.chromosome[constraint])
-                # 父代2中不存在，随机生成
-                child2_chromosome[constraint] = self._generate_random_slots_for_constraint(constraint)
-            else:
-                # 只在父代2中存在
-                child2_chromosome[constraint] = copy.deepcopy(parent2.chromosome[constraint])
-                # 父代1中不存在，随机生成
-                child1_chromosome[constraint] = self._generate_random_slots_for_constraint(constraint)
-        
-        child1 = Individual(chromosome=child1_chromosome)
-        child2 = Individual(chromosome=child2_chromosome)
+    @staticmethod
+    def _clone(individual: Individual, out: Optional[np.ndarray] = None) -> Individual:
+        """复制个体；给定 out 时基因写入该行（如新一代基因矩阵的某一行）"""
+        if out is None:
+            genome = individual.genome.copy()
+        else:
+            out[:] = individual.genome
+            genome = out
+        return Individual(fitness=individual.fitness, genome=genome, state=individual.state.copy())
+    
+    def crossover(self, parent1: Individual, parent2: Individual,
+                  out: Optional[np.ndarray] = None) -> Tuple[Individual, Individual]:
+        """交叉操作 - 均匀交叉
+
+        子代复制父代的基因与适应度统计，只有交换且基因不同的约束需要更新；
+        交换的约束较多时直接重新计算统计。给定 out（2 行）时子代基因写入其中。
+        """
+        if out is None:
+            out = np.empty((2, parent1.genome.size), dtype=np.int64)
+        child1, child2 = self._clone(parent1, out[0]), self._clone(parent2, out[1])
+        if self.rng.random() > self.crossover_rate:
+            return child1, child2
+        
+        evaluator = self.fitness_evaluator
+        offsets = evaluator.offsets
+        # 均匀交叉：逐个约束随机选择来自哪个父代
+        swap = np.array([self.rng.random() >= 0.5 for _ in range(len(offsets) - 1)], dtype=bool)
+        differs = np.bincount(evaluator.gene_constraint[parent1.genome != parent2.genome],
+                              minlength=len(swap)) > 0
+        changed = np.flatnonzero(swap & differs)
+        if changed.size == 0:
+            return child1, child2
+        
+        if changed.size > self.delta_crossover_limit:
+            gene_swap = swap[evaluator.gene_constraint]
+            child1.genome[gene_swap] = parent2.genome[gene_swap]
+            child2.genome[gene_swap] = parent1.genome[gene_swap]
+            child1.state = evaluator.build_state(child1.genome)
+            child2.state = evaluator.build_state(child2.genome)
+        else:
+            for ci in changed:
+                start, end = offsets[ci], offsets[ci + 1]
+                evaluator.update(child1.genome, child1.state, ci, parent2.genome[start:end])
+                evaluator.update(child2.genome, child2.state, ci, parent1.genome[start:end])
+        child1.fitness = child1.state.fitness()
+        child2.fitness = child2.state.fitness()
         
         return child1, child2
     
-    def _generate_random_slots_for_constraint(self, constraint: ScheduleConstraint) -> List[ScheduleSlot]:
-        """为约束生成随机时间槽"""
-        slots = []
-        for _ in range(constraint.sessions_per_week):
-            if self.available_slots:
-                slot = random.choice(list(self.available_slots))
-                slots.append(slot)
-        return slots
-    
     def mutate(self, individual: Individual) -> Individual:
-        """变异操作"""
-        if random.random() > self.mutation_rate:
+        """变异操作：随机重排一个约束，只增量更新其适应度贡献"""
+        if self.rng.random() > self.mutation_rate:
             return individual
         
         # 随机选择一个约束进行变异
-        if not individual.chromosome:
+        count = len(self.fitness_evaluator.offsets) - 1
+        if count == 0:
             return individual
         
-        constraint = random.choice(list(individual.chromosome.keys()))
+        ci = self.rng.randrange(count)
         # 重新为该约束生成时间槽
-        individual.chromosome[constraint] = self._generate_random_slots_for_constraint(constraint)
+        self.fitness_evaluator.update(individual.genome, individual.state, ci, self._random_genes(ci))
+        individual.fitness = individual.state.fitness()
         
         return individual
     
-    def solve(self) -> Dict:
-        """执行遗传算法排课"""
+    def solve(self, timeout_seconds: Optional[float] = None, budget: Optional[TimeBudget] = None) -> Dict:
+        """执行遗传算法排课
+        
+        Args:
+            timeout_seconds: 算法执行超时时间（秒），None 表示只受最大代数限制
+            budget: 与其他求解阶段共享的时间预算，给定时忽略 timeout_seconds
+        """
+        self.budget = TimeBudget.of(timeout_seconds, budget)
         print("🧬 开始遗传算法排课...")
         print(f"  📊 约束数量: {len(self.constraints)}")
-        print(f"  👥 可用时间槽: {len(self.available_slots)}")
+        self._prepare_model()
+        print(f"  👥 可用时间槽: {len(self._gene_pool)}")
         
+        try:
+            return self._evolve()
+        finally:
+            self.fitness_evaluator.close()
+    
+    def _evolve(self) -> Dict:
+        """进化主循环"""
         # 初始化种群
         self.initialize_population()
         
@@ -359,22 +319,34 @@ class GeneticSchedulingAlgorithm(SchedulingAlgorithm):
         self.best_individual = max(self.population, key=lambda x: x.fitness)
         
         # 进化过程
+        self.termination_reason = '达到最大代数'
+        evolve_start = time.monotonic()
         for generation in range(self.max_generations):
+            # 检查时间预算：剩余时间不足以完成一代（按已完成代的平均耗时估计）时返回当前最优解
+            if self.budget.expired() or (
+                    generation and self.budget.remaining() < (time.monotonic() - evolve_start) / generation):
+                print(f"  ⏱️  时间预算用尽，终止于第 {generation} 代")
+                self.termination_reason = '超时'
+                break
+            
             # 计算所有个体的适应度
-            for individual in self.population:
-                self.calculate_fitness(individual)
+            self.evaluate_population(self.population)
             
             # 更新最优个体
             current_best = max(self.population, key=lambda x: x.fitness)
             if current_best.fitness > self.best_individual.fitness:
-                self.best_individual = copy.deepcopy(current_best)
+                self.best_individual = self._clone(current_best)
             
             # 记录适应度历史
             self.fitness_history.append(self.best_individual.fitness)
+            self._report_progress(stage='genetic', generation=generation + 1,
+                                  max_generations=self.max_generations,
+                                  best_fitness=self.best_individual.fitness)
             
             # 检查收敛条件
             if generation > 100 and len(set(self.fitness_history[-50:])) == 1:
                 print(f"  ⏹️  算法收敛，提前终止于第 {generation} 代")
+                self.termination_reason = '收敛'
                 break
             
             # 打印进度
@@ -384,19 +356,24 @@ class GeneticSchedulingAlgorithm(SchedulingAlgorithm):
             # 选择
             selected = self.selection()
             
-            # 交叉和变异生成新种群
-            new_population = []
+            # 交叉和变异生成新种群，新一代基因写入新的基因矩阵
+            child_rows = max(0, self.population_size - self.elite_size)
+            next_genomes = np.empty((self.elite_size + child_rows + child_rows % 2, self.genomes.shape[1]),
+                                    dtype=np.int64)
             
             # 保持精英个体
             sorted_selected = sorted(selected, key=lambda x: x.fitness, reverse=True)
-            new_population.extend(sorted_selected[:self.elite_size])
+            new_population = [
+                self._clone(individual, next_genomes[row])
+                for row, individual in enumerate(sorted_selected[:self.elite_size])
+            ]
             
             # 交叉和变异生成其余个体
             for i in range(self.elite_size, self.population_size, 2):
                 parent1 = selected[i]
                 parent2 = selected[i + 1] if i + 1 < len(selected) else selected[0]
                 
-                child1, child2 = self.crossover(parent1, parent2)
+                child1, child2 = self.crossover(parent1, parent2, next_genomes[i:i + 2])
                 child1 = self.mutate(child1)
                 child2 = self.mutate(child2)
                 
@@ -404,8 +381,10 @@ class GeneticSchedulingAlgorithm(SchedulingAlgorithm):
             
             # 确保种群大小正确
             self.population = new_population[:self.population_size]
+            self.genomes = next_genomes[:self.population_size]
         
         # 准备返回结果
+        self.best_individual.chromosome = self.decode(self.best_individual.genome)
         successful_assignments = 0
         failed_assignments = []
         total_constraints = len(self.best_individual.chromosome)
@@ -435,6 +414,8 @@ class GeneticSchedulingAlgorithm(SchedulingAlgorithm):
             'assigned_slots': self.assigned_slots,
             'best_fitness': self.best_individual.fitness,
             'generations': len(self.fitness_history),
+            'termination_reason': self.termination_reason,
+            'execution_time': self.budget.elapsed(),
             'optimization_suggestions': self.get_optimization_suggestions()
         }
         
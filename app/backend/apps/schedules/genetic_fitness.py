@@ -0,0 +1,318 @@
+"""
+遗传算法适应度评估模块
+个体被编码为紧凑的整数基因数组：每节课对应一个基因，
+取值为 ``教室下标 * 单元格数 + 单元格``，-1 表示该节课未分配。
+约束 c 的基因位于 ``offsets[c]:offsets[c+1]``（按 SolverModel 的约束顺序）。
+适应度只依赖 SolverModel 的数组，因此可以在进程池中并行评估；
+FitnessState 保存适应度的逐项统计，修改单个约束的基因时只需增量更新。
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .solver_model import SolverModel
+
+logger = logging.getLogger(__name__)
+
+# 适应度权重
+HARD_WEIGHT = 1000
+SOFT_WEIGHT = 100
+OPTIMIZATION_WEIGHT = 50
+
+
+def genome_offsets(model: SolverModel) -> np.ndarray:
+    """各约束基因段的起始位置（长度 C+1）"""
+    offsets = np.zeros(len(model.sessions) + 1, dtype=np.int64)
+    np.cumsum(model.sessions, out=offsets[1:])
+    return offsets
+
+
+def _count_consecutive(cells: Sequence[int], model: SolverModel) -> int:
+    """同一天内时间段顺序相邻的课程对数（按 (星期, 顺序) 排序后比较相邻元素）"""
+    if len(cells) < 2:
+        return 0
+    num_time_slots = model.num_time_slots
+    keys = sorted((cell // num_time_slots, int(model.time_slot_orders[cell % num_time_slots]))
+                  for cell in cells)
+    return sum(
+        1 for (day, order), (next_day, next_order) in zip(keys, keys[1:])
+        if day == next_day and next_order == order + 1
+    )
+
+
+def _balance_score(nonzero: int, total: int, sum_squares: int) -> float:
+    """使用次数的平衡度：1 - 方差 / (均值 + 1)，只统计出现过的键
+
+    方差由计数、总和与平方和以整数运算得到，增量维护与完整计算的结果一致。
+    """
+    if nonzero == 0:
+        return 0.0
+    variance = (sum_squares * nonzero - total * total) / (nonzero * nonzero)
+    return max(0.0, 1.0 - (variance / (total / nonzero + 1)))
+
+
+def _constraint_terms(model: SolverModel, ci: int, genes: np.ndarray) -> Tuple[int, int, float]:
+    """单个约束的 (冲突数, 已分配节数, 软约束得分)"""
+    num_cells = model.num_cells
+    num_time_slots = model.num_time_slots
+    valid = [int(g) for g in genes if g >= 0]
+    assigned = len(valid)
+    cells = [g % num_cells for g in valid]
+    conflicts = (assigned - len(set(cells))) + (assigned - len(set(valid)))
+
+    room_hits = sum(1 for g in valid if model.room_pref[ci, g // num_cells])
+    time_hits = sum(1 for cell in cells if model.time_pref[ci, cell % num_time_slots])
+    day_hits = sum(1 for cell in cells if model.day_pref[ci, cell // num_time_slots])
+    divisor = assigned or 1
+    score = ((room_hits / divisor * 0.3 if model.has_room_pref[ci] else 0.0) +
+             (time_hits / divisor * 0.3 if model.has_time_pref[ci] else 0.0) +
+             (day_hits / divisor * 0.2 if model.has_day_pref[ci] else 0.0))
+    if not model.avoid_consecutive[ci]:
+        score += 0.2
+    elif assigned:
+        score += (assigned - _count_consecutive(cells, model)) / assigned * 0.2
+    return conflicts, assigned, score
+
+
+class FitnessState:
+    """个体适应度的逐项统计
+
+    conflicts / assigned / soft 为逐约束的贡献，room_counts / cell_counts 为
+    教室使用与时间分布直方图，平衡度所需的非零计数与平方和随直方图一起维护。
+    """
+
+    def __init__(self, conflicts: np.ndarray, assigned: np.ndarray, soft: np.ndarray,
+                 room_counts: np.ndarray, cell_counts: np.ndarray):
+        self.conflicts = conflicts
+        self.assigned = assigned
+        self.soft = soft
+        self.room_counts = room_counts
+        self.cell_counts = cell_counts
+        self.total_conflicts = int(conflicts.sum())
+        self.total_assigned = int(assigned.sum())
+        self.room_nonzero = int(np.count_nonzero(room_counts))
+        self.room_sum_squares = int((room_counts * room_counts).sum())
+        self.cell_nonzero = int(np.count_nonzero(cell_counts))
+        self.cell_sum_squares = int((cell_counts * cell_counts).sum())
+
+    def copy(self) -> 'FitnessState':
+        clone = FitnessState.__new__(FitnessState)
+        clone.__dict__.update(self.__dict__)
+        for key in ('conflicts', 'assigned', 'soft', 'room_counts', 'cell_counts'):
+            setattr(clone, key, getattr(self, key).copy())
+        return clone
+
+    def fitness(self) -> float:
+        """计算适应度
+
+        与原逐对象实现的三部分评分一致：
+          1. 硬约束：同一约束内重复的 (星期, 时间段) 与 (教室, 星期, 时间段)
+          2. 软约束：偏好教室 / 时间段 / 星期命中率与避免连续排课
+          3. 优化目标：教室使用与时间分布的平衡度
+        """
+        total = self.total_assigned
+        hard_score = 0.0 if total == 0 else max(0.0, 1.0 - self.total_conflicts / total)
+        if hard_score < 1.0:
+            return -HARD_WEIGHT * (1.0 - hard_score)
+
+        count = len(self.soft)
+        soft_score = float(self.soft.sum()) / count if count else 0.0
+        optimization_score = (
+            _balance_score(self.room_nonzero, total, self.room_sum_squares) +
+            _balance_score(self.cell_nonzero, total, self.cell_sum_squares)
+        ) / 2
+        return hard_score * HARD_WEIGHT + soft_score * SOFT_WEIGHT + optimization_score * OPTIMIZATION_WEIGHT
+
+    def _add(self, room: int, cell: int):
+        count = int(self.room_counts[room])
+        self.room_counts[room] = count + 1
+        self.room_sum_squares += 2 * count + 1
+        self.room_nonzero += int(count == 0)
+        count = int(self.cell_counts[cell])
+        self.cell_counts[cell] = count + 1
+        self.cell_sum_squares += 2 * count + 1
+        self.cell_nonzero += int(count == 0)
+
+    def _remove(self, room: int, cell: int):
+        count = int(self.room_counts[room])
+        self.room_counts[room] = count - 1
+        self.room_sum_squares -= 2 * count - 1
+        self.room_nonzero -= int(count == 1)
+        count = int(self.cell_counts[cell])
+        self.cell_counts[cell] = count - 1
+        self.cell_sum_squares -= 2 * count - 1
+        self.cell_nonzero -= int(count == 1)
+
+
+def build_fitness_state(model: SolverModel, offsets: np.ndarray, genome: np.ndarray) -> FitnessState:
+    """根据完整基因数组计算适应度统计"""
+    num_cells = model.num_cells
+    count = len(offsets) - 1
+    gene_constraint = np.repeat(np.arange(count), np.diff(offsets))
+
+    valid = genome >= 0
+    genes = genome[valid]
+    owners = gene_constraint[valid]
+    rooms = genes // num_cells
+    cells = genes % num_cells
+
+    # 每组重复键贡献 (次数 - 1) 个冲突
+    assigned = np.bincount(owners, minlength=count).astype(np.int64)
+    unique_cells = np.unique(owners * num_cells + cells) // num_cells
+    unique_genes = np.unique(owners * (num_cells * model.num_classrooms) + genes) // (num_cells * model.num_classrooms)
+    conflicts = (2 * assigned -
+                 np.bincount(unique_cells, minlength=count) -
+                 np.bincount(unique_genes, minlength=count))
+
+    divisor = np.where(assigned > 0, assigned, 1).astype(float)
+    day_index = cells // model.num_time_slots
+    time_index = cells % model.num_time_slots
+    room_hits = np.bincount(owners, weights=model.room_pref[owners, rooms], minlength=count)
+    time_hits = np.bincount(owners, weights=model.time_pref[owners, time_index], minlength=count)
+    day_hits = np.bincount(owners, weights=model.day_pref[owners, day_index], minlength=count)
+    soft = (
+        np.where(model.has_room_pref, room_hits / divisor * 0.3, 0.0) +
+        np.where(model.has_time_pref, time_hits / divisor * 0.3, 0.0) +
+        np.where(model.has_day_pref, day_hits / divisor * 0.2, 0.0)
+    )
+    # 避免连续排课：按 (约束, 星期, 顺序) 排序后统计同约束同一天顺序相邻的课程对
+    orders = model.time_slot_orders[time_index]
+    sort = np.lexsort((orders, day_index, owners))
+    sorted_owners, sorted_days, sorted_orders = owners[sort], day_index[sort], orders[sort]
+    adjacent = ((sorted_owners[1:] == sorted_owners[:-1]) & (sorted_days[1:] == sorted_days[:-1]) &
+                (sorted_orders[1:] == sorted_orders[:-1] + 1))
+    consecutive = np.bincount(sorted_owners[1:][adjacent], minlength=count)
+    soft += np.where(
+        model.avoid_consecutive,
+        np.where(assigned > 0, (assigned - consecutive) / divisor * 0.2, 0.0),
+        0.2
+    )
+
+    return FitnessState(
+        conflicts, assigned, soft,
+        np.bincount(rooms, minlength=model.num_classrooms).astype(np.int64),
+        np.bincount(cells, minlength=num_cells).astype(np.int64)
+    )
+
+
+def update_genes(model: SolverModel, offsets: np.ndarray, genome: np.ndarray,
+                 state: FitnessState, ci: int, genes: np.ndarray):
+    """将约束 ci 的基因替换为 genes，并增量更新适应度统计
+
+    只重新计算该约束的冲突与软约束得分，以及其涉及的直方图计数。
+    """
+    num_cells = model.num_cells
+    segment = genome[offsets[ci]:offsets[ci + 1]]
+    for gene in segment[segment >= 0]:
+        state._remove(int(gene) // num_cells, int(gene) % num_cells)
+    segment[:] = genes
+    for gene in segment[segment >= 0]:
+        state._add(int(gene) // num_cells, int(gene) % num_cells)
+
+    conflicts, assigned, soft = _constraint_terms(model, ci, segment)
+    state.total_conflicts += conflicts - int(state.conflicts[ci])
+    state.total_assigned += assigned - int(state.assigned[ci])
+    state.conflicts[ci] = conflicts
+    state.assigned[ci] = assigned
+    state.soft[ci] = soft
+
+
+def genome_fitness(model: SolverModel, offsets: np.ndarray, genome: np.ndarray) -> float:
+    """计算基因数组的适应度"""
+    return build_fitness_state(model, offsets, genome).fitness()
+
+
+# ---- 进程池工作函数 ----
+
+_worker_state: Dict = {}
+
+
+def init_fitness_worker(model: SolverModel, offsets: np.ndarray):
+    """进程池初始化：每个工作进程只接收一次求解模型"""
+    _worker_state.clear()
+    _worker_state.update(model=model, offsets=offsets)
+
+
+def build_states(genomes: Sequence[np.ndarray]) -> List[FitnessState]:
+    """在工作进程中为一批基因数组计算适应度统计"""
+    model, offsets = _worker_state['model'], _worker_state['offsets']
+    return [build_fitness_state(model, offsets, genome) for genome in genomes]
+
+
+class FitnessEvaluator:
+    """种群适应度评估器
+
+    ``max_workers`` 不大于 1 时在当前进程中串行评估，否则使用进程池。
+    两种模式调用同一个 build_fitness_state 且保持个体顺序，结果完全一致。
+    """
+
+    def __init__(self, model: SolverModel, max_workers: int = 1, chunk_size: Optional[int] = None):
+        self.model = model
+        self.offsets = genome_offsets(model)
+        # 每个基因所属的约束下标
+        self.gene_constraint = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def parallel(self) -> bool:
+        return self.max_workers > 1
+
+    def evaluate(self, genome: np.ndarray) -> float:
+        """评估单个基因数组"""
+        return genome_fitness(self.model, self.offsets, genome)
+
+    def evaluate_many(self, genomes: Sequence[np.ndarray]) -> List[float]:
+        """按顺序评估一批基因数组"""
+        return [state.fitness() for state in self.build_states(genomes)]
+
+    def build_state(self, genome: np.ndarray) -> FitnessState:
+        return build_fitness_state(self.model, self.offsets, genome)
+
+    def build_states(self, genomes: Sequence[np.ndarray]) -> List[FitnessState]:
+        """按顺序为一批基因数组计算适应度统计"""
+        if not self.parallel or len(genomes) < 2:
+            return [self.build_state(genome) for genome in genomes]
+        try:
+            return self._build_parallel(genomes)
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            # 进程池不可用（如受限环境）时退回串行评估
+            logger.warning(f"适应度评估进程池不可用，改为串行评估: {e}")
+            self.close()
+            self.max_workers = 1
+            return [self.build_state(genome) for genome in genomes]
+
+    def update(self, genome: np.ndarray, state: FitnessState, ci: int, genes: np.ndarray):
+        """替换约束 ci 的基因并增量更新统计"""
+        update_genes(self.model, self.offsets, genome, state, ci, genes)
+
+    def _build_parallel(self, genomes: Sequence[np.ndarray]) -> List[FitnessState]:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=init_fitness_worker,
+                initargs=(self.model, self.offsets)
+            )
+        chunk_size = self.chunk_size or max(1, -(-len(genomes) // self.max_workers))
+        chunks = [genomes[i:i + chunk_size] for i in range(0, len(genomes), chunk_size)]
+        results = []
+        for chunk_result in self._executor.map(build_states, chunks):
+            results.extend(chunk_result)
+        return results
+
+    def close(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,446 @@
+"""
+贪心排课求解内核
+只依赖 SolverModel 与 SlotAvailabilityIndex 的整数数组，不访问 Django ORM，
+因此既被 SchedulingAlgorithm 直接使用，也可以在多进程的工作进程中独立运行
+"""
+
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .availability import SlotAvailabilityIndex
+from .domains import CandidateDomains, ConstraintDomains
+from .solver_model import SolverModel
+
+Pair = Tuple[int, int]  # (教室下标, 单元格)
+
+
+def load_score_weights(cfg: Dict) -> Dict[str, float]:
+    """从排课配置（SCHEDULE_CONFIG）读取打分权重"""
+    return {
+        'priority_weight': cfg.get('priority_weight', 10),
+        'preferred_classroom_bonus': cfg.get('preferred_classroom_bonus', 20),
+        'preferred_time_slot_bonus': cfg.get('preferred_time_slot_bonus', 15),
+        'preferred_day_bonus': cfg.get('preferred_day_bonus', 10),
+        'good_time_slot_order_min': cfg.get('good_time_slot_order_min', 2),
+        'good_time_slot_order_max': cfg.get('good_time_slot_order_max', 6),
+        'good_time_slot_bonus': cfg.get('good_time_slot_bonus', 5),
+        'noon_penalty': cfg.get('noon_penalty', 30),
+        'teacher_same_day_penalty': cfg.get('teacher_same_day_penalty', 8),
+        'time_slot_usage_penalty': cfg.get('time_slot_usage_penalty', 2.0),
+        'teacher_day_load_limit': cfg.get('teacher_day_load_limit', 3),
+    }
+
+
+def ranked_positions(scores: np.ndarray, batch: int) -> Iterator[int]:
+    """按分数从高到低逐个产出候选下标，顺序与 np.argsort(-scores, kind='stable') 一致
+
+    每次用 np.partition 取出不少于 batch 个最高分候选（与阈值同分的全部取出）并只对这一批排序，
+    调用方停止迭代后剩余候选不再排序；每取下一批 batch 翻倍。
+    """
+    remaining = np.arange(len(scores))
+    values = scores
+    while len(remaining):
+        if len(remaining) > batch:
+            threshold = np.partition(values, len(values) - batch)[len(values) - batch]
+            head = values >= threshold
+        else:
+            head = np.ones(len(remaining), dtype=bool)
+        chosen = remaining[head]
+        # 主键为分数（降序），同分时按下标
+        for position in chosen[np.lexsort((chosen, -values[head]))]:
+            yield int(position)
+        remaining, values = remaining[~head], values[~head]
+        batch *= 2
+
+
+class GreedySolverCore:
+    """贪心求解内核
+
+    负责候选打分、为单个约束选择时间槽以及维护占用状态。
+    ``score_noise`` 大于 0 时，在排序前为候选分数加入高斯扰动（多起点求解使用）。
+    """
+
+    def __init__(self, model: SolverModel, index: SlotAvailabilityIndex, weights: Dict[str, float],
+                 usage_counts: Optional[np.ndarray] = None):
+        self.model = model
+        self.index = index
+        self.weights = weights
+        # 各放宽级别的静态候选域，放宽约束时直接查表
+        self.candidates = CandidateDomains(model)
+
+        orders = model.time_slot_orders
+        self.time_slot_order_bonus = np.where(
+            (orders >= weights['good_time_slot_order_min']) & (orders <= weights['good_time_slot_order_max']),
+            weights['good_time_slot_bonus'], 0.0
+        )
+        self.time_slot_usage_counts = (usage_counts if usage_counts is not None
+                                       else np.zeros(model.num_time_slots, dtype=float))
+
+        self.score_noise = 0.0
+        self.rng: Optional[np.random.Generator] = None
+
+    # ---- 打分 ----
+
+    def score(self, ci: int, rooms: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """按约束下标批量打分，只读取求解模型中的数组"""
+        model = self.model
+        weights = self.weights
+        num_time_slots = model.num_time_slots
+        day_indices = cells // num_time_slots
+        time_indices = cells % num_time_slots
+
+        scores = np.full(len(cells), model.priority[ci] * weights['priority_weight'], dtype=float)
+
+        # 偏好教室 / 时间段 / 星期
+        if model.has_room_pref[ci]:
+            scores += np.where(model.room_pref[ci][rooms], weights['preferred_classroom_bonus'], 0.0)
+        if model.has_time_pref[ci]:
+            scores += np.where(model.time_pref[ci][time_indices], weights['preferred_time_slot_bonus'], 0.0)
+        if model.has_day_pref[ci]:
+            scores += np.where(model.day_pref[ci][day_indices], weights['preferred_day_bonus'], 0.0)
+
+        # 教室容量适合度
+        max_students = model.max_students[ci]
+        if max_students:
+            with np.errstate(divide='ignore'):
+                capacity_ratio = max_students / model.classroom_capacity[rooms]
+            scores += np.select(
+                [(capacity_ratio >= 0.5) & (capacity_ratio <= 0.9), capacity_ratio <= 1.0],
+                [15.0, 10.0], default=-20.0
+            )
+
+        # 时间段顺序奖励与中午惩罚
+        scores += self.time_slot_order_bonus[time_indices]
+        if model.avoid_noon[ci]:
+            scores -= np.where(model.time_slot_noon[time_indices], weights['noon_penalty'], 0.0)
+
+        # 教师当天负载惩罚
+        day_load = self.index.teacher_day_loads(int(model.constraint_teacher[ci]))
+        scores -= weights['teacher_same_day_penalty'] * day_load[day_indices]
+
+        # 时间段使用均衡惩罚
+        scores -= weights['time_slot_usage_penalty'] * self.time_slot_usage_counts[time_indices]
+
+        return scores
+
+    # ---- 选择 ----
+
+    def select(self, ci: int, relax_rooms: bool = False, relax_times: bool = False,
+               sessions: Optional[int] = None, taken_cells: Sequence[int] = (),
+               excluded_cells: Sequence[int] = ()) -> List[Pair]:
+        """为约束选择 (教室下标, 单元格)，选中的教室在索引中标记为占用
+
+        Args:
+            ci: 约束在求解模型中的下标
+            relax_rooms: 忽略偏好教室限制
+            relax_times: 忽略偏好时间段限制
+            sessions: 需要选择的节数，默认为约束的每周课时数
+            taken_cells: 该约束已保留的单元格，参与每日课时与连续排课判断
+            excluded_cells: 本次不考虑的单元格（不影响固定时间槽）
+        """
+        model, index = self.model, self.index
+        teacher = int(model.constraint_teacher[ci])
+        if sessions is None:
+            sessions = int(model.sessions[ci])
+        rooms = self.candidates.allowed_rooms(ci, relax_rooms)
+
+        # 处理固定时间槽
+        fixed_cells = model.fixed_cells(ci)
+        if fixed_cells and not taken_cells:
+            fixed_pairs = []
+            room_order = rooms if rooms is not None else range(model.num_classrooms)
+            for cell in fixed_cells:
+                # 教师已占用
+                if index.is_teacher_busy(teacher, cell):
+                    continue
+                # 查找匹配的空闲教室
+                for room in room_order:
+                    if index.free[room, cell]:
+                        fixed_pairs.append((int(room), cell))
+
+            # 如果固定时间槽数量满足要求
+            if len(fixed_pairs) >= sessions:
+                # 从可用槽中移除
+                for room, cell in fixed_pairs[:sessions]:
+                    index.occupy_classroom(room, cell)
+                return fixed_pairs[:sessions]
+
+        # 候选单元格 = 偏好星期 × 偏好时间段（去掉中午） 且教师空闲
+        cell_mask = self.candidates.cell_mask(ci, relax_times)
+        cell_mask &= ~index.teacher_mask(teacher)
+        for cell in excluded_cells:
+            cell_mask &= ~(1 << cell)
+
+        # 掩码求交得到空闲的 (教室, 单元格) 对，并批量打分
+        candidate_rooms, candidate_cells = index.candidates(rooms, cell_mask)
+        scores = self.score(ci, candidate_rooms, candidate_cells)
+        if self.score_noise > 0 and self.rng is not None:
+            scores += self.rng.normal(0.0, self.score_noise, len(scores))
+
+        # 按分数从高到低逐批取候选（同分时保持单元格顺序），选够节数即停止，不对全部候选排序
+        order = ranked_positions(scores, max(16, 4 * sessions))
+
+        # 选择最佳的时间槽
+        selected = []
+        selected_cells = set()
+        # 已选单元格的覆盖范围：时间段重叠时同一教师不能再选与之重叠的单元格
+        blocked_cells = set()
+        overlapping = index.has_overlaps
+        daily_sessions = defaultdict(int)  # 每天课时计数
+        teacher_day_loads = index.teacher_day_loads(teacher)
+        max_daily = int(model.max_daily[ci])
+        avoid_consecutive = bool(model.avoid_consecutive[ci])
+        day_load_limit = self.weights['teacher_day_load_limit']
+        num_time_slots = model.num_time_slots
+        for cell in taken_cells:
+            selected_cells.add(cell)
+            blocked_cells.update(index.footprint(cell))
+            daily_sessions[cell // num_time_slots] += 1
+
+        for position in order:
+            if len(selected) >= sessions:
+                break
+            room, cell = int(candidate_rooms[position]), int(candidate_cells[position])
+            day_index = cell // num_time_slots
+
+            # 同一约束的教师不能在同一（或时间重叠的）单元格上两个教室同时上课
+            if cell in blocked_cells:
+                continue
+            # 候选是选择前生成的，本次已选的重叠单元格可能挡住了该教室
+            if overlapping and not index.free[room, cell]:
+                continue
+
+            # 检查每天最大课时数限制
+            if max_daily > 0 and daily_sessions[day_index] >= max_daily:
+                continue
+
+            # 限制教师在同一天的总授课数（跨课程），缓解某天过满
+            if teacher_day_loads[day_index] >= day_load_limit:
+                continue
+
+            # 如果避免连续排课，检查是否在同一天（如果已经排了一天的课）
+            if avoid_consecutive and daily_sessions[day_index] > 0:
+                # 检查是否与已选的同一日课程连续
+                if self.would_be_consecutive(cell, selected_cells):
+                    continue
+
+            selected.append((room, cell))
+            selected_cells.add(cell)
+            blocked_cells.update(index.footprint(cell))
+            daily_sessions[day_index] += 1
+
+            # 从可用槽中移除
+            index.occupy_classroom(room, cell)
+
+        return selected
+
+    def select_forward_checked(self, ci: int, domains: ConstraintDomains) -> List[Pair]:
+        """选择时间槽并做前向检查
+
+        如果选中的时间槽会使某个待排约束的可行域小于所需节数，
+        就避开这些关键单元格重新选择一次；新的选择完整且造成的无解约束更少时采用它。
+        """
+        pairs = self.select(ci)
+        if len(pairs) < self.model.sessions[ci]:
+            return pairs
+        wiped = domains.wipeouts(ci, pairs)
+        if not wiped:
+            return pairs
+
+        critical = set()
+        for cells in wiped.values():
+            critical.update(cells)
+        for room, cell in pairs:
+            self.index.release_classroom(room, cell)
+        alternative = self.select(ci, excluded_cells=sorted(critical))
+        if len(alternative) >= self.model.sessions[ci] and len(domains.wipeouts(ci, alternative)) < len(wiped):
+            return alternative
+
+        # 保留原选择
+        for room, cell in alternative:
+            self.index.release_classroom(room, cell)
+        for room, cell in pairs:
+            self.index.occupy_classroom(room, cell)
+        return pairs
+
+    def select_relaxed(self, ci: int) -> Optional[List[Pair]]:
+        """依次放宽教室、时间段偏好重新选择，失败时归还占用并返回 None
+
+        不放宽日期限制，严格限定周一到周五。
+        """
+        model = self.model
+        attempts = []
+        if model.has_room_pref[ci]:
+            attempts.append((True, False))  # 放宽教室限制
+        if model.has_time_pref[ci]:
+            attempts.append((True, True))  # 继续放宽时间段限制
+
+        for relax_rooms, relax_times in attempts:
+            pairs = self.select(ci, relax_rooms, relax_times)
+            if len(pairs) >= model.sessions[ci]:
+                return pairs
+            # 未能满足要求，归还本次尝试占用的教室
+            for room, cell in pairs:
+                self.index.release_classroom(room, cell)
+        return None
+
+    def would_be_consecutive(self, cell: int, selected_cells) -> bool:
+        """检查新单元格是否与已选单元格在同一天且时间段连续"""
+        model = self.model
+        num_time_slots = model.num_time_slots
+        day_index, time_index = divmod(cell, num_time_slots)
+        order = model.time_slot_orders[time_index]
+        for other in selected_cells:
+            other_day, other_time = divmod(other, num_time_slots)
+            if other_day == day_index and abs(model.time_slot_orders[other_time] - order) == 1:
+                return True
+        return False
+
+    # ---- 占用维护 ----
+
+    def commit(self, ci: int, pairs: Sequence[Pair]):
+        """记录约束的分配：占用教师、教室并更新时间段使用计数"""
+        teacher = int(self.model.constraint_teacher[ci])
+        num_time_slots = self.model.num_time_slots
+        for room, cell in pairs:
+            self.index.occupy_teacher(teacher, cell)
+            self.index.occupy_classroom(room, cell)
+            self.time_slot_usage_counts[cell % num_time_slots] += 1
+
+    def uncommit(self, ci: int, pairs: Sequence[Pair]):
+        """撤销 commit 记录的占用"""
+        teacher = int(self.model.constraint_teacher[ci])
+        num_time_slots = self.model.num_time_slots
+        for room, cell in pairs:
+            self.index.release_teacher(teacher, cell)
+            self.index.release_classroom(room, cell)
+            self.time_slot_usage_counts[cell % num_time_slots] -= 1
+
+    # ---- 完整求解 ----
+
+    def solve_order(self, order: Sequence[int], deadline: Optional[float] = None,
+                    most_constrained: bool = False) -> Dict:
+        """按给定顺序贪心求解全部约束，流程与 SchedulingAlgorithm.solve 一致
+
+        Args:
+            order: 约束下标的处理顺序；最受约束优先时只用于可行域相同时的先后次序
+            deadline: time.time() 截止时间，超过后剩余约束记为超时
+            most_constrained: 每次选取可行域余量最小的约束，并做前向检查
+
+        Returns:
+            {'assignments': {ci: [(room, cell), ...]}, 'successful': 成功数,
+             'soft_score': 选择时的分数之和, 'timed_out': [ci, ...]}
+        """
+        model = self.model
+        assignments: Dict[int, List[Pair]] = {}
+        failed: List[int] = []
+        timed_out: List[int] = []
+
+        domains = None
+        if most_constrained:
+            domains = ConstraintDomains(model, self.index, order, self.weights['teacher_day_load_limit'],
+                                        self.candidates)
+        for position in range(len(order)):
+            if deadline is not None and time.time() > deadline:
+                timed_out = domains.pending_order() if domains is not None else list(order[position:])
+                break
+            if domains is None:
+                ci = order[position]
+                pairs = self.select(ci)
+            else:
+                ci = domains.pop()
+                pairs = self.select_forward_checked(ci, domains)
+                domains.consume(ci, pairs)
+            if pairs:
+                assignments[ci] = pairs
+                self.commit(ci, pairs)
+            if len(pairs) < model.sessions[ci]:
+                failed.append(ci)
+
+        # 放宽约束重新分配失败的约束
+        for ci in failed:
+            if deadline is not None and time.time() > deadline:
+                break
+            previous = assignments.pop(ci, [])
+            self.uncommit(ci, previous)
+            pairs = self.select_relaxed(ci)
+            if pairs is None:
+                pairs = previous
+            if pairs:
+                assignments[ci] = pairs
+                self.commit(ci, pairs)
+
+        successful = sum(1 for ci, pairs in assignments.items() if len(pairs) >= model.sessions[ci])
+        return {
+            'assignments': assignments,
+            'successful': successful,
+            'soft_score': self.assignment_score(assignments),
+            'timed_out': timed_out,
+        }
+
+    def assignment_score(self, assignments: Dict[int, List[Pair]]) -> float:
+        """分配方案的软约束得分（与占用状态无关的静态打分项之和）"""
+        model = self.model
+        weights = self.weights
+        num_time_slots = model.num_time_slots
+        total = 0.0
+        for ci, pairs in assignments.items():
+            if not pairs:
+                continue
+            rooms = np.array([room for room, _cell in pairs], dtype=np.int64)
+            cells = np.array([cell for _room, cell in pairs], dtype=np.int64)
+            time_indices = cells % num_time_slots
+            day_indices = cells // num_time_slots
+            if model.has_room_pref[ci]:
+                total += weights['preferred_classroom_bonus'] * model.room_pref[ci][rooms].sum()
+            if model.has_time_pref[ci]:
+                total += weights['preferred_time_slot_bonus'] * model.time_pref[ci][time_indices].sum()
+            if model.has_day_pref[ci]:
+                total += weights['preferred_day_bonus'] * model.day_pref[ci][day_indices].sum()
+            total += self.time_slot_order_bonus[time_indices].sum()
+            if model.avoid_noon[ci]:
+                total -= weights['noon_penalty'] * model.time_slot_noon[time_indices].sum()
+        return float(total)
+
+
+# ---- 多起点求解的工作进程 ----
+
+_worker_state: Dict = {}
+
+
+def init_multi_start_worker(snapshot: Dict):
+    """工作进程初始化：只接收一次问题快照"""
+    _worker_state.clear()
+    _worker_state.update(snapshot)
+
+
+def run_multi_start(seed: int, deadline: Optional[float] = None) -> Dict:
+    """在工作进程中执行一次随机化的贪心求解
+
+    seed 为 0 时使用确定性的优先级顺序且不加扰动，与普通贪心求解结果一致。
+    """
+    snapshot = _worker_state
+    model: SolverModel = snapshot['model']
+    index = SlotAvailabilityIndex.for_model(model)
+    index.load_state(snapshot['index_state'])
+
+    core = GreedySolverCore(model, index, snapshot['weights'], np.array(snapshot['usage_counts'], dtype=float))
+    priorities = model.priority.astype(float)
+    if seed == 0:
+        # 与 sorted(..., key=priority, reverse=True) 一致的稳定顺序
+        order = np.argsort(-priorities, kind='stable')
+    else:
+        rng = np.random.default_rng(seed)
+        core.rng = rng
+        core.score_noise = snapshot['score_noise']
+        # 优先级加入扰动后排序，同优先级内随机打乱
+        order = np.argsort(-(priorities + rng.uniform(0.0, snapshot['order_noise'], len(priorities))),
+                           kind='stable')
+
+    result = core.solve_order([int(ci) for ci in order], deadline,
+                              most_constrained=snapshot.get('most_constrained', False))
+    result['seed'] = seed
+    return result
@@ -4,15 +4,14 @@
 """
 
 import random
-import copy
-import time
 import numpy as np
-from typing import List, Dict, Set, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 from dataclasses import dataclass
 from collections import defaultdict
 
 from .algorithms import SchedulingAlgorithm, ScheduleConstraint, ScheduleSlot, create_auto_schedule
 from .genetic_algorithm import GeneticSchedulingAlgorithm, Individual
+from .time_budget import TimeBudget
 from .models import Schedule, TimeSlot
 from apps.courses.models import Course
 from apps.classrooms.models import Classroom
@@ -42,49 +41,70 @@ class HybridSchedulingAlgorithm(SchedulingAlgorithm):
         self.best_individual: Individual = None
         self.fitness_history: List[float] = []
         
-    def solve(self, timeout_seconds: int = 300) -> Dict:
-        """执行混合算法排课"""
+    def solve(self, timeout_seconds: int = 300, budget: Optional[TimeBudget] = None) -> Dict:
+        """执行混合算法排课
+        
+        三个阶段共享同一个时间预算：贪心阶段最多使用其中一部分，遗传算法使用剩余时间
+        （贪心结果仍有失败约束时为局部优化预留一部分），局部优化使用最后剩下的时间。
+        预算用尽时返回目前为止成功分配最多的结果。
+        
+        Args:
+            timeout_seconds: 算法执行超时时间（秒）
+            budget: 与其他求解阶段共享的时间预算，给定时忽略 timeout_seconds
+        """
         print("🔄 开始混合算法排课...")
-        start_time = time.time()
+        budget = TimeBudget.of(timeout_seconds, budget)
         
         # 阶段1: 使用贪心算法生成初始解
         print("  🧠 阶段1: 贪心算法生成初始解")
-        greedy_result = self._solve_with_greedy()
+        greedy_result = self._solve_with_greedy(budget.stage(self.cfg.get('hybrid_greedy_fraction', 0.5)))
         
         # 检查超时
-        if time.time() - start_time > timeout_seconds:
-            return self._create_result_from_greedy(greedy_result, time.time() - start_time, "超时")
+        if budget.expired():
+            return self._create_result_from_greedy(greedy_result, budget.elapsed(), "超时")
         
         # 阶段2: 使用遗传算法优化
         print("  🧬 阶段2: 遗传算法优化")
-        genetic_result = self._solve_with_genetic(greedy_result, start_time, timeout_seconds)
-        
-        # 检查超时
-        if time.time() - start_time > timeout_seconds:
-            return self._create_result_from_greedy(greedy_result, time.time() - start_time, "超时")
+        reserve = 0.0
+        if budget.limited and greedy_result.get('failed_assignments'):
+            reserve = budget.remaining() * self.cfg.get('hybrid_local_fraction', 0.15)
+        genetic_result = self._solve_with_genetic(greedy_result, budget.stage(reserve=reserve))
         
         # 阶段3: 局部优化
-        print("  🔧 阶段3: 局部优化")
-        final_result = self._local_optimization(genetic_result, start_time, timeout_seconds)
+        if not budget.expired():
+            print("  🔧 阶段3: 局部优化")
+            genetic_result = self._local_optimization(genetic_result, budget)
         
-        execution_time = time.time() - start_time
-        return self._create_final_result(final_result, execution_time)
+        # 返回成功分配最多的结果（同等时优先优化后的结果）
+        termination_reason = "超时" if budget.expired() else "完成"
+        if (self._count_successful(genetic_result.get('assigned_slots', {})) <
+                self._count_successful(greedy_result.get('assigned_slots', {}))):
+            return self._create_result_from_greedy(greedy_result, budget.elapsed(), termination_reason)
+        result = self._create_final_result(genetic_result, budget.elapsed())
+        result['termination_reason'] = termination_reason
+        return result
     
-    def _solve_with_greedy(self) -> Dict:
+    def _count_successful(self, assigned_slots: Dict) -> int:
+        """分配节数满足要求的约束数量"""
+        return sum(
+            1 for constraint in self.constraints
+            if len(assigned_slots.get(constraint, [])) >= constraint.sessions_per_week
+        )
+    
+    def _solve_with_greedy(self, budget: TimeBudget) -> Dict:
         """使用贪心算法生成初始解"""
         # 创建贪心算法实例
         greedy_algorithm = SchedulingAlgorithm(self.semester, self.academic_year)
         
-        # 复制约束
-        for constraint in self.constraints:
-            greedy_algorithm.add_constraint(constraint)
+        # 复制约束、快照与配置
+        self._share_context(greedy_algorithm)
         
         # 执行贪心算法
-        result = greedy_algorithm.solve()
+        result = greedy_algorithm.solve(budget=budget)
         
         return result
     
-    def _solve_with_genetic(self, greedy_result: Dict, start_time: float, timeout_seconds: int) -> Dict:
+    def _solve_with_genetic(self, greedy_result: Dict, budget: TimeBudget) -> Dict:
         """使用遗传算法优化贪心算法的结果"""
         # 创建遗传算法实例
         genetic_algorithm = GeneticSchedulingAlgorithm(
@@ -97,95 +117,61 @@ class HybridSchedulingAlgorithm(SchedulingAlgorithm):
             elite_size=self.elite_size
         )
         
-        # 复制约束
-        for constraint in self.constraints:
-            genetic_algorithm.add_constraint(constraint)
+        # 复制约束、快照与配置
+        self._share_context(genetic_algorithm)
         
-        # 使用贪心算法的结果作为初始种群的一部分
+        # 使用贪心算法的结果作为初始种群的精英个体（直接编码为基因，无需复制）
         if 'assigned_slots' in greedy_result and greedy_result['assigned_slots']:
-            # 将贪心算法的结果转换为遗传算法的个体
-            chromosome = copy.deepcopy(greedy_result['assigned_slots'])
-            elite_individual = Individual(chromosome=chromosome)
-            
-            # 设置初始种群，将贪心算法的结果作为精英个体
-            genetic_algorithm.population = [elite_individual]
-            
-            # 填充剩余种群
-            genetic_algorithm.initialize_population()
-        else:
-            # 如果贪心算法没有结果，正常初始化种群
-            genetic_algorithm.initialize_population()
+            genetic_algorithm.initial_assignments = greedy_result['assigned_slots']
         
-        # 执行遗传算法优化
-        remaining_time = timeout_seconds - (time.time() - start_time)
-        genetic_result = genetic_algorithm.solve()
+        # 执行遗传算法优化，预算用尽时返回当前最优个体
+        genetic_result = genetic_algorithm.solve(budget=budget)
         
         return genetic_result
     
-    def _local_optimization(self, genetic_result: Dict, start_time: float, timeout_seconds: int) -> Dict:
+    def _local_optimization(self, genetic_result: Dict, budget: TimeBudget) -> Dict:
         """局部优化 - 对遗传算法结果进行改进"""
         # 如果遗传算法产生了结果，使用其最佳个体
         if hasattr(genetic_result.get('algorithm_instance'), 'best_individual'):
             best_individual = genetic_result['algorithm_instance'].best_individual
-            self.assigned_slots = copy.deepcopy(best_individual.chromosome)
+            assigned_slots = dict(best_individual.chromosome)
         elif 'assigned_slots' in genetic_result:
-            self.assigned_slots = copy.deepcopy(genetic_result['assigned_slots'])
+            # 解码得到的时间槽列表只会被整体替换，浅复制即可
+            assigned_slots = dict(genetic_result['assigned_slots'])
         else:
             # 回退到贪心算法结果
             return genetic_result
         
-        # 多轮局部优化
+        # 在可用性索引中登记当前分配，局部优化才能查询空闲时间槽
+        self.initialize_available_slots()
+        self.assigned_slots = assigned_slots
+        for constraint, slots in assigned_slots.items():
+            self._update_conflict_tracking(constraint, slots)
+        
+        # 多轮局部搜索（移动、交换与 Kempe 链），某一轮没有改进时提前结束
         for round_num in range(self.greedy_improvement_rounds):
             # 检查超时
-            if time.time() - start_time > timeout_seconds:
+            if budget.expired():
                 break
             
             print(f"    🔧 局部优化轮次 {round_num + 1}/{self.greedy_improvement_rounds}")
+            self._report_progress(stage='local_optimization', round=round_num + 1,
+                                  total_rounds=self.greedy_improvement_rounds)
             
-            # 尝试重新安排失败的约束
-            failed_constraints = self._get_failed_constraints()
-            if not failed_constraints:
+            # 剩余轮次平分剩余时间
+            stats = self.run_local_search(budget.stage(1.0 / (self.greedy_improvement_rounds - round_num)),
+                                          seed=round_num)
+            if not stats['improvements']:
                 break
-            
-            # 对每个失败的约束尝试重新安排
-            for constraint in failed_constraints:
-                if time.time() - start_time > timeout_seconds:
-                    break
-                
-                # 尝试为约束找到更好的时间槽
-                self._improve_constraint_assignment(constraint)
         
         # 更新结果
         genetic_result['assigned_slots'] = self.assigned_slots
         return genetic_result
     
-    def _get_failed_constraints(self) -> List[ScheduleConstraint]:
-        """获取未完全满足的约束"""
-        failed_constraints = []
-        
-        for constraint, slots in self.assigned_slots.items():
-            if len(slots) < constraint.sessions_per_week:
-                failed_constraints.append(constraint)
-        
-        return failed_constraints
-    
-    def _improve_constraint_assignment(self, constraint: ScheduleConstraint):
-        """改进约束的分配"""
-        # 获取当前分配的时间槽
-        current_slots = self.assigned_slots.get(constraint, [])
-        
-        # 尝试找到更好的时间槽
-        best_slots = self.find_best_slots(constraint)
-        
-        # 如果找到更好的分配，更新
-        if len(best_slots) > len(current_slots):
-            self.assigned_slots[constraint] = best_slots
-            
-            # 更新冲突跟踪
-            self._update_conflict_tracking(constraint, best_slots)
-    
     def _create_result_from_greedy(self, greedy_result: Dict, execution_time: float, termination_reason: str) -> Dict:
         """从贪心算法结果创建返回结果"""
+        # create_schedules 依据 assigned_slots 生成排课记录
+        self.assigned_slots = greedy_result.get('assigned_slots', {})
         successful_assignments = 0
         failed_assignments = []
         total_constraints = len(self.constraints)
@@ -224,6 +210,7 @@ class HybridSchedulingAlgorithm(SchedulingAlgorithm):
         
         # 分析每个约束的分配结果
         assigned_slots = final_result.get('assigned_slots', {})
+        self.assigned_slots = assigned_slots
         for constraint in self.constraints:
             slots = assigned_slots.get(constraint, [])
             if len(slots) >= constraint.sessions_per_week:
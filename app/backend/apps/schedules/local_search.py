@@ -0,0 +1,485 @@
+"""
+局部搜索排课模块
+在已有分配上执行禁忌搜索或模拟退火：邻域由单节移动、两节交换和 Kempe 链交换组成，
+目标函数按节课、约束与教师日负载分解，每次移动只重新计算受影响的几项。
+只依赖 SolverModel 与 SlotAvailabilityIndex，不访问 Django ORM
+"""
+
+import math
+import random
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .availability import SlotAvailabilityIndex
+from .domains import CandidateDomains
+from .solver_model import SolverModel
+from .time_budget import TimeBudget
+
+Pair = Tuple[int, int]  # (教室下标, 单元格)
+Change = Tuple[int, int, int]  # (节课下标, 新教室下标, 新单元格)，教室为 -1 表示取消分配
+
+# 目标函数权重（目标值越小越好）
+UNASSIGNED_PENALTY = 1000
+SOFT_PENALTY = 100
+
+# 邻域类型及其抽样权重
+MOVE_TYPES = ('move', 'swap', 'kempe')
+MOVE_WEIGHTS = (0.45, 0.25, 0.3)
+
+# Kempe 链的最大长度，超过时放弃该移动
+KEMPE_MAX_CHAIN = 32
+# 每隔多少次迭代检查一次时间预算
+BUDGET_CHECK_INTERVAL = 64
+
+
+class LocalSearchEngine:
+    """禁忌搜索 / 模拟退火局部搜索
+
+    每节课是一个搜索变量，取值为 (教室下标, 单元格) 或未分配。
+    占用情况保存在 SlotAvailabilityIndex 中，另外用占有者矩阵记录每个
+    (教室, 单元格) 与 (教师, 单元格) 上是哪一节课，用于构造交换与 Kempe 链。
+    索引中没有占有者的占用（如已有排课）视为不可移动。
+
+    硬约束（教师、教室不冲突，允许的星期，需要回避的中午）在生成邻域时保证，
+    目标函数包含：
+      - 未分配的节数（按约束优先级加权）
+      - 每节课静态得分的相反数（偏好教室/时间段/星期、教室容量、时间段顺序、中午）
+      - 约束内连续排课的对数与每日超限的节数
+      - 教师单日授课数超过上限的节数
+
+    Args:
+        model: 求解模型
+        index: 只包含外部占用的可用性索引，引擎登记 assignments 后原地维护
+        weights: 打分权重（与 GreedySolverCore 相同）
+        assignments: 初始分配 {约束下标: [(教室下标, 单元格), ...]}，与已有占用冲突的节会被丢弃
+        locked: 保持不动的约束下标（如带固定时间槽的约束）
+        acceptance: 'annealing' 为模拟退火，'tabu' 为禁忌搜索
+    """
+
+    def __init__(self, model: SolverModel, index: SlotAvailabilityIndex, weights: Dict[str, float],
+                 assignments: Dict[int, Sequence[Pair]], locked: Iterable[int] = (),
+                 acceptance: str = 'annealing', max_iterations: int = 20000,
+                 tabu_tenure: int = 10, candidate_moves: int = 20,
+                 initial_temperature: float = 50.0, cooling_rate: float = 0.9995,
+                 seed: Optional[int] = None):
+        if acceptance not in ('annealing', 'tabu'):
+            raise ValueError(f"不支持的接受准则: {acceptance}")
+        self.model = model
+        self.index = index
+        self.weights = weights
+        self.acceptance = acceptance
+        self.max_iterations = max_iterations
+        self.tabu_tenure = tabu_tenure
+        self.candidate_moves = max(1, candidate_moves)
+        self.initial_temperature = initial_temperature
+        self.cooling_rate = cooling_rate
+        self.rng = random.Random(seed)
+
+        num_constraints = len(model.sessions)
+        self.num_time_slots = model.num_time_slots
+        self.offsets = np.zeros(num_constraints + 1, dtype=np.int64)
+        np.cumsum(model.sessions, out=self.offsets[1:])
+        self.offsets = self.offsets.tolist()
+        num_sessions = self.offsets[-1]
+        self.session_constraint: List[int] = np.repeat(
+            np.arange(num_constraints), model.sessions).tolist()
+        self.constraint_teacher: List[int] = model.constraint_teacher.tolist()
+        self.locked = set(int(ci) for ci in locked)
+
+        # 静态打分数组（与 GreedySolverCore.score 的静态项一致）
+        orders = model.time_slot_orders
+        self.order_bonus: List[float] = np.where(
+            (orders >= weights['good_time_slot_order_min']) & (orders <= weights['good_time_slot_order_max']),
+            weights['good_time_slot_bonus'], 0.0
+        ).tolist()
+        self.time_slot_orders: List[int] = orders.tolist()
+        self.unassigned_cost: List[float] = (
+            UNASSIGNED_PENALTY + model.priority * weights['priority_weight']).tolist()
+        self.day_load_limit = weights['teacher_day_load_limit']
+
+        # 允许的单元格（放宽时间段偏好，仍限定星期并回避中午）与偏好教室
+        candidates = CandidateDomains(model)
+        self.allowed = candidates.cells[True]
+        self.allowed_cells: List[List[int]] = [np.flatnonzero(row).tolist() for row in self.allowed]
+        self.preferred_rooms: List[List[int]] = [
+            rooms.tolist() if rooms is not None else [] for rooms in candidates.rooms
+        ]
+
+        # 节课位置与占有者矩阵
+        self.room: List[int] = [-1] * num_sessions
+        self.cell: List[int] = [-1] * num_sessions
+        self.room_owner = np.full((model.num_classrooms, model.num_cells), -1, dtype=np.int64)
+        self.teacher_owner = np.full((len(model.teacher_ids), model.num_cells), -1, dtype=np.int64)
+
+        self.dropped = 0
+        for ci, pairs in assignments.items():
+            teacher = self.constraint_teacher[ci]
+            session = self.offsets[ci]
+            for room, cell in list(pairs)[:int(model.sessions[ci])]:
+                if room is None or cell is None or not index.free[room, cell] or \
+                        index.is_teacher_busy(teacher, cell):
+                    self.dropped += 1
+                    continue
+                self._place(session, int(room), int(cell))
+                session += 1
+
+        # 教师每天的授课数（包含外部占用）
+        self.teacher_day_load = np.array(
+            [index.teacher_day_loads(p) for p in range(len(model.teacher_ids))], dtype=np.int64
+        ).reshape(len(model.teacher_ids), model.num_days)
+
+        self.movable: List[int] = [s for s in range(num_sessions)
+                                   if self.session_constraint[s] not in self.locked]
+        self.unassigned = set(s for s in self.movable if self.room[s] < 0)
+        self.cost = self.full_cost()
+        self.best_cost = self.cost
+        self.best_positions = (list(self.room), list(self.cell))
+        self._tabu_until: Dict[Pair, int] = {}
+
+    # ---- 目标函数 ----
+
+    def session_score(self, ci: int, room: int, cell: int) -> float:
+        """单节课在 (教室, 单元格) 上的静态得分"""
+        model, weights = self.model, self.weights
+        day_index, time_index = divmod(cell, self.num_time_slots)
+        score = self.order_bonus[time_index]
+        if model.has_room_pref[ci] and model.room_pref[ci, room]:
+            score += weights['preferred_classroom_bonus']
+        if model.has_time_pref[ci] and model.time_pref[ci, time_index]:
+            score += weights['preferred_time_slot_bonus']
+        if model.has_day_pref[ci] and model.day_pref[ci, day_index]:
+            score += weights['preferred_day_bonus']
+        if model.avoid_noon[ci] and model.time_slot_noon[time_index]:
+            score -= weights['noon_penalty']
+        max_students = model.max_students[ci]
+        if max_students:
+            capacity = model.classroom_capacity[room]
+            capacity_ratio = max_students / capacity if capacity else math.inf
+            if 0.5 <= capacity_ratio <= 0.9:
+                score += 15.0
+            elif capacity_ratio <= 1.0:
+                score += 10.0
+            else:
+                score -= 20.0
+        return float(score)
+
+    def _position_cost(self, ci: int, room: int, cell: int) -> float:
+        if room < 0:
+            return self.unassigned_cost[ci]
+        return -self.session_score(ci, room, cell)
+
+    def constraint_penalty(self, ci: int, cells: Sequence[int]) -> float:
+        """约束内连续排课与每日超限的惩罚"""
+        model = self.model
+        penalty = 0
+        if model.max_daily[ci] > 0 or model.avoid_consecutive[ci]:
+            keys = sorted((cell // self.num_time_slots, self.time_slot_orders[cell % self.num_time_slots])
+                          for cell in cells)
+            if model.max_daily[ci] > 0:
+                max_daily = int(model.max_daily[ci])
+                per_day: Dict[int, int] = {}
+                for day_index, _order in keys:
+                    per_day[day_index] = per_day.get(day_index, 0) + 1
+                penalty += sum(max(0, count - max_daily) for count in per_day.values())
+            if model.avoid_consecutive[ci]:
+                penalty += sum(1 for (day, order), (next_day, next_order) in zip(keys, keys[1:])
+                               if day == next_day and next_order == order + 1)
+        return float(SOFT_PENALTY * penalty)
+
+    def _load_penalty(self, load: int) -> float:
+        return float(SOFT_PENALTY * max(0, load - self.day_load_limit))
+
+    def constraint_cells(self, ci: int) -> List[int]:
+        return [cell for cell in self.cell[self.offsets[ci]:self.offsets[ci + 1]] if cell >= 0]
+
+    def full_cost(self) -> float:
+        """完整计算目标值（用于初始化与校验增量结果）"""
+        cost = 0.0
+        for session, ci in enumerate(self.session_constraint):
+            cost += self._position_cost(ci, self.room[session], self.cell[session])
+        for ci in range(len(self.offsets) - 1):
+            cost += self.constraint_penalty(ci, self.constraint_cells(ci))
+        cost += sum(self._load_penalty(int(load)) for load in self.teacher_day_load.ravel())
+        return cost
+
+    def delta(self, changes: Sequence[Change]) -> float:
+        """执行一组修改后目标值的变化量，只计算受影响的节课、约束与教师日负载"""
+        num_time_slots = self.num_time_slots
+        delta = 0.0
+        new_cells: Dict[int, int] = {}
+        touched: Dict[int, None] = {}
+        load_changes: Dict[Pair, int] = {}
+        for session, room, cell in changes:
+            ci = self.session_constraint[session]
+            old_room, old_cell = self.room[session], self.cell[session]
+            delta += self._position_cost(ci, room, cell) - self._position_cost(ci, old_room, old_cell)
+            new_cells[session] = cell
+            touched[ci] = None
+            teacher = self.constraint_teacher[ci]
+            if old_cell >= 0:
+                key = (teacher, old_cell // num_time_slots)
+                load_changes[key] = load_changes.get(key, 0) - 1
+            if cell >= 0:
+                key = (teacher, cell // num_time_slots)
+                load_changes[key] = load_changes.get(key, 0) + 1
+
+        for ci in touched:
+            start, end = self.offsets[ci], self.offsets[ci + 1]
+            cells = [new_cells.get(s, self.cell[s]) for s in range(start, end)]
+            delta += (self.constraint_penalty(ci, [cell for cell in cells if cell >= 0]) -
+                      self.constraint_penalty(ci, self.constraint_cells(ci)))
+
+        for (teacher, day_index), change in load_changes.items():
+            if change:
+                load = int(self.teacher_day_load[teacher, day_index])
+                delta += self._load_penalty(load + change) - self._load_penalty(load)
+        return delta
+
+    # ---- 占用维护 ----
+
+    def _place(self, session: int, room: int, cell: int):
+        teacher = self.constraint_teacher[self.session_constraint[session]]
+        self.room[session], self.cell[session] = room, cell
+        self.room_owner[room, cell] = session
+        self.teacher_owner[teacher, cell] = session
+        self.index.occupy_classroom(room, cell)
+        self.index.occupy_teacher(teacher, cell)
+
+    def _remove(self, session: int):
+        teacher = self.constraint_teacher[self.session_constraint[session]]
+        room, cell = self.room[session], self.cell[session]
+        self.room[session], self.cell[session] = -1, -1
+        self.room_owner[room, cell] = -1
+        self.teacher_owner[teacher, cell] = -1
+        self.index.release_classroom(room, cell)
+        self.index.release_teacher(teacher, cell)
+
+    def apply(self, changes: Sequence[Change], delta: Optional[float] = None):
+        """执行一组修改：先释放全部旧位置，再占用新位置"""
+        if delta is None:
+            delta = self.delta(changes)
+        num_time_slots = self.num_time_slots
+        for session, _room, _cell in changes:
+            if self.cell[session] >= 0:
+                teacher = self.constraint_teacher[self.session_constraint[session]]
+                self.teacher_day_load[teacher, self.cell[session] // num_time_slots] -= 1
+                self._remove(session)
+                self.unassigned.add(session)
+        for session, room, cell in changes:
+            if room >= 0:
+                teacher = self.constraint_teacher[self.session_constraint[session]]
+                self.teacher_day_load[teacher, cell // num_time_slots] += 1
+                self._place(session, room, cell)
+                self.unassigned.discard(session)
+        self.cost += delta
+
+    def feasible(self, changes: Sequence[Change]) -> bool:
+        """检查修改后是否仍满足硬约束（占用者也在本次修改中移走的位置视为可用）"""
+        moving = {session for session, _room, _cell in changes}
+        rooms_taken = set()
+        teachers_taken = set()
+        index = self.index
+        for session, room, cell in changes:
+            if room < 0:
+                continue
+            ci = self.session_constraint[session]
+            if ci in self.locked or not self.allowed[ci, cell]:
+                return False
+            teacher = self.constraint_teacher[ci]
+            if (room, cell) in rooms_taken or (teacher, cell) in teachers_taken:
+                return False
+            # 时间段重叠时，同一次修改中的其他节课也不能落在被挡住的单元格上
+            for blocked in index.footprint(cell):
+                rooms_taken.add((room, blocked))
+                teachers_taken.add((teacher, blocked))
+            if not index.free[room, cell] and int(self.room_owner[room, cell]) not in moving:
+                return False
+            if index.is_teacher_busy(teacher, cell) and int(self.teacher_owner[teacher, cell]) not in moving:
+                return False
+        return True
+
+    # ---- 邻域 ----
+
+    def _random_room(self, ci: int) -> int:
+        preferred = self.preferred_rooms[ci]
+        if preferred and self.rng.random() < 0.5:
+            return self.rng.choice(preferred)
+        return self.rng.randrange(self.model.num_classrooms)
+
+    def _random_cell(self, ci: int) -> Optional[int]:
+        cells = self.allowed_cells[ci]
+        return self.rng.choice(cells) if cells else None
+
+    def propose(self) -> Optional[List[Change]]:
+        """随机生成一个邻域移动，无法生成时返回 None"""
+        rng = self.rng
+        if not self.movable:
+            return None
+        if self.unassigned and rng.random() < 0.5:
+            return self._propose_insert(rng.choice(tuple(self.unassigned)))
+
+        session = rng.choice(self.movable)
+        if self.room[session] < 0:
+            return self._propose_insert(session)
+        move_type = rng.choices(MOVE_TYPES, MOVE_WEIGHTS)[0]
+        if move_type == 'move':
+            return self._propose_move(session)
+        if move_type == 'swap':
+            other = rng.choice(self.movable)
+            if other == session or self.room[other] < 0:
+                return None
+            return [(session, self.room[other], self.cell[other]),
+                    (other, self.room[session], self.cell[session])]
+        return self._propose_kempe(session)
+
+    def _propose_insert(self, session: int) -> Optional[List[Change]]:
+        """为未分配的节选择位置；教室被占用时把占有者挪到别处或挤出"""
+        ci = self.session_constraint[session]
+        cell = self._random_cell(ci)
+        if cell is None:
+            return None
+        room = self._random_room(ci)
+        owner = int(self.room_owner[room, cell])
+        if owner < 0:
+            return [(session, room, cell)]
+
+        # 挤出占有者：尝试为其找一个新的空闲位置，找不到则取消其分配
+        owner_ci = self.session_constraint[owner]
+        new_cell = self._random_cell(owner_ci)
+        new_room = self._random_room(owner_ci)
+        if new_cell is not None and new_cell != cell and self.index.free[new_room, new_cell]:
+            return [(session, room, cell), (owner, new_room, new_cell)]
+        return [(session, room, cell), (owner, -1, -1)]
+
+    def _propose_move(self, session: int) -> Optional[List[Change]]:
+        """把一节课移到新的位置；目标位置被占用时与占有者交换"""
+        ci = self.session_constraint[session]
+        cell = self._random_cell(ci)
+        if cell is None:
+            return None
+        room = self._random_room(ci)
+        if (room, cell) == (self.room[session], self.cell[session]):
+            return None
+        owner = int(self.room_owner[room, cell])
+        if owner < 0:
+            return [(session, room, cell)]
+        return [(session, room, cell), (owner, self.room[session], self.cell[session])]
+
+    def _propose_kempe(self, session: int) -> Optional[List[Change]]:
+        """Kempe 链交换：把两个单元格中经教师或教室相连的节课整体互换单元格，教室不变"""
+        ci = self.session_constraint[session]
+        first = self.cell[session]
+        second = self._random_cell(ci)
+        if second is None or second == first:
+            return None
+
+        chain = {session}
+        frontier = [session]
+        while frontier:
+            current = frontier.pop()
+            target = second if self.cell[current] == first else first
+            teacher = self.constraint_teacher[self.session_constraint[current]]
+            for neighbour in (int(self.teacher_owner[teacher, target]),
+                              int(self.room_owner[self.room[current], target])):
+                if neighbour >= 0 and neighbour not in chain:
+                    if self.session_constraint[neighbour] in self.locked or len(chain) >= KEMPE_MAX_CHAIN:
+                        return None
+                    chain.add(neighbour)
+                    frontier.append(neighbour)
+
+        return [(s, self.room[s], second if self.cell[s] == first else first) for s in chain]
+
+    # ---- 搜索 ----
+
+    def _is_tabu(self, changes: Sequence[Change], iteration: int) -> bool:
+        tabu_until = self._tabu_until
+        return any(tabu_until.get((session, cell), 0) > iteration for session, _room, cell in changes)
+
+    def _make_tabu(self, changes: Sequence[Change], iteration: int):
+        for session, _room, _cell in changes:
+            self._tabu_until[(session, self.cell[session])] = iteration + self.tabu_tenure
+        # 定期清理过期的禁忌项
+        if len(self._tabu_until) > 64 * self.tabu_tenure:
+            self._tabu_until = {key: until for key, until in self._tabu_until.items() if until > iteration}
+
+    def _best_candidate(self, iteration: int) -> Optional[Tuple[List[Change], float]]:
+        """禁忌搜索：在若干随机邻域中选择目标值变化最小的非禁忌移动（满足渴望准则时可破禁）"""
+        best = None
+        for _ in range(self.candidate_moves):
+            changes = self.propose()
+            if not changes or not self.feasible(changes):
+                continue
+            delta = self.delta(changes)
+            if self._is_tabu(changes, iteration) and self.cost + delta >= self.best_cost - 1e-9:
+                continue
+            if best is None or delta < best[1]:
+                best = (changes, delta)
+        return best
+
+    def run(self, budget: Optional[TimeBudget] = None) -> Dict:
+        """执行局部搜索，结束时恢复到搜索过程中的最优解
+
+        Returns:
+            {'initial_cost', 'cost', 'iterations', 'accepted', 'improvements',
+             'unassigned_sessions', 'acceptance'}
+        """
+        budget = budget or TimeBudget()
+        rng = self.rng
+        initial_cost = self.cost
+        temperature = self.initial_temperature
+        iteration = accepted = improvements = 0
+
+        while iteration < self.max_iterations:
+            if iteration % BUDGET_CHECK_INTERVAL == 0 and budget.expired():
+                break
+            iteration += 1
+
+            if self.acceptance == 'tabu':
+                candidate = self._best_candidate(iteration)
+                if candidate is None:
+                    continue
+                changes, delta = candidate
+                self._make_tabu(changes, iteration)
+            else:
+                changes = self.propose()
+                if not changes or not self.feasible(changes):
+                    continue
+                delta = self.delta(changes)
+                temperature *= self.cooling_rate
+                if delta > 0 and (temperature <= 0 or rng.random() >= math.exp(-delta / temperature)):
+                    continue
+
+            self.apply(changes, delta)
+            accepted += 1
+            if self.cost < self.best_cost - 1e-9:
+                self.best_cost = self.cost
+                self.best_positions = (list(self.room), list(self.cell))
+                improvements += 1
+
+        self.restore_best()
+        return {
+            'initial_cost': initial_cost,
+            'cost': self.cost,
+            'iterations': iteration,
+            'accepted': accepted,
+            'improvements': improvements,
+            'unassigned_sessions': len(self.unassigned),
+            'acceptance': self.acceptance,
+        }
+
+    def restore_best(self):
+        """恢复到目前为止目标值最小的分配"""
+        best_rooms, best_cells = self.best_positions
+        changes = [(s, best_rooms[s], best_cells[s]) for s in range(len(best_rooms))
+                   if (best_rooms[s], best_cells[s]) != (self.room[s], self.cell[s])]
+        if changes:
+            self.apply(changes, self.best_cost - self.cost)
+
+    def assignments(self) -> Dict[int, List[Pair]]:
+        """当前分配 {约束下标: [(教室下标, 单元格), ...]}，不含没有任何节课的约束"""
+        result: Dict[int, List[Pair]] = {}
+        for session, ci in enumerate(self.session_constraint):
+            if self.room[session] >= 0:
+                result.setdefault(ci, []).append((self.room[session], self.cell[session]))
+        return result
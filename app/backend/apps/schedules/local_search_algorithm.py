@@ -0,0 +1,78 @@
+"""
+局部搜索排课算法模块
+先用贪心算法生成初始解，再在剩余时间内以模拟退火或禁忌搜索改进
+"""
+
+import time
+from typing import Dict, Optional
+
+from .algorithms import SchedulingAlgorithm
+from .time_budget import TimeBudget
+
+
+class LocalSearchSchedulingAlgorithm(SchedulingAlgorithm):
+    """贪心初始解 + 局部搜索
+
+    局部搜索的邻域包括单节移动、两节交换和 Kempe 链交换，
+    目标值优先减少未分配的节数，其次提高软约束得分。
+    """
+
+    def __init__(self, semester: str, academic_year: str,
+                 acceptance: Optional[str] = None,
+                 max_iterations: Optional[int] = None,
+                 tabu_tenure: Optional[int] = None,
+                 initial_temperature: Optional[float] = None,
+                 cooling_rate: Optional[float] = None,
+                 seed: Optional[int] = None):
+        super().__init__(semester, academic_year)
+        self.local_search_options = {
+            'acceptance': acceptance,
+            'max_iterations': max_iterations,
+            'tabu_tenure': tabu_tenure,
+            'initial_temperature': initial_temperature,
+            'cooling_rate': cooling_rate,
+            'seed': seed,
+        }
+        # 最近一次局部搜索的统计
+        self.local_search_stats: Dict = {}
+
+    def solve(self, timeout_seconds: int = 300, budget: Optional[TimeBudget] = None) -> Dict:
+        """执行贪心排课后进行局部搜索
+
+        Args:
+            timeout_seconds: 两个阶段共用的超时时间（秒）
+            budget: 与其他求解阶段共享的时间预算，给定时忽略 timeout_seconds
+        """
+        start_time = time.time()
+        budget = TimeBudget.of(timeout_seconds, budget)
+        greedy_result = super().solve(budget=budget.stage(self.cfg.get('local_search_greedy_fraction', 0.5)))
+        if budget.expired():
+            return greedy_result
+
+        self.local_search_stats = self.run_local_search(budget, **self.local_search_options)
+
+        successful_assignments = 0
+        failed_assignments = []
+        for constraint in self.constraints:
+            assigned = len(self.assigned_slots.get(constraint, []))
+            if assigned >= constraint.sessions_per_week:
+                successful_assignments += 1
+            else:
+                failed_assignments.append({
+                    'constraint': constraint,
+                    'assigned_slots': assigned,
+                    'required_slots': constraint.sessions_per_week,
+                    'reason': '无法找到足够的合适时间槽'
+                })
+
+        total_constraints = len(self.constraints)
+        return {
+            'successful_assignments': successful_assignments,
+            'failed_assignments': failed_assignments,
+            'total_constraints': total_constraints,
+            'success_rate': successful_assignments / total_constraints * 100 if total_constraints else 0,
+            'assigned_slots': self.assigned_slots,
+            'optimization_suggestions': self.get_optimization_suggestions(),
+            'execution_time': time.time() - start_time,
+            'local_search': self.local_search_stats,
+        }
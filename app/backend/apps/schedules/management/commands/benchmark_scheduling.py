@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.schedules.benchmark import (
+    BENCHMARK_ALGORITHMS, DEFAULT_SIZES, DEFAULT_TOLERANCES,
+    compare_with_baseline, load_report, run_benchmark, save_report,
+)
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the scheduling algorithms on seeded synthetic problems, write the results as JSON "
+            "and optionally fail when they regress against a stored baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                            help='Comma separated course counts')
+        parser.add_argument('--algorithms', default=','.join(BENCHMARK_ALGORITHMS),
+                            help='Comma separated algorithms (greedy, genetic, hybrid)')
+        parser.add_argument('--timeout', type=float, default=60, help='Timeout per solve in seconds')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default=None, help='Write the JSON report to this file')
+        parser.add_argument('--baseline', default=None, help='Compare against this JSON report')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Write the report to --baseline instead of comparing')
+        parser.add_argument('--max-slowdown', type=float, default=DEFAULT_TOLERANCES['max_slowdown'])
+        parser.add_argument('--max-memory-growth', type=float, default=DEFAULT_TOLERANCES['max_memory_growth'])
+        parser.add_argument('--max-success-drop', type=float, default=DEFAULT_TOLERANCES['max_success_drop'])
+        parser.add_argument('--max-soft-score-drop', type=float,
+                            default=DEFAULT_TOLERANCES['max_soft_score_drop'])
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size]
+        algorithms = [name for name in options['algorithms'].split(',') if name]
+        unknown = [name for name in algorithms if name not in BENCHMARK_ALGORITHMS]
+        if unknown:
+            raise CommandError(f"Unknown algorithms: {', '.join(unknown)}")
+
+        report = run_benchmark(sizes, algorithms, timeout_seconds=options['timeout'], seed=options['seed'],
+                               log=self.stdout.write)
+        if options['output']:
+            save_report(report, options['output'])
+            self.stdout.write(f"Report written to {options['output']}")
+
+        baseline_path = options['baseline']
+        if not baseline_path:
+            return
+        if options['update_baseline']:
+            save_report(report, baseline_path)
+            self.stdout.write(self.style.SUCCESS(f"Baseline updated: {baseline_path}"))
+            return
+
+        regressions = compare_with_baseline(report, load_report(baseline_path), {
+            'max_slowdown': options['max_slowdown'],
+            'max_memory_growth': options['max_memory_growth'],
+            'max_success_drop': options['max_success_drop'],
+            'max_soft_score_drop': options['max_soft_score_drop'],
+        })
+        for item in regressions:
+            self.stdout.write(self.style.ERROR(
+                f"{item['algorithm']} @ {item['num_courses']} courses: {item['metric']} "
+                f"{item['baseline']:.3f} -> {item['current']:.3f} (limit {item['limit']:.3f})"
+            ))
+        if regressions:
+            raise CommandError(f"{len(regressions)} benchmark regression(s) against {baseline_path}")
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-16 20:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('schedules', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester', models.CharField(max_length=20, verbose_name='学期')),
+                ('academic_year', models.CharField(max_length=10, verbose_name='学年')),
+                ('algorithm_type', models.CharField(default='greedy', max_length=20, verbose_name='算法类型')),
+                ('parameters', models.JSONField(blank=True, default=dict, help_text='如：course_ids、timeout_seconds、incremental', verbose_name='任务参数')),
+                ('celery_task_id', models.CharField(blank=True, max_length=255, verbose_name='Celery任务ID')),
+                ('status', models.CharField(choices=[('pending', '等待中'), ('running', '运行中'), ('completed', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='状态')),
+                ('progress', models.JSONField(blank=True, default=dict, help_text='如：stage、generation、best_fitness、assigned', verbose_name='进度')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='结果摘要')),
+                ('error_message', models.TextField(blank=True, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduling_jobs', to=settings.AUTH_USER_MODEL, verbose_name='创建人')),
+            ],
+            options={
+                'verbose_name': '排课任务',
+                'verbose_name_plural': '排课任务',
+                'db_table': 'schedules_schedulingjob',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['semester', 'academic_year'], name='schedules_s_semeste_8505a7_idx'), models.Index(fields=['status'], name='schedules_s_status_c6b2e4_idx')],
+            },
+        ),
+    ]
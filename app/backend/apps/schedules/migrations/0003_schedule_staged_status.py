@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0002_schedulingjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='schedule',
+            name='status',
+            field=models.CharField(choices=[('active', '正常'), ('cancelled', '取消'), ('rescheduled', '调课'), ('suspended', '暂停'), ('staged', '待生效')], default='active', max_length=20, verbose_name='状态'),
+        ),
+    ]
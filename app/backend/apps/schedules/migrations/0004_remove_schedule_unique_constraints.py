@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0003_schedule_staged_status'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='schedule',
+            name='unique_classroom_schedule',
+        ),
+        migrations.RemoveConstraint(
+            model_name='schedule',
+            name='unique_teacher_schedule',
+        ),
+    ]
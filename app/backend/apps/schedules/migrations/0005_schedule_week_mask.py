@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:05
+
+from django.db import migrations, models
+
+# 迁移不引用应用代码：以下为写入本迁移时 apps.schedules.models 中周次掩码计算的副本
+MAX_WEEKS = 31
+ALL_WEEKS_MASK = (1 << MAX_WEEKS) - 1
+
+
+def week_range_to_mask(week_range):
+    """把周次范围转换为周次位掩码，空的或无法解析的周次范围视为占用全部周次"""
+    mask = 0
+    try:
+        for part in (week_range or '').replace('周', '').strip().split(','):
+            part = part.strip()
+            if '-' in part:
+                start, end = map(int, part.split('-'))
+                weeks = range(start, end + 1)
+            else:
+                weeks = [int(part)]
+            for week in weeks:
+                if 1 <= week <= MAX_WEEKS:
+                    mask |= 1 << (week - 1)
+    except ValueError:
+        mask = 0
+    return mask or ALL_WEEKS_MASK
+
+
+def populate_week_mask(apps, schema_editor):
+    """根据已有记录的周次范围计算周次位掩码"""
+    Schedule = apps.get_model('schedules', 'Schedule')
+    batch = []
+    for schedule in Schedule.objects.only('id', 'week_range').iterator(chunk_size=2000):
+        schedule.week_mask = week_range_to_mask(schedule.week_range)
+        batch.append(schedule)
+        if len(batch) >= 2000:
+            Schedule.objects.bulk_update(batch, ['week_mask'])
+            batch = []
+    if batch:
+        Schedule.objects.bulk_update(batch, ['week_mask'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0004_remove_schedule_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='week_mask',
+            field=models.IntegerField(default=0, editable=False, help_text='保存时由周次范围自动计算，第N周对应第N-1位', verbose_name='周次位掩码'),
+        ),
+        migrations.RunPython(populate_week_mask, migrations.RunPython.noop),
+    ]
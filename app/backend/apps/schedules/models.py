@@ -1,16 +1,102 @@
 from django.db import models
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Q
+from django.db.models import F, Q
 from datetime import datetime, timedelta
+from functools import lru_cache
 import re
 from apps.courses.models import Course
 from apps.classrooms.models import Classroom
+from .time_grid import TimeSlotIntervalIndex, build_interval_index
+from utils.cache import CacheManager
 
 User = get_user_model()
 
+# 周次位掩码：第 w 周对应第 w-1 位，最多支持 31 周（可存入 32 位有符号整数）
+MAX_WEEKS = 31
+ALL_WEEKS_MASK = (1 << MAX_WEEKS) - 1
+
+
+# 周次范围字符串只有少数几种写法（"1-18"、"1-16周"……），解析结果按字符串缓存，
+# 导出和课表渲染时不再重复解析
+WEEK_RANGE_CACHE_SIZE = getattr(settings, 'SCHEDULE_CONFIG', {}).get('week_range_cache_size', 256)
+
+
+def weeks_to_mask(weeks):
+    """把周次列表转换为周次位掩码，超出 1-MAX_WEEKS 的周次被忽略"""
+    mask = 0
+    for week in weeks:
+        if 1 <= week <= MAX_WEEKS:
+            mask |= 1 << (week - 1)
+    return mask
+
+
+@lru_cache(maxsize=WEEK_RANGE_CACHE_SIZE)
+def parse_weeks(week_range):
+    """解析周次范围字符串，返回不可变的周次集合（结果带缓存）
+
+    Args:
+        week_range (str): 周次范围，如 "1-16周", "1-8,10-16周", "1,3,5-8周"
+
+    Returns:
+        frozenset: 周次集合；空字符串返回空集合
+
+    Raises:
+        ValueError: 周次范围格式错误（异常不会被缓存）
+    """
+    if not week_range:
+        return frozenset()
+
+    weeks = set()
+    for part in week_range.replace('周', '').strip().split(','):
+        part = part.strip()
+        if '-' in part:
+            # 处理范围，如 "1-16"
+            start, end = map(int, part.split('-'))
+            weeks.update(range(start, end + 1))
+        else:
+            # 处理单个周次
+            weeks.add(int(part))
+    return frozenset(weeks)
+
+
+@lru_cache(maxsize=WEEK_RANGE_CACHE_SIZE)
+def week_range_to_mask(week_range):
+    """把周次范围转换为周次位掩码（结果带缓存）
+
+    空的或无法解析的周次范围视为占用全部周次，冲突检查时按最保守的情况处理。
+    """
+    try:
+        weeks = parse_weeks(week_range)
+    except ValueError:
+        weeks = ()
+    return weeks_to_mask(weeks) or ALL_WEEKS_MASK
+
+
+def week_range_cache_stats():
+    """返回周次解析缓存的命中统计，供性能分析使用"""
+    stats = {}
+    for name, func in (('parse_weeks', parse_weeks), ('week_range_to_mask', week_range_to_mask)):
+        info = func.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'max_size': info.maxsize,
+            'hit_rate': round(info.hits / lookups, 4) if lookups else 0.0,
+        }
+    return stats
+
+
+def clear_week_range_cache():
+    """清空周次解析缓存及其统计"""
+    parse_weeks.cache_clear()
+    week_range_to_mask.cache_clear()
+
 
 class TimeSlot(models.Model):
     """时间段模型"""
@@ -82,6 +168,64 @@ class TimeSlot(models.Model):
         self.clean()
         super().save(*args, **kwargs)
 
+    # (时间段网格版本号, 区间索引)：版本号由 TimeSlot 的写入信号递增
+    _interval_index_memo = (None, None)
+
+    @classmethod
+    def interval_index(cls) -> TimeSlotIntervalIndex:
+        """全部时间段（含停用的）的区间索引
+
+        按时间段网格版本号在进程内缓存，版本号未变时不查询数据库；
+        缓存不可用（读不到版本号）时每次重新查询。
+        """
+        versions = CacheManager.get_schedule_versions(CacheManager.TIME_GRID_SCOPE)
+        memo_versions, index = cls._interval_index_memo
+        if versions is None or versions != memo_versions:
+            index = build_interval_index(tuple(
+                cls.objects.order_by('id').values_list('id', 'start_time', 'end_time')
+            ))
+            if versions is not None:
+                cls._interval_index_memo = (versions, index)
+        return index
+
+    @classmethod
+    def overlapping_ids(cls, time_slot):
+        """与给定时间段（对象或ID）在时间上重叠的时间段ID集合，含自身"""
+        return cls.interval_index().overlapping(getattr(time_slot, 'pk', time_slot))
+
+
+class ScheduleQuerySet(models.QuerySet):
+    """课程安排查询集，按周次过滤时在数据库中对 week_mask 做位运算"""
+
+    def overlapping_weeks(self, week_mask):
+        """筛选与给定周次位掩码有重叠周次的课程安排"""
+        if week_mask == ALL_WEEKS_MASK:
+            return self
+        return self.alias(week_overlap=F('week_mask').bitand(week_mask)).filter(week_overlap__gt=0)
+
+    def in_week(self, week_number):
+        """筛选在指定周次有课的课程安排"""
+        if not 1 <= week_number <= MAX_WEEKS:
+            return self.none()
+        return self.overlapping_weeks(1 << (week_number - 1))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create 不调用 save，在这里同步周次位掩码
+        objs = list(objs)
+        for obj in objs:
+            obj.week_mask = week_range_to_mask(obj.week_range)
+        created = super().bulk_create(objs, *args, **kwargs)
+        # bulk_create 不发送 post_save，在这里使相关学期的课程表缓存失效
+        CacheManager.bump_schedule_version(*{obj.semester for obj in objs})
+        return created
+
+    def delete(self):
+        # Schedule 不挂 post_delete 接收器以保留快速删除，整批删除只递增一次相关学期的版本号
+        semesters = set(self.values_list('semester', flat=True).distinct())
+        deleted = super().delete()
+        CacheManager.bump_schedule_version(*semesters)
+        return deleted
+
 
 class Schedule(models.Model):
     """课程安排模型"""
@@ -101,6 +245,7 @@ class Schedule(models.Model):
         ('cancelled', '取消'),
         ('rescheduled', '调课'),
         ('suspended', '暂停'),
+        ('staged', '待生效'),
     ]
 
     # 基本信息
@@ -141,6 +286,12 @@ class Schedule(models.Model):
         verbose_name='周次范围',
         help_text='如：1-16周、1-8,10-16周'
     )
+    week_mask = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='周次位掩码',
+        help_text='保存时由周次范围自动计算，第N周对应第N-1位'
+    )
     semester = models.CharField(
         max_length=20,
         verbose_name='学期',
@@ -176,6 +327,8 @@ class Schedule(models.Model):
         verbose_name='更新时间'
     )
 
+    objects = ScheduleQuerySet.as_manager()
+
     class Meta:
         verbose_name = '课程安排'
         verbose_name_plural = '课程安排'
@@ -188,20 +341,8 @@ class Schedule(models.Model):
             models.Index(fields=['semester', 'academic_year']),
             models.Index(fields=['status']),
         ]
-        # 确保同一时间段、同一教室不能有多个课程
-        constraints = [
-            models.UniqueConstraint(
-                fields=['classroom', 'day_of_week', 'time_slot', 'semester'],
-                condition=models.Q(status='active'),
-                name='unique_classroom_schedule'
-            ),
-            # 确保同一教师在同一时间段不能有多个课程
-            models.UniqueConstraint(
-                fields=['teacher', 'day_of_week', 'time_slot', 'semester'],
-                condition=models.Q(status='active'),
-                name='unique_teacher_schedule'
-            ),
-        ]
+        # 同一教室/教师在同一时间段的课程只要周次不重叠就可以共存（如1-8周与9-16周），
+        # 因此不设数据库唯一约束，冲突检查按周次位掩码进行（见 get_conflicts）
         ordering = ['day_of_week', 'time_slot__order']
 
     def __str__(self):
@@ -230,8 +371,14 @@ class Schedule(models.Model):
 
     def save(self, *args, **kwargs):
         self.clean()
+        self.week_mask = week_range_to_mask(self.week_range)
         super().save(*args, **kwargs)
 
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        CacheManager.bump_schedule_version(self.semester)
+        return deleted
+
     @classmethod
     def parse_week_range(cls, week_range):
         """解析周次范围字符串
@@ -242,40 +389,33 @@ class Schedule(models.Model):
         Returns:
             list: 周次列表，如 [1, 2, 3, ..., 16]
         """
-        if not week_range:
-            return []
-
-        # 移除"周"字
-        week_range = week_range.replace('周', '').strip()
-        weeks = []
-
-        # 按逗号分割
-        parts = week_range.split(',')
+        return sorted(parse_weeks(week_range))  # 去重并排序，返回新列表供调用方修改
 
-        for part in parts:
-            part = part.strip()
-            if '-' in part:
-                # 处理范围，如 "1-16"
-                start, end = map(int, part.split('-'))
-                weeks.extend(range(start, end + 1))
-            else:
-                # 处理单个周次
-                weeks.append(int(part))
+    @classmethod
+    def week_range_mask(cls, week_range):
+        """把周次范围转换为周次位掩码（见 week_range_to_mask）"""
+        return week_range_to_mask(week_range)
 
-        return sorted(list(set(weeks)))  # 去重并排序
+    @classmethod
+    def filter_week_overlap(cls, queryset, week_range):
+        """筛选出与给定周次范围有重叠周次的课程安排"""
+        return queryset.overlapping_weeks(week_range_to_mask(week_range))
 
     @property
     def week_numbers(self):
         """获取周次列表"""
-        return self.parse_week_range(self.week_range)
+        return sorted(parse_weeks(self.week_range))
 
     def is_active_in_week(self, week_number):
         """检查在指定周次是否有课"""
-        return week_number in self.week_numbers
+        week_mask = self.week_mask or week_range_to_mask(self.week_range)
+        return 1 <= week_number <= MAX_WEEKS and bool(week_mask & (1 << (week_number - 1)))
 
     def get_conflicts(self, exclude_self=True):
         """获取与当前课程安排冲突的其他安排
 
+        同一星期、时间段有重叠（见 TimeSlot.interval_index）、同一教室或教师且周次有重叠的有效安排视为冲突。
+
         Args:
             exclude_self (bool): 是否排除自身
 
@@ -284,7 +424,7 @@ class Schedule(models.Model):
         """
         conflicts = Schedule.objects.filter(
             day_of_week=self.day_of_week,
-            time_slot=self.time_slot,
+            time_slot_id__in=TimeSlot.overlapping_ids(self.time_slot_id),
             semester=self.semester,
             status='active'
         ).filter(
@@ -294,22 +434,23 @@ class Schedule(models.Model):
         if exclude_self and self.pk:
             conflicts = conflicts.exclude(pk=self.pk)
 
-        return conflicts
+        return self.filter_week_overlap(conflicts, self.week_range)
 
     def has_conflicts(self):
         """检查是否有冲突"""
         return self.get_conflicts().exists()
 
     @classmethod
-    def check_classroom_conflicts(cls, classroom, day_of_week, time_slot, semester, exclude_pk=None):
+    def check_classroom_conflicts(cls, classroom, day_of_week, time_slot, semester, exclude_pk=None, week_range=None):
         """检查教室冲突
 
         Args:
             classroom: 教室对象
             day_of_week: 星期
-            time_slot: 时间段
+            time_slot: 时间段（对象或ID），与之时间重叠的时间段同样参与检查
             semester: 学期
             exclude_pk: 排除的课程安排ID
+            week_range: 周次范围（可选），给定时只返回周次有重叠的安排
 
         Returns:
             QuerySet: 冲突的课程安排
@@ -317,26 +458,29 @@ class Schedule(models.Model):
         conflicts = cls.objects.filter(
             classroom=classroom,
             day_of_week=day_of_week,
-            time_slot=time_slot,
+            time_slot_id__in=TimeSlot.overlapping_ids(time_slot),
             semester=semester,
             status='active'
         )
 
         if exclude_pk:
             conflicts = conflicts.exclude(pk=exclude_pk)
+        if week_range:
+            conflicts = cls.filter_week_overlap(conflicts, week_range)
 
         return conflicts
 
     @classmethod
-    def check_teacher_conflicts(cls, teacher, day_of_week, time_slot, semester, exclude_pk=None):
+    def check_teacher_conflicts(cls, teacher, day_of_week, time_slot, semester, exclude_pk=None, week_range=None):
         """检查教师冲突
 
         Args:
             teacher: 教师对象
             day_of_week: 星期
-            time_slot: 时间段
+            time_slot: 时间段（对象或ID），与之时间重叠的时间段同样参与检查
             semester: 学期
             exclude_pk: 排除的课程安排ID
+            week_range: 周次范围（可选），给定时只返回周次有重叠的安排
 
         Returns:
             QuerySet: 冲突的课程安排
@@ -344,13 +488,15 @@ class Schedule(models.Model):
         conflicts = cls.objects.filter(
             teacher=teacher,
             day_of_week=day_of_week,
-            time_slot=time_slot,
+            time_slot_id__in=TimeSlot.overlapping_ids(time_slot),
             semester=semester,
             status='active'
         )
 
         if exclude_pk:
             conflicts = conflicts.exclude(pk=exclude_pk)
+        if week_range:
+            conflicts = cls.filter_week_overlap(conflicts, week_range)
 
         return conflicts
 
@@ -374,11 +520,7 @@ class Schedule(models.Model):
 
         # 如果指定了周次，过滤出该周有课的安排
         if week_number:
-            active_schedules = []
-            for schedule in schedules:
-                if schedule.is_active_in_week(week_number):
-                    active_schedules.append(schedule)
-            schedules = active_schedules
+            schedules = schedules.in_week(week_number)
 
         # 构建矩阵
         matrix = {}
@@ -417,3 +559,147 @@ class Schedule(models.Model):
             })
 
         return matrix
+
+
+class SchedulingJobQuerySet(models.QuerySet):
+    """排课任务查询集"""
+
+    def visible_to(self, user):
+        """用户可查看的任务：系统管理员不限，其他排课管理员只能查看自己创建的任务"""
+        if user.user_type == 'admin' or user.is_superuser:
+            return self
+        return self.filter(created_by_id=user.pk)
+
+
+class SchedulingJob(models.Model):
+    """排课任务模型
+
+    记录通过 Celery 异步执行的排课任务的参数、进度与结果。
+    """
+
+    STATUS_CHOICES = [
+        ('pending', '等待中'),
+        ('running', '运行中'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+    ]
+
+    # 任务参数
+    semester = models.CharField(
+        max_length=20,
+        verbose_name='学期'
+    )
+    academic_year = models.CharField(
+        max_length=10,
+        verbose_name='学年'
+    )
+    algorithm_type = models.CharField(
+        max_length=20,
+        default='greedy',
+        verbose_name='算法类型'
+    )
+    parameters = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='任务参数',
+        help_text='如：course_ids、timeout_seconds、incremental'
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='scheduling_jobs',
+        verbose_name='创建人'
+    )
+    celery_task_id = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Celery任务ID'
+    )
+
+    # 状态与进度
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name='状态'
+    )
+    progress = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='进度',
+        help_text='如：stage、generation、best_fitness、assigned'
+    )
+
+    # 结果
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='结果摘要'
+    )
+    error_message = models.TextField(
+        blank=True,
+        verbose_name='错误信息'
+    )
+
+    # 时间戳
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='创建时间'
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='开始时间'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='结束时间'
+    )
+
+    objects = SchedulingJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = '排课任务'
+        verbose_name_plural = '排课任务'
+        db_table = 'schedules_schedulingjob'
+        indexes = [
+            models.Index(fields=['semester', 'academic_year']),
+            models.Index(fields=['status']),
+        ]
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"排课任务#{self.pk} {self.semester} {self.algorithm_type} ({self.get_status_display()})"
+
+    @property
+    def group_name(self):
+        """进度推送使用的 channels 组名"""
+        return f"scheduling_job_{self.pk}"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    def is_visible_to(self, user):
+        """与 SchedulingJobQuerySet.visible_to 相同的可见规则"""
+        return user.user_type == 'admin' or user.is_superuser or self.created_by_id == user.pk
+
+    def to_dict(self):
+        """序列化为接口返回的字典"""
+        return {
+            'id': self.pk,
+            'semester': self.semester,
+            'academic_year': self.academic_year,
+            'algorithm_type': self.algorithm_type,
+            'parameters': self.parameters,
+            'status': self.status,
+            'progress': self.progress,
+            'result': self.result,
+            'error_message': self.error_message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
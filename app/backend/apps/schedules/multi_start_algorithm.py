@@ -0,0 +1,167 @@
+"""
+多起点贪心排课算法模块
+在进程池中并行运行多次随机化的贪心求解（打乱同优先级约束的顺序并扰动候选分数），
+保留成功率与软约束得分最高的结果
+"""
+
+import logging
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+from .algorithms import SchedulingAlgorithm
+from .greedy_core import init_multi_start_worker, run_multi_start
+from .time_budget import TimeBudget
+
+logger = logging.getLogger(__name__)
+
+
+class MultiStartSchedulingAlgorithm(SchedulingAlgorithm):
+    """多起点贪心排课
+
+    第 0 次求解使用确定性的优先级顺序且不加扰动，结果与普通贪心算法一致，
+    因此多起点结果不会比贪心算法差。工作进程只接收不含 ORM 对象的问题快照。
+    """
+
+    def __init__(self, semester: str, academic_year: str,
+                 num_starts: Optional[int] = None,
+                 max_workers: Optional[int] = None,
+                 score_noise: Optional[float] = None,
+                 order_noise: Optional[float] = None,
+                 seed: Optional[int] = None):
+        super().__init__(semester, academic_year)
+        self.num_starts = max(1, num_starts or self.cfg.get('multi_start_runs', 8))
+        self.max_workers = max(1, max_workers or self.cfg.get('multi_start_workers') or os.cpu_count() or 1)
+        self.score_noise = score_noise if score_noise is not None else self.cfg.get('multi_start_score_noise', 3.0)
+        self.order_noise = order_noise if order_noise is not None else self.cfg.get('multi_start_order_noise', 1.0)
+        self.seed = seed if seed is not None else self.cfg.get('multi_start_seed', 0)
+
+        # 每次求解的摘要 [{'seed', 'successful', 'soft_score'}]
+        self.start_results: List[Dict] = []
+
+    def _seeds(self) -> List[int]:
+        return [0] + [self.seed + i for i in range(1, self.num_starts)]
+
+    def _snapshot(self) -> Dict:
+        """不含 ORM 对象的问题快照（SolverModel 序列化时会去掉模型对象）"""
+        index = self.slot_index
+        return {
+            'model': self.model,
+            'index_state': index.state(),
+            'usage_counts': self._time_slot_usage_counts,
+            'weights': self.score_weights,
+            'score_noise': self.score_noise,
+            'order_noise': self.order_noise,
+            'most_constrained': self.cfg.get('greedy_ordering', 'most_constrained') == 'most_constrained',
+        }
+
+    def _run_serial(self, seeds: List[int], deadline: float) -> List[Dict]:
+        """在当前进程中依次求解"""
+        init_multi_start_worker(self._snapshot())
+        results = []
+        try:
+            for seed in seeds:
+                if results and time.time() > deadline:
+                    break
+                results.append(run_multi_start(seed, deadline))
+                self._report_start_progress(results, len(seeds))
+        finally:
+            init_multi_start_worker({})
+        return results
+
+    def _run_parallel(self, seeds: List[int], deadline: float, workers: int) -> List[Dict]:
+        """在进程池中并行求解，超过截止时间后不再等待未完成的求解"""
+        results = []
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_multi_start_worker,
+            initargs=(self._snapshot(),)
+        )
+        try:
+            pending = {executor.submit(run_multi_start, seed, deadline) for seed in seeds}
+            while pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining if math.isfinite(remaining) else None,
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    results.append(future.result())
+                    self._report_start_progress(results, len(seeds))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def _report_start_progress(self, results: List[Dict], total: int):
+        self._report_progress(stage='multi_start', completed=len(results), starts=total,
+                              best_successful=max(r['successful'] for r in results))
+
+    def solve(self, timeout_seconds: int = 300, budget: Optional[TimeBudget] = None) -> Dict:
+        """执行多起点排课
+
+        Args:
+            timeout_seconds: 全部求解共用的超时时间（秒）
+            budget: 与其他求解阶段共享的时间预算，给定时忽略 timeout_seconds
+        """
+        start_time = time.time()
+        deadline = start_time + TimeBudget.of(timeout_seconds, budget).remaining()
+        self.initialize_available_slots()
+
+        seeds = self._seeds()
+        workers = min(self.max_workers, len(seeds))
+        results = []
+        if workers > 1:
+            try:
+                results = self._run_parallel(seeds, deadline, workers)
+            except (OSError, NotImplementedError, BrokenProcessPool) as e:
+                # 无法创建进程池（如受限环境）时退回单进程
+                logger.warning(f"多起点排课进程池不可用，改为单进程执行: {e}")
+                workers = 1
+        if not results:
+            results = self._run_serial(seeds if workers == 1 else seeds[:1], deadline)
+
+        # 成功数优先，其次软约束得分；同分时取种子较小者（种子 0 即普通贪心结果）
+        results.sort(key=lambda r: r['seed'])
+        best = max(results, key=lambda r: (r['successful'], r['soft_score']))
+        self.start_results = [
+            {'seed': r['seed'], 'successful': r['successful'], 'soft_score': r['soft_score']}
+            for r in results
+        ]
+
+        # 将最优结果映射回模型对象
+        model = self.model
+        for ci, pairs in best['assignments'].items():
+            constraint = model.constraints[ci]
+            slots = [self._make_slot(room, cell) for room, cell in pairs]
+            self.assigned_slots[constraint] = slots
+            self._update_conflict_tracking(constraint, slots)
+
+        timed_out = set(best['timed_out'])
+        failed_assignments = []
+        for ci, constraint in enumerate(model.constraints):
+            assigned = len(best['assignments'].get(ci, []))
+            if assigned < constraint.sessions_per_week:
+                failed_assignments.append({
+                    'constraint': constraint,
+                    'assigned_slots': assigned,
+                    'required_slots': constraint.sessions_per_week,
+                    'reason': '算法执行超时' if ci in timed_out else '无法找到足够的合适时间槽'
+                })
+
+        total_constraints = len(self.constraints)
+        return {
+            'successful_assignments': best['successful'],
+            'failed_assignments': failed_assignments,
+            'total_constraints': total_constraints,
+            'success_rate': best['successful'] / total_constraints * 100 if total_constraints else 0,
+            'assigned_slots': self.assigned_slots,
+            'optimization_suggestions': self.get_optimization_suggestions(),
+            'execution_time': time.time() - start_time,
+            'soft_score': best['soft_score'],
+            'best_seed': best['seed'],
+            'starts_completed': len(results),
+            'workers': workers
+        }
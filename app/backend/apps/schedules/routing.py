@@ -0,0 +1,11 @@
+"""
+排课WebSocket路由配置
+"""
+
+from django.urls import re_path
+from . import consumers
+
+websocket_urlpatterns = [
+    # 排课任务进度
+    re_path(r'ws/scheduling-jobs/(?P<job_id>\d+)/$', consumers.SchedulingJobConsumer.as_asgi()),
+]
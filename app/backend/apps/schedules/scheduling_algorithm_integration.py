@@ -13,6 +13,7 @@ from .algorithms import SchedulingAlgorithm, ScheduleConstraint, create_auto_sch
 from .genetic_algorithm import GeneticSchedulingAlgorithm, create_genetic_schedule
 from .hybrid_algorithm import HybridSchedulingAlgorithm
 from .models import Schedule, TimeSlot
+from .services import AutoScheduleService
 from apps.courses.models import Course
 from apps.classrooms.models import Classroom
 from apps.users.models import User
@@ -203,6 +204,21 @@ class SchedulingAlgorithmIntegration:
                 # 创建Schedule对象
                 schedules_to_create = []
                 
+                # 排课任务保存的分配结果：[{course_id, teacher_id, classroom_id, time_slot_id, day_of_week, week_range}, ...]
+                if isinstance(assigned_slots, list):
+                    for assignment in assigned_slots:
+                        schedules_to_create.append(Schedule(
+                            course_id=assignment['course_id'],
+                            teacher_id=assignment['teacher_id'],
+                            classroom_id=assignment['classroom_id'],
+                            time_slot_id=assignment['time_slot_id'],
+                            day_of_week=assignment['day_of_week'],
+                            semester=semester,
+                            academic_year=academic_year,
+                            week_range=assignment.get('week_range') or "1-18",
+                            status='active'
+                        ))
+                
                 # 处理每个约束的分配结果
                 if isinstance(assigned_slots, dict):
                     for constraint, slots in assigned_slots.items():
@@ -223,7 +239,8 @@ class SchedulingAlgorithmIntegration:
                 
                 # 批量创建Schedule对象
                 if schedules_to_create:
-                    Schedule.objects.bulk_create(schedules_to_create)
+                    # 写入前在内存中校验授课教师、教室容量与时间冲突
+                    AutoScheduleService.bulk_save_schedules(schedules_to_create)
                     logger.info(f"成功创建了 {len(schedules_to_create)} 个课程安排")
                 
                 return True
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from .models import TimeSlot, Schedule
 from apps.courses.models import Course
@@ -90,6 +91,7 @@ class ScheduleSerializer(serializers.ModelSerializer):
         day_of_week = attrs.get('day_of_week')
         time_slot = attrs.get('time_slot')
         semester = attrs.get('semester')
+        week_range = attrs.get('week_range')
         status = attrs.get('status', 'active')
         
         # 只对active状态的排课进行冲突检测
@@ -107,7 +109,7 @@ class ScheduleSerializer(serializers.ModelSerializer):
         # 检查时间冲突（排除当前实例）
         existing_schedules = Schedule.objects.filter(
             day_of_week=day_of_week,
-            time_slot=time_slot,
+            time_slot_id__in=TimeSlot.overlapping_ids(time_slot),
             semester=semester,
             status='active'
         )
@@ -115,6 +117,11 @@ class ScheduleSerializer(serializers.ModelSerializer):
         # 如果是更新操作，排除当前实例
         if self.instance:
             existing_schedules = existing_schedules.exclude(id=self.instance.id)
+
+        # 只有周次重叠的安排才构成冲突
+        existing_schedules = Schedule.filter_week_overlap(
+            existing_schedules, week_range or getattr(self.instance, 'week_range', None)
+        )
         
         # 检查教室冲突
         if existing_schedules.filter(classroom=classroom).exists():
@@ -219,16 +226,43 @@ class ScheduleBatchCreateSerializer(serializers.Serializer):
         except Classroom.DoesNotExist:
             raise serializers.ValidationError('教室不存在')
         
-        # 验证时间段
+        # 验证时间段（一次查询取出全部时间段）
         time_slots = attrs['time_slots']
+        time_slot_objects = TimeSlot.objects.in_bulk({slot['time_slot_id'] for slot in time_slots})
         for slot in time_slots:
-            try:
-                TimeSlot.objects.get(id=slot['time_slot_id'])
-            except TimeSlot.DoesNotExist:
+            if slot['time_slot_id'] not in time_slot_objects:
                 raise serializers.ValidationError(f'时间段{slot["time_slot_id"]}不存在')
         
         attrs['course'] = course
         attrs['teacher'] = teacher
         attrs['classroom'] = classroom
+        attrs['time_slot_objects'] = time_slot_objects
         
         return attrs
+
+
+class SchedulePlacementSerializer(serializers.Serializer):
+    """拟定排课位置序列化器"""
+
+    course_id = serializers.IntegerField(required=False)
+    teacher_id = serializers.IntegerField()
+    classroom_id = serializers.IntegerField()
+    day_of_week = serializers.IntegerField(min_value=1, max_value=7)
+    time_slot_id = serializers.IntegerField()
+    week_range = serializers.CharField(required=False, allow_blank=True)
+    exclude_schedule_id = serializers.IntegerField(required=False, allow_null=True)  # 调整已有排课时排除其原位置
+
+
+class ScheduleBatchConflictCheckSerializer(serializers.Serializer):
+    """批量冲突检查序列化器"""
+
+    semester = serializers.CharField()
+    placements = serializers.ListField(
+        child=SchedulePlacementSerializer(),
+        allow_empty=False,
+        max_length=getattr(settings, 'SCHEDULE_CONFIG', {}).get('batch_conflict_check_limit', 500),
+        help_text='格式：[{"teacher_id": 1, "classroom_id": 1, "day_of_week": 1, "time_slot_id": 1, "week_range": "1-16周"}, ...]'
+    )
+    exclude_schedule_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
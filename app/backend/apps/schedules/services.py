@@ -2,21 +2,64 @@
 课程表相关服务类
 """
 
+from collections import defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection, transaction
 from django.db.models import Q
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from typing import List, Dict, Any, Optional, Tuple
 from .models import Schedule, TimeSlot
+from .time_grid import TimeSlotIntervalIndex, build_interval_index
+from utils.cache import CacheManager
 from apps.courses.models import Course
 from apps.classrooms.models import Classroom
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# PostgreSQL 咨询锁的命名空间（两段式键的第一段），与其他用途的咨询锁区分
+SCHEDULE_WRITE_LOCK_NAMESPACE = 0x5343
+
+
+@contextmanager
+def schedule_write_lock(*semesters):
+    """在一个事务中按学期串行化排课写入
+
+    周次可以错开，同一时间段允许多条有效排课，无法再用唯一约束兜底；
+    冲突检查与写入都放在这个上下文中，同一学期的并发写入排队执行，不会重复占用。
+    PostgreSQL 使用事务级咨询锁，事务结束时自动释放；其他数据库（开发测试用的 SQLite）不另加锁。
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # 按固定顺序加锁，多学期写入之间不会死锁
+                for semester in sorted({str(semester) for semester in semesters}):
+                    cursor.execute('SELECT pg_advisory_xact_lock(%s, hashtext(%s))',
+                                   [SCHEDULE_WRITE_LOCK_NAMESPACE, semester])
+        yield
+
 
 class ScheduleConflictDetector:
-    """课程表冲突检测器"""
-    
+    """课程表冲突检测器
+
+    只读取生成报告所需的列，一次流式遍历即完成教室、教师、时间与容量冲突检测，
+    查询次数与学期规模无关（时间段一次、课程安排一次）。
+    时间段的重叠关系取自区间索引：同一教室或教师的安排按"星期 + 时间段重叠分量"分组，
+    组内时间段重叠且周次重叠的安排构成冲突；时间段互不重叠时即按单个时间段分组。
+    """
+
+    # 冲突报告用到的列，按 values_list(named=True) 流式读取，不实例化模型对象
+    REPORT_FIELDS = (
+        'id', 'classroom_id', 'teacher_id', 'time_slot_id', 'day_of_week', 'week_mask',
+        'course__name', 'course__max_students',
+        'teacher__username', 'teacher__first_name', 'teacher__last_name',
+        'classroom__room_number', 'classroom__capacity', 'classroom__building__code',
+        'time_slot__name',
+    )
+    STREAM_CHUNK_SIZE = 2000
+
     @staticmethod
     def detect_all_conflicts(semester: str) -> Dict[str, List[Dict]]:
         """检测指定学期的所有冲突
@@ -27,162 +70,242 @@ class ScheduleConflictDetector:
         Returns:
             dict: 冲突报告
         """
-        conflicts = {
-            'classroom_conflicts': [],
-            'teacher_conflicts': [],
-            'time_conflicts': [],
-            'capacity_conflicts': []
+        time_slots = list(TimeSlot.objects.order_by('start_time'))
+        interval_index = build_interval_index(tuple(
+            (slot.id, slot.start_time, slot.end_time) for slot in sorted(time_slots, key=lambda ts: ts.id)
+        ))
+
+        classroom_groups = defaultdict(list)
+        teacher_groups = defaultdict(list)
+        slot_courses = defaultdict(list)
+        capacity_conflicts = []
+
+        for row in ScheduleConflictDetector._report_rows(semester):
+            slot_group = interval_index.group(row.time_slot_id)
+            classroom_groups[(row.classroom_id, row.day_of_week, slot_group)].append(row)
+            teacher_groups[(row.teacher_id, row.day_of_week, slot_group)].append(row)
+            slot_courses[row.time_slot_id].append(row.course__name)
+            if row.classroom__capacity < row.course__max_students:
+                capacity_conflicts.append(ScheduleConflictDetector._capacity_conflict(row))
+
+        return {
+            'classroom_conflicts': ScheduleConflictDetector._detect_classroom_conflicts(
+                classroom_groups, interval_index),
+            'teacher_conflicts': ScheduleConflictDetector._detect_teacher_conflicts(
+                teacher_groups, interval_index),
+            'time_conflicts': ScheduleConflictDetector._detect_time_conflicts(
+                [slot for slot in time_slots if slot.is_active], interval_index, slot_courses),
+            'capacity_conflicts': capacity_conflicts,
         }
-        
-        schedules = Schedule.objects.filter(
+
+    @staticmethod
+    def check_placements(placements: List[Dict[str, Any]], semester: str,
+                         exclude_ids: Optional[List[int]] = None) -> List[List[Dict[str, Any]]]:
+        """批量检查拟定排课位置的教室与教师冲突
+
+        全部拟定位置用一次集合查询取出可能冲突的已有排课（星期、时间重叠的时间段、教室或教师取并集），
+        再在内存中逐条比对；本批次内的拟定位置之间也互相检查，冲突双方都会记录。
+
+        Args:
+            placements: [{'teacher_id', 'classroom_id', 'day_of_week', 'time_slot_id', 'week_range'(可选)}, ...]
+            semester: 学期
+            exclude_ids: 视为已移走的排课ID（如本批次中正在调整位置的排课）
+
+        Returns:
+            list: 与 placements 一一对应的冲突列表，每条冲突为
+                {'conflict_type': 'classroom' 或 'teacher',
+                 'schedule': 冲突的已有排课（本批次内冲突时为 None），
+                 'batch_index': 冲突的本批次下标（与已有排课冲突时为 None）}
+        """
+        if not placements:
+            return []
+
+        interval_index = TimeSlot.interval_index()
+        placements = [
+            {
+                'teacher_id': int(p['teacher_id']),
+                'classroom_id': int(p['classroom_id']),
+                'day_of_week': int(p['day_of_week']),
+                'time_slot_id': int(p['time_slot_id']),
+                'week_mask': Schedule.week_range_mask(p.get('week_range')),
+                'overlapping': sorted(interval_index.overlapping(int(p['time_slot_id']))),
+            }
+            for p in placements
+        ]
+
+        existing = Schedule.objects.filter(
+            semester=semester,
+            status='active',
+            day_of_week__in={p['day_of_week'] for p in placements},
+            time_slot_id__in={slot_id for p in placements for slot_id in p['overlapping']},
+        ).filter(
+            Q(classroom_id__in={p['classroom_id'] for p in placements}) |
+            Q(teacher_id__in={p['teacher_id'] for p in placements})
+        ).exclude(
+            id__in=exclude_ids or []
+        ).select_related('course', 'teacher', 'classroom__building', 'time_slot')
+
+        # (教室/教师, 星期, 时间段) -> 已有排课 / 本批次下标
+        existing_by_key = {'classroom': defaultdict(list), 'teacher': defaultdict(list)}
+        for schedule in existing:
+            time_key = (schedule.day_of_week, schedule.time_slot_id)
+            existing_by_key['classroom'][(schedule.classroom_id,) + time_key].append(schedule)
+            existing_by_key['teacher'][(schedule.teacher_id,) + time_key].append(schedule)
+        batch_by_key = {'classroom': defaultdict(list), 'teacher': defaultdict(list)}
+
+        results = [[] for _ in placements]
+        for i, placement in enumerate(placements):
+            day_of_week, week_mask = placement['day_of_week'], placement['week_mask']
+            for conflict_type in ('classroom', 'teacher'):
+                resource_id = placement[f'{conflict_type}_id']
+                for slot_id in placement['overlapping']:
+                    key = (resource_id, day_of_week, slot_id)
+                    for schedule in existing_by_key[conflict_type].get(key, ()):
+                        if schedule.week_mask & week_mask:
+                            results[i].append({'conflict_type': conflict_type, 'schedule': schedule, 'batch_index': None})
+                    for j in batch_by_key[conflict_type].get(key, ()):
+                        if placements[j]['week_mask'] & week_mask:
+                            results[i].append({'conflict_type': conflict_type, 'schedule': None, 'batch_index': j})
+                            results[j].append({'conflict_type': conflict_type, 'schedule': None, 'batch_index': i})
+                batch_by_key[conflict_type][(resource_id, day_of_week, placement['time_slot_id'])].append(i)
+        return results
+
+    @staticmethod
+    def _report_rows(semester: str):
+        """按课程表默认顺序流式返回指定学期有效安排的报告列"""
+        return Schedule.objects.filter(
             semester=semester,
             status='active'
-        ).select_related('course', 'teacher', 'classroom', 'time_slot')
-        
-        # 检测教室冲突
-        classroom_conflicts = ScheduleConflictDetector._detect_classroom_conflicts(schedules)
-        conflicts['classroom_conflicts'] = classroom_conflicts
-        
-        # 检测教师冲突
-        teacher_conflicts = ScheduleConflictDetector._detect_teacher_conflicts(schedules)
-        conflicts['teacher_conflicts'] = teacher_conflicts
-        
-        # 检测时间冲突
-        time_conflicts = ScheduleConflictDetector._detect_time_conflicts(schedules)
-        conflicts['time_conflicts'] = time_conflicts
-        
-        # 检测容量冲突
-        capacity_conflicts = ScheduleConflictDetector._detect_capacity_conflicts(schedules)
-        conflicts['capacity_conflicts'] = capacity_conflicts
-        
-        return conflicts
-    
+        ).order_by('day_of_week', 'time_slot__order', 'id').values_list(
+            *ScheduleConflictDetector.REPORT_FIELDS, named=True
+        ).iterator(chunk_size=ScheduleConflictDetector.STREAM_CHUNK_SIZE)
+
     @staticmethod
-    def _detect_classroom_conflicts(schedules) -> List[Dict]:
+    def _classroom_label(row) -> str:
+        """与 str(classroom) 一致的教室名称"""
+        return f"{row.classroom__building__code}-{row.classroom__room_number}"
+
+    @staticmethod
+    def _teacher_label(row) -> str:
+        """与 teacher.get_full_name() or teacher.username 一致的教师名称"""
+        full_name = f"{row.teacher__first_name} {row.teacher__last_name}".strip()
+        return full_name or row.teacher__username
+
+    @staticmethod
+    def _detect_classroom_conflicts(classroom_groups, interval_index: TimeSlotIntervalIndex) -> List[Dict]:
         """检测教室冲突"""
         conflicts = []
-        classroom_schedule_map = {}
-        
-        for schedule in schedules:
-            key = (
-                schedule.classroom.id,
-                schedule.day_of_week,
-                schedule.time_slot.id
-            )
-            
-            if key not in classroom_schedule_map:
-                classroom_schedule_map[key] = []
-            classroom_schedule_map[key].append(schedule)
-        
-        # 找出有冲突的教室
-        for key, schedule_list in classroom_schedule_map.items():
+        day_names = dict(Schedule.DAY_CHOICES)
+
+        for schedule_list in classroom_groups.values():
+            schedule_list = ScheduleConflictDetector._week_overlapping(schedule_list, interval_index)
             if len(schedule_list) > 1:
+                first = schedule_list[0]
                 conflicts.append({
                     'type': 'classroom_conflict',
-                    'classroom': str(schedule_list[0].classroom),
-                    'day_of_week': schedule_list[0].get_day_of_week_display(),
-                    'time_slot': schedule_list[0].time_slot.name,
+                    'classroom': ScheduleConflictDetector._classroom_label(first),
+                    'day_of_week': day_names.get(first.day_of_week, first.day_of_week),
+                    'time_slot': first.time_slot__name,
                     'conflicting_schedules': [
                         {
                             'id': s.id,
-                            'course': s.course.name,
-                            'teacher': s.teacher.get_full_name() or s.teacher.username,
+                            'course': s.course__name,
+                            'teacher': ScheduleConflictDetector._teacher_label(s),
                         }
                         for s in schedule_list
                     ]
                 })
-        
+
         return conflicts
-    
+
     @staticmethod
-    def _detect_teacher_conflicts(schedules) -> List[Dict]:
+    def _detect_teacher_conflicts(teacher_groups, interval_index: TimeSlotIntervalIndex) -> List[Dict]:
         """检测教师冲突"""
         conflicts = []
-        teacher_schedule_map = {}
-        
-        for schedule in schedules:
-            key = (
-                schedule.teacher.id,
-                schedule.day_of_week,
-                schedule.time_slot.id
-            )
-            
-            if key not in teacher_schedule_map:
-                teacher_schedule_map[key] = []
-            teacher_schedule_map[key].append(schedule)
-        
-        # 找出有冲突的教师
-        for key, schedule_list in teacher_schedule_map.items():
+        day_names = dict(Schedule.DAY_CHOICES)
+
+        for schedule_list in teacher_groups.values():
+            schedule_list = ScheduleConflictDetector._week_overlapping(schedule_list, interval_index)
             if len(schedule_list) > 1:
+                first = schedule_list[0]
                 conflicts.append({
                     'type': 'teacher_conflict',
-                    'teacher': schedule_list[0].teacher.get_full_name() or schedule_list[0].teacher.username,
-                    'day_of_week': schedule_list[0].get_day_of_week_display(),
-                    'time_slot': schedule_list[0].time_slot.name,
+                    'teacher': ScheduleConflictDetector._teacher_label(first),
+                    'day_of_week': day_names.get(first.day_of_week, first.day_of_week),
+                    'time_slot': first.time_slot__name,
                     'conflicting_schedules': [
                         {
                             'id': s.id,
-                            'course': s.course.name,
-                            'classroom': str(s.classroom),
+                            'course': s.course__name,
+                            'classroom': ScheduleConflictDetector._classroom_label(s),
                         }
                         for s in schedule_list
                     ]
                 })
-        
+
         return conflicts
-    
+
     @staticmethod
-    def _detect_time_conflicts(schedules) -> List[Dict]:
-        """检测时间冲突（重叠的时间段）"""
-        conflicts = []
-        time_slots = TimeSlot.objects.filter(is_active=True).order_by('start_time')
-        
-        # 检查时间段是否有重叠
-        for i, slot1 in enumerate(time_slots):
-            for slot2 in time_slots[i+1:]:
-                if ScheduleConflictDetector._time_slots_overlap(slot1, slot2):
-                    # 找出使用这两个时间段的课程
-                    schedules1 = schedules.filter(time_slot=slot1)
-                    schedules2 = schedules.filter(time_slot=slot2)
-                    
-                    if schedules1.exists() and schedules2.exists():
-                        conflicts.append({
-                            'type': 'time_overlap',
-                            'time_slot_1': slot1.name,
-                            'time_slot_2': slot2.name,
-                            'overlap_period': f"{max(slot1.start_time, slot2.start_time)}-{min(slot1.end_time, slot2.end_time)}",
-                            'affected_schedules': {
-                                'slot1_schedules': [s.course.name for s in schedules1],
-                                'slot2_schedules': [s.course.name for s in schedules2],
-                            }
-                        })
-        
-        return conflicts
-    
+    def _week_overlapping(schedule_list: List, interval_index: TimeSlotIntervalIndex) -> List:
+        """返回同一组安排中，与其他安排时间段重叠且周次重叠的那些"""
+        if len(schedule_list) < 2:
+            return schedule_list
+        return [
+            schedule for i, schedule in enumerate(schedule_list)
+            if any(
+                schedule.week_mask & other.week_mask and
+                interval_index.overlaps(schedule.time_slot_id, other.time_slot_id)
+                for j, other in enumerate(schedule_list) if j != i
+            )
+        ]
+
     @staticmethod
-    def _detect_capacity_conflicts(schedules) -> List[Dict]:
-        """检测容量冲突"""
+    def _detect_time_conflicts(time_slots: List[TimeSlot], interval_index: TimeSlotIntervalIndex,
+                               slot_courses) -> List[Dict]:
+        """检测时间冲突（重叠的时间段）
+
+        Args:
+            time_slots: 启用的时间段
+            interval_index: 时间段区间索引
+            slot_courses: 时间段ID -> 使用该时间段的课程名称列表
+        """
         conflicts = []
-        
-        for schedule in schedules:
-            if schedule.classroom.capacity < schedule.course.max_students:
+        slot_by_id = {slot.id: slot for slot in time_slots}
+
+        # 区间索引给出全部重叠的时间段对（按开始时间排列）
+        for slot1_id, slot2_id in interval_index.overlap_pairs():
+            slot1, slot2 = slot_by_id.get(slot1_id), slot_by_id.get(slot2_id)
+            if slot1 is None or slot2 is None:
+                continue
+            # 找出使用这两个时间段的课程
+            courses1 = slot_courses.get(slot1_id)
+            courses2 = slot_courses.get(slot2_id)
+            if courses1 and courses2:
                 conflicts.append({
-                    'type': 'capacity_conflict',
-                    'schedule_id': schedule.id,
-                    'course': schedule.course.name,
-                    'classroom': str(schedule.classroom),
-                    'classroom_capacity': schedule.classroom.capacity,
-                    'course_max_students': schedule.course.max_students,
-                    'shortage': schedule.course.max_students - schedule.classroom.capacity,
+                    'type': 'time_overlap',
+                    'time_slot_1': slot1.name,
+                    'time_slot_2': slot2.name,
+                    'overlap_period': f"{max(slot1.start_time, slot2.start_time)}-{min(slot1.end_time, slot2.end_time)}",
+                    'affected_schedules': {
+                        'slot1_schedules': list(courses1),
+                        'slot2_schedules': list(courses2),
+                    }
                 })
-        
+
         return conflicts
-    
+
     @staticmethod
-    def _time_slots_overlap(slot1: TimeSlot, slot2: TimeSlot) -> bool:
-        """检查两个时间段是否重叠"""
-        return (slot1.start_time < slot2.end_time and 
-                slot2.start_time < slot1.end_time)
+    def _capacity_conflict(row) -> Dict:
+        """生成单条安排的容量冲突记录"""
+        return {
+            'type': 'capacity_conflict',
+            'schedule_id': row.id,
+            'course': row.course__name,
+            'classroom': ScheduleConflictDetector._classroom_label(row),
+            'classroom_capacity': row.classroom__capacity,
+            'course_max_students': row.course__max_students,
+            'shortage': row.course__max_students - row.classroom__capacity,
+        }
 
 
 class ScheduleOptimizer:
@@ -312,6 +435,195 @@ class ScheduleOptimizer:
         return score
 
 
+class AutoScheduleService:
+    """自动排课结果保存服务（同步接口与异步任务共用）"""
+
+    @staticmethod
+    def remove_existing_schedules(semester: str, academic_year: str, course_ids: Optional[List[int]] = None) -> int:
+        """删除现有排课（强制重新排课时使用），返回删除数量"""
+        existing_schedules = Schedule.objects.filter(
+            semester=semester,
+            academic_year=academic_year,
+            status='active'
+        )
+        if course_ids:
+            existing_schedules = existing_schedules.filter(course_id__in=course_ids)
+
+        deleted_count = existing_schedules.count()
+        existing_schedules.delete()
+        return deleted_count
+
+    @staticmethod
+    def save_result(result: Dict[str, Any], swap: bool = False) -> Tuple[List[Schedule], int]:
+        """保存 create_auto_schedule 的结果
+
+        会从 result 中取出 algorithm_instance 与 stale_schedule_ids（增量模式或替换模式下被替换的旧记录）。
+
+        Args:
+            result: create_auto_schedule 的返回值
+            swap: 先以待生效状态写入新排课，再在一个短事务中删除旧记录并启用新记录
+
+        Returns:
+            (创建的排课记录, 删除的旧记录数量)
+        """
+        algorithm_instance = result.pop('algorithm_instance')
+        schedules_to_create = algorithm_instance.create_schedules()
+        stale_schedule_ids = result.pop('stale_schedule_ids', [])
+
+        created_schedules = AutoScheduleService.bulk_save_schedules(
+            schedules_to_create, stale_schedule_ids, swap=swap
+        )
+        return created_schedules, len(stale_schedule_ids)
+
+    @staticmethod
+    def validate_schedules(schedules: List[Schedule], exclude_ids: Optional[List[int]] = None) -> List[str]:
+        """在内存中校验待写入的排课，返回错误信息列表
+
+        与 Schedule.clean 及 get_conflicts 的检查一致：教师须为课程授课教师、教室容量不小于课程最大人数、
+        教室与教师在时间重叠的时间段上不能与本批次或数据库中周次重叠的有效排课冲突（exclude_ids 中的记录视为已删除）。
+        数据库查询次数与排课数量无关。
+        """
+        if not schedules:
+            return []
+
+        course_ids = {s.course_id for s in schedules}
+        classroom_ids = {s.classroom_id for s in schedules}
+        course_teachers = set(Course.teachers.through.objects.filter(
+            course_id__in=course_ids
+        ).values_list('course_id', 'user_id'))
+        max_students = dict(Course.objects.filter(id__in=course_ids).values_list('id', 'max_students'))
+        capacities = dict(Classroom.objects.filter(id__in=classroom_ids).values_list('id', 'capacity'))
+        interval_index = TimeSlot.interval_index()
+
+        existing = Schedule.objects.filter(
+            semester__in={s.semester for s in schedules},
+            status='active'
+        ).exclude(id__in=exclude_ids or [])
+        # (教师/教室, 星期, 时间段, 学期) -> 已占用周次的位掩码
+        teacher_weeks, classroom_weeks = defaultdict(int), defaultdict(int)
+        for semester, day_of_week, time_slot_id, classroom_id, teacher_id, week_mask in existing.values_list(
+            'semester', 'day_of_week', 'time_slot_id', 'classroom_id', 'teacher_id', 'week_mask'
+        ).iterator():
+            teacher_weeks[(teacher_id, day_of_week, time_slot_id, semester)] |= week_mask
+            classroom_weeks[(classroom_id, day_of_week, time_slot_id, semester)] |= week_mask
+
+        errors = []
+        for schedule in schedules:
+            label = f'课程{schedule.course_id} 星期{schedule.day_of_week} 时间段{schedule.time_slot_id}'
+            if (schedule.course_id, schedule.teacher_id) not in course_teachers:
+                errors.append(f'{label}: 该教师不是此课程的授课教师')
+            capacity = capacities.get(schedule.classroom_id, 0)
+            if capacity < max_students.get(schedule.course_id, 0):
+                errors.append(f'{label}: 教室容量({capacity})小于课程最大选课人数'
+                              f'({max_students[schedule.course_id]})')
+
+            time_key = (schedule.day_of_week, schedule.time_slot_id, schedule.semester)
+            teacher_key = (schedule.teacher_id,) + time_key
+            classroom_key = (schedule.classroom_id,) + time_key
+            # 待写入的记录尚未保存，周次位掩码由周次范围计算
+            week_mask = Schedule.week_range_mask(schedule.week_range)
+            # 与本时间段时间重叠的时间段（含自身）上的占用都构成冲突
+            overlapping = interval_index.overlapping(schedule.time_slot_id)
+            if any(teacher_weeks.get((schedule.teacher_id, schedule.day_of_week, slot_id, schedule.semester), 0)
+                   & week_mask for slot_id in overlapping):
+                errors.append(f'{label}: 教师时间冲突')
+            if any(classroom_weeks.get((schedule.classroom_id, schedule.day_of_week, slot_id, schedule.semester), 0)
+                   & week_mask for slot_id in overlapping):
+                errors.append(f'{label}: 教室时间冲突')
+            teacher_weeks[teacher_key] |= week_mask
+            classroom_weeks[classroom_key] |= week_mask
+        return errors
+
+    @staticmethod
+    def bulk_save_schedules(schedules: List[Schedule], stale_schedule_ids: Optional[List[int]] = None,
+                            batch_size: Optional[int] = None, swap: bool = False) -> List[Schedule]:
+        """批量写入排课记录
+
+        先用 validate_schedules 在内存中完成校验（不逐条调用 Schedule.clean），
+        再按批次 bulk_create，并删除被替换的旧记录。
+
+        Args:
+            schedules: 未保存的排课记录
+            stale_schedule_ids: 需要删除的旧记录ID
+            batch_size: 每批插入的记录数，默认读取 SCHEDULE_CONFIG['bulk_create_batch_size']
+            swap: 先以 staged 状态插入（不参与有效排课的冲突检查），
+                再在一个事务中删除旧记录并按主键用一条 UPDATE 启用新记录；
+                数据库不支持 bulk_create 回填主键时无法确定本批记录，改为在一个事务中直接写入
+
+        校验与写入在 schedule_write_lock 中进行，不会与同一学期的并发写入重复占用；
+        swap 模式在插入前先校验一次，启用前在锁内再校验一次。
+
+        Raises:
+            ValidationError: 校验失败时抛出，数据库不做任何修改
+        """
+        stale_schedule_ids = list(stale_schedule_ids or [])
+        if batch_size is None:
+            batch_size = getattr(settings, 'SCHEDULE_CONFIG', {}).get('bulk_create_batch_size', 1000)
+
+        semesters = {s.semester for s in schedules}
+
+        def check():
+            errors = AutoScheduleService.validate_schedules(schedules, stale_schedule_ids)
+            if errors:
+                raise ValidationError(errors)
+
+        now = timezone.now()
+        for schedule in schedules:
+            # bulk_create 不会触发 auto_now / auto_now_add
+            schedule.created_at = schedule.updated_at = now
+
+        # 按条件找回 staged 记录可能误启用或误删其他写入方暂存的记录，取不到主键时不做两阶段替换
+        if swap and not connection.features.can_return_rows_from_bulk_insert:
+            swap = False
+
+        if not swap:
+            with schedule_write_lock(*semesters):
+                check()
+                if stale_schedule_ids:
+                    Schedule.objects.filter(id__in=stale_schedule_ids).delete()
+                return Schedule.objects.bulk_create(schedules, batch_size=batch_size)
+
+        check()
+        for schedule in schedules:
+            schedule.status = 'staged'
+        with transaction.atomic():
+            created_schedules = Schedule.objects.bulk_create(schedules, batch_size=batch_size)
+        staged_ids = [schedule.pk for schedule in created_schedules]
+        try:
+            with schedule_write_lock(*semesters):
+                # 插入与启用之间可能有其他写入，staged 记录不参与检查，锁内再校验一次
+                check()
+                if stale_schedule_ids:
+                    Schedule.objects.filter(id__in=stale_schedule_ids).delete()
+                Schedule.objects.filter(id__in=staged_ids).update(status='active', updated_at=timezone.now())
+                # update 不发送 post_save，启用新记录后显式使课程表缓存失效
+                CacheManager.bump_schedule_version(*semesters)
+        except Exception:
+            Schedule.objects.filter(id__in=staged_ids, status='staged').delete()
+            raise
+        for schedule in created_schedules:
+            schedule.status = 'active'
+        return created_schedules
+
+    @staticmethod
+    def summarize_failures(failed_assignments: List[Dict]) -> List[Dict[str, Any]]:
+        """处理失败分配的详情，移除不可序列化的对象"""
+        failed_assignments_detail = []
+        for failed in failed_assignments:
+            constraint = failed['constraint']
+            failed_assignments_detail.append({
+                'course_id': constraint.course.id,
+                'course_name': constraint.course.name,
+                'course_code': constraint.course.code,
+                'teacher_id': constraint.teacher.id,
+                'teacher_name': constraint.teacher.get_full_name() or constraint.teacher.username,
+                'assigned_slots': failed['assigned_slots'],
+                'required_slots': failed['required_slots'],
+                'reason': failed['reason']
+            })
+        return failed_assignments_detail
+
+
 class ScheduleImportExportService:
     """课程表导入导出服务"""
     
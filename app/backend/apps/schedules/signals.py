@@ -0,0 +1,32 @@
+"""
+课程表缓存失效信号
+排课、选课、时间段写入时递增对应的课程表版本号，旧版本下缓存的课程表随之失效。
+bulk_create 由 ScheduleQuerySet.bulk_create 递增版本号，queryset.update 需由调用方显式递增。
+Schedule 的删除由 Schedule.delete / ScheduleQuerySet.delete 递增版本号而不挂 post_delete，
+避免批量删除退化为逐行加载、逐行递增；随课程、教室级联删除的排课依赖缓存过期。
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.courses.models import Enrollment
+from utils.cache import CacheManager
+from .models import Schedule, TimeSlot
+
+
+@receiver(post_save, sender=Schedule)
+def invalidate_semester_schedule_tables(sender, instance, **kwargs):
+    """排课变化：该学期的全部课程表失效"""
+    CacheManager.bump_schedule_version(instance.semester)
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def invalidate_student_schedule_tables(sender, instance, **kwargs):
+    """选课变化只影响该学生自己的课程表"""
+    CacheManager.bump_schedule_version(f'student:{instance.student_id}')
+
+
+@receiver([post_save, post_delete], sender=TimeSlot)
+def invalidate_time_grid_schedule_tables(sender, instance, **kwargs):
+    """时间段变化：所有课程表的网格都要重建"""
+    CacheManager.bump_schedule_version(CacheManager.TIME_GRID_SCOPE)
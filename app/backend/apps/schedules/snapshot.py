@@ -0,0 +1,273 @@
+"""
+排课求解快照模块
+把一次求解的完整输入（约束、教室、时间段、已有排课占用与排课配置）保存为 NumPy 数组文件，
+之后无需查询数据库即可重放求解。本模块不依赖 Django：
+``SolverSnapshot.solve_greedy`` 可以在没有 Django 配置的环境中直接运行，
+排课算法类则通过 ``SchedulingAlgorithm.from_snapshot`` 在不访问数据库的情况下求解。
+
+文件格式：
+  - ``*.npz``：单个未压缩的 npz 文件
+  - 其他路径：目录，每个数组一个 ``.npy`` 文件，可用 ``mmap_mode='r'`` 内存映射加载
+变长列表（偏好教室、偏好时间段、偏好星期、固定时间槽）以 CSR 形式保存：
+``<name>_offsets[c]:<name>_offsets[c+1]`` 为第 c 个约束的元素。
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .availability import SlotAvailabilityIndex, occupy_existing
+from .greedy_core import GreedySolverCore, load_score_weights
+from .solver_model import SolverModel
+
+FORMAT_VERSION = 1
+
+
+# ---- 不依赖 ORM 的资源记录（属性与模型对象同名，可直接用于 SolverModel） ----
+
+@dataclass(frozen=True)
+class SnapshotTimeSlot:
+    id: int
+    order: int
+    start_time: time
+    end_time: time
+
+
+@dataclass(frozen=True)
+class SnapshotClassroom:
+    id: int
+    capacity: int
+    room_type: str = ''
+
+
+@dataclass(frozen=True)
+class SnapshotCourse:
+    id: int
+    max_students: int = 0
+    course_type: str = ''
+
+
+@dataclass(frozen=True)
+class SnapshotTeacher:
+    id: int
+
+
+@dataclass
+class SnapshotConstraint:
+    """与 ScheduleConstraint 字段一致的约束记录"""
+    course: SnapshotCourse
+    teacher: SnapshotTeacher
+    preferred_classrooms: List[SnapshotClassroom]
+    preferred_time_slots: List[SnapshotTimeSlot]
+    preferred_days: List[int]
+    sessions_per_week: int
+    avoid_consecutive: bool = False
+    avoid_noon: bool = False
+    max_daily_sessions: int = 0
+    fixed_time_slots: List[Tuple[int, SnapshotTimeSlot]] = field(default_factory=list)
+    priority: int = 1
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _from_minutes(value: int) -> time:
+    return time(int(value) // 60, int(value) % 60)
+
+
+def _csr(rows: Sequence[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """把变长整数列表编码为 (offsets, values)"""
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(row) for row in rows])
+    values = np.array([value for row in rows for value in row], dtype=np.int64)
+    return offsets, values
+
+
+def _rows(offsets: np.ndarray, values: np.ndarray, ci: int) -> List[int]:
+    return values[offsets[ci]:offsets[ci + 1]].tolist()
+
+
+class SolverSnapshot:
+    """排课求解输入快照
+
+    Args:
+        time_slots: 可用时间段
+        classrooms: 可用教室
+        constraints: 排课约束（ScheduleConstraint 或 SnapshotConstraint）
+        existing_rows: 已有排课 [(排课ID, 课程ID, 星期, 时间段ID, 教室ID, 教师ID), ...]
+        semester / academic_year: 学期与学年
+        config: 导出时的 SCHEDULE_CONFIG
+    """
+
+    def __init__(self, time_slots: Sequence, classrooms: Sequence, constraints: Sequence,
+                 existing_rows: Sequence[Tuple[int, int, int, int, int, int]] = (),
+                 semester: str = '', academic_year: str = '', config: Optional[Dict] = None):
+        self.time_slots = list(time_slots)
+        self.classrooms = list(classrooms)
+        self.constraints = list(constraints)
+        self.existing_rows = [tuple(int(v) for v in row) for row in existing_rows]
+        self.semester = semester
+        self.academic_year = academic_year
+        self.config = dict(config or {})
+
+    # ---- 数组编码 ----
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """编码为数组字典（只保存求解需要的字段）"""
+        constraints = self.constraints
+        arrays = {
+            'format_version': np.array(FORMAT_VERSION, dtype=np.int64),
+            'meta_json': np.array(json.dumps({
+                'semester': self.semester,
+                'academic_year': self.academic_year,
+                'config': self.config,
+            }, ensure_ascii=False, default=str)),
+            # 时间段
+            'time_slot_ids': np.array([ts.id for ts in self.time_slots], dtype=np.int64),
+            'time_slot_orders': np.array([ts.order for ts in self.time_slots], dtype=np.int64),
+            'time_slot_start': np.array([_minutes(ts.start_time) for ts in self.time_slots], dtype=np.int64),
+            'time_slot_end': np.array([_minutes(ts.end_time) for ts in self.time_slots], dtype=np.int64),
+            # 教室
+            'classroom_ids': np.array([c.id for c in self.classrooms], dtype=np.int64),
+            'classroom_capacity': np.array([c.capacity for c in self.classrooms], dtype=np.int64),
+            'classroom_type': np.array([getattr(c, 'room_type', '') or '' for c in self.classrooms], dtype=str),
+            # 约束
+            'course_ids': np.array([c.course.id for c in constraints], dtype=np.int64),
+            'course_max_students': np.array(
+                [getattr(c.course, 'max_students', 0) or 0 for c in constraints], dtype=np.int64),
+            'course_type': np.array([getattr(c.course, 'course_type', '') or '' for c in constraints], dtype=str),
+            'teacher_ids': np.array([c.teacher.id for c in constraints], dtype=np.int64),
+            'sessions': np.array([c.sessions_per_week for c in constraints], dtype=np.int64),
+            'priority': np.array([c.priority for c in constraints], dtype=np.int64),
+            'avoid_consecutive': np.array([c.avoid_consecutive for c in constraints], dtype=bool),
+            'avoid_noon': np.array([c.avoid_noon for c in constraints], dtype=bool),
+            'max_daily': np.array([c.max_daily_sessions for c in constraints], dtype=np.int64),
+            # 已有排课占用
+            'existing_rows': np.array(self.existing_rows, dtype=np.int64).reshape(-1, 6),
+        }
+        lists = {
+            'pref_rooms': [[c.id for c in constraint.preferred_classrooms or []] for constraint in constraints],
+            'pref_time_slots': [[ts.id for ts in constraint.preferred_time_slots or []]
+                                for constraint in constraints],
+            'pref_days': [list(constraint.preferred_days or []) for constraint in constraints],
+            'fixed_days': [[day for day, _ts in constraint.fixed_time_slots or []] for constraint in constraints],
+            'fixed_time_slots': [[ts.id for _day, ts in constraint.fixed_time_slots or []]
+                                 for constraint in constraints],
+        }
+        for name, rows in lists.items():
+            arrays[f'{name}_offsets'], arrays[name] = _csr(rows)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays) -> 'SolverSnapshot':
+        """由数组字典（或 np.load 的结果）还原快照"""
+        version = int(arrays['format_version'])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"不支持的快照版本: {version}")
+        meta = json.loads(str(arrays['meta_json']))
+
+        time_slots = [
+            SnapshotTimeSlot(id=int(ts_id), order=int(order), start_time=_from_minutes(start),
+                             end_time=_from_minutes(end))
+            for ts_id, order, start, end in zip(arrays['time_slot_ids'], arrays['time_slot_orders'],
+                                                arrays['time_slot_start'], arrays['time_slot_end'])
+        ]
+        classrooms = [
+            SnapshotClassroom(id=int(room_id), capacity=int(capacity), room_type=str(room_type))
+            for room_id, capacity, room_type in zip(arrays['classroom_ids'], arrays['classroom_capacity'],
+                                                    arrays['classroom_type'])
+        ]
+        time_slot_by_id = {ts.id: ts for ts in time_slots}
+        classroom_by_id = {c.id: c for c in classrooms}
+        teachers: Dict[int, SnapshotTeacher] = {}
+        courses: Dict[int, SnapshotCourse] = {}
+
+        pref_rooms = (arrays['pref_rooms_offsets'], arrays['pref_rooms'])
+        pref_time_slots = (arrays['pref_time_slots_offsets'], arrays['pref_time_slots'])
+        pref_days = (arrays['pref_days_offsets'], arrays['pref_days'])
+        fixed_days = (arrays['fixed_days_offsets'], arrays['fixed_days'])
+        fixed_time_slots = (arrays['fixed_time_slots_offsets'], arrays['fixed_time_slots'])
+
+        constraints = []
+        for ci, course_id in enumerate(arrays['course_ids'].tolist()):
+            course = courses.setdefault(course_id, SnapshotCourse(
+                id=course_id, max_students=int(arrays['course_max_students'][ci]),
+                course_type=str(arrays['course_type'][ci])))
+            teacher_id = int(arrays['teacher_ids'][ci])
+            teacher = teachers.setdefault(teacher_id, SnapshotTeacher(id=teacher_id))
+            constraints.append(SnapshotConstraint(
+                course=course,
+                teacher=teacher,
+                preferred_classrooms=[classroom_by_id[i] for i in _rows(*pref_rooms, ci) if i in classroom_by_id],
+                preferred_time_slots=[time_slot_by_id[i] for i in _rows(*pref_time_slots, ci)
+                                      if i in time_slot_by_id],
+                preferred_days=_rows(*pref_days, ci),
+                sessions_per_week=int(arrays['sessions'][ci]),
+                avoid_consecutive=bool(arrays['avoid_consecutive'][ci]),
+                avoid_noon=bool(arrays['avoid_noon'][ci]),
+                max_daily_sessions=int(arrays['max_daily'][ci]),
+                fixed_time_slots=[(day, time_slot_by_id[ts_id]) for day, ts_id
+                                  in zip(_rows(*fixed_days, ci), _rows(*fixed_time_slots, ci))
+                                  if ts_id in time_slot_by_id],
+                priority=int(arrays['priority'][ci]),
+            ))
+
+        return cls(time_slots, classrooms, constraints, arrays['existing_rows'].tolist(),
+                   semester=meta.get('semester', ''), academic_year=meta.get('academic_year', ''),
+                   config=meta.get('config', {}))
+
+    # ---- 文件读写 ----
+
+    def save(self, path: str):
+        """保存快照；以 .npz 结尾时写入单个文件，否则写入 .npy 目录（可内存映射）"""
+        arrays = self.to_arrays()
+        if path.endswith('.npz'):
+            np.savez(path, **arrays)
+            return
+        os.makedirs(path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), array)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = None) -> 'SolverSnapshot':
+        """加载快照；目录格式可传入 mmap_mode='r' 以内存映射方式读取"""
+        if path.endswith('.npz'):
+            with np.load(path) as data:
+                return cls.from_arrays(data)
+        arrays = {
+            name[:-len('.npy')]: np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+            for name in os.listdir(path) if name.endswith('.npy')
+        }
+        return cls.from_arrays(arrays)
+
+    # ---- 不依赖 Django 的求解 ----
+
+    def build_model(self, days: Sequence[int] = range(1, 6)) -> SolverModel:
+        return SolverModel(self.constraints, self.time_slots, self.classrooms, days=days)
+
+    def build_index(self, model: SolverModel) -> SlotAvailabilityIndex:
+        """创建可用性索引并写入已有排课的占用"""
+        index = SlotAvailabilityIndex.for_model(model)
+        occupy_existing(model, index, (row[2:] for row in self.existing_rows))
+        return index
+
+    def solve_greedy(self, most_constrained: Optional[bool] = None) -> Dict:
+        """在快照上直接运行贪心求解内核（不需要 Django）
+
+        Returns:
+            GreedySolverCore.solve_order 的结果，并附带 'model'（用于解释下标）
+        """
+        model = self.build_model()
+        index = self.build_index(model)
+        core = GreedySolverCore(model, index, load_score_weights(self.config))
+        if most_constrained is None:
+            most_constrained = self.config.get('greedy_ordering', 'most_constrained') == 'most_constrained'
+        order = np.argsort(-model.priority.astype(float), kind='stable')
+        result = core.solve_order([int(ci) for ci in order], most_constrained=most_constrained)
+        result['model'] = model
+        return result
@@ -0,0 +1,210 @@
+"""
+排课求解模型模块
+将排课约束与教室、时间段资源一次性编译为以整数下标表示的结构数组，
+求解过程只操作这些数组，只有在输出结果时才映射回 Django 模型对象
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .time_grid import build_interval_index
+
+
+def is_noon_time(time_slot) -> bool:
+    """判断时间段是否为中午时间（12:00-13:00）"""
+    start_time, end_time = time_slot.start_time, time_slot.end_time
+    return (start_time.hour == 12 or
+            (start_time.hour == 11 and end_time.hour >= 12) or
+            (start_time.hour < 12 and end_time.hour > 12))
+
+
+def time_slot_overlaps(time_slots: Sequence) -> Optional[List[Tuple[int, ...]]]:
+    """各时间段下标与哪些时间段下标在时间上重叠（含自身）
+
+    时间段互不重叠（或缺少起止时间）时返回 None，求解器按单元格互相独立处理。
+    """
+    if not all(getattr(ts, 'start_time', None) is not None and getattr(ts, 'end_time', None) is not None
+               for ts in time_slots):
+        return None
+    index = build_interval_index(tuple((t, ts.start_time, ts.end_time) for t, ts in enumerate(time_slots)))
+    if not index.has_overlaps:
+        return None
+    return [tuple(sorted(index.overlapping(t))) for t in range(len(time_slots))]
+
+
+class SolverModel:
+    """排课求解模型（结构数组）
+
+    资源与约束在这里被编码为：
+      - 时间段下标 t ∈ [0, T)，教室下标 r ∈ [0, R)，教师下标 p ∈ [0, P)
+      - 约束下标 c ∈ [0, C)，偏好以布尔矩阵 room_pref[C, R] / time_pref[C, T] / day_pref[C, D] 表示
+      - 单元格 cell = day_index * T + t，与 SlotAvailabilityIndex 一致
+      - 时间段混排（如 45 分钟小节与 2 小时大节）时，time_slot_overlaps[t] 为与 t 重叠的时间段下标
+
+    ``time_slots`` / ``classrooms`` / ``constraints`` 仅用于把整数结果映射回模型对象。
+    """
+
+    def __init__(self, constraints: Sequence, time_slots: Sequence, classrooms: Sequence,
+                 days: Iterable[int] = range(1, 6)):
+        self.constraints = list(constraints)
+        self.time_slots = list(time_slots)
+        self.classrooms = list(classrooms)
+        self.days = np.asarray(list(days), dtype=np.int64)
+
+        # 时间段
+        self.time_slot_ids = np.array([ts.id for ts in self.time_slots], dtype=np.int64)
+        self.time_slot_orders = np.array([ts.order for ts in self.time_slots], dtype=np.int64)
+        self.time_slot_noon = np.array([is_noon_time(ts) for ts in self.time_slots], dtype=bool)
+        self.time_slot_overlaps = time_slot_overlaps(self.time_slots)
+
+        # 教室
+        self.classroom_ids = np.array([c.id for c in self.classrooms], dtype=np.int64)
+        self.classroom_capacity = np.array([c.capacity for c in self.classrooms], dtype=float)
+
+        # 教师（只收录约束涉及的教师）
+        teacher_ids = sorted({c.teacher.id for c in self.constraints})
+        self.teacher_ids = np.array(teacher_ids, dtype=np.int64)
+
+        self._build_lookups()
+        self._compile_constraints()
+
+    def __getstate__(self):
+        """序列化时去掉 ORM 对象，得到可跨进程传递的纯数组快照"""
+        state = self.__dict__.copy()
+        for key in ('constraints', 'time_slots', 'classrooms', '_constraint_pos'):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.constraints, self.time_slots, self.classrooms = [], [], []
+        self._constraint_pos = {}
+
+    @property
+    def num_days(self) -> int:
+        return len(self.days)
+
+    @property
+    def num_time_slots(self) -> int:
+        return len(self.time_slot_ids)
+
+    @property
+    def num_classrooms(self) -> int:
+        return len(self.classroom_ids)
+
+    @property
+    def num_cells(self) -> int:
+        return self.num_days * self.num_time_slots
+
+    def _build_lookups(self):
+        self.day_pos: Dict[int, int] = {int(d): i for i, d in enumerate(self.days)}
+        self.time_slot_pos: Dict[int, int] = {int(ts_id): i for i, ts_id in enumerate(self.time_slot_ids)}
+        self.classroom_pos: Dict[int, int] = {int(c_id): i for i, c_id in enumerate(self.classroom_ids)}
+        self.teacher_pos: Dict[int, int] = {int(t_id): i for i, t_id in enumerate(self.teacher_ids)}
+        # 按对象身份定位约束，避免经由 __hash__/__eq__ 访问模型属性
+        self._constraint_pos: Dict[int, int] = {id(c): i for i, c in enumerate(self.constraints)}
+
+    def _compile_constraints(self):
+        """将约束编译为结构数组"""
+        count = len(self.constraints)
+        self.course_ids = np.zeros(count, dtype=np.int64)
+        self.constraint_teacher = np.zeros(count, dtype=np.int64)
+        self.sessions = np.zeros(count, dtype=np.int64)
+        self.priority = np.zeros(count, dtype=np.int64)
+        self.max_students = np.zeros(count, dtype=np.int64)
+        self.avoid_noon = np.zeros(count, dtype=bool)
+        self.avoid_consecutive = np.zeros(count, dtype=bool)
+        self.max_daily = np.zeros(count, dtype=np.int64)
+
+        self.room_pref = np.zeros((count, self.num_classrooms), dtype=bool)
+        self.time_pref = np.zeros((count, self.num_time_slots), dtype=bool)
+        self.day_pref = np.zeros((count, self.num_days), dtype=bool)
+        self.has_room_pref = np.zeros(count, dtype=bool)
+        self.has_time_pref = np.zeros(count, dtype=bool)
+        self.has_day_pref = np.zeros(count, dtype=bool)
+
+        # 固定时间槽: 第 c 个约束的固定槽位为 fixed_days/fixed_times[fixed_offsets[c]:fixed_offsets[c+1]]
+        fixed_days: List[int] = []
+        fixed_times: List[int] = []
+        self.fixed_offsets = np.zeros(count + 1, dtype=np.int64)
+
+        for i, constraint in enumerate(self.constraints):
+            self.course_ids[i] = constraint.course.id
+            self.constraint_teacher[i] = self.teacher_pos[constraint.teacher.id]
+            self.sessions[i] = constraint.sessions_per_week
+            self.priority[i] = constraint.priority
+            self.max_students[i] = getattr(constraint.course, 'max_students', 0) or 0
+            self.avoid_noon[i] = constraint.avoid_noon
+            self.avoid_consecutive[i] = constraint.avoid_consecutive
+            self.max_daily[i] = constraint.max_daily_sessions
+
+            if constraint.preferred_classrooms:
+                self.has_room_pref[i] = True
+                for classroom in constraint.preferred_classrooms:
+                    room = self.classroom_pos.get(classroom.id)
+                    if room is not None:
+                        self.room_pref[i, room] = True
+            if constraint.preferred_time_slots:
+                self.has_time_pref[i] = True
+                for time_slot in constraint.preferred_time_slots:
+                    time_index = self.time_slot_pos.get(time_slot.id)
+                    if time_index is not None:
+                        self.time_pref[i, time_index] = True
+            if constraint.preferred_days:
+                self.has_day_pref[i] = True
+                for day in constraint.preferred_days:
+                    day_index = self.day_pos.get(day)
+                    if day_index is not None:
+                        self.day_pref[i, day_index] = True
+
+            for day, time_slot in constraint.fixed_time_slots:
+                time_index = self.time_slot_pos.get(time_slot.id)
+                if day in self.day_pos and time_index is not None:
+                    fixed_days.append(day)
+                    fixed_times.append(time_index)
+            self.fixed_offsets[i + 1] = len(fixed_days)
+
+        self.fixed_days = np.array(fixed_days, dtype=np.int64)
+        self.fixed_times = np.array(fixed_times, dtype=np.int64)
+
+    # ---- 约束查询 ----
+
+    def index_of(self, constraint) -> Optional[int]:
+        """约束在模型中的下标，不属于本模型时返回 None"""
+        return self._constraint_pos.get(id(constraint))
+
+    def fixed_cells(self, ci: int) -> List[int]:
+        """约束的固定时间槽对应的单元格列表"""
+        start, end = self.fixed_offsets[ci], self.fixed_offsets[ci + 1]
+        return [self.day_pos[int(day)] * self.num_time_slots + int(t)
+                for day, t in zip(self.fixed_days[start:end], self.fixed_times[start:end])]
+
+    def allowed_rooms(self, ci: int, relax_rooms: bool = False) -> Optional[np.ndarray]:
+        """约束允许的教室下标，None 表示不限制"""
+        if relax_rooms or not self.has_room_pref[ci]:
+            return None
+        return np.flatnonzero(self.room_pref[ci])
+
+    def allowed_cells(self, ci: int, relax_times: bool = False) -> np.ndarray:
+        """约束允许的单元格布尔数组（长度 D*T），已排除需要回避的中午时间"""
+        time_ok = (self.time_pref[ci] if self.has_time_pref[ci] and not relax_times
+                   else np.ones(self.num_time_slots, dtype=bool))
+        if self.avoid_noon[ci]:
+            time_ok = time_ok & ~self.time_slot_noon
+        day_ok = self.day_pref[ci] if self.has_day_pref[ci] else np.ones(self.num_days, dtype=bool)
+        return np.outer(day_ok, time_ok).ravel()
+
+    # ---- 映射回模型对象 ----
+
+    def cell_day(self, cell: int) -> int:
+        return int(self.days[cell // self.num_time_slots])
+
+    def slot_position(self, slot) -> Tuple[Optional[int], Optional[int]]:
+        """将 ScheduleSlot 映射为 (教室下标, 单元格)，不在模型网格内的部分为 None"""
+        room = self.classroom_pos.get(slot.classroom.id)
+        day_index = self.day_pos.get(slot.day_of_week)
+        time_index = self.time_slot_pos.get(slot.time_slot.id)
+        if day_index is None or time_index is None:
+            return room, None
+        return room, day_index * self.num_time_slots + time_index
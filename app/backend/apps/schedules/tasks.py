@@ -0,0 +1,136 @@
+"""
+排课异步任务
+在 Celery worker 中执行自动排课，持久化任务状态与结果，并通过 channels 推送进度
+"""
+
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from channels.layers import get_channel_layer
+from django.utils import timezone
+
+from .algorithms import create_auto_schedule
+from .models import SchedulingJob
+from .services import AutoScheduleService
+
+logger = logging.getLogger(__name__)
+
+
+class JobProgressReporter:
+    """排课任务进度上报
+
+    作为算法的 progress_callback 使用：按时间间隔节流后写入任务记录，
+    并广播到该任务的 channels 组，前端订阅 ws/scheduling-jobs/<id>/ 即可跟踪进度。
+    """
+
+    def __init__(self, job: SchedulingJob, min_interval: float = 0.5):
+        self.job = job
+        self.min_interval = min_interval
+        self.channel_layer = get_channel_layer()
+        self._last_report = 0.0
+
+    def __call__(self, progress: dict):
+        now = time.monotonic()
+        if now - self._last_report < self.min_interval:
+            return
+        self._last_report = now
+
+        self.job.progress = progress
+        SchedulingJob.objects.filter(pk=self.job.pk).update(progress=progress)
+        self.publish()
+
+    def publish(self):
+        """广播任务当前状态"""
+        if self.channel_layer is None:
+            return
+        try:
+            async_to_sync(self.channel_layer.group_send)(
+                self.job.group_name,
+                {
+                    'type': 'job_update',
+                    'job': self.job.to_dict()
+                }
+            )
+        except Exception as e:
+            # 推送失败不影响排课本身
+            logger.warning(f"排课任务 {self.job.pk} 进度推送失败: {e}")
+
+
+@shared_task(bind=True)
+def run_scheduling_job(self, job_id):
+    """执行排课任务并保存结果"""
+    job = SchedulingJob.objects.get(pk=job_id)
+    job.status = 'running'
+    job.started_at = timezone.now()
+    job.celery_task_id = self.request.id or ''
+    job.save(update_fields=['status', 'started_at', 'celery_task_id'])
+
+    reporter = JobProgressReporter(job)
+    reporter.publish()
+
+    parameters = job.parameters or {}
+    course_ids = parameters.get('course_ids')
+    incremental = parameters.get('incremental', False)
+
+    force_recreate = parameters.get('force_recreate', False)
+    save_results = parameters.get('save_results', True)
+
+    try:
+        # 只有保存结果时才替换现有排课：被替换的排课与新结果在同一次写入中删除，
+        # 只计算方案的任务不修改任何排课记录
+        result = create_auto_schedule(
+            job.semester, job.academic_year, course_ids, job.algorithm_type,
+            parameters.get('timeout_seconds', 300),
+            incremental=incremental,
+            replace_existing=force_recreate and save_results,
+            week_range=parameters.get('week_range'),
+            progress_callback=reporter,
+            algorithm_options=parameters.get('algorithm_options')
+        )
+        created_schedules, stale_count = [], 0
+        if save_results:
+            created_schedules, stale_count = AutoScheduleService.save_result(
+                result, swap=parameters.get('atomic_swap', False)
+            )
+
+        job.result = {
+            'algorithm_type': result.get('algorithm_type', job.algorithm_type),
+            'total_constraints': result['total_constraints'],
+            'successful_assignments': result['successful_assignments'],
+            'failed_assignments': len(result['failed_assignments']),
+            'success_rate': result['success_rate'],
+            'execution_time': result.get('execution_time', 0),
+            'created_schedules_count': len(created_schedules),
+            'deleted_schedules_count': stale_count,
+            'failed_assignments_detail': AutoScheduleService.summarize_failures(result['failed_assignments']),
+        }
+        if not save_results:
+            # 只计算方案时保存分配结果，apply-results 接口传入 job_id 即可写入
+            job.result['assignments'] = [
+                {
+                    'course_id': schedule.course_id,
+                    'teacher_id': schedule.teacher_id,
+                    'classroom_id': schedule.classroom_id,
+                    'time_slot_id': schedule.time_slot_id,
+                    'day_of_week': schedule.day_of_week,
+                    'week_range': schedule.week_range,
+                }
+                for schedule in result['algorithm_instance'].create_schedules()
+            ]
+        job.progress = {
+            'stage': 'completed',
+            'assigned': result['successful_assignments'],
+            'total': result['total_constraints']
+        }
+        job.status = 'completed'
+    except Exception as e:
+        logger.exception(f"排课任务 {job.pk} 执行失败: {e}")
+        job.status = 'failed'
+        job.error_message = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'result', 'error_message', 'finished_at'])
+    reporter.publish()
+    return job.status
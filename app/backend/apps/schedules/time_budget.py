@@ -0,0 +1,57 @@
+"""
+排课求解时间预算模块
+多个求解阶段共享同一个墙钟截止时间，各阶段从剩余时间中按需划出子预算
+"""
+
+import math
+import time
+from typing import Optional
+
+
+class TimeBudget:
+    """墙钟时间预算
+
+    ``deadline`` 为 time.monotonic() 意义下的截止时间，None 表示不限时。
+    stage() 划出的子预算截止时间不会晚于父预算，因此把子预算传给下一阶段
+    即可保证整体在请求的时间内返回。
+    """
+
+    def __init__(self, seconds: Optional[float] = None, deadline: Optional[float] = None):
+        self.started_at = time.monotonic()
+        if deadline is None and seconds is not None:
+            deadline = self.started_at + max(0.0, float(seconds))
+        self.deadline = deadline
+
+    @classmethod
+    def of(cls, timeout_seconds: Optional[float] = None,
+           budget: Optional['TimeBudget'] = None) -> 'TimeBudget':
+        """优先使用调用方传入的预算，否则按超时秒数新建"""
+        return budget if budget is not None else cls(timeout_seconds)
+
+    @property
+    def limited(self) -> bool:
+        return self.deadline is not None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def remaining(self) -> float:
+        """剩余秒数，不限时返回 inf"""
+        if self.deadline is None:
+            return math.inf
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def stage(self, fraction: float = 1.0, reserve: float = 0.0) -> 'TimeBudget':
+        """为一个阶段划出子预算
+
+        Args:
+            fraction: 可用时间中分配给该阶段的比例
+            reserve: 预留给后续阶段、不参与分配的秒数
+        """
+        if self.deadline is None:
+            return TimeBudget()
+        available = max(0.0, self.remaining() - reserve)
+        return TimeBudget(deadline=min(self.deadline, time.monotonic() + available * fraction))
@@ -0,0 +1,87 @@
+"""
+时间段区间索引模块
+按起止时间对时间段做一次扫描，求出每个时间段与哪些时间段在时间上重叠。
+45 分钟小节与 2 小时大节混排时，一个大节会覆盖多个小节，
+冲突检查因此展开为"重叠时间段集合"上的查找，而不是逐对比较起止时间。
+"""
+
+import heapq
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Tuple
+
+Interval = Tuple[int, Any, Any]  # (时间段ID, 开始时间, 结束时间)
+
+
+class TimeSlotIntervalIndex:
+    """时间段区间索引
+
+    按开始时间排序后扫描，用以结束时间为键的小顶堆维护"仍在进行"的时间段，
+    新时间段与堆中剩余的时间段两两重叠，复杂度 O(n log n + 重叠对数)。
+    起止时间只需可比较（datetime.time 或分钟数均可），首尾相接不算重叠。
+
+    Args:
+        intervals: [(时间段ID, 开始时间, 结束时间), ...]
+    """
+
+    def __init__(self, intervals: Iterable[Interval]):
+        self.intervals: Tuple[Interval, ...] = tuple(sorted(intervals, key=lambda x: (x[1], x[2], x[0])))
+        self.position: Dict[int, int] = {slot_id: i for i, (slot_id, _s, _e) in enumerate(self.intervals)}
+
+        overlaps: Dict[int, set] = {slot_id: {slot_id} for slot_id, _s, _e in self.intervals}
+        active: List[Tuple[Any, int]] = []  # (结束时间, 时间段ID)
+        for slot_id, start, end in self.intervals:
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for _end, other in active:
+                overlaps[slot_id].add(other)
+                overlaps[other].add(slot_id)
+            heapq.heappush(active, (end, slot_id))
+
+        self._overlaps: Dict[int, FrozenSet[int]] = {
+            slot_id: frozenset(ids) for slot_id, ids in overlaps.items()
+        }
+        self.has_overlaps = any(len(ids) > 1 for ids in self._overlaps.values())
+        self._groups = self._connected_groups()
+
+    def _connected_groups(self) -> Dict[int, int]:
+        """重叠关系的连通分量：时间段ID -> 分量内开始最早的时间段ID"""
+        groups: Dict[int, int] = {}
+        for slot_id, _s, _e in self.intervals:
+            if slot_id in groups:
+                continue
+            stack = [slot_id]
+            groups[slot_id] = slot_id
+            while stack:
+                for other in self._overlaps[stack.pop()]:
+                    if other not in groups:
+                        groups[other] = slot_id
+                        stack.append(other)
+        return groups
+
+    def overlapping(self, slot_id: int) -> FrozenSet[int]:
+        """与给定时间段重叠的时间段ID（含自身）；未知的时间段只与自身重叠"""
+        return self._overlaps.get(slot_id, frozenset((slot_id,)))
+
+    def overlaps(self, slot_a: int, slot_b: int) -> bool:
+        """两个时间段是否在时间上重叠（同一时间段视为重叠）"""
+        return slot_a == slot_b or slot_b in self._overlaps.get(slot_a, ())
+
+    def group(self, slot_id: int) -> int:
+        """时间段所在重叠分量的代表ID，互不重叠的时间段各自成组"""
+        return self._groups.get(slot_id, slot_id)
+
+    def overlap_pairs(self) -> List[Tuple[int, int]]:
+        """全部重叠的时间段对 (先开始的ID, 后开始的ID)，按开始时间顺序排列"""
+        position = self.position
+        pairs = []
+        for slot_id, _s, _e in self.intervals:
+            later = sorted((other for other in self._overlaps[slot_id] if position[other] > position[slot_id]),
+                           key=position.__getitem__)
+            pairs.extend((slot_id, other) for other in later)
+        return pairs
+
+
+@lru_cache(maxsize=8)
+def build_interval_index(intervals: Tuple[Interval, ...]) -> TimeSlotIntervalIndex:
+    """按时间段网格缓存区间索引，同一组时间段只构建一次"""
+    return TimeSlotIntervalIndex(intervals)
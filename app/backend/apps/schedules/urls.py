@@ -15,6 +15,7 @@ urlpatterns = [
     
     # 排课功能
     path('check-conflicts/', views.check_schedule_conflicts, name='check_conflicts'),
+    path('check-conflicts/batch/', views.batch_check_schedule_conflicts, name='batch_check_conflicts'),
     path('batch-create/', views.batch_create_schedules, name='batch_create'),
     
     # 课程表查询
@@ -25,6 +26,7 @@ urlpatterns = [
 
     # 智能排课
     path('auto-schedule/', views.auto_schedule, name='auto_schedule'),
+    path('jobs/<int:pk>/', views.get_scheduling_job, name='scheduling_job_detail'),
     path('optimize/', views.optimize_schedule, name='optimize_schedule'),
 
     # 导入导出
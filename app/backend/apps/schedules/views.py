@@ -7,21 +7,27 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db import transaction
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.http import HttpResponse
+from django.utils.http import parse_etags
+import hashlib
+import json
 
-from .models import TimeSlot, Schedule
+from .models import TimeSlot, Schedule, SchedulingJob, weeks_to_mask
 from .serializers import (
     TimeSlotSerializer, ScheduleSerializer, ScheduleListSerializer,
     ScheduleCreateSerializer, ScheduleConflictSerializer,
-    ScheduleBatchCreateSerializer
+    ScheduleBatchCreateSerializer, ScheduleBatchConflictCheckSerializer
 )
 from .algorithms import create_auto_schedule, SchedulingAlgorithm
-from .services import ScheduleImportExportService
+from .services import ScheduleImportExportService, AutoScheduleService, ScheduleConflictDetector, schedule_write_lock
+from .tasks import run_scheduling_job
 from apps.users.permissions import CanManageSchedules, CanViewSchedules
 from apps.courses.models import Course
 from apps.classrooms.models import Classroom
+from utils.cache import get_schedule_table_key, get_schedule_table_cache, set_schedule_table_cache
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
@@ -232,9 +238,8 @@ class ScheduleListCreateView(generics.ListCreateAPIView):
         if weeks_param:
             try:
                 weeks_list = Schedule.parse_week_range(weeks_param)
-                weeks_set = set(int(w) for w in weeks_list)
-                if weeks_set:
-                    queryset = [s for s in queryset if any(w in s.week_numbers for w in weeks_set)]
+                if weeks_list:
+                    queryset = queryset.overlapping_weeks(weeks_to_mask(weeks_list))
             except Exception as e:
                 logger.error(f"Failed to parse weeks parameter: {e}")
                 return Response({
@@ -245,7 +250,7 @@ class ScheduleListCreateView(generics.ListCreateAPIView):
         elif week_param:
             try:
                 week_number = int(week_param)
-                queryset = [s for s in queryset if s.is_active_in_week(week_number)]
+                queryset = queryset.in_week(week_number)
             except Exception as e:
                 logger.error(f"Failed to parse week parameter: {e}")
                 return Response({
@@ -269,8 +274,10 @@ class ScheduleListCreateView(generics.ListCreateAPIView):
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        # 冲突检查与写入在同一把学期锁内完成，并发创建不会重复占用
+        with schedule_write_lock(request.data.get('semester', '')):
+            serializer.is_valid(raise_exception=True)
+            self.perform_create(serializer)
 
         # 返回完整的排课信息
         schedule_serializer = ScheduleSerializer(serializer.instance)
@@ -324,8 +331,9 @@ class ScheduleDetailView(generics.RetrieveUpdateDestroyAPIView):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
-        serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
+        with schedule_write_lock(instance.semester, request.data.get('semester', instance.semester)):
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
 
         return Response({
             'code': 200,
@@ -343,6 +351,16 @@ class ScheduleDetailView(generics.RetrieveUpdateDestroyAPIView):
         })
 
 
+def _conflict_message(conflict):
+    """冲突说明文字"""
+    resource = '教室' if conflict['conflict_type'] == 'classroom' else '教师'
+    if conflict['schedule'] is None:
+        return f"{resource}与本批次第{conflict['batch_index'] + 1}条安排时间冲突"
+    if conflict['conflict_type'] == 'classroom':
+        return f"教室在该时间段已被课程 {conflict['schedule'].course.code} 占用"
+    return f"教师在该时间段已有课程 {conflict['schedule'].course.code}"
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated, CanManageSchedules])
 def check_schedule_conflicts(request):
@@ -354,6 +372,7 @@ def check_schedule_conflicts(request):
     time_slot_id = request.data.get('time_slot_id')
     semester = request.data.get('semester')
     exclude_schedule_id = request.data.get('exclude_schedule_id')  # 更新时排除当前排课
+    week_range = request.data.get('week_range')  # 可选，只检查周次重叠的排课
 
     if not all([course_id, teacher_id, classroom_id, day_of_week, time_slot_id, semester]):
         return Response({
@@ -362,36 +381,34 @@ def check_schedule_conflicts(request):
             'data': None
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    conflicts = []
-
-    # 查询同一时间段的排课
-    existing_schedules = Schedule.objects.filter(
-        day_of_week=day_of_week,
-        time_slot_id=time_slot_id,
-        semester=semester,
-        status='active'
-    ).select_related('course', 'teacher', 'classroom')
-
-    if exclude_schedule_id:
-        existing_schedules = existing_schedules.exclude(id=exclude_schedule_id)
-
-    # 检查教室冲突
-    classroom_conflict = existing_schedules.filter(classroom_id=classroom_id).first()
-    if classroom_conflict:
-        conflicts.append({
-            'conflict_type': 'classroom',
-            'conflicting_schedule': ScheduleListSerializer(classroom_conflict).data,
-            'message': f'教室在该时间段已被课程 {classroom_conflict.course.code} 占用'
-        })
+    placement = {
+        'teacher_id': teacher_id,
+        'classroom_id': classroom_id,
+        'day_of_week': day_of_week,
+        'time_slot_id': time_slot_id,
+        'week_range': week_range,
+    }
+    try:
+        found = ScheduleConflictDetector.check_placements(
+            [placement], semester, [exclude_schedule_id] if exclude_schedule_id else None
+        )[0]
+    except (TypeError, ValueError):
+        return Response({
+            'code': 400,
+            'message': '参数格式错误',
+            'data': None
+        }, status=status.HTTP_400_BAD_REQUEST)
 
-    # 检查教师冲突
-    teacher_conflict = existing_schedules.filter(teacher_id=teacher_id).first()
-    if teacher_conflict:
-        conflicts.append({
-            'conflict_type': 'teacher',
-            'conflicting_schedule': ScheduleListSerializer(teacher_conflict).data,
-            'message': f'教师在该时间段已有课程 {teacher_conflict.course.code}'
-        })
+    # 教室、教师各报告一条冲突
+    conflicts = []
+    for conflict_type in ('classroom', 'teacher'):
+        conflict = next((c for c in found if c['conflict_type'] == conflict_type), None)
+        if conflict:
+            conflicts.append({
+                'conflict_type': conflict_type,
+                'conflicting_schedule': ScheduleListSerializer(conflict['schedule']).data,
+                'message': _conflict_message(conflict)
+            })
 
     serializer = ScheduleConflictSerializer(conflicts, many=True)
     return Response({
@@ -404,10 +421,62 @@ def check_schedule_conflicts(request):
     })
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, CanManageSchedules])
+def batch_check_schedule_conflicts(request):
+    """批量检查排课冲突
+
+    一次请求检查多条拟定排课（如课表编辑器一次拖拽调整的全部结果），
+    既与已有排课比对，也检查本批次内部的冲突；查询次数与拟定排课数量无关。
+    """
+    serializer = ScheduleBatchConflictCheckSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    validated_data = serializer.validated_data
+    placements = validated_data['placements']
+    # 本批次中正在调整位置的排课，其原位置不再参与冲突检查
+    exclude_ids = set(validated_data['exclude_schedule_ids'])
+    exclude_ids.update(p['exclude_schedule_id'] for p in placements if p.get('exclude_schedule_id'))
+
+    results = ScheduleConflictDetector.check_placements(placements, validated_data['semester'], exclude_ids)
+
+    items = []
+    for index, found in enumerate(results):
+        items.append({
+            'index': index,
+            'has_conflicts': bool(found),
+            'conflicts': [
+                {
+                    'conflict_type': conflict['conflict_type'],
+                    'conflicting_schedule': (
+                        ScheduleListSerializer(conflict['schedule']).data if conflict['schedule'] else None
+                    ),
+                    'batch_index': conflict['batch_index'],
+                    'message': _conflict_message(conflict),
+                }
+                for conflict in found
+            ]
+        })
+    conflict_count = sum(1 for item in items if item['has_conflicts'])
+
+    return Response({
+        'code': 200,
+        'message': f'批量冲突检查完成，{conflict_count}条安排存在冲突',
+        'data': {
+            'has_conflicts': conflict_count > 0,
+            'conflict_count': conflict_count,
+            'results': items
+        }
+    })
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated, CanManageSchedules])
 def batch_create_schedules(request):
-    """批量创建课程安排"""
+    """批量创建课程安排
+
+    全部时间槽一次完成冲突检查（含本批次内部冲突），无冲突的安排批量插入。
+    """
     serializer = ScheduleBatchCreateSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
 
@@ -419,55 +488,61 @@ def batch_create_schedules(request):
     academic_year = validated_data['academic_year']
     week_range = validated_data['week_range']
     time_slots = validated_data['time_slots']
+    time_slot_objects = validated_data['time_slot_objects']
 
-    created_schedules = []
-    conflicts = []
-
-    with transaction.atomic():
-        for slot_data in time_slots:
-            day_of_week = slot_data['day_of_week']
-            time_slot_id = slot_data['time_slot_id']
+    results = ScheduleConflictDetector.check_placements([
+        {
+            'teacher_id': teacher.id,
+            'classroom_id': classroom.id,
+            'day_of_week': slot_data['day_of_week'],
+            'time_slot_id': slot_data['time_slot_id'],
+            'week_range': week_range,
+        }
+        for slot_data in time_slots
+    ], semester)
 
-            # 检查冲突
-            existing_schedules = Schedule.objects.filter(
-                day_of_week=day_of_week,
-                time_slot_id=time_slot_id,
-                semester=semester,
-                status='active'
-            )
+    new_schedules = []
+    conflicts = []
+    accepted = set()
+    for index, (slot_data, found) in enumerate(zip(time_slots, results)):
+        day_of_week = slot_data['day_of_week']
+        time_slot_id = slot_data['time_slot_id']
+
+        # 与已有排课冲突，或与本批次中排在前面且已接受的安排冲突（教室冲突优先报告）
+        found = [c for c in found if c['batch_index'] is None or c['batch_index'] in accepted]
+        if found:
+            conflict_type = 'classroom' if any(c['conflict_type'] == 'classroom' for c in found) else 'teacher'
+            conflicts.append({
+                'day_of_week': day_of_week,
+                'time_slot_id': time_slot_id,
+                'conflict_type': conflict_type,
+                'message': '教室已被占用' if conflict_type == 'classroom' else '教师已有课程安排'
+            })
+            continue
+
+        accepted.add(index)
+        new_schedules.append(Schedule(
+            course=course,
+            teacher=teacher,
+            classroom=classroom,
+            time_slot=time_slot_objects[time_slot_id],
+            day_of_week=day_of_week,
+            week_range=week_range,
+            semester=semester,
+            academic_year=academic_year
+        ))
 
-            # 检查教室冲突
-            if existing_schedules.filter(classroom=classroom).exists():
-                conflicts.append({
-                    'day_of_week': day_of_week,
-                    'time_slot_id': time_slot_id,
-                    'conflict_type': 'classroom',
-                    'message': '教室已被占用'
-                })
-                continue
-
-            # 检查教师冲突
-            if existing_schedules.filter(teacher=teacher).exists():
-                conflicts.append({
-                    'day_of_week': day_of_week,
-                    'time_slot_id': time_slot_id,
-                    'conflict_type': 'teacher',
-                    'message': '教师已有课程安排'
-                })
-                continue
-
-            # 创建排课
-            schedule = Schedule.objects.create(
-                course=course,
-                teacher=teacher,
-                classroom=classroom,
-                time_slot_id=time_slot_id,
-                day_of_week=day_of_week,
-                week_range=week_range,
-                semester=semester,
-                academic_year=academic_year
-            )
-            created_schedules.append(schedule)
+    created_schedules = []
+    if new_schedules:
+        try:
+            created_schedules = AutoScheduleService.bulk_save_schedules(new_schedules)
+        except ValidationError as e:
+            # 检查与写入之间排课数据发生了变化
+            return Response({
+                'code': 409,
+                'message': '排课数据已变化，请重新检查冲突',
+                'data': {'errors': e.messages}
+            }, status=status.HTTP_409_CONFLICT)
 
     # 序列化结果
     created_data = ScheduleListSerializer(created_schedules, many=True).data
@@ -484,10 +559,60 @@ def batch_create_schedules(request):
     }, status=status.HTTP_201_CREATED if created_schedules else status.HTTP_400_BAD_REQUEST)
 
 
+def _schedule_table_subject(request, user_type, user_id, classroom_id):
+    """课程表对象（缓存键的一部分），与 get_schedule_table 的筛选分支一一对应
+
+    参数本身不合法时返回 None，交由正常流程返回 400。
+    """
+    if user_type and user_type not in ['student', 'teacher']:
+        return None
+    try:
+        if user_type and user_id:
+            return f"{user_type}:{int(user_id)}"
+        if classroom_id:
+            return f"classroom:{int(classroom_id)}"
+    except (ValueError, TypeError):
+        return None
+    if request.user.user_type in ['student', 'teacher']:
+        return f"{request.user.user_type}:{request.user.id}"
+    return 'all'
+
+
+def _etag_matches(request, etag):
+    """If-None-Match 中是否包含给定 ETag（按弱比较，忽略 W/ 前缀）"""
+    client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return etag in {tag.removeprefix('W/') for tag in client_etags}
+
+
+def _schedule_table_etag(data):
+    """按课程表内容生成 ETag：版本号之外的变化（如课程改名）重建后也会得到新的 ETag"""
+    payload = json.dumps(data, cls=DjangoJSONEncoder)
+    return f'"{hashlib.md5(payload.encode()).hexdigest()}"'
+
+
+def _schedule_table_response(request, data, etag):
+    """返回课程表；If-None-Match 与当前 ETag 一致时返回 304"""
+    headers = {'Cache-Control': 'private, no-cache'}
+    if etag:
+        headers['ETag'] = etag
+        if _etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response({
+        'code': 200,
+        'message': '获取课程表成功',
+        'data': data
+    }, headers=headers)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, CanViewSchedules])
 def get_schedule_table(request):
-    """获取课程表"""
+    """获取课程表
+
+    结果按(学期, 对象, 周次筛选)缓存，缓存键带排课、选课与时间段的版本号，
+    相关数据写入后自动失效。ETag 由课程表内容生成并与之一同缓存，
+    缓存命中（含 304 协商）不查询数据库；缓存过期或被逐出后重建，按新内容重新比较 ETag。
+    """
     semester = request.GET.get('semester')
     user_type = request.GET.get('user_type')  # 'student', 'teacher', 'classroom'
     user_id = request.GET.get('user_id')
@@ -505,6 +630,37 @@ def get_schedule_table(request):
     # 规范化学期编码
     semester = normalize_semester(semester)
 
+    # 按周次过滤（可选）：优先使用 weeks，其次使用 week；无法解析时不过滤
+    week_mask = week_number = None
+    if weeks_param:
+        try:
+            weeks_list = Schedule.parse_week_range(weeks_param)
+        except Exception:
+            weeks_list = []
+        if weeks_list:
+            week_mask = weeks_to_mask(weeks_list)
+    elif week_param:
+        try:
+            week_number = int(week_param)
+        except (ValueError, TypeError):
+            pass
+    if week_mask is not None:
+        week_filter = f"weeks:{week_mask:x}"
+    elif week_number is not None:
+        week_filter = f"week:{week_number}"
+    else:
+        week_filter = 'all'
+
+    # 缓存命中时直接返回，不做下面的数据库校验
+    cache_key = None
+    subject = _schedule_table_subject(request, user_type, user_id, classroom_id)
+    if subject is not None:
+        cache_key = get_schedule_table_key(semester, subject, week_filter)
+    if cache_key is not None:
+        cached = get_schedule_table_cache(cache_key)
+        if cached is not None:
+            return _schedule_table_response(request, cached['data'], cached['etag'])
+
     # 参数校验：当传入筛选参数时，避免由于类型/ID不匹配导致静默空结果
     if user_type:
         if user_type not in ['student', 'teacher']:
@@ -595,21 +751,10 @@ def get_schedule_table(request):
         # 当前教师的课程表
         schedules = schedules.filter(teacher=request.user)
 
-    # 按周次过滤（可选）：优先使用 weeks，其次使用 week
-    if weeks_param:
-        try:
-            weeks_list = Schedule.parse_week_range(weeks_param)
-            weeks_set = set(int(w) for w in weeks_list)
-        except Exception:
-            weeks_set = set()
-        if weeks_set:
-            schedules = [s for s in schedules if any(w in s.week_numbers for w in weeks_set)]
-    elif week_param:
-        try:
-            week_number = int(week_param)
-            schedules = [s for s in schedules if s.is_active_in_week(week_number)]
-        except (ValueError, TypeError):
-            pass
+    if week_mask is not None:
+        schedules = schedules.overlapping_weeks(week_mask)
+    elif week_number is not None:
+        schedules = schedules.in_week(week_number)
 
     # 构建课程表数据结构
     time_slots = TimeSlot.objects.filter(is_active=True).order_by('order')
@@ -648,15 +793,16 @@ def get_schedule_table(request):
         for ts in time_slots
     ]
 
-    return Response({
-        'code': 200,
-        'message': '获取课程表成功',
-        'data': {
-            'semester': semester,
-            'time_slots': time_slot_info,
-            'schedule_table': schedule_table
-        }
-    })
+    data = {
+        'semester': semester,
+        'time_slots': time_slot_info,
+        'schedule_table': schedule_table
+    }
+    etag = _schedule_table_etag(data)
+    if cache_key is not None:
+        set_schedule_table_cache(cache_key, {'data': data, 'etag': etag})
+
+    return _schedule_table_response(request, data, etag)
 
 
 @api_view(['GET'])
@@ -738,7 +884,12 @@ def auto_schedule(request):
     course_ids = request.data.get('course_ids')  # 可选，指定要排课的课程
     algorithm_type = request.data.get('algorithm_type', 'greedy')  # 算法类型
     force_recreate = request.data.get('force_recreate', False)  # 是否强制重新排课
+    incremental = request.data.get('incremental', False)  # 增量排课，只重排变化的课程
     timeout_seconds = request.data.get('timeout_seconds', 300)  # 超时时间
+    algorithm_options = request.data.get('algorithm_options') or {}  # 算法参数，如 num_starts、max_workers
+    run_async = request.data.get('async', False)  # 是否提交为后台任务
+    atomic_swap = request.data.get('atomic_swap', False)  # 新排课先待生效写入，再一次性替换旧排课
+    schedule_week_range = request.data.get('week_range')  # 新排课的周次范围，默认为整个学期
 
     if not semester or not academic_year:
         return Response({
@@ -748,50 +899,44 @@ def auto_schedule(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        # 如果强制重新排课，先删除现有排课
-        if force_recreate:
-            existing_schedules = Schedule.objects.filter(
+        # 提交为后台排课任务，立即返回任务信息
+        if run_async:
+            job = SchedulingJob.objects.create(
                 semester=semester,
                 academic_year=academic_year,
-                status='active'
+                algorithm_type=algorithm_type,
+                parameters={
+                    'course_ids': course_ids,
+                    'timeout_seconds': timeout_seconds,
+                    'force_recreate': force_recreate,
+                    'incremental': incremental,
+                    'algorithm_options': algorithm_options,
+                    'atomic_swap': atomic_swap,
+                    'week_range': schedule_week_range,
+                },
+                created_by=request.user
             )
-            if course_ids:
-                existing_schedules = existing_schedules.filter(course_id__in=course_ids)
-
-            deleted_count = existing_schedules.count()
-            existing_schedules.delete()
-
-        # 执行自动排课算法
-        result = create_auto_schedule(semester, academic_year, course_ids, algorithm_type, timeout_seconds)
+            run_scheduling_job.delay(job.id)
+            job.refresh_from_db()
+            return Response({
+                'code': 202,
+                'message': '排课任务已提交',
+                'data': job.to_dict()
+            }, status=status.HTTP_202_ACCEPTED)
 
-        # 创建Schedule对象
-        algorithm_instance = result.pop('algorithm_instance')
-        schedules_to_create = algorithm_instance.create_schedules()
+        # 执行自动排课算法；强制重新排课时现有排课在保存新结果的同时删除（增量模式由算法决定需要替换的记录）
+        result = create_auto_schedule(semester, academic_year, course_ids, algorithm_type, timeout_seconds,
+                                      incremental=incremental, replace_existing=force_recreate,
+                                      week_range=schedule_week_range, algorithm_options=algorithm_options)
 
-        # 批量创建排课记录
-        created_schedules = []
-        with transaction.atomic():
-            for schedule in schedules_to_create:
-                schedule.save()
-                created_schedules.append(schedule)
+        # 创建Schedule对象并批量保存
+        created_schedules, stale_count = AutoScheduleService.save_result(result, swap=atomic_swap)
 
         # 序列化创建的排课记录
         created_data = ScheduleListSerializer(created_schedules, many=True).data
 
         # 处理失败分配的详情，移除不可序列化的对象
-        failed_assignments_detail = []
-        for failed in result['failed_assignments']:
-            constraint = failed['constraint']
-            failed_assignments_detail.append({
-                'course_id': constraint.course.id,
-                'course_name': constraint.course.name,
-                'course_code': constraint.course.code,
-                'teacher_id': constraint.teacher.id,
-                'teacher_name': constraint.teacher.get_full_name() or constraint.teacher.username,
-                'assigned_slots': failed['assigned_slots'],
-                'required_slots': failed['required_slots'],
-                'reason': failed['reason']
-            })
+        failed_assignments_detail = AutoScheduleService.summarize_failures(result['failed_assignments'])
 
         response_data = {
             'algorithm_type': result.get('algorithm_type', algorithm_type),
@@ -808,8 +953,15 @@ def auto_schedule(request):
             'resource_utilization': result.get('resource_utilization', {})
         }
 
-        if force_recreate:
-            response_data['deleted_schedules_count'] = deleted_count
+        if incremental:
+            response_data.update({
+                'incremental': True,
+                'kept_assignments': result.get('kept_assignments', 0),
+                'changed_constraints': result.get('changed_constraints', 0),
+                'deleted_schedules_count': stale_count
+            })
+        elif force_recreate:
+            response_data['deleted_schedules_count'] = stale_count
 
         return Response({
             'code': 200,
@@ -825,6 +977,26 @@ def auto_schedule(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, CanManageSchedules])
+def get_scheduling_job(request, pk):
+    """获取排课任务状态（只能查看自己创建的任务，系统管理员不限）"""
+    try:
+        job = SchedulingJob.objects.visible_to(request.user).get(pk=pk)
+    except SchedulingJob.DoesNotExist:
+        return Response({
+            'code': 404,
+            'message': '排课任务不存在',
+            'data': None
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        'code': 200,
+        'message': '获取排课任务成功',
+        'data': job.to_dict()
+    })
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated, CanManageSchedules])
 def optimize_schedule(request):
@@ -9,12 +9,20 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
+from django.utils import timezone
 import json
 import logging
 from typing import Dict, Any, List
 
 # 导入排课算法集成
 from .scheduling_algorithm_integration import SchedulingAlgorithmIntegration
+from .models import Schedule, SchedulingJob
+from .services import ScheduleConflictDetector
+from .tasks import run_scheduling_job
+from apps.courses.models import Course
+from apps.classrooms.models import Classroom
+from apps.users.permissions import CanManageSchedules
+from utils.cache import CacheManager, get_schedule_conflict_count_key
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +46,8 @@ def run_scheduling_algorithm(request):
             "max_daily_hours": 8,
             "preferred_time_slots": [1, 2, 3, 4]
         },
-        "timeout_seconds": 300       // 算法执行超时时间（秒）
+        "timeout_seconds": 300,      // 算法执行超时时间（秒）
+        "async": false               // 是否提交为后台任务（通过 status 接口或 WebSocket 跟踪进度）
     }
     """
     try:
@@ -53,6 +62,28 @@ def run_scheduling_algorithm(request):
         timeout_seconds = data.get('timeout_seconds', 300)
         
         logger.info(f"用户 {request.user.username} 请求运行{algorithm_type}排课算法")
+
+        # 提交为后台任务：只计算方案，不写入排课记录
+        if data.get('async', False):
+            job = SchedulingJob.objects.create(
+                semester=semester,
+                academic_year=academic_year,
+                algorithm_type=algorithm_type if algorithm_type in ('genetic', 'hybrid') else 'greedy',
+                parameters={
+                    'course_ids': course_ids or None,
+                    'timeout_seconds': timeout_seconds,
+                    'save_results': False,
+                },
+                created_by=request.user
+            )
+            run_scheduling_job.delay(job.id)
+            job.refresh_from_db()
+            return Response({
+                'success': True,
+                'message': '排课任务已提交',
+                'data': job.to_dict(),
+                'status': job.status
+            }, status=status.HTTP_202_ACCEPTED)
         
         # 创建排课算法集成实例
         integration = SchedulingAlgorithmIntegration()
@@ -120,7 +151,7 @@ def run_scheduling_algorithm(request):
 
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, CanManageSchedules])
 def apply_scheduling_results(request):
     """
     应用排课结果到系统
@@ -129,17 +160,40 @@ def apply_scheduling_results(request):
     
     请求体:
     {
-        "assignments": [...],  // 排课算法生成的分配结果
-        "semester": "2024春",
+        "job_id": 1,           // 只计算方案的排课任务ID，直接应用该任务保存的分配结果（可选，只能应用自己创建的任务）
+        "assignments": [...],  // 排课算法生成的分配结果（未提供 job_id 时必填）
+        "semester": "2024春",         // 未提供 job_id 时必填
+        "academic_year": "2023-2024", // 未提供 job_id 时必填
         "overwrite_existing": false  // 是否覆盖现有安排
     }
     """
     try:
         data = request.data
         assignments = data.get('assignments', [])
-        semester = data.get('semester', '2024春')
+        semester = data.get('semester')
+        academic_year = data.get('academic_year')
         overwrite_existing = data.get('overwrite_existing', False)
         
+        job_id = data.get('job_id')
+        if job_id:
+            job = SchedulingJob.objects.visible_to(request.user).filter(pk=job_id, status='completed').first()
+            if job is None:
+                return Response({
+                    'success': False,
+                    'message': '排课任务不存在或尚未完成',
+                    'data': None,
+                    'status': 'failed'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            assignments = (job.result or {}).get('assignments', [])
+            semester, academic_year = job.semester, job.academic_year
+        elif not semester or not academic_year:
+            return Response({
+                'success': False,
+                'message': '缺少学期或学年参数',
+                'data': None,
+                'status': 'failed'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         if not assignments:
             return Response({
                 'success': False,
@@ -157,7 +211,8 @@ def apply_scheduling_results(request):
         scheduling_result = {
             'assignments': assignments,
             'semester': semester,
-            'timestamp': str(timezone.now()) if 'timezone' in globals() else str(datetime.now())
+            'academic_year': academic_year,
+            'timestamp': str(timezone.now())
         }
         
         # 应用结果到系统
@@ -198,38 +253,75 @@ def apply_scheduling_results(request):
         return Response(error_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _conflict_count(semester):
+    """学期内教师与教室冲突数（时间段重叠且周次重叠，与冲突检测器一致）
+
+    按时间段网格与学期的版本号缓存，轮询状态时不重复做全量冲突检测，排课变化后自动重新计算。
+    """
+    cache_key = get_schedule_conflict_count_key(semester)
+    count = CacheManager.get_cache(cache_key) if cache_key else None
+    if count is None:
+        conflict_report = ScheduleConflictDetector.detect_all_conflicts(semester)
+        count = len(conflict_report['teacher_conflicts']) + len(conflict_report['classroom_conflicts'])
+        if cache_key:
+            CacheManager.set_cache(cache_key, count, CacheManager.SHORT_CACHE_TIME)
+    return count
+
+
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, CanManageSchedules])
 def get_scheduling_status(request):
     """
-    获取排课状态信息
+    获取排课状态信息（任务列表只包含自己创建的任务，系统管理员不限）
     
-    GET /api/scheduling/status/
+    GET /api/scheduling/status/?semester=2024春&academic_year=2023-2024&job_id=1
     """
     try:
-        # 获取当前学期信息（需要根据实际系统调整）
         current_semester = request.GET.get('semester', '2024春')
-        
-        # 这里可以添加实际的统计逻辑
-        # 例如：已安排课程数量、未安排课程数量、冲突数量等
-        
+        academic_year = request.GET.get('academic_year')
+        job_id = request.GET.get('job_id')
+
+        courses = Course.objects.filter(semester=current_semester, is_active=True)
+        schedules = Schedule.objects.filter(semester=current_semester, status='active')
+        jobs = SchedulingJob.objects.visible_to(request.user).filter(semester=current_semester)
+        if academic_year:
+            courses = courses.filter(academic_year=academic_year)
+            schedules = schedules.filter(academic_year=academic_year)
+            jobs = jobs.filter(academic_year=academic_year)
+
+        total_courses = courses.count()
+        scheduled_courses = courses.filter(
+            id__in=schedules.values('course_id')
+        ).count()
+
+        active_jobs = list(jobs.filter(status__in=['pending', 'running'])[:10])
+        latest_job = jobs.first()
+        last_completed_job = jobs.filter(status='completed').order_by('-finished_at').first()
+
         status_data = {
             'current_semester': current_semester,
-            'total_courses': 0,  # 需要从数据库获取
-            'scheduled_courses': 0,
-            'unscheduled_courses': 0,
-            'total_teachers': 0,
-            'total_classrooms': 0,
-            'conflicts_detected': 0,
-            'last_scheduling_time': None,
-            'system_ready': True
+            'total_courses': total_courses,
+            'scheduled_courses': scheduled_courses,
+            'unscheduled_courses': total_courses - scheduled_courses,
+            'total_teachers': courses.values('teachers').exclude(teachers=None).distinct().count(),
+            'total_classrooms': Classroom.objects.filter(is_active=True).count(),
+            'conflicts_detected': _conflict_count(current_semester),
+            'last_scheduling_time': (last_completed_job.finished_at.isoformat()
+                                     if last_completed_job and last_completed_job.finished_at else None),
+            'active_jobs': [job.to_dict() for job in active_jobs],
+            'latest_job': latest_job.to_dict() if latest_job else None,
+            'system_ready': not active_jobs
         }
+
+        if job_id:
+            job = SchedulingJob.objects.visible_to(request.user).filter(pk=job_id).first()
+            status_data['job'] = job.to_dict() if job else None
         
         return Response({
             'success': True,
             'message': '排课状态获取成功',
             'data': status_data,
-            'status': 'ready'
+            'status': 'running' if active_jobs else 'ready'
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
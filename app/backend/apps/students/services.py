@@ -194,7 +194,7 @@ class StudentService:
         if week:
             try:
                 week_num = int(week)
-                schedules = [s for s in schedules if s.is_active_in_week(week_num)]
+                schedules = schedules.in_week(week_num)
             except (ValueError, TypeError):
                 pass  # 忽略无效的周次参数
         
@@ -376,7 +376,7 @@ class StudentService:
         current_week = max(1, min(20, delta_days // 7 + 1))
         
         # 按周次过滤
-        schedules = [s for s in schedules if s.is_active_in_week(current_week)]
+        schedules = schedules.in_week(current_week)
 
         return [
             {
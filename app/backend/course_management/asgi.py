@@ -31,6 +31,12 @@ try:
 except ImportError:
     websocket_urlpatterns = []
 
+try:
+    from apps.schedules.routing import websocket_urlpatterns as schedule_websocket_urlpatterns
+    websocket_urlpatterns = websocket_urlpatterns + schedule_websocket_urlpatterns
+except ImportError:
+    pass
+
 # ASGI应用配置
 application = ProtocolTypeRouter({
     # HTTP协议使用Django的ASGI应用
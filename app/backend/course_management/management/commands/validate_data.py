@@ -1,33 +1,64 @@
 import os
 import json
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.db import connections
 from apps.courses.models import Course, Enrollment
 from apps.classrooms.models import Building, Classroom
 from apps.schedules.models import Schedule, TimeSlot
-from django.db.models import Count, Avg, Max, Min
+from apps.schedules.services import ScheduleConflictDetector
+from django.db.models import Avg, Count, Q
 
 User = get_user_model()
 
 class Command(BaseCommand):
     help = '验证数据库数据的合理性'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--parallel', action='store_true',
+                            help='各检查族在独立的数据库连接上并发执行')
+        parser.add_argument('--chunk-size', type=int, default=ComprehensiveDataValidator.STREAM_CHUNK_SIZE,
+                            help='流式读取排课时每批取回的行数')
+
     def handle(self, *args, **options):
         self.stdout.write("🔍 开始综合数据验证...")
         self.stdout.write("=" * 60)
         
         # 创建验证器实例并运行
-        validator = ComprehensiveDataValidator()
+        validator = ComprehensiveDataValidator(
+            parallel=options['parallel'], chunk_size=options['chunk_size']
+        )
         validator.run_validation()
         
         self.stdout.write(self.style.SUCCESS('数据验证完成！'))
 
 
 class ComprehensiveDataValidator:
-    """综合数据验证器"""
+    """综合数据验证器
+
+    取数按检查族组织：基础数据、选课汇总、排课扫描三族互不依赖，各自只访问自己的表，
+    查询次数固定，与数据规模无关。排课表逐行流式读取一次，同时喂给冲突、工作量、
+    利用率和时间分布各项检查；选课表在数据库中按课程分组汇总一次。
+    内存占用只与课程、教师、教室数量相关，不随排课、选课行数增长。
+    parallel=True 时三族在各自线程中并发执行，Django 的数据库连接按线程隔离。
+    """
+
+    STREAM_CHUNK_SIZE = 2000
+
+    # 排课扫描读取的列；按"学期、星期、开始时间"排序后，同一时间段重叠分量内的安排相邻
+    SCHEDULE_FIELDS = (
+        'id', 'status', 'semester', 'day_of_week', 'time_slot_id', 'week_mask',
+        'teacher_id', 'classroom_id', 'course_id', 'course__max_students',
+        'classroom__capacity', 'classroom__room_type', 'time_slot__name',
+    )
+    WORKLOAD_RANGES = [(0, 5), (6, 10), (11, 15), (16, 20), (21, 50)]
     
-    def __init__(self):
+    def __init__(self, parallel=False, chunk_size=None):
+        self.parallel = parallel
+        self.chunk_size = chunk_size or self.STREAM_CHUNK_SIZE
         self.report = {
             'validation_time': datetime.now().isoformat(),
             'data_statistics': {},
@@ -42,14 +73,25 @@ class ComprehensiveDataValidator:
         print("🔍 开始综合数据验证...")
         print("=" * 60)
         
+        self.validate()
+        
+        # 6. 输出报告
+        self._output_report()
+        return self.report
+    
+    def validate(self):
+        """执行各项检查并返回报告（不写文件）"""
+        # 0. 各检查族取数
+        scans = self._run_check_families()
+        
         # 1. 数据统计
-        self._collect_data_statistics()
+        self._collect_data_statistics(scans)
         
         # 2. 硬约束验证
-        self._validate_hard_constraints()
+        self._validate_hard_constraints(scans)
         
         # 3. 软约束评估
-        self._evaluate_soft_constraints()
+        self._evaluate_soft_constraints(scans)
         
         # 4. 数据质量检查
         self._check_data_quality()
@@ -57,50 +99,229 @@ class ComprehensiveDataValidator:
         # 5. 生成建议
         self._generate_recommendations()
         
-        # 6. 输出报告
-        self._output_report()
+        return self.report
+    
+    def _run_check_families(self):
+        """执行三个检查族，返回 {族名: 汇总结果}"""
+        families = {
+            'reference': self._scan_reference_tables,
+            'enrollments': self._scan_enrollments,
+            'schedules': self._scan_schedules,
+        }
+        if not self.parallel:
+            return {name: scan() for name, scan in families.items()}
+        
+        print(f"⚡ 并发执行 {len(families)} 个检查族...")
+        with ThreadPoolExecutor(max_workers=len(families)) as executor:
+            futures = {name: executor.submit(self._in_own_connection, scan) for name, scan in families.items()}
+            return {name: future.result() for name, future in futures.items()}
     
-    def _collect_data_statistics(self):
+    @staticmethod
+    def _in_own_connection(scan):
+        """在工作线程中执行检查族，结束时关闭该线程打开的数据库连接"""
+        try:
+            return scan()
+        finally:
+            connections.close_all()
+    
+    def _scan_reference_tables(self):
+        """基础数据族：用户、教学楼、教室、时间段与课程的汇总查询"""
+        print("📊 汇总基础数据...")
+        
+        users = Counter(dict(
+            User.objects.order_by().values_list('user_type').annotate(count=Count('id'))
+        ))
+        classrooms_by_type = {
+            row['room_type']: {'total': row['total'], 'available': row['available']}
+            for row in Classroom.objects.order_by().values('room_type').annotate(
+                total=Count('id'), available=Count('id', filter=Q(is_available=True))
+            )
+        }
+        courses = Course.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            avg_credits=Avg('credits'),
+            avg_hours=Avg('hours'),
+        )
+        
+        return {
+            'users': users,
+            'buildings': Building.objects.count(),
+            'classrooms_by_type': classrooms_by_type,
+            'time_slots': TimeSlot.objects.count(),
+            'courses': courses,
+            'courses_by_type': dict(
+                Course.objects.order_by().values_list('course_type').annotate(count=Count('id'))
+            ),
+            'courses_by_department': dict(
+                Course.objects.order_by().values_list('department').annotate(count=Count('id'))
+            ),
+            'courses_without_teachers': Course.objects.filter(teachers__isnull=True).count(),
+            'courses_without_schedules': Course.objects.filter(
+                is_active=True, schedules__isnull=True
+            ).count(),
+        }
+    
+    def _scan_enrollments(self):
+        """选课族：按(课程, 状态, 是否有效)分组汇总一次，结果行数与课程数同阶"""
+        print("📚 汇总选课数据...")
+        
+        summary = {
+            'total': 0,
+            'active': 0,
+            'by_status': Counter(),
+            'by_course_type': Counter(),
+            'total_by_course': Counter(),
+            'enrolled_by_course': Counter(),
+        }
+        groups = Enrollment.objects.order_by().values_list(
+            'course_id', 'course__course_type', 'status', 'is_active'
+        ).annotate(count=Count('id')).iterator(chunk_size=self.chunk_size)
+        
+        for course_id, course_type, status, is_active, count in groups:
+            summary['total'] += count
+            summary['by_status'][status] += count
+            summary['total_by_course'][course_id] += count
+            if is_active:
+                summary['active'] += count
+                summary['by_course_type'][course_type] += count
+            if status == 'enrolled':
+                summary['enrolled_by_course'][course_id] += count
+        
+        summary['students_with_enrollments'] = Enrollment.objects.aggregate(
+            count=Count('student', distinct=True)
+        )['count']
+        return summary
+    
+    def _scan_schedules(self):
+        """排课族：流式读取一次排课表，同时完成冲突、工作量、利用率与时间分布统计"""
+        print("🗓️ 流式扫描排课数据...")
+        
+        interval_index = TimeSlot.interval_index()
+        summary = {
+            'total': 0,
+            'active': 0,
+            'teacher_time_conflicts': [],
+            'classroom_time_conflicts': [],
+            'weekly': Counter(),
+            'timeslot': Counter(),
+        }
+        teacher_load = defaultdict(lambda: [0, set()])  # 教师ID -> [有效安排数, 课程ID集合]
+        used_classrooms = defaultdict(set)  # 教室类型 -> 有安排的教室ID
+        course_schedules = {}  # 课程ID -> [有效安排数, 最小教室容量, 课程最大人数]
+        
+        rows = Schedule.objects.order_by(
+            'semester', 'day_of_week', 'time_slot__start_time', 'time_slot__end_time', 'id'
+        ).values_list(*self.SCHEDULE_FIELDS, named=True).iterator(chunk_size=self.chunk_size)
+        
+        # 当前"学期、星期、时间段重叠分量"内的有效安排；分量切换时检测冲突后清空
+        cell_key, cell_rows = None, []
+        for row in rows:
+            summary['total'] += 1
+            if row.status != 'active':
+                continue
+            summary['active'] += 1
+            
+            key = (row.semester, row.day_of_week, interval_index.group(row.time_slot_id))
+            if key != cell_key:
+                self._collect_cell_conflicts(cell_rows, interval_index, summary)
+                cell_key, cell_rows = key, []
+            cell_rows.append(row)
+            
+            load = teacher_load[row.teacher_id]
+            load[0] += 1
+            load[1].add(row.course_id)
+            used_classrooms[row.classroom__room_type].add(row.classroom_id)
+            summary['weekly'][row.day_of_week] += 1
+            summary['timeslot'][row.time_slot__name] += 1
+            
+            course = course_schedules.get(row.course_id)
+            if course is None:
+                course_schedules[row.course_id] = [1, row.classroom__capacity, row.course__max_students]
+            else:
+                course[0] += 1
+                course[1] = min(course[1], row.classroom__capacity)
+        self._collect_cell_conflicts(cell_rows, interval_index, summary)
+        
+        summary['teacher_load'] = {
+            teacher_id: (schedule_count, len(course_ids))
+            for teacher_id, (schedule_count, course_ids) in teacher_load.items()
+        }
+        summary['used_classrooms'] = {room_type: len(ids) for room_type, ids in used_classrooms.items()}
+        summary['used_classroom_total'] = sum(summary['used_classrooms'].values())
+        summary['course_schedules'] = course_schedules
+        return summary
+    
+    @staticmethod
+    def _collect_cell_conflicts(cell_rows, interval_index, summary):
+        """检测同一时间段重叠分量内的教师与教室冲突（时间段重叠且周次重叠）"""
+        if len(cell_rows) < 2:
+            return
+        
+        by_teacher, by_classroom = defaultdict(list), defaultdict(list)
+        for row in cell_rows:
+            by_teacher[row.teacher_id].append(row)
+            by_classroom[row.classroom_id].append(row)
+        
+        for resource, groups in (('teacher', by_teacher), ('classroom', by_classroom)):
+            for resource_id, group in groups.items():
+                conflicting = ScheduleConflictDetector._week_overlapping(group, interval_index)
+                if len(conflicting) < 2:
+                    continue
+                first = conflicting[0]
+                summary[f'{resource}_time_conflicts'].append({
+                    'type': f'{resource}_time_conflict',
+                    f'{resource}_id': resource_id,
+                    'semester': first.semester,
+                    'day_of_week': first.day_of_week,
+                    'time_slot_id': first.time_slot_id,
+                    'conflicting_schedules': [s.id for s in conflicting],
+                    'count': len(conflicting)
+                })
+    
+    def _collect_data_statistics(self, scans):
         """收集数据统计信息"""
         print("📊 收集数据统计信息...")
         
+        reference, enrollments, schedules = scans['reference'], scans['enrollments'], scans['schedules']
         stats = {}
         
         # 基础数据统计
+        users = reference['users']
         stats['users'] = {
-            'total': User.objects.count(),
-            'students': User.objects.filter(user_type='student').count(),
-            'teachers': User.objects.filter(user_type='teacher').count(),
-            'admins': User.objects.filter(user_type='admin').count()
+            'total': sum(users.values()),
+            'students': users['student'],
+            'teachers': users['teacher'],
+            'admins': users['admin']
         }
         
         stats['infrastructure'] = {
-            'buildings': Building.objects.count(),
-            'classrooms': Classroom.objects.count(),
-            'time_slots': TimeSlot.objects.count()
+            'buildings': reference['buildings'],
+            'classrooms': sum(t['total'] for t in reference['classrooms_by_type'].values()),
+            'time_slots': reference['time_slots']
         }
         
         stats['academic'] = {
-            'courses': Course.objects.count(),
-            'active_courses': Course.objects.filter(is_active=True).count(),
-            'schedules': Schedule.objects.count(),
-            'active_schedules': Schedule.objects.filter(status='active').count(),
-            'enrollments': Enrollment.objects.count(),
-            'active_enrollments': Enrollment.objects.filter(is_active=True).count()
+            'courses': reference['courses']['total'],
+            'active_courses': reference['courses']['active'],
+            'schedules': schedules['total'],
+            'active_schedules': schedules['active'],
+            'enrollments': enrollments['total'],
+            'active_enrollments': enrollments['active']
         }
         
         # 详细分析
         stats['course_analysis'] = {
-            'by_type': dict(Course.objects.values('course_type').annotate(count=Count('id'))),
-            'by_department': dict(Course.objects.values('department').annotate(count=Count('id'))),
-            'avg_credits': Course.objects.aggregate(avg=Avg('credits'))['avg'] or 0,
-            'avg_hours': Course.objects.aggregate(avg=Avg('hours'))['avg'] or 0
+            'by_type': reference['courses_by_type'],
+            'by_department': reference['courses_by_department'],
+            'avg_credits': reference['courses']['avg_credits'] or 0,
+            'avg_hours': reference['courses']['avg_hours'] or 0
         }
         
         stats['enrollment_analysis'] = {
-            'by_status': dict(Enrollment.objects.values('status').annotate(count=Count('id'))),
-            'students_with_enrollments': Enrollment.objects.values('student').distinct().count(),
-            'courses_with_enrollments': Enrollment.objects.values('course').distinct().count(),
+            'by_status': dict(enrollments['by_status']),
+            'students_with_enrollments': enrollments['students_with_enrollments'],
+            'courses_with_enrollments': len(enrollments['total_by_course']),
             'avg_enrollments_per_student': None,
             'avg_enrollments_per_course': None
         }
@@ -117,26 +338,24 @@ class ComprehensiveDataValidator:
         self.report['data_statistics'] = stats
         print("✅ 数据统计收集完成")
     
-    def _validate_hard_constraints(self):
+    def _validate_hard_constraints(self, scans):
         """验证硬约束"""
         print("🔒 验证硬约束...")
         
         violations = {}
         
         # 1. 教师时间冲突检查
-        teacher_conflicts = self._check_teacher_time_conflicts()
-        violations['teacher_time_conflicts'] = teacher_conflicts
+        violations['teacher_time_conflicts'] = scans['schedules']['teacher_time_conflicts']
         
         # 2. 教室时间冲突检查
-        classroom_conflicts = self._check_classroom_time_conflicts()
-        violations['classroom_time_conflicts'] = classroom_conflicts
+        violations['classroom_time_conflicts'] = scans['schedules']['classroom_time_conflicts']
         
         # 3. 教室容量约束检查
-        capacity_violations = self._check_classroom_capacity()
+        capacity_violations = self._check_classroom_capacity(scans)
         violations['capacity_violations'] = capacity_violations
         
         # 4. 数据完整性检查
-        integrity_issues = self._check_data_integrity()
+        integrity_issues = self._check_data_integrity(scans)
         violations['data_integrity_issues'] = integrity_issues
         
         self.report['hard_constraints'] = {
@@ -151,220 +370,136 @@ class ComprehensiveDataValidator:
         
         print(f"✅ 硬约束验证完成，发现 {self.report['hard_constraints']['total_violations']} 个违例")
     
-    def _check_teacher_time_conflicts(self):
-        """检查教师时间冲突"""
-        conflicts = []
-        
-        # 查询同一教师在同一时间段的多个排课
-        duplicate_schedules = Schedule.objects.values(
-            'teacher', 'day_of_week', 'time_slot'
-        ).annotate(
-            count=Count('id')
-        ).filter(
-            count__gt=1,
-            status='active'
-        )
-        
-        for dup in duplicate_schedules:
-            schedules = Schedule.objects.filter(
-                teacher_id=dup['teacher'],
-                day_of_week=dup['day_of_week'],
-                time_slot_id=dup['time_slot'],
-                status='active'
-            )
-            
-            conflicts.append({
-                'type': 'teacher_time_conflict',
-                'teacher_id': dup['teacher'],
-                'day_of_week': dup['day_of_week'],
-                'time_slot_id': dup['time_slot'],
-                'conflicting_schedules': [s.id for s in schedules],
-                'count': dup['count']
-            })
-        
-        return conflicts
-    
-    def _check_classroom_time_conflicts(self):
-        """检查教室时间冲突"""
-        conflicts = []
-        
-        # 查询同一教室在同一时间段的多个排课
-        duplicate_schedules = Schedule.objects.values(
-            'classroom', 'day_of_week', 'time_slot'
-        ).annotate(
-            count=Count('id')
-        ).filter(
-            count__gt=1,
-            status='active'
-        )
-        
-        for dup in duplicate_schedules:
-            schedules = Schedule.objects.filter(
-                classroom_id=dup['classroom'],
-                day_of_week=dup['day_of_week'],
-                time_slot_id=dup['time_slot'],
-                status='active'
-            )
-            
-            conflicts.append({
-                'type': 'classroom_time_conflict',
-                'classroom_id': dup['classroom'],
-                'day_of_week': dup['day_of_week'],
-                'time_slot_id': dup['time_slot'],
-                'conflicting_schedules': [s.id for s in schedules],
-                'count': dup['count']
-            })
+    def _check_classroom_capacity(self, scans):
+        """检查教室容量约束
+
+        扫描时已记下每门课程所用教室的最小容量，只有选课人数超过该容量的课程才可能违例，
+        一次查询取回这些课程的有效安排逐条核对。
+        """
+        enrolled_by_course = scans['enrollments']['enrolled_by_course']
+        overflowing = [
+            course_id for course_id, (_count, min_capacity, _max_students) in scans['schedules']['course_schedules'].items()
+            if enrolled_by_course[course_id] > min_capacity
+        ]
+        if not overflowing:
+            return []
         
-        return conflicts
-    
-    def _check_classroom_capacity(self):
-        """检查教室容量约束"""
         violations = []
-        
-        # 查询选课人数超过教室容量的情况
-        schedules = Schedule.objects.filter(status='active').select_related(
-            'course', 'classroom'
-        )
+        schedules = Schedule.objects.filter(
+            status='active', course_id__in=overflowing
+        ).order_by('id').values_list(
+            'id', 'course_id', 'course__name', 'classroom_id', 'classroom__capacity', named=True
+        ).iterator(chunk_size=self.chunk_size)
         
         for schedule in schedules:
-            enrollment_count = Enrollment.objects.filter(
-                course=schedule.course,
-                status='enrolled'
-            ).count()
-            
-            if enrollment_count > schedule.classroom.capacity:
+            enrollment_count = enrolled_by_course[schedule.course_id]
+            if enrollment_count > schedule.classroom__capacity:
                 violations.append({
                     'type': 'capacity_violation',
                     'schedule_id': schedule.id,
-                    'course_id': schedule.course.id,
-                    'course_name': schedule.course.name,
-                    'classroom_id': schedule.classroom.id,
-                    'classroom_capacity': schedule.classroom.capacity,
+                    'course_id': schedule.course_id,
+                    'course_name': schedule.course__name,
+                    'classroom_id': schedule.classroom_id,
+                    'classroom_capacity': schedule.classroom__capacity,
                     'enrollment_count': enrollment_count,
-                    'overflow': enrollment_count - schedule.classroom.capacity
+                    'overflow': enrollment_count - schedule.classroom__capacity
                 })
         
         return violations
     
-    def _check_data_integrity(self):
+    def _check_data_integrity(self, scans):
         """检查数据完整性"""
+        reference, enrollments, schedules = scans['reference'], scans['enrollments'], scans['schedules']
+        total_by_course = enrollments['total_by_course']
+        course_schedules = schedules['course_schedules']
         issues = {}
         
         # 检查课程没有教师的情况
-        courses_without_teachers = Course.objects.filter(
-            teachers__isnull=True
-        ).count()
-        issues['courses_without_teachers'] = courses_without_teachers
+        issues['courses_without_teachers'] = reference['courses_without_teachers']
         
         # 检查课程没有排课的情况
-        courses_without_schedules = Course.objects.filter(
-            is_active=True,
-            schedules__isnull=True
-        ).count()
-        issues['courses_without_schedules'] = courses_without_schedules
+        issues['courses_without_schedules'] = reference['courses_without_schedules']
         
         # 检查排课没有选课的情况
-        schedules_without_enrollments = Schedule.objects.filter(
-            status='active'
-        ).exclude(
-            course__in=Enrollment.objects.values('course')
-        ).count()
-        issues['schedules_without_enrollments'] = schedules_without_enrollments
-        
-        # 检查孤立的选课记录
-        orphaned_enrollments = Enrollment.objects.exclude(
-            course__in=Schedule.objects.filter(status='active').values('course')
-        ).count()
-        issues['orphaned_enrollments'] = orphaned_enrollments
+        issues['schedules_without_enrollments'] = sum(
+            schedule_count for course_id, (schedule_count, _c, _m) in course_schedules.items()
+            if course_id not in total_by_course
+        )
+        
+        # 检查孤立的选课记录（课程没有有效排课）
+        issues['orphaned_enrollments'] = sum(
+            count for course_id, count in total_by_course.items()
+            if course_id not in course_schedules
+        )
         
         return issues
     
-    def _evaluate_soft_constraints(self):
+    def _evaluate_soft_constraints(self, scans):
         """评估软约束"""
         print("📈 评估软约束...")
         
         metrics = {}
         
         # 1. 教师工作量分布
-        teacher_workload = self._analyze_teacher_workload()
+        teacher_workload = self._analyze_teacher_workload(scans)
         metrics['teacher_workload'] = teacher_workload
         
         # 2. 教室利用率分析
-        classroom_utilization = self._analyze_classroom_utilization()
+        classroom_utilization = self._analyze_classroom_utilization(scans)
         metrics['classroom_utilization'] = classroom_utilization
         
         # 3. 时间分布分析
-        time_distribution = self._analyze_time_distribution()
+        time_distribution = self._analyze_time_distribution(scans)
         metrics['time_distribution'] = time_distribution
         
         # 4. 选课分布分析
-        enrollment_distribution = self._analyze_enrollment_distribution()
+        enrollment_distribution = self._analyze_enrollment_distribution(scans)
         metrics['enrollment_distribution'] = enrollment_distribution
         
         self.report['soft_constraints'] = metrics
         print("✅ 软约束评估完成")
     
-    def _analyze_teacher_workload(self):
+    def _analyze_teacher_workload(self, scans):
         """分析教师工作量"""
-        workload_stats = Schedule.objects.filter(
-            status='active'
-        ).values('teacher').annotate(
-            course_count=Count('course', distinct=True),
-            total_schedules=Count('id')
-        ).aggregate(
-            avg_courses=Avg('course_count'),
-            max_courses=Max('course_count'),
-            min_courses=Min('course_count'),
-            avg_schedules=Avg('total_schedules'),
-            max_schedules=Max('total_schedules')
-        )
+        loads = list(scans['schedules']['teacher_load'].values())  # [(有效安排数, 课程数), ...]
+        schedule_counts = [schedule_count for schedule_count, _course_count in loads]
+        course_counts = [course_count for _schedule_count, course_count in loads]
+        
+        workload_stats = {
+            'avg_courses': sum(course_counts) / len(loads) if loads else None,
+            'max_courses': max(course_counts, default=None),
+            'min_courses': min(course_counts, default=None),
+            'avg_schedules': sum(schedule_counts) / len(loads) if loads else None,
+            'max_schedules': max(schedule_counts, default=None)
+        }
         
         # 工作量分布
-        workload_distribution = {}
-        workload_ranges = [(0, 5), (6, 10), (11, 15), (16, 20), (21, 50)]
-        
-        for min_load, max_load in workload_ranges:
-            count = Schedule.objects.filter(
-                status='active'
-            ).values('teacher').annotate(
-                schedule_count=Count('id')
-            ).filter(
-                schedule_count__gte=min_load,
-                schedule_count__lte=max_load
-            ).count()
-            
-            workload_distribution[f"{min_load}-{max_load}"] = count
+        workload_distribution = {
+            f"{min_load}-{max_load}": sum(1 for count in schedule_counts if min_load <= count <= max_load)
+            for min_load, max_load in self.WORKLOAD_RANGES
+        }
         
         return {
             'statistics': workload_stats,
             'distribution': workload_distribution
         }
     
-    def _analyze_classroom_utilization(self):
+    def _analyze_classroom_utilization(self, scans):
         """分析教室利用率"""
-        total_classrooms = Classroom.objects.filter(is_available=True).count()
-        used_classrooms = Schedule.objects.filter(
-            status='active'
-        ).values('classroom').distinct().count()
+        classrooms_by_type = scans['reference']['classrooms_by_type']
+        used_by_type = scans['schedules']['used_classrooms']
+        
+        total_classrooms = sum(t['available'] for t in classrooms_by_type.values())
+        used_classrooms = scans['schedules']['used_classroom_total']
         
         utilization_rate = (used_classrooms / total_classrooms * 100) if total_classrooms > 0 else 0
         
         # 按教室类型分析
         utilization_by_type = {}
-        room_types = Classroom.objects.values('room_type').distinct()
-        
-        for room_type in room_types:
-            total_type = Classroom.objects.filter(
-                room_type=room_type['room_type'],
-                is_available=True
-            ).count()
-            
-            used_type = Schedule.objects.filter(
-                status='active',
-                classroom__room_type=room_type['room_type']
-            ).values('classroom').distinct().count()
-            
-            utilization_by_type[room_type['room_type']] = {
+        for room_type, counts in classrooms_by_type.items():
+            total_type = counts['available']
+            used_type = used_by_type.get(room_type, 0)
+            utilization_by_type[room_type] = {
                 'total': total_type,
                 'used': used_type,
                 'rate': (used_type / total_type * 100) if total_type > 0 else 0
@@ -377,62 +512,29 @@ class ComprehensiveDataValidator:
             'by_type': utilization_by_type
         }
     
-    def _analyze_time_distribution(self):
+    def _analyze_time_distribution(self, scans):
         """分析时间分布"""
-        # 按星期分布
-        weekly_distribution = dict(
-            Schedule.objects.filter(status='active')
-            .values('day_of_week')
-            .annotate(count=Count('id'))
-        )
-        
-        # 按时间段分布
-        timeslot_distribution = dict(
-            Schedule.objects.filter(status='active')
-            .values('time_slot__name')
-            .annotate(count=Count('id'))
-        )
-        
         return {
-            'weekly': weekly_distribution,
-            'timeslot': timeslot_distribution
+            'weekly': dict(scans['schedules']['weekly']),
+            'timeslot': dict(scans['schedules']['timeslot'])
         }
     
-    def _analyze_enrollment_distribution(self):
+    def _analyze_enrollment_distribution(self, scans):
         """分析选课分布"""
-        # 按课程类型分布
-        by_course_type = dict(
-            Enrollment.objects.filter(is_active=True)
-            .values('course__course_type')
-            .annotate(count=Count('id'))
-        )
-        
-        # 按状态分布
-        by_status = dict(
-            Enrollment.objects.values('status')
-            .annotate(count=Count('id'))
-        )
+        enrollments = scans['enrollments']
         
-        # 课程容量使用率
-        course_fill_rates = []
-        courses_with_schedules = Course.objects.filter(
-            schedules__status='active'
-        ).distinct()
-        
-        for course in courses_with_schedules[:100]:  # 抽样分析
-            enrollment_count = Enrollment.objects.filter(
-                course=course,
-                status='enrolled'
-            ).count()
-            
-            fill_rate = (enrollment_count / course.max_students * 100) if course.max_students > 0 else 0
-            course_fill_rates.append(fill_rate)
+        # 课程容量使用率（全部有有效排课的课程，不再抽样）
+        enrolled_by_course = enrollments['enrolled_by_course']
+        course_fill_rates = [
+            (enrolled_by_course[course_id] / max_students * 100) if max_students > 0 else 0
+            for course_id, (_count, _capacity, max_students) in scans['schedules']['course_schedules'].items()
+        ]
         
         avg_fill_rate = sum(course_fill_rates) / len(course_fill_rates) if course_fill_rates else 0
         
         return {
-            'by_course_type': by_course_type,
-            'by_status': by_status,
+            'by_course_type': dict(enrollments['by_course_type']),
+            'by_status': dict(enrollments['by_status']),
             'avg_course_fill_rate': avg_fill_rate,
             'sampled_courses': len(course_fill_rates)
         }
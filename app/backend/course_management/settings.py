@@ -179,4 +179,30 @@ SCHEDULE_CONFIG = {
     'two_hour_minutes_min': int(os.environ.get('SCHEDULE_TWO_HOUR_MIN', 115)),
     'two_hour_minutes_max': int(os.environ.get('SCHEDULE_TWO_HOUR_MAX', 125)),
     'max_daily_sessions_per_course': int(os.environ.get('SCHEDULE_MAX_DAILY_SESSIONS_PER_COURSE', 1)),
+    # 贪心求解的约束顺序：most_constrained（可行域余量最小优先并做前向检查）或 priority（仅按优先级）
+    'greedy_ordering': os.environ.get('SCHEDULE_GREEDY_ORDERING', 'most_constrained'),
+    'incremental_repair_moves': int(os.environ.get('SCHEDULE_INCREMENTAL_REPAIR_MOVES', 50)),
+    # 批量保存排课结果时每条 INSERT 语句包含的记录数
+    'bulk_create_batch_size': int(os.environ.get('SCHEDULE_BULK_CREATE_BATCH_SIZE', 1000)),
+    # 周次范围解析结果的进程内 LRU 缓存容量
+    'week_range_cache_size': int(os.environ.get('SCHEDULE_WEEK_RANGE_CACHE_SIZE', 256)),
+    # 批量冲突检查单次请求最多包含的拟定排课数
+    'batch_conflict_check_limit': int(os.environ.get('SCHEDULE_BATCH_CONFLICT_CHECK_LIMIT', 500)),
+    'multi_start_runs': int(os.environ.get('SCHEDULE_MULTI_START_RUNS', 8)),
+    # 0 表示使用全部 CPU 核心
+    'multi_start_workers': int(os.environ.get('SCHEDULE_MULTI_START_WORKERS', 0)),
+    'multi_start_score_noise': float(os.environ.get('SCHEDULE_MULTI_START_SCORE_NOISE', 3.0)),
+    'multi_start_order_noise': float(os.environ.get('SCHEDULE_MULTI_START_ORDER_NOISE', 1.0)),
+    # 遗传算法适应度评估进程数：1 为串行，0 表示使用全部 CPU 核心
+    'genetic_fitness_workers': int(os.environ.get('SCHEDULE_GENETIC_FITNESS_WORKERS', 1)),
+    # 混合算法：贪心阶段最多使用的时间比例；贪心结果有失败约束时为局部优化预留的比例
+    'hybrid_greedy_fraction': float(os.environ.get('SCHEDULE_HYBRID_GREEDY_FRACTION', 0.5)),
+    'hybrid_local_fraction': float(os.environ.get('SCHEDULE_HYBRID_LOCAL_FRACTION', 0.15)),
+    # 局部搜索：接受准则 annealing（模拟退火）或 tabu（禁忌搜索）
+    'local_search_acceptance': os.environ.get('SCHEDULE_LOCAL_SEARCH_ACCEPTANCE', 'annealing'),
+    'local_search_iterations': int(os.environ.get('SCHEDULE_LOCAL_SEARCH_ITERATIONS', 20000)),
+    'local_search_tabu_tenure': int(os.environ.get('SCHEDULE_LOCAL_SEARCH_TABU_TENURE', 10)),
+    'local_search_temperature': float(os.environ.get('SCHEDULE_LOCAL_SEARCH_TEMPERATURE', 50.0)),
+    'local_search_cooling_rate': float(os.environ.get('SCHEDULE_LOCAL_SEARCH_COOLING_RATE', 0.9995)),
+    'local_search_greedy_fraction': float(os.environ.get('SCHEDULE_LOCAL_SEARCH_GREEDY_FRACTION', 0.5)),
 }
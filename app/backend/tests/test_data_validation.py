@@ -0,0 +1,88 @@
+"""
+Tests for the validate_data management command.
+"""
+
+from datetime import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from course_management.management.commands.validate_data import ComprehensiveDataValidator
+from tests.factories import (
+    ClassroomFactory, CourseFactory, EnrollmentFactory, ScheduleFactory,
+    TeacherUserFactory, TimeSlotFactory
+)
+
+
+def build_dataset(extra_schedules=0):
+    """A teacher clash across overlapping slots, a classroom clash and a week-disjoint pair."""
+    morning = TimeSlotFactory(start_time=time(8, 0), end_time=time(9, 40))
+    long_block = TimeSlotFactory(start_time=time(9, 0), end_time=time(11, 0))
+    afternoon = TimeSlotFactory(start_time=time(14, 0), end_time=time(15, 40))
+    room, other_room = ClassroomFactory(capacity=50), ClassroomFactory(capacity=50)
+    teacher = TeacherUserFactory()
+
+    def schedule(time_slot, classroom, week_range, teacher=teacher, day_of_week=1):
+        course = CourseFactory(teachers=[teacher], max_students=30)
+        return ScheduleFactory(course=course, teacher=teacher, classroom=classroom, time_slot=time_slot,
+                               day_of_week=day_of_week, week_range=week_range)
+
+    schedules = {
+        'first': schedule(morning, room, '1-8'),
+        'overlapping_slot': schedule(long_block, other_room, '5-6'),
+        'same_room': schedule(morning, room, '7-10', teacher=TeacherUserFactory()),
+        'disjoint_weeks': schedule(afternoon, room, '1-8'),
+        'later_weeks': schedule(afternoon, other_room, '9-16'),
+    }
+    type(other_room).objects.filter(id=other_room.id).update(capacity=2)
+    for _ in range(3):
+        EnrollmentFactory(course=schedules['later_weeks'].course)
+    for day in range(extra_schedules):
+        schedule(afternoon, ClassroomFactory(capacity=50), '1-16', teacher=TeacherUserFactory(), day_of_week=day % 7 + 1)
+    return schedules
+
+
+@pytest.mark.django_db
+class TestComprehensiveDataValidator:
+    """Test the streamed, query-bounded data validator."""
+
+    def test_conflicts_are_week_and_overlap_aware(self):
+        schedules = build_dataset()
+
+        report = ComprehensiveDataValidator().validate()
+
+        violations = report['hard_constraints']['violations']
+        teacher_conflict, = violations['teacher_time_conflicts']
+        assert teacher_conflict['conflicting_schedules'] == [schedules['first'].id, schedules['overlapping_slot'].id]
+        classroom_conflict, = violations['classroom_time_conflicts']
+        assert classroom_conflict['conflicting_schedules'] == [schedules['first'].id, schedules['same_room'].id]
+        capacity_violation, = violations['capacity_violations']
+        assert capacity_violation['schedule_id'] == schedules['later_weeks'].id
+        assert capacity_violation['overflow'] == 1
+        assert violations['data_integrity_issues']['schedules_without_enrollments'] == 4
+        assert report['data_statistics']['academic']['active_schedules'] == 5
+        assert report['soft_constraints']['time_distribution']['weekly'] == {1: 5}
+
+    def test_query_count_does_not_grow_with_data(self):
+        build_dataset()
+        with CaptureQueriesContext(connection) as small:
+            ComprehensiveDataValidator(chunk_size=2).validate()
+
+        build_dataset(extra_schedules=20)
+        with CaptureQueriesContext(connection) as large:
+            report = ComprehensiveDataValidator(chunk_size=2).validate()
+
+        assert report['data_statistics']['academic']['schedules'] == 30
+        assert len(large) == len(small)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_run_matches_sequential_run():
+    build_dataset(extra_schedules=3)
+
+    sequential = ComprehensiveDataValidator().validate()
+    parallel = ComprehensiveDataValidator(parallel=True).validate()
+
+    for section in ('data_statistics', 'hard_constraints', 'soft_constraints', 'data_quality'):
+        assert parallel[section] == sequential[section]
@@ -231,6 +231,109 @@ class TestScheduleModel:
         assert '周一' in schedule_str
         assert '第' in schedule_str and '节' in schedule_str
 
+    def test_conflicts_require_overlapping_weeks(self):
+        """Test that schedules only conflict when their week ranges overlap."""
+        classroom = ClassroomFactory(capacity=100)
+        time_slot = TimeSlotFactory()
+
+        def schedule_for(week_range):
+            teacher = TeacherUserFactory()
+            course = CourseFactory(teachers=[teacher], max_students=30)
+            return ScheduleFactory(course=course, teacher=teacher, classroom=classroom,
+                                   time_slot=time_slot, day_of_week=1, week_range=week_range)
+
+        first_half = schedule_for('1-8周')
+        second_half = schedule_for('9-16周')
+        assert not first_half.has_conflicts()
+        assert not second_half.has_conflicts()
+
+        middle = schedule_for('5-12周')
+        assert set(middle.get_conflicts()) == {first_half, second_half}
+        assert list(Schedule.check_classroom_conflicts(
+            classroom, 1, time_slot, first_half.semester, week_range='13-16'
+        )) == [second_half]
+        assert Schedule.week_range_mask('1-3,5周') == 0b10111
+
+    def test_conflicts_cover_overlapping_time_slots(self):
+        """Test that a long block conflicts with the shorter periods it covers."""
+        from datetime import time
+        classroom = ClassroomFactory(capacity=100)
+        block = TimeSlotFactory(start_time=time(8, 0), end_time=time(10, 0))
+        period = TimeSlotFactory(start_time=time(9, 0), end_time=time(9, 45))
+        later = TimeSlotFactory(start_time=time(10, 0), end_time=time(10, 45))
+
+        def schedule_for(time_slot):
+            teacher = TeacherUserFactory()
+            course = CourseFactory(teachers=[teacher], max_students=30)
+            return ScheduleFactory(course=course, teacher=teacher, classroom=classroom,
+                                   time_slot=time_slot, day_of_week=1)
+
+        long_block = schedule_for(block)
+        short_period = schedule_for(period)
+        back_to_back = schedule_for(later)
+
+        assert list(long_block.get_conflicts()) == [short_period]
+        assert not back_to_back.has_conflicts()
+        assert TimeSlot.overlapping_ids(block) == {block.id, period.id}
+        assert list(Schedule.check_classroom_conflicts(
+            classroom, 1, period.id, long_block.semester, exclude_pk=short_period.pk
+        )) == [long_block]
+
+    def test_interval_index_is_reused_until_the_time_grid_changes(self):
+        """Test that the interval index only queries the database after a time slot write."""
+        from datetime import time
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext, override_settings
+
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            cache.clear()
+            slot = TimeSlotFactory(start_time=time(8, 0), end_time=time(9, 40))
+            assert TimeSlot.overlapping_ids(slot) == {slot.id}
+
+            with CaptureQueriesContext(connection) as queries:
+                TimeSlot.interval_index()
+            assert len(queries) == 0
+
+            long_block = TimeSlotFactory(start_time=time(9, 0), end_time=time(11, 0))
+            assert TimeSlot.overlapping_ids(slot) == {slot.id, long_block.id}
+
+    def test_week_filters_run_on_stored_mask(self):
+        """Test that week filtering uses the week mask kept in sync on save and bulk create."""
+        teacher = TeacherUserFactory()
+        course = CourseFactory(teachers=[teacher], max_students=30)
+        classroom = ClassroomFactory(capacity=100)
+        odd = ScheduleFactory(course=course, teacher=teacher, classroom=classroom, week_range='1,3,5周')
+        full = ScheduleFactory(course=course, teacher=teacher, classroom=classroom, week_range='1-16周')
+        bulk, = Schedule.objects.bulk_create([Schedule(
+            course=course, teacher=teacher, classroom=classroom, time_slot=full.time_slot,
+            day_of_week=2, week_range='9-12', semester=full.semester, academic_year=full.academic_year
+        )])
+
+        assert odd.week_mask == 0b10101
+        assert bulk.week_mask == 0b1111 << 8
+        assert set(Schedule.objects.in_week(3)) == {odd, full}
+        assert set(Schedule.objects.in_week(10)) == {full, bulk}
+        assert not Schedule.objects.in_week(40).exists()
+        assert set(Schedule.objects.overlapping_weeks(0b110000)) == {odd, full}
+        assert odd.is_active_in_week(5) and not odd.is_active_in_week(4)
+
+    def test_week_range_parsing_is_memoized(self):
+        """Test that week range parsing is cached and returns fresh lists to callers."""
+        from apps.schedules.models import parse_weeks, clear_week_range_cache, week_range_cache_stats
+        clear_week_range_cache()
+
+        assert parse_weeks('1-3,5周') == frozenset({1, 2, 3, 5})
+        weeks = Schedule.parse_week_range('1-3,5周')
+        weeks.append(99)
+        assert Schedule.parse_week_range('1-3,5周') == [1, 2, 3, 5]
+        with pytest.raises(ValueError):
+            Schedule.parse_week_range('abc')
+
+        stats = week_range_cache_stats()['parse_weeks']
+        assert stats['misses'] == 2 and stats['hits'] == 2
+        assert stats['hit_rate'] == 0.5
+
 
 @pytest.mark.django_db
 class TestBusinessLogic:
@@ -0,0 +1,1158 @@
+"""
+Tests for the scheduling solvers and their supporting indexes.
+"""
+
+import pickle
+import random
+import time as time_module
+import numpy as np
+import pytest
+from datetime import time
+from django.core.exceptions import ValidationError
+from django.db import connection
+
+from tests.factories import (
+    TeacherUserFactory, CourseFactory, ClassroomFactory,
+    TimeSlotFactory, ScheduleFactory
+)
+from apps.schedules.algorithms import SchedulingAlgorithm, ScheduleConstraint, ScheduleSlot
+from apps.schedules.availability import SlotAvailabilityIndex
+from apps.schedules.benchmark import build_problem, compare_with_baseline, run_benchmark, scaled_params
+from apps.schedules.domains import CandidateDomains, ConstraintDomains
+from apps.schedules.genetic_algorithm import GeneticSchedulingAlgorithm, Individual
+from apps.schedules.greedy_core import ranked_positions
+from apps.schedules.hybrid_algorithm import HybridSchedulingAlgorithm
+from apps.schedules.local_search import LocalSearchEngine
+from apps.schedules.local_search_algorithm import LocalSearchSchedulingAlgorithm
+from apps.schedules.models import Schedule
+from apps.schedules.multi_start_algorithm import MultiStartSchedulingAlgorithm
+from apps.schedules.services import AutoScheduleService, ScheduleConflictDetector
+from apps.schedules.snapshot import SolverSnapshot
+from apps.schedules.solver_model import SolverModel
+from apps.schedules.time_budget import TimeBudget
+from apps.schedules.time_grid import TimeSlotIntervalIndex
+
+
+SEMESTER = '2024-2025-1'
+ACADEMIC_YEAR = '2024-2025'
+
+
+@pytest.fixture
+def scheduling_resources():
+    """Four time slots, three classrooms and four courses (two share a teacher)."""
+    time_slots = [
+        TimeSlotFactory(order=1, start_time=time(8, 0), end_time=time(9, 40)),
+        TimeSlotFactory(order=2, start_time=time(10, 0), end_time=time(11, 40)),
+        TimeSlotFactory(order=3, start_time=time(14, 0), end_time=time(15, 40)),
+        TimeSlotFactory(order=4, start_time=time(16, 0), end_time=time(17, 40)),
+    ]
+    classrooms = [ClassroomFactory(capacity=60, room_type='lecture') for _ in range(3)]
+    shared_teacher = TeacherUserFactory()
+    teachers = [shared_teacher, shared_teacher, TeacherUserFactory(), TeacherUserFactory()]
+    courses = [
+        CourseFactory(teachers=[teacher], max_students=40, semester=SEMESTER,
+                      academic_year=ACADEMIC_YEAR)
+        for teacher in teachers
+    ]
+    return {
+        'time_slots': time_slots,
+        'classrooms': classrooms,
+        'teachers': teachers,
+        'courses': courses,
+    }
+
+
+def build_algorithm(resources, sessions_per_week=2, algorithm_class=SchedulingAlgorithm):
+    """Create a solver with one constraint per course."""
+    algorithm = algorithm_class(SEMESTER, ACADEMIC_YEAR)
+    for course, teacher in zip(resources['courses'], resources['teachers']):
+        algorithm.add_constraint(ScheduleConstraint(
+            course=course,
+            teacher=teacher,
+            preferred_classrooms=list(resources['classrooms']),
+            preferred_time_slots=list(resources['time_slots']),
+            preferred_days=list(range(1, 6)),
+            sessions_per_week=sessions_per_week,
+            avoid_consecutive=True,
+            max_daily_sessions=1,
+            priority=2,
+        ))
+    return algorithm
+
+
+def assert_conflict_free(assigned_slots):
+    """No teacher or classroom is booked twice for the same (day, time slot)."""
+    teacher_keys = set()
+    classroom_keys = set()
+    for constraint, slots in assigned_slots.items():
+        for slot in slots:
+            teacher_key = (constraint.teacher.id, slot.day_of_week, slot.time_slot.id)
+            classroom_key = (slot.classroom.id, slot.day_of_week, slot.time_slot.id)
+            assert teacher_key not in teacher_keys
+            assert classroom_key not in classroom_keys
+            teacher_keys.add(teacher_key)
+            classroom_keys.add(classroom_key)
+
+
+class TestSlotAvailabilityIndex:
+    """Test the bitmask availability index."""
+
+    def test_cell_encoding(self):
+        index = SlotAvailabilityIndex(num_days=5, num_time_slots=3, num_classrooms=2)
+        assert index.cell(2, 1) == 2 * 3 + 1
+        assert index.num_cells == 15
+
+    def test_candidates_exclude_occupied_pairs(self):
+        index = SlotAvailabilityIndex(num_days=2, num_time_slots=2, num_classrooms=2)
+        index.occupy_classroom(0, index.cell(0, 0))
+        rooms, cells = index.candidates(None, 1 << index.cell(0, 0))
+        assert list(zip(rooms.tolist(), cells.tolist())) == [(1, 0)]
+
+        index.release_classroom(0, index.cell(0, 0))
+        rooms, _cells = index.candidates(None, 1 << index.cell(0, 0))
+        assert rooms.tolist() == [0, 1]
+
+    def test_teacher_day_load_counts_only_that_day(self):
+        index = SlotAvailabilityIndex(num_days=2, num_time_slots=2, num_classrooms=1)
+        index.occupy_teacher(5, index.cell(0, 0))
+        index.occupy_teacher(5, index.cell(0, 1))
+        index.occupy_teacher(5, index.cell(1, 1))
+        assert index.teacher_day_load(5, 0) == 2
+        assert index.teacher_day_load(5, 1) == 1
+        assert index.teacher_day_loads(5).tolist() == [2.0, 1.0]
+        assert index.is_teacher_busy(5, index.cell(1, 1))
+        assert not index.is_teacher_busy(5, index.cell(1, 0))
+
+    def test_mask_round_trip(self):
+        index = SlotAvailabilityIndex(num_days=5, num_time_slots=13, num_classrooms=1)
+        allowed = np.random.default_rng(0).random(index.num_cells) < 0.5
+
+        mask = index.mask_from_cells(allowed)
+        assert mask == sum(1 << int(cell) for cell in np.flatnonzero(allowed))
+        assert index.mask_to_cells(mask).tolist() == np.flatnonzero(allowed).tolist()
+        assert index.mask_to_cells(-1).tolist() == list(range(index.num_cells))
+
+    def test_overlapping_time_slots_share_occupancy(self):
+        # slot 0 is a long block covering the short slots 1 and 2
+        index = SlotAvailabilityIndex(num_days=1, num_time_slots=3, num_classrooms=1,
+                                      time_overlaps=[(0, 1, 2), (0, 1), (0, 2)])
+        index.occupy_classroom(0, 1)
+        index.occupy_classroom(0, 2)
+        index.occupy_classroom(0, 2)
+        assert index.free[0].tolist() == [False, False, False]
+
+        index.release_classroom(0, 1)
+        assert index.free[0].tolist() == [False, True, False]
+        index.release_classroom(0, 2)
+        assert index.free[0].all()
+
+        index.occupy_teacher(7, 0)
+        assert index.is_teacher_busy(7, 1) and index.is_teacher_busy(7, 2)
+        assert index.teacher_day_load(7, 0) == 1
+
+
+class TestTimeSlotIntervalIndex:
+    """Test the interval index over mixed-length time slot grids."""
+
+    def test_long_block_overlaps_the_periods_it_covers(self):
+        index = TimeSlotIntervalIndex([
+            (1, time(8, 0), time(10, 0)),
+            (2, time(8, 0), time(8, 45)),
+            (3, time(8, 55), time(9, 40)),
+            (4, time(10, 0), time(10, 45)),
+            (5, time(9, 50), time(10, 35)),
+        ])
+        assert index.has_overlaps
+        assert index.overlapping(1) == {1, 2, 3, 5}
+        assert index.overlapping(2) == {1, 2}
+        assert not index.overlaps(1, 4)  # back-to-back slots do not overlap
+        assert index.overlaps(4, 5)
+        assert len({index.group(slot_id) for slot_id in range(1, 6)}) == 1
+        assert index.overlap_pairs() == [(2, 1), (1, 3), (1, 5), (5, 4)]
+        assert index.overlapping(99) == {99}
+
+    def test_disjoint_grid_has_no_overlaps(self):
+        index = TimeSlotIntervalIndex([(i, 100 * i, 100 * i + 90) for i in range(1, 6)])
+        assert not index.has_overlaps
+        assert index.overlap_pairs() == []
+        assert [index.group(i) for i in range(1, 6)] == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.django_db
+class TestGreedySchedulingAlgorithm:
+    """Test the greedy solver end to end against the ORM."""
+
+    def test_solve_assigns_all_constraints_without_conflicts(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        result = algorithm.solve(timeout_seconds=30)
+
+        assert result['successful_assignments'] == len(scheduling_resources['courses'])
+        assert_conflict_free(result['assigned_slots'])
+        for constraint, slots in result['assigned_slots'].items():
+            assert len(slots) == constraint.sessions_per_week
+            assert len({slot.day_of_week for slot in slots}) == len(slots)
+
+    def test_existing_schedules_are_treated_as_occupied(self, scheduling_resources):
+        time_slot = scheduling_resources['time_slots'][0]
+        classroom = scheduling_resources['classrooms'][0]
+        teacher = scheduling_resources['teachers'][2]
+        ScheduleFactory(
+            course=scheduling_resources['courses'][2], teacher=teacher,
+            classroom=classroom, time_slot=time_slot, day_of_week=1,
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR
+        )
+
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.initialize_available_slots()
+        slot = ScheduleSlot(day_of_week=1, time_slot=time_slot, classroom=classroom)
+
+        assert algorithm.check_classroom_conflict(classroom, slot)
+        assert algorithm.check_teacher_conflict(teacher, slot)
+        assert slot not in algorithm.available_slots
+
+    def test_create_schedules_maps_assignments_to_models(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources, sessions_per_week=1)
+        algorithm.solve(timeout_seconds=30)
+        schedules = algorithm.create_schedules()
+
+        assert len(schedules) == len(scheduling_resources['courses'])
+        assert {s.course_id for s in schedules} == {c.id for c in scheduling_resources['courses']}
+
+    def test_batch_scores_match_scalar_scorer(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        first, second = algorithm.constraints[0], algorithm.constraints[1]
+        second.preferred_classrooms = scheduling_resources['classrooms'][:1]
+        second.preferred_time_slots = scheduling_resources['time_slots'][1:3]
+        algorithm.initialize_available_slots()
+        algorithm._update_conflict_tracking(first, algorithm.find_best_slots(first))
+
+        rooms, cells = algorithm.slot_index.candidates(None, algorithm.slot_index.full_mask)
+        batch_scores = algorithm.score_candidates(second, rooms, cells)
+        scalar_scores = [
+            algorithm.calculate_slot_score(second, algorithm._make_slot(int(room), int(cell)))
+            for room, cell in zip(rooms, cells)
+        ]
+
+        assert batch_scores.tolist() == pytest.approx(scalar_scores)
+
+    def test_mixed_length_grid_never_double_books(self, scheduling_resources):
+        # a two-hour block overlapping two 45-minute periods, plus a separate block
+        time_slots = [
+            TimeSlotFactory(order=11, start_time=time(8, 0), end_time=time(10, 0)),
+            TimeSlotFactory(order=12, start_time=time(8, 0), end_time=time(8, 45)),
+            TimeSlotFactory(order=13, start_time=time(9, 0), end_time=time(9, 45)),
+            TimeSlotFactory(order=14, start_time=time(10, 10), end_time=time(12, 10)),
+        ]
+        shared_teacher = scheduling_resources['teachers'][0]
+        resources = dict(scheduling_resources, time_slots=time_slots,
+                         classrooms=scheduling_resources['classrooms'][:1])
+        algorithm = build_algorithm(resources)
+        result = algorithm.solve(timeout_seconds=30)
+        assert result['successful_assignments'] == len(resources['courses'])
+
+        index = TimeSlotIntervalIndex([(ts.id, ts.start_time, ts.end_time) for ts in time_slots])
+        placed = [(constraint.teacher.id, slot) for constraint, slots in result['assigned_slots'].items()
+                  for slot in slots]
+        for i, (teacher_a, a) in enumerate(placed):
+            for teacher_b, b in placed[i + 1:]:
+                if a.day_of_week == b.day_of_week and index.overlaps(a.time_slot.id, b.time_slot.id):
+                    assert a.classroom.id != b.classroom.id
+                    assert teacher_a != teacher_b
+        assert any(teacher == shared_teacher.id for teacher, _slot in placed)
+
+        created = AutoScheduleService.bulk_save_schedules(algorithm.create_schedules())
+        assert not any(schedule.has_conflicts() for schedule in created)
+
+    def test_ranked_positions_match_stable_sort(self):
+        rng = np.random.default_rng(0)
+        scores = rng.integers(0, 5, 200).astype(float)
+
+        for batch in (1, 7, 500):
+            assert list(ranked_positions(scores, batch)) == np.argsort(-scores, kind='stable').tolist()
+
+    def test_relaxed_constraints_do_not_mutate_preferences(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources, sessions_per_week=1)
+        constraint = algorithm.constraints[2]
+        constraint.preferred_classrooms = scheduling_resources['classrooms'][:1]
+        algorithm.initialize_available_slots()
+        # Fill the preferred classroom so only a relaxed retry can succeed
+        for cell in range(algorithm.model.num_cells):
+            algorithm.slot_index.occupy_classroom(0, cell)
+
+        assert algorithm.find_best_slots(constraint) == []
+        assert algorithm._try_relaxed_constraints(constraint)
+        assert constraint.preferred_classrooms == scheduling_resources['classrooms'][:1]
+        slot = algorithm.assigned_slots[constraint][0]
+        assert slot.classroom != scheduling_resources['classrooms'][0]
+        assert algorithm.check_teacher_conflict(constraint.teacher, slot)
+
+
+@pytest.mark.django_db
+class TestSolverModel:
+    """Test compiling constraints into integer arrays."""
+
+    def test_preferences_compile_to_masks(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        constraint = algorithm.constraints[0]
+        constraint.preferred_time_slots = scheduling_resources['time_slots'][:2]
+        constraint.preferred_days = [1, 3]
+        model = SolverModel(algorithm.constraints, scheduling_resources['time_slots'],
+                            scheduling_resources['classrooms'])
+
+        ci = model.index_of(constraint)
+        assert ci == 0
+        assert model.time_pref[ci].tolist() == [True, True, False, False]
+        assert model.day_pref[ci].tolist() == [True, False, True, False, False]
+        allowed = model.allowed_cells(ci).reshape(model.num_days, model.num_time_slots)
+        assert allowed[0].tolist() == [True, True, False, False]
+        assert not allowed[1].any()
+        # The shared teacher is compiled once
+        assert len(model.teacher_ids) == 3
+        assert model.constraint_teacher[0] == model.constraint_teacher[1]
+
+
+def save_schedules(algorithm):
+    schedules = algorithm.create_schedules()
+    for schedule in schedules:
+        schedule.save()
+    return schedules
+
+
+@pytest.mark.django_db
+class TestIncrementalScheduling:
+    """Test re-solving only the constraints whose schedules changed."""
+
+    def test_valid_existing_schedules_are_kept(self, scheduling_resources):
+        save_schedules(self._solve(build_algorithm(scheduling_resources)))
+
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.incremental = True
+        result = algorithm.solve(timeout_seconds=30)
+
+        assert result['kept_assignments'] == len(scheduling_resources['courses'])
+        assert result['stale_schedule_ids'] == []
+        assert algorithm.create_schedules() == []
+
+    def test_teacher_swap_resolves_only_that_course(self, scheduling_resources):
+        save_schedules(self._solve(build_algorithm(scheduling_resources)))
+        swapped_course = scheduling_resources['courses'][3]
+        old_ids = set(swapped_course.schedules.values_list('id', flat=True))
+
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.incremental = True
+        new_teacher = TeacherUserFactory()
+        algorithm.constraints[3] = ScheduleConstraint(
+            course=swapped_course, teacher=new_teacher,
+            preferred_classrooms=[], preferred_time_slots=[], preferred_days=[],
+            sessions_per_week=2, max_daily_sessions=1,
+        )
+        result = algorithm.solve(timeout_seconds=30)
+
+        assert result['kept_assignments'] == 3
+        assert set(result['stale_schedule_ids']) == old_ids
+        schedules = algorithm.create_schedules()
+        assert {s.course_id for s in schedules} == {swapped_course.id}
+        assert {s.teacher_id for s in schedules} == {new_teacher.id}
+        assert_conflict_free(result['assigned_slots'])
+
+    def test_repair_moves_a_blocking_session(self, scheduling_resources):
+        time_slots = scheduling_resources['time_slots']
+        classrooms = scheduling_resources['classrooms']
+        # One classroom and three time slots
+        time_slots[3].is_active = False
+        time_slots[3].save()
+        for classroom in classrooms[1:]:
+            classroom.is_active = False
+            classroom.save()
+
+        algorithm = build_algorithm(scheduling_resources, sessions_per_week=1)
+        algorithm.incremental = True
+        target = algorithm.constraints[2]
+        target.preferred_days = [1]
+        algorithm.initialize_available_slots()
+        # Monday is fully booked by other courses
+        for constraint, time_slot in zip(
+                [algorithm.constraints[0], algorithm.constraints[1], algorithm.constraints[3]], time_slots):
+            slot = ScheduleSlot(day_of_week=1, time_slot=time_slot, classroom=classrooms[0])
+            algorithm.assigned_slots[constraint] = [slot]
+            algorithm._update_conflict_tracking(constraint, [slot])
+
+        moves = algorithm._repair_constraint(target, max_moves=5)
+
+        assert moves == 1
+        assert algorithm.assigned_slots[target][0].day_of_week == 1
+        assert len(algorithm.changed_constraints) == 1
+        for constraint, slots in algorithm.assigned_slots.items():
+            assert len(slots) == 1
+        assert_conflict_free(algorithm.assigned_slots)
+
+    @staticmethod
+    def _solve(algorithm):
+        algorithm.solve(timeout_seconds=30)
+        return algorithm
+
+
+@pytest.mark.django_db
+class TestBulkPersistence:
+    """Test validating and bulk-saving solver output."""
+
+    def test_replace_mode_swaps_existing_schedules(self, scheduling_resources):
+        old = save_schedules(self._solve(build_algorithm(scheduling_resources)))
+
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.replace_existing = True
+        self._solve(algorithm)
+        assert set(algorithm.stale_schedule_ids) == {s.id for s in old}
+
+        created = AutoScheduleService.bulk_save_schedules(
+            algorithm.create_schedules(), algorithm.stale_schedule_ids, batch_size=3, swap=True
+        )
+
+        assert not Schedule.objects.filter(id__in=[s.id for s in old]).exists()
+        assert set(Schedule.objects.values_list('id', flat=True)) == {s.id for s in created}
+        assert set(Schedule.objects.values_list('status', flat=True)) == {'active'}
+
+    def test_swap_without_returned_ids_leaves_other_staged_rows_alone(self, scheduling_resources, monkeypatch):
+        old = save_schedules(self._solve(build_algorithm(scheduling_resources)))
+        # rows another writer has staged for the same semester and courses
+        foreign = Schedule.objects.bulk_create([Schedule(
+            course=s.course, teacher=s.teacher, classroom=s.classroom, time_slot=s.time_slot,
+            day_of_week=s.day_of_week, semester=SEMESTER, academic_year=ACADEMIC_YEAR,
+            week_range=s.week_range, status='staged'
+        ) for s in old])
+
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.replace_existing = True
+        self._solve(algorithm)
+        monkeypatch.setattr(type(connection.features), 'can_return_rows_from_bulk_insert', False)
+        created = AutoScheduleService.bulk_save_schedules(
+            algorithm.create_schedules(), algorithm.stale_schedule_ids, swap=True
+        )
+
+        assert not Schedule.objects.filter(id__in=[s.id for s in old]).exists()
+        assert set(Schedule.objects.filter(status='active').values_list('course_id', flat=True)) == \
+            {s.course_id for s in created}
+        assert set(Schedule.objects.filter(status='staged').values_list('id', flat=True)) == {s.id for s in foreign}
+
+    def test_conflicts_are_rejected_without_writing(self, scheduling_resources):
+        old = save_schedules(self._solve(build_algorithm(scheduling_resources)))
+        clash = Schedule(
+            course=old[0].course, teacher=old[0].teacher, classroom=old[0].classroom,
+            time_slot=old[0].time_slot, day_of_week=old[0].day_of_week,
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR, week_range='1-18'
+        )
+
+        errors = AutoScheduleService.validate_schedules([clash])
+        assert len(errors) == 2
+        assert AutoScheduleService.validate_schedules([clash], exclude_ids=[old[0].id]) == []
+        with pytest.raises(ValidationError):
+            AutoScheduleService.bulk_save_schedules([clash])
+        assert Schedule.objects.count() == len(old)
+
+    @pytest.mark.parametrize('swap', [False, True])
+    def test_concurrent_writer_is_checked_under_the_semester_lock(self, scheduling_resources, monkeypatch, swap):
+        from contextlib import contextmanager
+        from apps.schedules import services
+
+        old = save_schedules(self._solve(build_algorithm(scheduling_resources)))
+        taken = old[0]
+        Schedule.objects.filter(id=taken.id).delete()
+
+        def copy():
+            return Schedule(
+                course=taken.course, teacher=taken.teacher, classroom=taken.classroom,
+                time_slot=taken.time_slot, day_of_week=taken.day_of_week,
+                semester=SEMESTER, academic_year=ACADEMIC_YEAR, week_range='1-18'
+            )
+
+        # another request takes the slot after this one passed its pre-check, just before it gets the lock
+        lock = services.schedule_write_lock
+
+        @contextmanager
+        def rival_first(*semesters):
+            copy().save()
+            with lock(*semesters):
+                yield
+
+        monkeypatch.setattr(services, 'schedule_write_lock', rival_first)
+        with pytest.raises(ValidationError):
+            AutoScheduleService.bulk_save_schedules([copy()], swap=swap)
+        assert Schedule.objects.filter(time_slot=taken.time_slot, day_of_week=taken.day_of_week,
+                                       classroom=taken.classroom).count() == 1
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql', reason='advisory locks are PostgreSQL only')
+    def test_writes_take_the_advisory_lock(self, scheduling_resources):
+        from django.test.utils import CaptureQueriesContext
+
+        schedules = self._solve(build_algorithm(scheduling_resources)).create_schedules()
+        with CaptureQueriesContext(connection) as queries:
+            AutoScheduleService.bulk_save_schedules(schedules)
+        assert any('pg_advisory_xact_lock' in query['sql'] for query in queries)
+
+    def test_disjoint_week_ranges_share_rooms(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.week_range = '9-16'
+        save_schedules(self._solve(algorithm))
+
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.week_range = '1-8'
+        algorithm.initialize_available_slots()
+        assert algorithm.slot_index.free.all()
+        created = AutoScheduleService.bulk_save_schedules(self._solve(algorithm).create_schedules())
+        assert {s.week_range for s in created} == {'1-8'}
+        assert not any(s.has_conflicts() for s in created)
+
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.week_range = '1-16'
+        algorithm.initialize_available_slots()
+        assert not algorithm.slot_index.free.all()
+
+    @staticmethod
+    def _solve(algorithm):
+        algorithm.solve(timeout_seconds=30)
+        return algorithm
+
+
+@pytest.mark.django_db
+class TestConflictDetector:
+    """Test the semester conflict report."""
+
+    def test_report_is_built_from_one_streamed_pass(self, django_assert_num_queries):
+        morning = TimeSlotFactory(start_time=time(8, 0), end_time=time(9, 40))
+        late_morning = TimeSlotFactory(start_time=time(9, 0), end_time=time(10, 0), duration_minutes=60)
+        room, other_room = ClassroomFactory(capacity=100), ClassroomFactory(capacity=100)
+
+        def schedule(teacher, classroom, time_slot, week_range):
+            course = CourseFactory(teachers=[teacher], max_students=30)
+            return ScheduleFactory(course=course, teacher=teacher, classroom=classroom,
+                                   time_slot=time_slot, day_of_week=1, week_range=week_range)
+
+        teacher = TeacherUserFactory()
+        first = schedule(teacher, room, morning, '1-8')
+        second = schedule(TeacherUserFactory(), room, morning, '5-12')
+        schedule(teacher, other_room, morning, '13-16')
+        crowded = schedule(TeacherUserFactory(), other_room, late_morning, '1-4')
+        type(other_room).objects.filter(id=other_room.id).update(capacity=10)
+
+        with django_assert_num_queries(2):
+            report = ScheduleConflictDetector.detect_all_conflicts(SEMESTER)
+
+        classroom_conflict, = report['classroom_conflicts']
+        assert classroom_conflict['classroom'] == str(room)
+        assert classroom_conflict['day_of_week'] == '周一'
+        assert [s['id'] for s in classroom_conflict['conflicting_schedules']] == [first.id, second.id]
+        assert report['teacher_conflicts'] == []
+        time_conflict, = report['time_conflicts']
+        assert time_conflict['affected_schedules']['slot2_schedules'] == [crowded.course.name]
+        assert len(time_conflict['affected_schedules']['slot1_schedules']) == 3
+        assert {c['schedule_id'] for c in report['capacity_conflicts']} == {
+            s.id for s in Schedule.objects.filter(classroom=other_room)
+        }
+
+
+    def test_placements_are_checked_with_one_set_query(self, scheduling_resources, django_assert_num_queries):
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.solve(timeout_seconds=30)
+        existing = save_schedules(algorithm)[0]
+        free_teacher = TeacherUserFactory()
+        busy_rooms = set(Schedule.objects.filter(day_of_week=existing.day_of_week, time_slot=existing.time_slot)
+                         .values_list('classroom_id', flat=True))
+        other_room = next(c for c in scheduling_resources['classrooms'] if c.id not in busy_rooms)
+        placement = {'teacher_id': free_teacher.id, 'classroom_id': other_room.id,
+                     'day_of_week': existing.day_of_week, 'time_slot_id': existing.time_slot_id,
+                     'week_range': '1-8'}
+        placements = [
+            # clashes with the saved schedule only
+            dict(placement, classroom_id=existing.classroom_id, teacher_id=TeacherUserFactory().id),
+            placement,
+            dict(placement, week_range='5-6'),  # clashes with the previous placement only
+            dict(placement, week_range='9-16'),
+        ]
+
+        # one query for the time slot grid, one for the candidate schedules
+        with django_assert_num_queries(2):
+            results = ScheduleConflictDetector.check_placements(placements, SEMESTER)
+
+        assert [(c['conflict_type'], c['schedule']) for c in results[0]] == [('classroom', existing)]
+        assert [(c['conflict_type'], c['batch_index']) for c in results[1]] == [('classroom', 2), ('teacher', 2)]
+        assert [c['batch_index'] for c in results[2]] == [1, 1]
+        assert results[3] == []
+        assert ScheduleConflictDetector.check_placements(placements[:1], SEMESTER, [existing.id]) == [[]]
+
+    def test_batch_endpoints(self, scheduling_resources, admin_user):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from apps.schedules.views import batch_check_schedule_conflicts, batch_create_schedules
+
+        course, teacher = scheduling_resources['courses'][2], scheduling_resources['teachers'][2]
+        classroom, time_slot = scheduling_resources['classrooms'][0], scheduling_resources['time_slots'][0]
+
+        def post(view, data):
+            request = APIRequestFactory().post('/api/schedules/', data, format='json')
+            force_authenticate(request, user=admin_user)
+            return view(request)
+
+        response = post(batch_create_schedules, {
+            'course_id': course.id, 'teacher_id': teacher.id, 'classroom_id': classroom.id,
+            'semester': SEMESTER, 'academic_year': ACADEMIC_YEAR, 'week_range': '1-16',
+            'time_slots': [{'day_of_week': 1, 'time_slot_id': time_slot.id}] * 2,
+        })
+        assert response.status_code == 201
+        assert response.data['data']['created_count'] == 1
+        assert response.data['data']['conflicts'][0]['conflict_type'] == 'classroom'
+        created = Schedule.objects.get(course=course)
+
+        placement = {'teacher_id': teacher.id, 'classroom_id': classroom.id,
+                     'day_of_week': 1, 'time_slot_id': time_slot.id}
+        response = post(batch_check_schedule_conflicts, {'semester': SEMESTER, 'placements': [placement]})
+        data = response.data['data']
+        assert data['has_conflicts'] and data['conflict_count'] == 1
+        assert data['results'][0]['conflicts'][0]['conflicting_schedule']['id'] == created.id
+
+        moved = dict(placement, exclude_schedule_id=created.id, day_of_week=2)
+        response = post(batch_check_schedule_conflicts, {'semester': SEMESTER, 'placements': [moved, placement]})
+        assert not response.data['data']['has_conflicts']
+
+
+@pytest.mark.django_db
+class TestScheduleTableCache:
+    """Test the versioned, ETag-validated timetable cache."""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self, settings):
+        from django.core.cache import cache
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        cache.clear()
+
+    @staticmethod
+    def get_table(user, **headers):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from apps.schedules.views import get_schedule_table
+
+        request = APIRequestFactory().get('/api/schedules/table/', {'semester': SEMESTER}, **headers)
+        force_authenticate(request, user=user)
+        return get_schedule_table(request)
+
+    @staticmethod
+    def timetable_courses(response):
+        return {cell['course_name'] for day in response.data['data']['schedule_table'].values()
+                for cell in day.values() if cell}
+
+    def test_warm_hits_and_revalidation_skip_the_database(self, django_assert_num_queries):
+        from tests.factories import EnrollmentFactory, StudentUserFactory
+
+        teacher, student = TeacherUserFactory(), StudentUserFactory()
+        course = CourseFactory(teachers=[teacher], max_students=30)
+        ScheduleFactory(course=course, teacher=teacher, classroom=ClassroomFactory(capacity=50), day_of_week=1)
+        EnrollmentFactory(student=student, course=course)
+
+        cold = self.get_table(student)
+        assert cold.status_code == 200 and self.timetable_courses(cold) == {course.name}
+
+        with django_assert_num_queries(0):
+            warm = self.get_table(student)
+            not_modified = self.get_table(student, HTTP_IF_NONE_MATCH=f'W/{cold["ETag"]}')
+        assert warm.data == cold.data and warm['ETag'] == cold['ETag']
+        assert not_modified.status_code == 304 and not_modified.data is None
+
+    def test_writes_bump_only_the_affected_timetables(self):
+        from tests.factories import EnrollmentFactory, StudentUserFactory
+
+        teacher, student, other_student = TeacherUserFactory(), StudentUserFactory(), StudentUserFactory()
+        room = ClassroomFactory(capacity=50)
+        first, second = (CourseFactory(teachers=[teacher], max_students=30) for _ in range(2))
+        schedule = ScheduleFactory(course=first, teacher=teacher, classroom=room, day_of_week=1)
+        ScheduleFactory(course=second, teacher=teacher, classroom=room, day_of_week=2)
+        EnrollmentFactory(student=student, course=first)
+        EnrollmentFactory(student=other_student, course=first)
+        etags = {user.id: self.get_table(user)['ETag'] for user in (student, other_student, teacher)}
+
+        # enrolling only changes that student's timetable
+        EnrollmentFactory(student=student, course=second)
+        response = self.get_table(student)
+        assert response['ETag'] != etags[student.id]
+        assert self.timetable_courses(response) == {first.name, second.name}
+        assert self.get_table(other_student)['ETag'] == etags[other_student.id]
+        assert self.get_table(teacher)['ETag'] == etags[teacher.id]
+
+        # a schedule edit invalidates every timetable of the semester
+        schedule.notes = 'moved'
+        schedule.save()
+        assert self.get_table(other_student)['ETag'] != etags[other_student.id]
+        response = self.get_table(teacher)
+        assert response['ETag'] != etags[teacher.id]
+        assert response.data['data']['schedule_table'][1][schedule.time_slot_id]['notes'] == 'moved'
+
+    def test_evicted_payload_is_rebuilt_instead_of_304(self):
+        from django.core.cache import cache
+
+        teacher = TeacherUserFactory()
+        course = CourseFactory(teachers=[teacher], max_students=30)
+        ScheduleFactory(course=course, teacher=teacher, classroom=ClassroomFactory(capacity=50), day_of_week=1)
+        cold = self.get_table(teacher)
+
+        # renaming a course bumps no version; once the payload is gone the client gets the new name
+        type(course).objects.filter(id=course.id).update(name='Renamed')
+        cache.clear()
+        response = self.get_table(teacher, HTTP_IF_NONE_MATCH=cold['ETag'])
+        assert response.status_code == 200 and response['ETag'] != cold['ETag']
+        assert self.timetable_courses(response) == {'Renamed'}
+
+        # an unchanged rebuild still revalidates
+        assert self.get_table(teacher, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+    def test_bulk_delete_bumps_the_semester_once(self, monkeypatch):
+        from utils.cache import CacheManager
+
+        teacher = TeacherUserFactory()
+        for day in (1, 2, 3):
+            course = CourseFactory(teachers=[teacher], max_students=30)
+            ScheduleFactory(course=course, teacher=teacher, classroom=ClassroomFactory(capacity=50), day_of_week=day)
+        assert self.timetable_courses(self.get_table(teacher))
+        bumps = []
+        bump = CacheManager.bump_schedule_version
+        monkeypatch.setattr(CacheManager, 'bump_schedule_version', lambda *scopes: bumps.append(scopes) or bump(*scopes))
+
+        deleted = AutoScheduleService.remove_existing_schedules(SEMESTER, Schedule.objects.first().academic_year)
+
+        assert deleted == 3 and bumps == [(SEMESTER,)]
+        assert self.timetable_courses(self.get_table(teacher)) == set()
+
+
+@pytest.mark.django_db
+class TestConstraintDomains:
+    """Test most-constrained-first ordering and the incremental domain counts."""
+
+    def test_incremental_counts_match_recomputation(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.initialize_available_slots()
+        model, core = algorithm.model, algorithm.core
+        domains = ConstraintDomains(model, algorithm.slot_index, range(len(model.constraints)), 3)
+        while domains.has_pending():
+            ci = domains.pop()
+            pairs = core.select_forward_checked(ci, domains)
+            domains.consume(ci, pairs)
+            core.commit(ci, pairs)
+
+        fresh = ConstraintDomains(model, algorithm.slot_index, [], 3)
+        assert (domains.room_count == fresh.room_count).all()
+        assert (domains.teacher_free == fresh.teacher_free).all()
+        assert (domains.day_domain == fresh.day_domain).all()
+        assert (domains.pair_domain == fresh.pair_domain).all()
+
+    def test_candidate_domains_match_solver_model(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.constraints[0].preferred_classrooms = scheduling_resources['classrooms'][:2]
+        algorithm.constraints[1].preferred_time_slots = scheduling_resources['time_slots'][1:]
+        algorithm.constraints[1].avoid_noon = True
+        algorithm.constraints[2].preferred_days = [2, 4]
+        algorithm.initialize_available_slots()
+        model = algorithm.model
+        candidates = CandidateDomains(model)
+
+        for ci in range(len(model.constraints)):
+            for relax in (False, True):
+                assert candidates.allowed_cells(ci, relax).tolist() == model.allowed_cells(ci, relax).tolist()
+                assert candidates.cell_mask(ci, relax) == algorithm.slot_index.mask_from_cells(
+                    model.allowed_cells(ci, relax))
+                expected_rooms = model.allowed_rooms(ci, relax)
+                rooms = candidates.allowed_rooms(ci, relax)
+                assert (rooms is None and expected_rooms is None) or rooms.tolist() == expected_rooms.tolist()
+
+    def test_scarce_room_constraint_is_scheduled_first(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        # The last, lowest-priority course can only use one classroom
+        scarce = algorithm.constraints[-1]
+        scarce.preferred_classrooms = scheduling_resources['classrooms'][:1]
+        scarce.priority = 1
+        algorithm.initialize_available_slots()
+        model = algorithm.model
+        domains = ConstraintDomains(model, algorithm.slot_index, range(len(model.constraints)), 3)
+
+        assert domains.pop() == model.index_of(scarce)
+
+    def test_wipeout_is_reported_for_the_losing_constraint(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        # Two courses compete for a single classroom on a single day
+        for constraint in algorithm.constraints[2:]:
+            constraint.preferred_classrooms = scheduling_resources['classrooms'][:1]
+            constraint.preferred_days = [1]
+            constraint.sessions_per_week = 1
+        algorithm.initialize_available_slots()
+        model = algorithm.model
+        first, second = (model.index_of(c) for c in algorithm.constraints[2:])
+        domains = ConstraintDomains(model, algorithm.slot_index, [first, second], 3)
+        domains.pending[first] = False
+
+        assert domains.wipeouts(first, [(0, cell) for cell in range(3)]) == {}
+        assert domains.wipeouts(first, [(0, cell) for cell in range(4)]) == {second: {0, 1, 2, 3}}
+
+
+@pytest.mark.django_db
+class TestMultiStartScheduling:
+    """Test the multi-start greedy solver."""
+
+    def test_solver_model_pickles_without_orm_objects(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        algorithm.initialize_available_slots()
+
+        restored = pickle.loads(pickle.dumps(algorithm.model))
+
+        assert restored.constraints == []
+        assert restored.classrooms == []
+        assert restored.sessions.tolist() == algorithm.model.sessions.tolist()
+        assert restored.allowed_cells(0).tolist() == algorithm.model.allowed_cells(0).tolist()
+
+    def test_first_start_matches_greedy(self, scheduling_resources):
+        greedy = build_algorithm(scheduling_resources)
+        greedy_result = greedy.solve(timeout_seconds=30)
+
+        multi_start = build_algorithm(scheduling_resources, algorithm_class=MultiStartSchedulingAlgorithm)
+        multi_start.num_starts = 1
+        multi_start.max_workers = 1
+        result = multi_start.solve(timeout_seconds=30)
+
+        assert result['best_seed'] == 0
+        assert result['successful_assignments'] == greedy_result['successful_assignments']
+        for constraint, slots in greedy.assigned_slots.items():
+            assert multi_start.assigned_slots[constraint] == slots
+
+    def test_serial_starts_are_conflict_free(self, scheduling_resources):
+        greedy_result = build_algorithm(scheduling_resources).solve(timeout_seconds=30)
+
+        algorithm = build_algorithm(scheduling_resources, algorithm_class=MultiStartSchedulingAlgorithm)
+        algorithm.num_starts = 4
+        algorithm.max_workers = 1
+        result = algorithm.solve(timeout_seconds=30)
+
+        assert result['starts_completed'] == 4
+        assert result['successful_assignments'] >= greedy_result['successful_assignments']
+        assert_conflict_free(result['assigned_slots'])
+
+    def test_parallel_starts_match_serial(self, scheduling_resources):
+        serial = build_algorithm(scheduling_resources, algorithm_class=MultiStartSchedulingAlgorithm)
+        serial.num_starts = 3
+        serial.max_workers = 1
+        serial_result = serial.solve(timeout_seconds=30)
+
+        parallel = build_algorithm(scheduling_resources, algorithm_class=MultiStartSchedulingAlgorithm)
+        parallel.num_starts = 3
+        parallel.max_workers = 2
+        parallel_result = parallel.solve(timeout_seconds=30)
+
+        assert parallel.start_results == serial.start_results
+        assert parallel_result['best_seed'] == serial_result['best_seed']
+        assert_conflict_free(parallel_result['assigned_slots'])
+
+
+def build_genetic_algorithm(resources, **options):
+    algorithm = build_algorithm(resources, algorithm_class=GeneticSchedulingAlgorithm)
+    algorithm.population_size = 8
+    algorithm.max_generations = 5
+    algorithm.elite_size = 2
+    for name, value in options.items():
+        setattr(algorithm, name, value)
+    return algorithm
+
+
+@pytest.mark.django_db
+class TestGeneticFitness:
+    """Test the encoded genetic fitness evaluation."""
+
+    def test_conflicting_genome_scores_negative(self, scheduling_resources):
+        algorithm = build_genetic_algorithm(scheduling_resources)
+        algorithm._prepare_model()
+        greedy = build_algorithm(scheduling_resources)
+        individual = Individual(chromosome=greedy.solve(timeout_seconds=30)['assigned_slots'])
+
+        genome = algorithm.encode(individual)
+        assert genome.dtype.kind == 'i'
+        assert (genome >= 0).all()
+        assert algorithm.fitness_evaluator.evaluate(genome) >= 1000
+
+        # Book the first course twice into the same classroom and time
+        genome[1] = genome[0]
+        assert algorithm.fitness_evaluator.evaluate(genome) < 0
+
+    def test_serial_and_parallel_runs_are_identical(self, scheduling_resources):
+        serial = build_genetic_algorithm(scheduling_resources, rng=random.Random(7), fitness_workers=1)
+        serial_result = serial.solve()
+        parallel = build_genetic_algorithm(scheduling_resources, rng=random.Random(7), fitness_workers=2)
+        parallel_result = parallel.solve()
+
+        assert parallel.fitness_evaluator.parallel
+        assert parallel.fitness_history == serial.fitness_history
+        assert parallel_result['best_fitness'] == serial_result['best_fitness']
+        assert (parallel.encode(parallel.best_individual).tolist() ==
+                serial.encode(serial.best_individual).tolist())
+
+    def test_incremental_updates_match_full_evaluation(self, scheduling_resources):
+        algorithm = build_genetic_algorithm(scheduling_resources, rng=random.Random(11))
+        algorithm._prepare_model()
+        evaluator = algorithm.fitness_evaluator
+        individual = Individual(genome=algorithm._random_genome())
+        algorithm.calculate_fitness(individual)
+
+        for _ in range(200):
+            ci = algorithm.rng.randrange(len(evaluator.offsets) - 1)
+            evaluator.update(individual.genome, individual.state, ci, algorithm._random_genes(ci))
+            rebuilt = evaluator.build_state(individual.genome)
+            assert individual.state.fitness() == rebuilt.fitness()
+            assert individual.state.soft.tolist() == rebuilt.soft.tolist()
+            assert individual.state.room_counts.tolist() == rebuilt.room_counts.tolist()
+            assert individual.state.total_conflicts == rebuilt.total_conflicts
+
+    def test_crossover_children_keep_consistent_state(self, scheduling_resources):
+        algorithm = build_genetic_algorithm(scheduling_resources, rng=random.Random(5), crossover_rate=1.0)
+        algorithm._prepare_model()
+        parents = [Individual(genome=algorithm._random_genome()) for _ in range(2)]
+        algorithm.evaluate_population(parents)
+
+        for limit in (0, 64):
+            algorithm.delta_crossover_limit = limit
+            for child in algorithm.crossover(*parents):
+                assert child.fitness == algorithm.fitness_evaluator.evaluate(child.genome)
+        # Parents are left untouched
+        for parent in parents:
+            assert parent.fitness == algorithm.fitness_evaluator.evaluate(parent.genome)
+
+    def test_population_rows_share_one_genome_matrix(self, scheduling_resources):
+        algorithm = build_genetic_algorithm(scheduling_resources, rng=random.Random(3))
+        algorithm.solve()
+
+        assert algorithm.genomes.shape[0] == len(algorithm.population)
+        for row, individual in enumerate(algorithm.population):
+            assert np.shares_memory(individual.genome, algorithm.genomes)
+            assert individual.genome.tolist() == algorithm.genomes[row].tolist()
+            assert individual.fitness == algorithm.fitness_evaluator.evaluate(individual.genome)
+        # The best individual is a detached copy
+        assert not np.shares_memory(algorithm.best_individual.genome, algorithm.genomes)
+
+    def test_hybrid_seeds_genetic_stage_with_greedy_result(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources, algorithm_class=HybridSchedulingAlgorithm)
+        algorithm.population_size = 6
+        algorithm.max_generations = 3
+        algorithm.elite_size = 1
+        result = algorithm.solve(timeout_seconds=30)
+
+        assert result['total_constraints'] == len(scheduling_resources['courses'])
+        assert result['successful_assignments'] == result['total_constraints']
+
+
+@pytest.mark.django_db
+class TestLocalSearch:
+    """Test the tabu / simulated-annealing local search."""
+
+    @staticmethod
+    def _engine(algorithm, assignments, **options):
+        algorithm.initialize_available_slots()
+        return LocalSearchEngine(algorithm.model, algorithm.slot_index, algorithm.score_weights,
+                                 assignments, **options)
+
+    @staticmethod
+    def _assert_index_matches(engine):
+        """Every placed session is the owner of its room and teacher cell."""
+        free = np.ones_like(engine.index.free)
+        for session, ci in enumerate(engine.session_constraint):
+            room, cell = engine.room[session], engine.cell[session]
+            if room < 0:
+                continue
+            assert engine.room_owner[room, cell] == session
+            assert engine.teacher_owner[engine.constraint_teacher[ci], cell] == session
+            free[room, cell] = False
+        assert (engine.index.free == free).all()
+
+    def test_incremental_cost_matches_full_cost(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        engine = self._engine(algorithm, {}, seed=3)
+        applied = 0
+        for _ in range(2000):
+            changes = engine.propose()
+            if changes and engine.feasible(changes):
+                engine.apply(changes)
+                applied += 1
+
+        assert applied > 0
+        assert engine.cost == pytest.approx(engine.full_cost())
+        self._assert_index_matches(engine)
+
+    def test_kempe_chain_swaps_connected_sessions(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        greedy = algorithm.solve(timeout_seconds=30)
+        assignments = {algorithm.model.index_of(c): [algorithm.model.slot_position(s) for s in slots]
+                       for c, slots in greedy['assigned_slots'].items()}
+        for constraint, slots in greedy['assigned_slots'].items():
+            algorithm._release_conflict_tracking(constraint, slots)
+        engine = LocalSearchEngine(algorithm.model, algorithm.slot_index, algorithm.score_weights,
+                                   assignments, seed=1)
+
+        chains = 0
+        for session in engine.movable * 20:
+            changes = engine._propose_kempe(session)
+            if not changes or not engine.feasible(changes):
+                continue
+            cells = {engine.cell[s] for s, _room, _cell in changes}
+            assert len(cells) <= 2
+            assert all(room == engine.room[s] for s, room, _cell in changes)
+            engine.apply(changes)
+            chains += 1
+
+        assert chains > 0
+        assert engine.cost == pytest.approx(engine.full_cost())
+        self._assert_index_matches(engine)
+
+    def test_search_places_unassigned_sessions(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources)
+        engine = self._engine(algorithm, {}, max_iterations=3000, seed=0)
+        stats = engine.run()
+
+        assert stats['unassigned_sessions'] == 0
+        assert stats['cost'] < stats['initial_cost']
+        assert engine.cost == pytest.approx(engine.full_cost())
+        self._assert_index_matches(engine)
+
+    @pytest.mark.parametrize('acceptance', ['annealing', 'tabu'])
+    def test_local_search_algorithm_is_conflict_free(self, scheduling_resources, acceptance):
+        algorithm = build_algorithm(scheduling_resources, algorithm_class=LocalSearchSchedulingAlgorithm)
+        algorithm.local_search_options.update(acceptance=acceptance, max_iterations=500, seed=0)
+        result = algorithm.solve(timeout_seconds=30)
+
+        assert result['successful_assignments'] == len(scheduling_resources['courses'])
+        assert result['local_search']['cost'] <= result['local_search']['initial_cost']
+        assert_conflict_free(result['assigned_slots'])
+        assert len(algorithm.create_schedules()) == 2 * len(scheduling_resources['courses'])
+
+
+def assignment_keys(assigned_slots):
+    """(course, slot key) pairs of a solution, independent of the record types used."""
+    return sorted(
+        (constraint.course.id, slot.day_of_week, slot.time_slot.id, slot.classroom.id)
+        for constraint, slots in assigned_slots.items() for slot in slots
+    )
+
+
+@pytest.mark.django_db
+class TestSolverSnapshot:
+    """Test snapshot export/import and database-free replays."""
+
+    def _export(self, resources, path):
+        ScheduleFactory(
+            course=resources['courses'][2], teacher=resources['teachers'][2],
+            classroom=resources['classrooms'][0], time_slot=resources['time_slots'][0], day_of_week=1,
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR
+        )
+        return build_algorithm(resources).export_snapshot(path)
+
+    @pytest.mark.parametrize('file_name', ['problem.npz', 'problem'])
+    def test_round_trip_preserves_model(self, scheduling_resources, tmp_path, file_name):
+        path = str(tmp_path / file_name)
+        exported = self._export(scheduling_resources, path)
+        loaded = SolverSnapshot.load(path, mmap_mode=None if path.endswith('.npz') else 'r')
+
+        original, restored = exported.build_model(), loaded.build_model()
+        for name in ('time_slot_ids', 'time_slot_noon', 'classroom_ids', 'classroom_capacity', 'course_ids',
+                     'constraint_teacher', 'sessions', 'priority', 'room_pref', 'time_pref', 'day_pref',
+                     'max_daily', 'avoid_consecutive', 'fixed_offsets'):
+            np.testing.assert_array_equal(getattr(original, name), getattr(restored, name))
+        assert loaded.existing_rows == exported.existing_rows
+        assert (loaded.semester, loaded.academic_year) == (SEMESTER, ACADEMIC_YEAR)
+
+    def test_replay_matches_database_run_without_queries(self, scheduling_resources, tmp_path,
+                                                         django_assert_num_queries):
+        path = str(tmp_path / 'problem.npz')
+        self._export(scheduling_resources, path)
+        expected = build_algorithm(scheduling_resources).solve(timeout_seconds=30)
+
+        snapshot = SolverSnapshot.load(path)
+        with django_assert_num_queries(0):
+            result = SchedulingAlgorithm.from_snapshot(snapshot).solve(timeout_seconds=30)
+            core_result = snapshot.solve_greedy()
+
+        assert assignment_keys(result['assigned_slots']) == assignment_keys(expected['assigned_slots'])
+        assert core_result['successful'] == result['successful_assignments']
+
+    def test_hybrid_stages_share_the_snapshot(self, scheduling_resources, tmp_path, django_assert_num_queries):
+        snapshot = self._export(scheduling_resources, str(tmp_path / 'problem'))
+        algorithm = HybridSchedulingAlgorithm.from_snapshot(snapshot, population_size=6, max_generations=2)
+
+        with django_assert_num_queries(0):
+            result = algorithm.solve(timeout_seconds=30)
+
+        assert result['successful_assignments'] == len(scheduling_resources['courses'])
+        assert_conflict_free(result['assigned_slots'])
+
+
+class TestBenchmark:
+    """Test the synthetic benchmark harness and its regression gate."""
+
+    def test_problems_are_reproducible(self):
+        first = build_problem(scaled_params(40, seed=7)).to_arrays()
+        second = build_problem(scaled_params(40, seed=7)).to_arrays()
+
+        for name, array in first.items():
+            if name != 'meta_json':
+                np.testing.assert_array_equal(array, second[name])
+
+    def test_report_records_metrics(self):
+        report = run_benchmark(sizes=[40], algorithms=['greedy'], timeout_seconds=30, log=lambda _message: None)
+
+        record, = report['results']
+        assert record['num_courses'] == 40
+        assert record['hard_conflicts'] == 0
+        assert record['success_rate'] > 0
+        assert record['wall_time'] > 0 and record['peak_memory_mb'] > 0
+        assert compare_with_baseline(report, report) == []
+
+    def test_gate_flags_slowdown_and_quality_loss(self):
+        baseline = {'results': [{'num_courses': 100, 'algorithm': 'greedy', 'wall_time': 2.0,
+                                 'peak_memory_mb': 10.0, 'success_rate': 100.0, 'soft_score': 1000.0,
+                                 'hard_conflicts': 0}]}
+        current = {'results': [dict(baseline['results'][0], wall_time=3.0, soft_score=900.0)]}
+
+        metrics = {item['metric'] for item in compare_with_baseline(current, baseline)}
+
+        assert metrics == {'wall_time', 'soft_score'}
+        assert compare_with_baseline(current, baseline, {'max_slowdown': 1.0, 'max_soft_score_drop': 0.2}) == []
+
+
+class TestTimeBudget:
+    """Test the shared wall-clock budget."""
+
+    def test_stage_never_outlives_parent(self):
+        budget = TimeBudget(10)
+        stage = budget.stage(0.5, reserve=2)
+
+        assert stage.deadline <= budget.deadline
+        assert 3.5 < stage.remaining() <= 4.0
+        assert budget.stage(5).deadline == budget.deadline
+
+    def test_unlimited_budget(self):
+        budget = TimeBudget()
+
+        assert not budget.limited
+        assert not budget.expired()
+        assert not budget.stage(0.1).limited
+
+
+@pytest.mark.django_db
+class TestSolverTimeBudgets:
+    """Test that the genetic and hybrid solvers stop within their budget."""
+
+    def test_genetic_returns_best_so_far_when_budget_is_spent(self, scheduling_resources):
+        algorithm = build_genetic_algorithm(scheduling_resources, max_generations=10 ** 6)
+        result = algorithm.solve(timeout_seconds=0)
+
+        assert result['termination_reason'] == '超时'
+        assert result['generations'] == 0
+        assert result['best_fitness'] == max(individual.fitness for individual in algorithm.population)
+
+    def test_hybrid_shares_one_deadline_across_stages(self, scheduling_resources):
+        algorithm = build_algorithm(scheduling_resources, algorithm_class=HybridSchedulingAlgorithm)
+        algorithm.population_size = 6
+        algorithm.max_generations = 10 ** 6
+        algorithm.elite_size = 1
+        started = time_module.monotonic()
+        result = algorithm.solve(timeout_seconds=0.5)
+
+        assert time_module.monotonic() - started < 2
+        assert result['successful_assignments'] == len(scheduling_resources['courses'])
+        assert algorithm.create_schedules()
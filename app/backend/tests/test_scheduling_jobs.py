@@ -0,0 +1,208 @@
+"""
+Tests for asynchronous scheduling jobs.
+"""
+
+import pytest
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.schedules.consumers import SchedulingJobConsumer
+from apps.schedules.models import Schedule, SchedulingJob
+from apps.schedules.tasks import run_scheduling_job
+from apps.schedules.views import get_scheduling_job
+from apps.schedules.views_algorithm import apply_scheduling_results, get_scheduling_status, run_scheduling_algorithm
+from tests.factories import AdminUserFactory, StudentUserFactory, UserFactory
+from tests.test_scheduling_algorithms import SEMESTER, ACADEMIC_YEAR, scheduling_resources  # noqa: F401
+
+
+@pytest.fixture
+def published_courses(scheduling_resources):
+    for course in scheduling_resources['courses']:
+        course.is_published = True
+        course.save()
+    return scheduling_resources['courses']
+
+
+def call(view, user, method='get', data=None, **kwargs):
+    factory = APIRequestFactory()
+    if method == 'get':
+        request = factory.get('/', data)
+    else:
+        request = factory.post('/', data, format='json')
+    force_authenticate(request, user=user)
+    return view(request, **kwargs)
+
+
+@pytest.mark.django_db
+class TestSchedulingJobs:
+    """Test running auto scheduling as a Celery task (eager in tests)."""
+
+    def test_job_runs_and_persists_result(self, published_courses):
+        job = SchedulingJob.objects.create(
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR,
+            parameters={'timeout_seconds': 30}
+        )
+        run_scheduling_job.apply(args=[job.id])
+        job.refresh_from_db()
+
+        assert job.status == 'completed'
+        assert job.started_at is not None and job.finished_at is not None
+        assert job.progress['stage'] == 'completed'
+        assert job.result['total_constraints'] == len(published_courses)
+        assert job.result['created_schedules_count'] == Schedule.objects.filter(semester=SEMESTER).count()
+
+    def test_job_without_saving_returns_assignments(self, published_courses):
+        job = SchedulingJob.objects.create(
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR,
+            parameters={'timeout_seconds': 30, 'save_results': False}
+        )
+        run_scheduling_job.apply(args=[job.id])
+        job.refresh_from_db()
+
+        assert job.status == 'completed'
+        assert not Schedule.objects.exists()
+        assert {a['course_id'] for a in job.result['assignments']} <= {c.id for c in published_courses}
+
+    def test_failed_job_records_error(self, published_courses):
+        job = SchedulingJob.objects.create(
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR,
+            parameters={'timeout_seconds': 'not-a-number'}
+        )
+        run_scheduling_job.apply(args=[job.id])
+        job.refresh_from_db()
+
+        assert job.status == 'failed'
+        assert job.error_message
+
+    def test_status_endpoint_reports_jobs_and_counts(self, admin_user, published_courses):
+        job = SchedulingJob.objects.create(
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR,
+            parameters={'timeout_seconds': 30}
+        )
+        run_scheduling_job.apply(args=[job.id])
+
+        request = APIRequestFactory().get('/api/scheduling/status/', {'semester': SEMESTER})
+        force_authenticate(request, user=admin_user)
+        response = get_scheduling_status(request)
+
+        assert response.status_code == 200
+        data = response.data['data']
+        assert data['total_courses'] == len(published_courses)
+        assert data['scheduled_courses'] + data['unscheduled_courses'] == data['total_courses']
+        assert data['latest_job']['id'] == job.id
+        assert data['last_scheduling_time'] is not None
+
+    def test_computed_job_can_be_applied(self, admin_user, published_courses):
+        job = SchedulingJob.objects.create(
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR,
+            parameters={'timeout_seconds': 30, 'save_results': False, 'week_range': '1-8'}
+        )
+        run_scheduling_job.apply(args=[job.id])
+        job.refresh_from_db()
+        assignments = job.result['assignments']
+        assert assignments and not Schedule.objects.exists()
+
+        request = APIRequestFactory().post('/api/scheduling/apply-results/', {'job_id': job.id}, format='json')
+        force_authenticate(request, user=admin_user)
+        response = apply_scheduling_results(request)
+
+        assert response.status_code == 200
+        saved = Schedule.objects.filter(semester=SEMESTER, academic_year=ACADEMIC_YEAR, status='active')
+        assert sorted(saved.values_list('course_id', 'classroom_id', 'time_slot_id', 'day_of_week', 'week_range')) == \
+            sorted((a['course_id'], a['classroom_id'], a['time_slot_id'], a['day_of_week'], '1-8') for a in assignments)
+
+    def test_progress_socket_is_limited_to_job_owner_and_admins(self):
+        owner = UserFactory(user_type='academic_admin', employee_id='E000001')
+        job = SchedulingJob.objects.create(semester=SEMESTER, academic_year=ACADEMIC_YEAR, created_by=owner)
+
+        def can_view(user):
+            consumer = SchedulingJobConsumer()
+            consumer.user = user
+            return consumer.can_view_job(job)
+
+        assert can_view(owner)
+        assert can_view(AdminUserFactory())
+        assert not can_view(UserFactory(user_type='academic_admin', employee_id='E000002'))
+        assert not can_view(StudentUserFactory())
+
+    def test_compute_only_job_never_deletes_live_schedules(self, admin_user, published_courses):
+        first = SchedulingJob.objects.create(
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR, parameters={'timeout_seconds': 30}
+        )
+        run_scheduling_job.apply(args=[first.id])
+        live = set(Schedule.objects.values_list('id', flat=True))
+        assert live
+
+        job = SchedulingJob.objects.create(
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR,
+            parameters={'timeout_seconds': 30, 'save_results': False, 'force_recreate': True}
+        )
+        run_scheduling_job.apply(args=[job.id])
+        job.refresh_from_db()
+
+        assert job.status == 'completed' and job.result['deleted_schedules_count'] == 0
+        assert set(Schedule.objects.values_list('id', flat=True)) == live
+
+    def test_job_endpoints_are_limited_to_job_owner_and_admins(self, admin_user, published_courses):
+        owner = UserFactory(user_type='academic_admin', employee_id='E000001')
+        other = UserFactory(user_type='academic_admin', employee_id='E000002')
+        job = SchedulingJob.objects.create(
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR, created_by=owner,
+            parameters={'timeout_seconds': 30, 'save_results': False}
+        )
+        run_scheduling_job.apply(args=[job.id])
+        status_params = {'semester': SEMESTER, 'job_id': job.id}
+
+        assert call(get_scheduling_status, StudentUserFactory(), data=status_params).status_code == 403
+        assert call(apply_scheduling_results, StudentUserFactory(), 'post', {'job_id': job.id}).status_code == 403
+
+        data = call(get_scheduling_status, other, data=status_params).data['data']
+        assert data['job'] is None and data['latest_job'] is None
+        assert call(get_scheduling_job, other, pk=job.id).status_code == 404
+        assert call(apply_scheduling_results, other, 'post', {'job_id': job.id}).status_code == 400
+        assert not Schedule.objects.exists()
+
+        for user in (owner, admin_user):
+            assert call(get_scheduling_status, user, data=status_params).data['data']['job']['id'] == job.id
+            assert call(get_scheduling_job, user, pk=job.id).status_code == 200
+        assert call(apply_scheduling_results, owner, 'post', {'job_id': job.id}).status_code == 200
+
+    def test_apply_without_job_requires_semester_and_academic_year(self, admin_user, published_courses):
+        course = published_courses[0]
+        assignment = {'course_id': course.id, 'teacher_id': course.teachers.first().id}
+        response = call(apply_scheduling_results, admin_user, 'post',
+                        {'assignments': [assignment], 'semester': SEMESTER})
+
+        assert response.status_code == 400
+        assert not Schedule.objects.exists()
+
+    def test_status_conflict_count_is_cached_until_schedules_change(self, admin_user, published_courses,
+                                                                   settings, django_assert_num_queries):
+        from django.core.cache import cache
+        from apps.schedules.views_algorithm import _conflict_count
+
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        cache.clear()
+        run_scheduling_job.apply(args=[SchedulingJob.objects.create(
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR, parameters={'timeout_seconds': 30}
+        ).id])
+        assert _conflict_count(SEMESTER) == 0
+
+        with django_assert_num_queries(0):
+            assert _conflict_count(SEMESTER) == 0
+
+        schedule = Schedule.objects.first()
+        Schedule.objects.bulk_create([Schedule(
+            course=schedule.course, teacher=schedule.teacher, classroom=schedule.classroom,
+            time_slot=schedule.time_slot, day_of_week=schedule.day_of_week,
+            semester=SEMESTER, academic_year=ACADEMIC_YEAR, week_range=schedule.week_range
+        )])
+        assert _conflict_count(SEMESTER) == 2
+
+    def test_synchronous_run_returns_the_solution(self, admin_user, published_courses):
+        response = call(run_scheduling_algorithm, admin_user, 'post', {
+            'semester': SEMESTER, 'academic_year': ACADEMIC_YEAR, 'timeout_seconds': 30
+        })
+
+        assert response.status_code == 200, response.data
+        assert response.data['data']['total_assignments'] == len(published_courses)
+        assert not Schedule.objects.exists()
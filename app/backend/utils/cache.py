@@ -5,8 +5,10 @@
 
 from django.core.cache import cache
 from django.conf import settings
+from django.db import transaction
 import json
 import hashlib
+import time
 from functools import wraps
 from typing import Any, Optional, Callable
 
@@ -26,6 +28,9 @@ class CacheManager:
     MEDIUM_CACHE_TIME = 60 * 30    # 30分钟
     LONG_CACHE_TIME = 60 * 60 * 2  # 2小时
     
+    # 课程表版本号作用域：时间段网格（全局）、学期、学生选课（f'student:{id}'）
+    TIME_GRID_SCOPE = 'grid'
+    
     @classmethod
     def get_cache_key(cls, prefix: str, *args) -> str:
         """生成缓存键"""
@@ -100,6 +105,48 @@ class CacheManager:
         for pattern in patterns:
             cls.delete_pattern(pattern)
     
+    @classmethod
+    def get_schedule_versions(cls, *scopes) -> Optional[tuple]:
+        """一次读取多个作用域的课程表版本号，缓存不可用时返回 None
+        
+        版本号缺失时以当前时间（纳秒）初始化：缓存被清空或逐出后的新版本号
+        不会与旧版本重复，旧版本号下的课程表缓存不会被误用。
+        """
+        keys = [cls.get_cache_key(cls.SCHEDULE_PREFIX + 'version', scope) for scope in scopes]
+        try:
+            versions = cache.get_many(keys)
+            for key in keys:
+                if key not in versions:
+                    cache.add(key, time.time_ns(), None)
+                    versions[key] = cache.get(key)
+            if None in versions.values():
+                return None
+            return tuple(versions[key] for key in keys)
+        except Exception as e:
+            print(f"Cache version get error: {e}")
+            return None
+    
+    @classmethod
+    def bump_schedule_version(cls, *scopes):
+        """递增课程表版本号，使这些作用域下已缓存的课程表全部失效
+        
+        立即递增一次，事务提交后再递增一次：事务进行中读到旧数据的请求
+        写入的缓存，会在提交后随版本号变化一并失效。
+        """
+        def bump():
+            for scope in scopes:
+                key = cls.get_cache_key(cls.SCHEDULE_PREFIX + 'version', scope)
+                try:
+                    cache.incr(key)
+                except ValueError:
+                    # 版本号不存在：以当前时间初始化，必然大于此前的任何版本号
+                    cache.set(key, time.time_ns(), None)
+                except Exception as e:
+                    print(f"Cache version bump error: {e}")
+        
+        bump()
+        transaction.on_commit(bump)
+    
     @classmethod
     def clear_schedule_cache(cls, semester: str = None):
         """清除排课相关缓存"""
@@ -189,21 +236,44 @@ def set_course_list_cache(filters: dict, data: list, timeout: int = CacheManager
     CacheManager.set_cache(cache_key, data, timeout)
 
 
-def get_schedule_table_cache(semester: str, user_type: str, user_id: int) -> Optional[dict]:
-    """获取课程表缓存"""
-    cache_key = CacheManager.get_cache_key(
+def get_schedule_table_key(semester: str, subject: str, week_filter: str) -> Optional[str]:
+    """生成课程表缓存键
+    
+    键中带上时间段网格与学期的版本号，学生课程表另带该学生的选课版本号，
+    排课、选课或时间段变化后旧键自然失效。版本号取不到时返回 None（不使用缓存）。
+    
+    Args:
+        semester: 规范化后的学期
+        subject: 课程表对象，如 'student:1'、'teacher:2'、'classroom:3'、'all'
+        week_filter: 周次筛选，如 'all'、'week:3'、'weeks:f'
+    """
+    scopes = [CacheManager.TIME_GRID_SCOPE, semester]
+    if subject.startswith('student:'):
+        scopes.append(subject)
+    versions = CacheManager.get_schedule_versions(*scopes)
+    if versions is None:
+        return None
+    return CacheManager.get_cache_key(
         CacheManager.SCHEDULE_PREFIX + 'table',
-        semester, user_type, user_id
+        semester, subject, week_filter, *versions
     )
+
+
+def get_schedule_conflict_count_key(semester: str) -> Optional[str]:
+    """生成学期冲突数缓存键，键中带时间段网格与学期的版本号；版本号取不到时返回 None"""
+    versions = CacheManager.get_schedule_versions(CacheManager.TIME_GRID_SCOPE, semester)
+    if versions is None:
+        return None
+    return CacheManager.get_cache_key(CacheManager.SCHEDULE_PREFIX + 'conflict_count', semester, *versions)
+
+
+def get_schedule_table_cache(cache_key: str) -> Optional[dict]:
+    """获取课程表缓存"""
     return CacheManager.get_cache(cache_key)
 
 
-def set_schedule_table_cache(semester: str, user_type: str, user_id: int, data: dict):
+def set_schedule_table_cache(cache_key: str, data: dict):
     """设置课程表缓存"""
-    cache_key = CacheManager.get_cache_key(
-        CacheManager.SCHEDULE_PREFIX + 'table',
-        semester, user_type, user_id
-    )
     CacheManager.set_cache(cache_key, data, CacheManager.SHORT_CACHE_TIME)
 
 
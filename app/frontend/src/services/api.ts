@@ -151,6 +151,9 @@ export const scheduleAPI = {
   checkConflicts: (data: any) =>
     api.post('/schedules/check-conflicts/', data),
 
+  batchCheckConflicts: (data: any) =>
+    api.post('/schedules/check-conflicts/batch/', data),
+
   exportSchedules: (params?: any) =>
     api.get('/schedules/export/', {
       params,